@@ -1,17 +1,184 @@
-from typing import Optional
-from fastapi_mail import FastMail, MessageSchema, ConnectionConfig, MessageType
+import re
+import threading
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, List, Optional
+from uuid import uuid4
+
+from fastapi.templating import Jinja2Templates
+from fastapi_mail import MessageSchema, ConnectionConfig, MessageType
+from jinja2 import nodes
+from markupsafe import escape
+
+from api.core.dependencies.smtp_pool import PooledFastMail
+from api.utils.logger import logger
 from api.utils.settings import settings
-from premailer import transform
 
 
+EMAIL_TEMPLATES_DIR = Path(__file__).resolve().parent / "email" / "templates"
 
-async def send_email(
-    recipient: str, 
-    template_name: str, 
-    subject: str, 
-    context: Optional[dict] = None
-):
-    from main import email_templates
+email_templates = Jinja2Templates(directory=str(EMAIL_TEMPLATES_DIR))
+
+
+@dataclass
+class CompiledEmail:
+    """A template whose CSS has already been inlined.
+
+    `segments` alternates static HTML and variable names: even indexes are
+    HTML, odd indexes the context keys to substitute between them.
+    """
+
+    segments: List[str]
+    autoescape: bool
+
+    def render(self, context: dict) -> str:
+        parts = self.segments.copy()
+        for i in range(1, len(parts), 2):
+            value = context.get(parts[i], "")
+            parts[i] = str(escape(value)) if self.autoescape else str(value)
+        return "".join(parts)
+
+
+def transform(html: str) -> str:
+    # premailer is imported on first use, it is slow to import
+    from premailer import transform
+
+    return transform(html)
+
+
+@lru_cache(maxsize=256)
+def inline_css(html: str) -> str:
+    """Inlines the CSS of a rendered email, reusing the result for identical HTML"""
+
+    return transform(html)
+
+
+class EmailRenderer:
+    """Renders email templates with their CSS inlined.
+
+    Templates that only output plain `{{ variable }}` expressions are
+    rendered once with placeholders and run through premailer once; each
+    send then only substitutes the recipient's variables. Templates using
+    any other Jinja construct (filters, conditionals, loops, attribute
+    access...) are rendered per send, with premailer results cached by
+    `inline_css`.
+    """
+
+    # nodes a template may contain to be precompiled
+    SIMPLE_NODES = (
+        nodes.Template,
+        nodes.Extends,
+        nodes.Block,
+        nodes.Output,
+        nodes.TemplateData,
+        nodes.Name,
+        nodes.Const,
+    )
+
+    def __init__(self, templates: Jinja2Templates):
+        self.env = templates.env
+        self._compiled: Dict[str, Optional[CompiledEmail]] = {}
+        self._lock = threading.Lock()
+
+    def template_variables(self, template_name: str) -> Optional[List[str]]:
+        """Returns the variables of a template and the templates it extends,
+        or None when it uses anything besides plain variable output"""
+
+        analysis = self._analyse(template_name)
+        return None if analysis is None else list(dict.fromkeys(analysis[0]))
+
+    def _analyse(self, template_name: str):
+        source, _, _ = self.env.loader.get_source(self.env, template_name)
+        ast = self.env.parse(source)
+        blocks = {block.name for block in ast.find_all(nodes.Block)}
+
+        variables, skipped = [], set()
+        extends = ast.find(nodes.Extends)
+        if extends is not None:
+            if not isinstance(extends.template, nodes.Const):
+                return None
+            parent = self._analyse(extends.template.value)
+            if parent is None:
+                return None
+            variables, parent_blocks = parent
+            # blocks the parent never renders are dead code
+            skipped = blocks - parent_blocks
+            blocks |= parent_blocks
+
+        if not self._collect(ast, variables, skipped):
+            return None
+        return variables, blocks
+
+    def _collect(self, node: nodes.Node, variables: List[str], skipped: set) -> bool:
+        if isinstance(node, nodes.Block) and node.name in skipped:
+            return True
+        if not isinstance(node, self.SIMPLE_NODES):
+            return False
+        if isinstance(node, nodes.Name):
+            variables.append(node.name)
+
+        return all(
+            self._collect(child, variables, skipped) for child in node.iter_child_nodes()
+        )
+
+    def compile(self, template_name: str) -> Optional[CompiledEmail]:
+        """Inlines the CSS of a template around placeholders for its variables"""
+
+        variables = self.template_variables(template_name)
+        if variables is None:
+            return None
+
+        token = f"x{uuid4().hex}x"
+        placeholders = {name: f"{token}{i}{token}" for i, name in enumerate(variables)}
+        html = inline_css.__wrapped__(
+            self.env.get_template(template_name).render(placeholders)
+        )
+
+        segments = re.split(f"{token}(\\d+){token}", html)
+        for i in range(1, len(segments), 2):
+            segments[i] = variables[int(segments[i])]
+
+        return CompiledEmail(segments=segments, autoescape=bool(self.env.autoescape))
+
+    def get_compiled(self, template_name: str) -> Optional[CompiledEmail]:
+        if template_name not in self._compiled:
+            with self._lock:
+                if template_name not in self._compiled:
+                    self._compiled[template_name] = self.compile(template_name)
+        return self._compiled[template_name]
+
+    def warmup(self):
+        """Precompiles every template, meant to run once at startup"""
+
+        for template_name in self.env.list_templates(extensions=["html"]):
+            try:
+                self.get_compiled(template_name)
+            except Exception as exc:
+                logger.error(f"Could not precompile email template {template_name}: {exc}")
+
+    def render(self, template_name: str, context: Optional[dict] = None) -> str:
+        context = context or {}
+
+        compiled = self.get_compiled(template_name)
+        if compiled is not None:
+            return compiled.render(context)
+
+        return inline_css(self.env.get_template(template_name).render(context))
+
+    def clear(self):
+        with self._lock:
+            self._compiled.clear()
+        inline_css.cache_clear()
+
+
+email_renderer = EmailRenderer(email_templates)
+
+
+@lru_cache(maxsize=1)
+def get_mail_client() -> PooledFastMail:
+    """Builds the mail client once, on the first send; it sends through the
+    shared SMTP pool of the mail server"""
 
     conf = ConnectionConfig(
         MAIL_USERNAME=settings.MAIL_USERNAME,
@@ -26,17 +193,22 @@ async def send_email(
         MAIL_FROM_NAME='HNG Boilerplate',
         # SUPPRESS_SEND=True  # suppress sending of email in testing environment
     )
-    
+    return PooledFastMail(conf)
+
+
+async def send_email(
+    recipient: str,
+    template_name: str,
+    subject: str,
+    context: Optional[dict] = None
+):
     message = MessageSchema(
         subject=subject,
         recipients=[recipient],
         subtype=MessageType.html
     )
-    
+
     # Render the template with context
-    html = email_templates.get_template(template_name).render(context)
-    message.body = transform(html)
-    
-    fm = FastMail(conf)
-    await fm.send_message(message)
-    
\ No newline at end of file
+    message.body = email_renderer.render(template_name, context)
+
+    await get_mail_client().send_message(message)
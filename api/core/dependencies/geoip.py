@@ -0,0 +1,114 @@
+""" Local GeoIP lookups
+
+IP addresses are resolved against a MaxMind database file that is memory
+mapped, so lookups need no network call and the pages are shared by all
+workers. Recent lookups are kept in an LRU cache, since the same users
+keep logging in from the same addresses.
+
+The database is set with GEOIP_DATABASE_PATH. When it is set, the app
+opens it at startup and refuses to start if it cannot; when it is not,
+every location is unknown.
+"""
+import ipaddress
+import threading
+from functools import lru_cache
+from typing import Optional
+
+import geoip2.database
+import maxminddb
+from geoip2.errors import AddressNotFoundError
+
+from api.utils.logger import logger
+from api.utils.settings import settings
+
+
+UNKNOWN_LOCATION = "Unknown Location"
+
+
+class GeoIPResolver:
+    """Resolves IP addresses to a "City, Country" location"""
+
+    def __init__(self, database_path: str, cache_size: int = 4096):
+        self.database_path = database_path
+        self._reader: Optional[geoip2.database.Reader] = None
+        self._unavailable = False
+        self._lock = threading.Lock()
+        self.locate = lru_cache(maxsize=cache_size)(self._locate)
+
+    @property
+    def reader(self) -> Optional[geoip2.database.Reader]:
+        """The database reader, opened on first use; None when the
+        database cannot be opened"""
+
+        if not self.database_path:
+            return None
+
+        if self._reader is None and not self._unavailable:
+            with self._lock:
+                if self._reader is None and not self._unavailable:
+                    try:
+                        self._reader = geoip2.database.Reader(
+                            self.database_path, mode=maxminddb.MODE_MMAP
+                        )
+                    except (OSError, maxminddb.InvalidDatabaseError) as exc:
+                        logger.warning(
+                            f"GeoIP database {self.database_path} is unavailable, "
+                            f"login locations will be unknown: {exc}"
+                        )
+                        self._unavailable = True
+        return self._reader
+
+    def open(self):
+        """Opens the configured database, raising when it cannot be opened,
+        so a missing file is noticed at startup rather than at the first
+        login"""
+
+        if not self.database_path:
+            return
+
+        with self._lock:
+            if self._reader is not None:
+                return
+            try:
+                self._reader = geoip2.database.Reader(self.database_path, mode=maxminddb.MODE_MMAP)
+            except (OSError, maxminddb.InvalidDatabaseError) as exc:
+                raise RuntimeError(
+                    f"GEOIP_DATABASE_PATH is {self.database_path}, which cannot be opened: {exc}"
+                ) from exc
+            self._unavailable = False
+
+    def _locate(self, ip_address: str) -> str:
+        try:
+            address = ipaddress.ip_address(ip_address)
+        except ValueError:
+            return UNKNOWN_LOCATION
+
+        # private, loopback and reserved addresses have no location
+        if not address.is_global:
+            return UNKNOWN_LOCATION
+
+        reader = self.reader
+        if reader is None:
+            return UNKNOWN_LOCATION
+
+        try:
+            if "City" in reader.metadata().database_type:
+                response = reader.city(ip_address)
+                city = response.city.name or "Unknown City"
+            else:
+                response = reader.country(ip_address)
+                city = "Unknown City"
+        except (AddressNotFoundError, TypeError, ValueError):
+            return UNKNOWN_LOCATION
+
+        return f"{city}, {response.country.name or 'Unknown Country'}"
+
+    def close(self):
+        with self._lock:
+            if self._reader is not None:
+                self._reader.close()
+                self._reader = None
+            self.locate.cache_clear()
+
+
+geoip_resolver = GeoIPResolver(settings.GEOIP_DATABASE_PATH, settings.GEOIP_CACHE_SIZE)
@@ -0,0 +1,331 @@
+""" Pooled SMTP connections
+
+Opening an SMTP session costs a TCP connect, a TLS handshake, EHLO and
+AUTH. The pool keeps authenticated sessions open and hands them out to
+senders, so a burst of emails pays that cost once per connection instead
+of once per recipient. Concurrency towards a server is capped by the
+pool size.
+"""
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from email.message import Message
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import aiosmtplib
+from fastapi_mail import ConnectionConfig, FastMail, MessageSchema
+from fastapi_mail.fastmail import email_dispatched
+from fastapi_mail.msg import MailMsg
+
+from api.core.metrics import EMAIL_SENDS
+from api.core.tracing import tracer
+from api.utils.logger import logger
+from api.utils.settings import settings
+
+
+# errors after which a pooled session cannot be reused
+CONNECTION_ERRORS = (
+    aiosmtplib.SMTPServerDisconnected,
+    aiosmtplib.SMTPConnectError,
+    aiosmtplib.SMTPTimeoutError,
+    ConnectionError,
+    OSError,
+)
+
+
+@dataclass
+class PooledConnection:
+    client: aiosmtplib.SMTP
+    last_used: float = field(default_factory=time.monotonic)
+    sent: int = 0
+
+
+@dataclass
+class PoolStats:
+    connections_opened: int = 0
+    messages_sent: int = 0
+
+
+class SMTPPool:
+    """A pool of authenticated SMTP sessions to one server"""
+
+    def __init__(
+        self,
+        hostname: str,
+        port: int,
+        username: Optional[str] = None,
+        password: Optional[str] = None,
+        use_tls: bool = True,
+        start_tls: bool = False,
+        validate_certs: bool = True,
+        timeout: float = 60,
+        max_connections: int = settings.MAIL_POOL_SIZE,
+        max_messages_per_connection: int = settings.MAIL_POOL_MAX_MESSAGES_PER_CONNECTION,
+        idle_timeout: float = settings.MAIL_POOL_IDLE_TIMEOUT,
+    ):
+        self.hostname = hostname
+        self.port = port
+        self.username = username
+        self.password = password
+        self.use_tls = use_tls
+        self.start_tls = start_tls
+        self.validate_certs = validate_certs
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self.max_messages_per_connection = max_messages_per_connection
+        self.idle_timeout = idle_timeout
+        self.stats = PoolStats()
+
+        self._idle: List[PooledConnection] = []
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    @classmethod
+    def from_config(cls, conf: ConnectionConfig, **kwargs) -> "SMTPPool":
+        password = conf.MAIL_PASSWORD
+        if hasattr(password, "get_secret_value"):
+            password = password.get_secret_value()
+
+        return cls(
+            hostname=conf.MAIL_SERVER,
+            port=conf.MAIL_PORT,
+            username=conf.MAIL_USERNAME if conf.USE_CREDENTIALS else None,
+            password=password if conf.USE_CREDENTIALS else None,
+            use_tls=conf.MAIL_SSL_TLS,
+            start_tls=conf.MAIL_STARTTLS,
+            validate_certs=conf.VALIDATE_CERTS,
+            timeout=conf.TIMEOUT,
+            **kwargs,
+        )
+
+    def _bind_loop(self) -> asyncio.Semaphore:
+        """Sessions belong to the event loop that opened them"""
+
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            # the old loop cannot run QUIT any more, drop the transports
+            for connection in self._idle:
+                self._close(connection)
+            self._loop = loop
+            self._idle = []
+            self._semaphore = asyncio.Semaphore(self.max_connections)
+        return self._semaphore
+
+    async def _connect(self) -> PooledConnection:
+        client = aiosmtplib.SMTP(
+            hostname=self.hostname,
+            port=self.port,
+            use_tls=self.use_tls,
+            start_tls=self.start_tls,
+            validate_certs=self.validate_certs,
+            timeout=self.timeout,
+        )
+        await client.connect()
+        if self.username:
+            try:
+                await client.login(self.username, self.password)
+            except BaseException:
+                client.close()
+                raise
+
+        self.stats.connections_opened += 1
+        return PooledConnection(client)
+
+    @staticmethod
+    def _close(connection: PooledConnection):
+        try:
+            connection.client.close()
+        except Exception:
+            pass
+
+    async def _discard(self, connection: PooledConnection):
+        try:
+            if connection.client.is_connected:
+                await connection.client.quit()
+        except Exception:
+            self._close(connection)
+
+    async def _checkout(self) -> PooledConnection:
+        while self._idle:
+            connection = self._idle.pop()
+            idle_for = time.monotonic() - connection.last_used
+            if connection.client.is_connected and idle_for < self.idle_timeout:
+                return connection
+            await self._discard(connection)
+
+        return await self._connect()
+
+    def _release(self, connection: PooledConnection):
+        connection.last_used = time.monotonic()
+        if connection.sent < self.max_messages_per_connection:
+            self._idle.append(connection)
+        else:
+            asyncio.ensure_future(self._discard(connection))
+
+    @asynccontextmanager
+    async def connection(self):
+        """Borrows a session, returning it to the pool unless it failed"""
+
+        async with self._bind_loop():
+            connection = await self._checkout()
+            try:
+                yield connection
+            except BaseException:
+                # the session may be broken or mid-transaction
+                await self._discard(connection)
+                raise
+            self._release(connection)
+
+    async def _send_on(self, connection: PooledConnection, message: Message):
+        await connection.client.send_message(message)
+        connection.sent += 1
+        self.stats.messages_sent += 1
+
+    async def send(self, message: Message):
+        """Sends one message, retrying once on a fresh session if a pooled
+        session turns out to be closed by the server"""
+
+        with tracer.span("smtp send", "client", attributes={"net.peer.name": self.hostname}):
+            try:
+                for attempt in range(2):
+                    try:
+                        async with self.connection() as connection:
+                            await self._send_on(connection, message)
+                            break
+                    except CONNECTION_ERRORS:
+                        if attempt:
+                            raise
+            except Exception:
+                EMAIL_SENDS.labels("failed").inc()
+                raise
+        EMAIL_SENDS.labels("sent").inc()
+
+    async def send_many(self, messages: Sequence[Message]) -> List[Optional[Exception]]:
+        """Sends messages over at most `max_connections` sessions, each
+        sending its share back to back.
+
+        Returns one entry per message: None when sent, the exception otherwise.
+        """
+
+        results: List[Optional[Exception]] = [None] * len(messages)
+        pending = list(enumerate(messages))
+        pending.reverse()
+        semaphore = self._bind_loop()
+
+        async def worker():
+            connection = None
+            async with semaphore:
+                try:
+                    while pending:
+                        index, message = pending.pop()
+                        for attempt in range(2):
+                            try:
+                                if connection is None:
+                                    connection = await self._checkout()
+                                await self._send_on(connection, message)
+                                break
+                            except CONNECTION_ERRORS as exc:
+                                if connection is not None:
+                                    await self._discard(connection)
+                                    connection = None
+                                if attempt:
+                                    results[index] = exc
+                                    logger.error(f"SMTP session to {self.hostname} failed: {exc}")
+                            except (
+                                aiosmtplib.SMTPResponseException,
+                                aiosmtplib.SMTPRecipientsRefused,
+                            ) as exc:
+                                # rejected by the server; login failures leave
+                                # no session, other rejections a usable one
+                                results[index] = exc
+                                if connection is not None:
+                                    try:
+                                        await connection.client.rset()
+                                    except Exception:
+                                        await self._discard(connection)
+                                        connection = None
+                                break
+
+                        if connection is not None and connection.sent >= self.max_messages_per_connection:
+                            await self._discard(connection)
+                            connection = None
+                finally:
+                    if connection is not None:
+                        self._release(connection)
+
+        workers = min(self.max_connections, len(messages))
+        attributes = {"net.peer.name": self.hostname, "email.messages": len(messages)}
+        with tracer.span("smtp send_many", "client", attributes=attributes) as span:
+            await asyncio.gather(*(worker() for _ in range(workers)))
+
+        failed = sum(result is not None for result in results)
+        if span is not None:
+            span.set("email.failed", failed)
+        EMAIL_SENDS.labels("sent").inc(len(results) - failed)
+        EMAIL_SENDS.labels("failed").inc(failed)
+        return results
+
+    async def close(self):
+        idle, self._idle = self._idle, []
+        for connection in idle:
+            await self._discard(connection)
+
+
+_pools: Dict[Tuple, SMTPPool] = {}
+
+
+def get_smtp_pool(conf: ConnectionConfig) -> SMTPPool:
+    """Returns the shared pool of the server and account of a mail config"""
+
+    key = (conf.MAIL_SERVER, conf.MAIL_PORT, conf.MAIL_USERNAME, conf.MAIL_SSL_TLS)
+    if key not in _pools:
+        _pools[key] = SMTPPool.from_config(conf)
+    return _pools[key]
+
+
+async def close_smtp_pools():
+    for pool in _pools.values():
+        await pool.close()
+
+
+class PooledFastMail(FastMail):
+    """FastMail sending through a shared `SMTPPool` instead of opening a
+    session per message"""
+
+    def __init__(self, config: ConnectionConfig, pool: Optional[SMTPPool] = None):
+        super().__init__(config)
+        self.pool = pool or get_smtp_pool(config)
+
+    async def build_message(self, message: MessageSchema) -> Message:
+        sender = self.config.MAIL_FROM
+        if self.config.MAIL_FROM_NAME is not None:
+            sender = f"{self.config.MAIL_FROM_NAME} <{self.config.MAIL_FROM}>"
+        return await MailMsg(message)._message(sender)
+
+    async def send_message(
+        self, message: MessageSchema, template_name: Optional[str] = None
+    ) -> None:
+        if template_name:
+            return await super().send_message(message, template_name)
+
+        msg = await self.build_message(message)
+        if not self.config.SUPPRESS_SEND:
+            await self.pool.send(msg)
+        email_dispatched.send(msg)
+
+    async def send_messages(
+        self, messages: Sequence[MessageSchema]
+    ) -> List[Optional[Exception]]:
+        """Sends a batch of messages, reusing pooled sessions across them"""
+
+        built = [await self.build_message(message) for message in messages]
+        if self.config.SUPPRESS_SEND:
+            results = [None] * len(built)
+        else:
+            results = await self.pool.send_many(built)
+
+        for msg, error in zip(built, results):
+            if error is None:
+                email_dispatched.send(msg)
+        return results
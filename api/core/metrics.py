@@ -0,0 +1,215 @@
+""" Prometheus metrics
+
+Requests are counted and timed by `MetricsMiddleware`, labelled with the
+route template (`/api/v1/blogs/{id}`) rather than the raw path so the
+number of series stays bounded. Database connections in use, SMTP send
+outcomes and the depth of the job and email queues are reported too.
+
+Each worker updates only its own values. Under gunicorn, set
+PROMETHEUS_MULTIPROC_DIR to an empty directory shared by the workers:
+values are then kept in per-process files there and `/metrics` merges
+them, so whichever worker answers the scrape reports the whole server.
+"""
+import os
+import time
+from typing import Dict, Optional, Tuple
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from prometheus_client.core import GaugeMetricFamily
+from sqlalchemy import event, func
+from sqlalchemy.engine import Engine
+from starlette.responses import Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from api.utils.logger import logger
+from api.utils.settings import settings
+
+
+UNMATCHED_ROUTE = "<unmatched>"
+
+HTTP_REQUESTS = Counter(
+    "http_requests_total",
+    "HTTP requests handled",
+    ["method", "route", "status_class"],
+)
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "Time to handle an HTTP request",
+    ["method", "route"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+HTTP_REQUESTS_IN_PROGRESS = Gauge(
+    "http_requests_in_progress",
+    "HTTP requests being handled",
+    ["method"],
+    multiprocess_mode="livesum",
+)
+DB_CONNECTIONS_IN_USE = Gauge(
+    "db_pool_connections_in_use",
+    "Database connections checked out of the pool",
+    multiprocess_mode="livesum",
+)
+DB_POOL_SIZE = Gauge(
+    "db_pool_size",
+    "Connections the database pool keeps open",
+    multiprocess_mode="livesum",
+)
+EMAIL_SENDS = Counter(
+    "email_sends_total",
+    "Emails handed to the SMTP server",
+    ["outcome"],  # sent, failed
+)
+
+
+class MetricsMiddleware:
+    """Counts and times HTTP requests by route template"""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+        self._routes: Dict[Tuple[object, str], str] = {}
+
+    def route_template(self, scope: Scope) -> str:
+        # the router leaves the matched endpoint in the scope
+        endpoint = scope.get("endpoint")
+        router = scope.get("router")
+        if endpoint is None or router is None:
+            return UNMATCHED_ROUTE
+
+        key = (endpoint, scope["method"])
+        template = self._routes.get(key)
+        if template is None:
+            template = next(
+                (
+                    route.path
+                    for route in router.routes
+                    if (getattr(route, "endpoint", None) is endpoint or getattr(route, "app", None) is endpoint)
+                    and scope["method"] in (getattr(route, "methods", None) or {scope["method"]})
+                ),
+                UNMATCHED_ROUTE,
+            )
+            self._routes[key] = template
+        return template
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        method = scope["method"]
+        status_code = 500
+
+        async def send_with_status(message: Message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        in_progress = HTTP_REQUESTS_IN_PROGRESS.labels(method)
+        in_progress.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            duration = time.perf_counter() - start
+            in_progress.dec()
+            route = self.route_template(scope)
+            HTTP_REQUESTS.labels(method, route, f"{status_code // 100}xx").inc()
+            HTTP_REQUEST_DURATION.labels(method, route).observe(duration)
+
+
+def instrument_engine(engine: Engine):
+    """Tracks the connections `engine` has checked out of its pool"""
+
+    size = getattr(engine.pool, "size", None)
+    if callable(size):
+        DB_POOL_SIZE.inc(size())
+
+    event.listen(engine, "checkout", lambda *args: DB_CONNECTIONS_IN_USE.inc())
+    event.listen(engine, "checkin", lambda *args: DB_CONNECTIONS_IN_USE.dec())
+
+
+class QueueDepthCollector:
+    """Reports how many jobs and emails are waiting, read from the
+    database at most every METRICS_QUEUE_DEPTH_TTL seconds"""
+
+    def __init__(self, session_factory=None):
+        self.session_factory = session_factory
+        self._cached: Optional[Tuple[float, list]] = None
+
+    def query(self) -> list:
+        from api.db.database import SessionLocal
+        from api.v1.models.background_job import BackgroundJob
+        from api.v1.models.email_outbox import EmailOutbox
+
+        with (self.session_factory or SessionLocal)() as db:
+            jobs = (
+                db.query(BackgroundJob.queue, BackgroundJob.status, func.count())
+                .filter(BackgroundJob.status.in_(("queued", "running")))
+                .group_by(BackgroundJob.queue, BackgroundJob.status)
+                .all()
+            )
+            emails = (
+                db.query(EmailOutbox.status, func.count())
+                .filter(EmailOutbox.status.in_(("pending", "dead")))
+                .group_by(EmailOutbox.status)
+                .all()
+            )
+
+        return self.families(jobs, emails)
+
+    @staticmethod
+    def families(jobs, emails) -> list:
+        job_depth = GaugeMetricFamily(
+            "background_jobs", "Background jobs waiting or running", labels=["queue", "status"]
+        )
+        for queue, status, count in jobs:
+            job_depth.add_metric([queue, status], count)
+
+        outbox_depth = GaugeMetricFamily(
+            "email_outbox_messages", "Emails waiting to be sent or dead-lettered", labels=["status"]
+        )
+        for status, count in emails:
+            outbox_depth.add_metric([status], count)
+
+        return [job_depth, outbox_depth]
+
+    def describe(self):
+        # lets registries learn the metric names without querying
+        return self.families([], [])
+
+    def collect(self):
+        now = time.monotonic()
+        if self._cached is None or now - self._cached[0] > settings.METRICS_QUEUE_DEPTH_TTL:
+            try:
+                self._cached = (now, self.query())
+            except Exception as exc:
+                logger.error(f"Could not read queue depths for metrics: {exc}")
+                self._cached = (now, [])
+        return self._cached[1]
+
+
+queue_depth_collector = QueueDepthCollector()
+REGISTRY.register(queue_depth_collector)
+
+
+def metrics_registry() -> CollectorRegistry:
+    if "PROMETHEUS_MULTIPROC_DIR" not in os.environ:
+        return REGISTRY
+
+    # a fresh registry per scrape, so concurrent scrapes share nothing
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    registry.register(queue_depth_collector)
+    return registry
+
+
+def metrics_response() -> Response:
+    return Response(generate_latest(metrics_registry()), media_type=CONTENT_TYPE_LATEST)
@@ -0,0 +1,243 @@
+""" Request profiling
+
+`ProfilingMiddleware` profiles a request when it carries a profiling token,
+in the X-Profile-Token header or the profile_token query parameter, or
+when it is picked by sampling 1 in PROFILING_SAMPLE_RATE requests. Tokens
+are signed with SECRET_KEY and expire; admins get one from
+POST /api/v1/request-profiles/tokens.
+
+A profiled request is watched by a sampling profiler, a thread that
+records the stacks of the other busy threads every PROFILING_INTERVAL
+seconds. This covers both async endpoints and sync endpoints run in the
+threadpool. The SQL statements the request runs are timed too. The
+profile is stored as a `RequestProfile` and its id is returned in the
+X-Profile-Id response header.
+
+The profiler samples the whole process, so a worker profiles one request
+at a time, and other requests running concurrently show up in it.
+"""
+import asyncio
+import contextvars
+import hashlib
+import hmac
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from uuid_extensions import uuid7
+
+from api.utils.logger import logger
+from api.utils.settings import settings
+
+
+TOKEN_HEADER = b"x-profile-token"
+TOKEN_QUERY_PARAM = "profile_token"
+
+# leaf frames of threads that are waiting, not working
+IDLE_FILES = ("threading.py", "selectors.py", "queue.py")
+
+
+def sign_token(expires_at: int) -> str:
+    signature = hmac.new(
+        settings.SECRET_KEY.encode(), f"profile:{expires_at}".encode(), hashlib.sha256
+    ).hexdigest()
+    return f"{expires_at}.{signature}"
+
+
+def create_token(ttl: int = settings.PROFILING_TOKEN_TTL) -> Tuple[str, int]:
+    expires_at = int(time.time()) + ttl
+    return sign_token(expires_at), expires_at
+
+
+def verify_token(token: str) -> bool:
+    expires_at, _, _ = token.partition(".")
+    if not expires_at.isdigit() or int(expires_at) < time.time():
+        return False
+    return hmac.compare_digest(token, sign_token(int(expires_at)))
+
+
+def frame_label(code) -> str:
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class SamplingProfiler:
+    """Counts the stacks of the process's busy threads, sampled every
+    `interval` seconds from a background thread"""
+
+    def __init__(self, interval: float = settings.PROFILING_INTERVAL):
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def sample(self):
+        own = threading.get_ident()
+        for ident, frame in sys._current_frames().items():
+            if ident == own or os.path.basename(frame.f_code.co_filename) in IDLE_FILES:
+                continue
+            labels = []
+            while frame is not None:
+                labels.append(frame_label(frame.f_code))
+                frame = frame.f_back
+            self.stacks[";".join(reversed(labels))] += 1
+        self.samples += 1
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.sample()
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def flamegraph(self) -> str:
+        """The stacks in the collapsed format read by flamegraph.pl and
+        speedscope"""
+
+        return "\n".join(f"{stack} {count}" for stack, count in self.stacks.most_common())
+
+    def top_frames(self, limit: int = settings.PROFILING_TOP_FRAMES) -> List[Dict[str, Any]]:
+        """The functions seen in the most samples, with the samples they
+        were running in themselves (self) and including callees (total)"""
+
+        own, total = Counter(), Counter()
+        for stack, count in self.stacks.items():
+            frames = stack.split(";")
+            own[frames[-1]] += count
+            for frame in set(frames):
+                total[frame] += count
+
+        samples = max(self.samples, 1)
+        return [
+            {
+                "frame": frame,
+                "self": own[frame],
+                "total": count,
+                "total_percent": round(count / samples * 100, 1),
+            }
+            for frame, count in total.most_common(limit)
+        ]
+
+
+# (start, statements) of the request being profiled
+sql_timeline: contextvars.ContextVar[Optional[Tuple[float, list]]] = contextvars.ContextVar(
+    "sql_timeline", default=None
+)
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _statement_started(conn, cursor, statement, parameters, context, executemany):
+    if sql_timeline.get() is not None:
+        context._profile_started = time.perf_counter()
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _statement_finished(conn, cursor, statement, parameters, context, executemany):
+    timeline = sql_timeline.get()
+    if timeline is None or not hasattr(context, "_profile_started"):
+        return
+
+    start, statements = timeline
+    if len(statements) < settings.PROFILING_MAX_STATEMENTS:
+        statements.append(
+            {
+                "statement": statement[:1000],
+                "start_ms": round((context._profile_started - start) * 1000, 2),
+                "duration_ms": round((time.perf_counter() - context._profile_started) * 1000, 2),
+            }
+        )
+
+
+class ProfilingMiddleware:
+    """Profiles requests that ask for it, and a sample of the others"""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+        self._busy = threading.Lock()
+
+    @staticmethod
+    def trigger(scope: Scope) -> Optional[str]:
+        token = dict(scope["headers"]).get(TOKEN_HEADER)
+        if token is not None:
+            return "header" if verify_token(token.decode("latin-1")) else None
+
+        if TOKEN_QUERY_PARAM.encode() in scope["query_string"]:
+            token = parse_qs(scope["query_string"].decode("latin-1")).get(TOKEN_QUERY_PARAM)
+            return "query" if token and verify_token(token[0]) else None
+
+        rate = settings.PROFILING_SAMPLE_RATE
+        if rate > 0 and random.randrange(rate) == 0:
+            return "sample"
+        return None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        trigger = self.trigger(scope)
+        if trigger is None:
+            return await self.app(scope, receive, send)
+        if not self._busy.acquire(blocking=False):
+            logger.info(f"Not profiling {scope['path']}, another request is being profiled")
+            return await self.app(scope, receive, send)
+
+        profile_id = str(uuid7())
+        status_code = None
+
+        async def send_with_profile_id(message: Message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                message["headers"] = [*message.get("headers", []), (b"x-profile-id", profile_id.encode())]
+            await send(message)
+
+        profiler = SamplingProfiler()
+        start = time.perf_counter()
+        statements: list = []
+        reset = sql_timeline.set((start, statements))
+        profiler.start()
+        try:
+            await self.app(scope, receive, send_with_profile_id)
+        finally:
+            profiler.stop()
+            duration = time.perf_counter() - start
+            sql_timeline.reset(reset)
+            self._busy.release()
+
+            route = scope.get("route")
+            profile = {
+                "id": profile_id,
+                "method": scope["method"],
+                "path": scope["path"],
+                "route": getattr(route, "path", None),
+                "status_code": status_code,
+                "trigger": trigger,
+                "duration_ms": round(duration * 1000, 2),
+                "samples": profiler.samples,
+                "top_frames": profiler.top_frames(),
+                "flamegraph": profiler.flamegraph(),
+                "sql": statements,
+            }
+            await asyncio.to_thread(self.store, profile)
+
+    @staticmethod
+    def store(profile: Dict[str, Any]):
+        from api.v1.services.request_profile import request_profile_service
+
+        try:
+            request_profile_service.save(profile)
+        except Exception as exc:
+            logger.error(f"Could not store the profile of {profile['path']}: {exc}")
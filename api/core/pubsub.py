@@ -0,0 +1,269 @@
+""" In-process publish/subscribe bus
+
+Used to push events (e.g. new notifications) to long lived SSE and
+WebSocket connections. Publishing is thread safe, so sync services running
+in the threadpool can publish directly.
+
+Messages published in one worker reach subscribers of other workers
+through a pluggable backend:
+- `LocalBackend`: single process, nothing leaves the worker
+- `BrokerBackend`: relays messages through the line based broker that
+  ships with this module (`python -m api.core.pubsub`)
+"""
+import asyncio
+import json
+import threading
+from collections import defaultdict
+from typing import Any, Callable, Dict, Optional, Set
+
+from api.utils.logger import logger
+from api.utils.settings import settings
+
+
+class Subscription:
+    """A bounded queue of messages for one connection.
+
+    When a slow client lets the queue fill up, the oldest message is
+    dropped so publishers never block on it.
+    """
+
+    def __init__(self, bus: "PubSubBus", topic: str, maxsize: int):
+        self.bus = bus
+        self.topic = topic
+        self.dropped = 0
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+
+    def put(self, message: Any):
+        """Queues a message, dropping the oldest one when full"""
+
+        if self._queue.full():
+            self._queue.get_nowait()
+            self.dropped += 1
+        self._queue.put_nowait(message)
+
+    async def get(self, timeout: Optional[float] = None) -> Any:
+        """Waits for the next message, raising `asyncio.TimeoutError` on timeout"""
+
+        return await asyncio.wait_for(self._queue.get(), timeout=timeout)
+
+    def qsize(self) -> int:
+        return self._queue.qsize()
+
+    def close(self):
+        self.bus.unsubscribe(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class LocalBackend:
+    """Backend for a single worker, nothing is relayed"""
+
+    async def start(self, deliver: Callable[[str, Any], None]):
+        pass
+
+    async def publish(self, topic: str, message: Any):
+        pass
+
+    async def stop(self):
+        pass
+
+
+class BrokerBackend:
+    """Relays messages to other workers through the pubsub broker.
+
+    Each message is written as one JSON line. The broker forwards it to
+    every other connected worker, which delivers it to its local
+    subscribers. The connection is re-established if the broker restarts;
+    messages published while disconnected are only delivered locally.
+    """
+
+    def __init__(self, host: str, port: int, reconnect_delay: float = 1.0):
+        self.host = host
+        self.port = port
+        self.reconnect_delay = reconnect_delay
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._task: Optional[asyncio.Task] = None
+        self._connected = asyncio.Event()
+
+    async def start(self, deliver: Callable[[str, Any], None]):
+        self._task = asyncio.create_task(self._run(deliver))
+
+    async def wait_connected(self, timeout: float = 5):
+        await asyncio.wait_for(self._connected.wait(), timeout=timeout)
+
+    async def _run(self, deliver: Callable[[str, Any], None]):
+        while True:
+            try:
+                reader, self._writer = await asyncio.open_connection(self.host, self.port)
+                self._connected.set()
+
+                while line := await reader.readline():
+                    envelope = json.loads(line)
+                    deliver(envelope["topic"], envelope["message"])
+
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                logger.error(f"Pubsub broker connection error: {exc}")
+            finally:
+                self._connected.clear()
+                if self._writer is not None:
+                    self._writer.close()
+                    self._writer = None
+
+            await asyncio.sleep(self.reconnect_delay)
+
+    async def publish(self, topic: str, message: Any):
+        if self._writer is None:
+            return
+
+        self._writer.write(json.dumps({"topic": topic, "message": message}).encode() + b"\n")
+        await self._writer.drain()
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+class PubSubBus:
+    """Topic based fan-out to in-process subscribers"""
+
+    def __init__(self, backend=None, queue_size: int = settings.PUBSUB_QUEUE_SIZE):
+        self.backend = backend or LocalBackend()
+        self.queue_size = queue_size
+        self._subscriptions: Dict[str, Set[Subscription]] = defaultdict(set)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._lock = threading.Lock()
+
+    async def start(self):
+        """Binds the bus to the running event loop and starts the backend"""
+
+        self._loop = asyncio.get_running_loop()
+        await self.backend.start(self._deliver)
+
+    async def stop(self):
+        await self.backend.stop()
+        self._loop = None
+
+    def subscribe(self, topic: str) -> Subscription:
+        """Subscribes the calling connection to a topic.
+
+        Must be called from the event loop; use as a context manager so the
+        subscription is removed when the connection closes.
+        """
+
+        self._loop = asyncio.get_running_loop()
+
+        subscription = Subscription(self, topic, self.queue_size)
+        with self._lock:
+            self._subscriptions[topic].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            subscribers = self._subscriptions.get(subscription.topic)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscriptions[subscription.topic]
+
+    def subscriber_count(self, topic: Optional[str] = None) -> int:
+        with self._lock:
+            if topic is not None:
+                return len(self._subscriptions.get(topic, ()))
+            return sum(len(subscribers) for subscribers in self._subscriptions.values())
+
+    def _deliver(self, topic: str, message: Any):
+        """Hands a message to the local subscribers of a topic (event loop only)"""
+
+        with self._lock:
+            subscribers = list(self._subscriptions.get(topic, ()))
+
+        for subscription in subscribers:
+            subscription.put(message)
+
+    def _publish_in_loop(self, topic: str, message: Any):
+        self._deliver(topic, message)
+        task = asyncio.ensure_future(self.backend.publish(topic, message))
+        task.add_done_callback(self._log_backend_error)
+
+    @staticmethod
+    def _log_backend_error(task: asyncio.Future):
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(f"Pubsub backend publish failed: {task.exception()}")
+
+    def publish(self, topic: str, message: Any):
+        """Publishes a JSON serialisable message to a topic.
+
+        Safe to call from the event loop or from worker threads; it never
+        blocks on subscribers.
+        """
+
+        loop = self._loop
+        if loop is None or loop.is_closed():
+            return
+
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+
+        if running is loop:
+            self._publish_in_loop(topic, message)
+        else:
+            loop.call_soon_threadsafe(self._publish_in_loop, topic, message)
+
+
+def create_backend():
+    """Builds the backend configured in the settings"""
+
+    if settings.PUBSUB_BACKEND == "broker":
+        return BrokerBackend(settings.PUBSUB_BROKER_HOST, settings.PUBSUB_BROKER_PORT)
+    return LocalBackend()
+
+
+notification_bus = PubSubBus(backend=create_backend())
+
+
+async def run_broker(host: str, port: int, max_buffer: int = 1024 * 1024):
+    """Runs the broker that relays messages between workers.
+
+    Each line received from a worker is forwarded to every other worker.
+    A worker whose write buffer exceeds `max_buffer` bytes is skipped
+    until it catches up.
+    """
+
+    clients: Set[asyncio.StreamWriter] = set()
+
+    async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        clients.add(writer)
+        try:
+            while line := await reader.readline():
+                for client in list(clients):
+                    if client is writer or client.is_closing():
+                        continue
+                    if client.transport.get_write_buffer_size() > max_buffer:
+                        continue
+                    client.write(line)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            clients.discard(writer)
+            writer.close()
+
+    server = await asyncio.start_server(handle, host, port)
+    async with server:
+        await server.serve_forever()
+
+
+if __name__ == "__main__":
+    asyncio.run(run_broker(settings.PUBSUB_BROKER_HOST, settings.PUBSUB_BROKER_PORT))
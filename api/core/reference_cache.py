@@ -0,0 +1,73 @@
+""" Process wide cache of reference data
+
+Reference data (product categories, billing plans, ...) is read on most
+requests and changes rarely. Each cache keeps snapshots of it, detached
+from any session, for REFERENCE_DATA_CACHE_TTL seconds at most.
+
+Snapshots are tagged with the database version named after the cache,
+see api/v1/services/cache_version.py. The service that changes the data
+calls `bump(db)` before committing, so every worker reloads it once the
+change is committed. Caches are primed at startup, see
+api/core/warmup.py.
+"""
+import threading
+from typing import Any, Callable, Hashable, List, Optional
+
+from cachetools import TTLCache
+from sqlalchemy.orm import Session
+
+from api.utils.settings import settings
+from api.v1.services.cache_version import cache_version_service
+
+
+class ReferenceCache:
+    instances: List["ReferenceCache"] = []
+
+    def __init__(self, name: str, ttl: int = settings.REFERENCE_DATA_CACHE_TTL, maxsize: int = 10_000):
+        self.name = name
+        self._lock = threading.Lock()
+        self._cache: TTLCache = TTLCache(maxsize=maxsize, ttl=ttl)
+        ReferenceCache.instances.append(self)
+
+    def bump(self, db: Session):
+        """Invalidates the snapshots of every worker once the current
+        transaction commits"""
+
+        cache_version_service.bump(db, self.name)
+
+    def get(self, db: Session, key: Hashable, load: Callable[[], List[Any]]) -> List[Any]:
+        """Returns the cached snapshot for `key`, loading it on a miss"""
+
+        version = cache_version_service.get(db, self.name)
+        with self._lock:
+            cached = self._cache.get(key)
+        if cached is not None and cached[0] == version:
+            return list(cached[1])
+
+        value = tuple(load())
+        with self._lock:
+            self._cache[key] = (version, value)
+        return list(value)
+
+    def set(self, db: Session, key: Hashable, value: List[Any]):
+        version = cache_version_service.get(db, self.name)
+        with self._lock:
+            self._cache[key] = (version, tuple(value))
+
+    def invalidate(self, key: Optional[Hashable] = None):
+        """Drops the snapshot of `key`, or every snapshot"""
+
+        with self._lock:
+            if key is None:
+                self._cache.clear()
+            else:
+                self._cache.pop(key, None)
+
+    def __len__(self):
+        with self._lock:
+            return len(self._cache)
+
+    @classmethod
+    def clear_all(cls):
+        for cache in cls.instances:
+            cache.invalidate()
@@ -0,0 +1,406 @@
+""" Tracing
+
+A small tracer recording spans for requests (`TracingMiddleware`), SQL
+statements, outbound HTTP calls made with httpx or requests (which covers
+the Stripe, Twilio, Flutterwave and Facebook calls), SMTP sends and
+background jobs, so a slow request can be broken down into what it
+waited on.
+
+Trace context follows the W3C traceparent header. It is read from
+incoming requests and added to outbound HTTP calls. A job carries the
+context of the code that queued it.
+
+Finished spans are handed to a background thread that exports them in
+batches to the sink chosen by TRACING_EXPORTER:
+- "file": JSON lines in TRACING_FILE
+- "otlp": OTLP/HTTP JSON, posted to TRACING_OTLP_ENDPOINT
+- "none": tracing is off
+
+Any object with an `export(spans)` method can be set as `tracer.sink`.
+"""
+import atexit
+import contextvars
+import functools
+import json
+import queue
+import random
+import re
+import secrets
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, Iterator, List, Optional
+
+import httpx
+import requests
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from api.utils.logger import logger
+from api.utils.settings import settings
+
+
+TRACEPARENT = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+
+# OTLP SpanKind values
+SPAN_KINDS = {"internal": 1, "server": 2, "client": 3, "producer": 4, "consumer": 5}
+
+
+@dataclass
+class Span:
+    name: str
+    trace_id: str
+    span_id: str
+    parent_id: Optional[str]
+    kind: str = "internal"
+    sampled: bool = True
+    start_ns: int = field(default_factory=time.time_ns)
+    end_ns: Optional[int] = None
+    attributes: Dict[str, Any] = field(default_factory=dict)
+    error: Optional[str] = None
+
+    @property
+    def traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-{'01' if self.sampled else '00'}"
+
+    @property
+    def duration_ms(self) -> Optional[float]:
+        return None if self.end_ns is None else (self.end_ns - self.start_ns) / 1e6
+
+    def set(self, key: str, value: Any):
+        self.attributes[key] = value
+
+    def record_error(self, exc: BaseException):
+        self.error = f"{type(exc).__name__}: {exc}"
+
+
+def parse_traceparent(header: Optional[str]) -> Optional[Span]:
+    """The remote parent described by a traceparent header, if valid"""
+
+    match = TRACEPARENT.match((header or "").strip().lower())
+    if match is None or set(match[1]) == {"0"} or set(match[2]) == {"0"}:
+        return None
+    return Span("remote", match[1], match[2], None, sampled=int(match[3], 16) & 1 == 1)
+
+
+current_span: contextvars.ContextVar[Optional[Span]] = contextvars.ContextVar(
+    "current_span", default=None
+)
+
+
+class JsonFileSink:
+    def __init__(self, path: str):
+        self.path = path
+
+    def export(self, spans: List[Span]):
+        with open(self.path, "a") as file:
+            for span in spans:
+                file.write(json.dumps({**asdict(span), "duration_ms": span.duration_ms}, default=str) + "\n")
+
+
+def otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+class OTLPSink:
+    """Posts spans to an OTLP/HTTP collector, JSON encoded"""
+
+    def __init__(self, endpoint: str, service_name: str = settings.TRACING_SERVICE_NAME):
+        self.endpoint = endpoint
+        self.service_name = service_name
+        self.client = httpx.Client(timeout=settings.TRACING_EXPORT_TIMEOUT)
+
+    def payload(self, spans: List[Span]) -> Dict[str, Any]:
+        return {
+            "resourceSpans": [
+                {
+                    "resource": {
+                        "attributes": [{"key": "service.name", "value": otlp_value(self.service_name)}]
+                    },
+                    "scopeSpans": [
+                        {
+                            "scope": {"name": __name__},
+                            "spans": [
+                                {
+                                    "traceId": span.trace_id,
+                                    "spanId": span.span_id,
+                                    "parentSpanId": span.parent_id or "",
+                                    "name": span.name,
+                                    "kind": SPAN_KINDS[span.kind],
+                                    "startTimeUnixNano": str(span.start_ns),
+                                    "endTimeUnixNano": str(span.end_ns),
+                                    "attributes": [
+                                        {"key": key, "value": otlp_value(value)}
+                                        for key, value in span.attributes.items()
+                                    ],
+                                    "status": (
+                                        {"code": 2, "message": span.error} if span.error else {"code": 1}
+                                    ),
+                                }
+                                for span in spans
+                            ],
+                        }
+                    ],
+                }
+            ]
+        }
+
+    def export(self, spans: List[Span]):
+        # outbound calls made here must not be traced themselves
+        token = current_span.set(None)
+        try:
+            self.client.post(self.endpoint, json=self.payload(spans)).raise_for_status()
+        finally:
+            current_span.reset(token)
+
+
+def sink_from_settings():
+    if settings.TRACING_EXPORTER == "file":
+        return JsonFileSink(settings.TRACING_FILE)
+    if settings.TRACING_EXPORTER == "otlp":
+        return OTLPSink(settings.TRACING_OTLP_ENDPOINT)
+    return None
+
+
+class Tracer:
+    def __init__(self, sink=None):
+        self.sink = sink
+        self._spans: "queue.SimpleQueue[Optional[Span]]" = queue.SimpleQueue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.sink is not None
+
+    def start_span(
+        self,
+        name: str,
+        kind: str = "internal",
+        parent: Optional[Span] = None,
+        attributes: Optional[Dict[str, Any]] = None,
+    ) -> Span:
+        """A span under `parent`, or the current span; without either it
+        starts a trace, sampled at TRACING_SAMPLE_RATE"""
+
+        parent = parent or current_span.get()
+        if parent is None:
+            trace_id, parent_id = secrets.token_hex(16), None
+            sampled = random.random() < settings.TRACING_SAMPLE_RATE
+        else:
+            trace_id, parent_id, sampled = parent.trace_id, parent.span_id, parent.sampled
+        return Span(name, trace_id, secrets.token_hex(8), parent_id, kind, sampled, attributes=dict(attributes or {}))
+
+    def end_span(self, span: Span):
+        span.end_ns = time.time_ns()
+        if span.sampled and self.enabled:
+            self._ensure_exporter()
+            self._spans.put(span)
+
+    @contextmanager
+    def span(
+        self,
+        name: str,
+        kind: str = "internal",
+        parent: Optional[Span] = None,
+        attributes: Optional[Dict[str, Any]] = None,
+    ) -> Iterator[Optional[Span]]:
+        """Runs the block in a new current span; yields None when tracing
+        is off"""
+
+        if not self.enabled:
+            yield None
+            return
+
+        span = self.start_span(name, kind, parent, attributes)
+        token = current_span.set(span)
+        try:
+            yield span
+        except BaseException as exc:
+            span.record_error(exc)
+            raise
+        finally:
+            current_span.reset(token)
+            self.end_span(span)
+
+    def traceparent(self) -> Optional[str]:
+        span = current_span.get()
+        return span.traceparent if span is not None else None
+
+    def _ensure_exporter(self):
+        if self._thread is None or not self._thread.is_alive():
+            with self._lock:
+                if self._thread is None or not self._thread.is_alive():
+                    self._thread = threading.Thread(target=self._export_loop, name="trace-exporter", daemon=True)
+                    self._thread.start()
+
+    def _export_loop(self):
+        batch: List[Span] = []
+        deadline = time.monotonic() + settings.TRACING_EXPORT_INTERVAL
+        while True:
+            try:
+                span = self._spans.get(timeout=max(deadline - time.monotonic(), 0))
+            except queue.Empty:
+                span = False
+
+            if span:
+                batch.append(span)
+            if span is None or len(batch) >= settings.TRACING_BATCH_SIZE or time.monotonic() >= deadline:
+                if batch:
+                    try:
+                        self.sink.export(batch)
+                    except Exception as exc:
+                        logger.error(f"Could not export {len(batch)} spans: {exc}")
+                batch = []
+                deadline = time.monotonic() + settings.TRACING_EXPORT_INTERVAL
+            if span is None:
+                return
+
+    def flush(self):
+        """Exports the finished spans and waits for it"""
+
+        if self._thread is not None and self._thread.is_alive():
+            self._spans.put(None)
+            self._thread.join(timeout=settings.TRACING_EXPORT_TIMEOUT)
+
+
+tracer = Tracer(sink_from_settings())
+atexit.register(tracer.flush)
+
+
+class TracingMiddleware:
+    """Records a server span for each request"""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or not tracer.enabled:
+            return await self.app(scope, receive, send)
+
+        headers = dict(scope["headers"])
+        parent = parse_traceparent(headers.get(b"traceparent", b"").decode("latin-1"))
+        attributes = {"http.method": scope["method"], "http.target": scope["path"]}
+
+        async def send_with_status(message: Message):
+            if message["type"] == "http.response.start":
+                span.set("http.status_code", message["status"])
+            await send(message)
+
+        with tracer.span(f"{scope['method']} {scope['path']}", "server", parent, attributes) as span:
+            try:
+                await self.app(scope, receive, send_with_status)
+            finally:
+                route = scope.get("route")
+                if route is not None:
+                    span.name = f"{scope['method']} {route.path}"
+                    span.set("http.route", route.path)
+
+
+def _client_span(method: str, url: str) -> Span:
+    return tracer.start_span(
+        f"HTTP {method}", "client", attributes={"http.method": method, "http.url": url.split("?")[0]}
+    )
+
+
+def _finish_client_span(span: Span, status_code: Optional[int] = None, exc: Optional[BaseException] = None):
+    if status_code is not None:
+        span.set("http.status_code", status_code)
+    if exc is not None:
+        span.record_error(exc)
+    tracer.end_span(span)
+
+
+def instrument():
+    """Traces outbound httpx and requests calls, and SQL statements"""
+
+    if getattr(httpx.Client.send, "_traced", False):
+        return
+
+    httpx_send, async_httpx_send, requests_send = (
+        httpx.Client.send,
+        httpx.AsyncClient.send,
+        requests.Session.send,
+    )
+
+    @functools.wraps(httpx_send)
+    def traced_httpx_send(client, request, *args, **kwargs):
+        if not tracer.enabled or current_span.get() is None:
+            return httpx_send(client, request, *args, **kwargs)
+        span = _client_span(request.method, str(request.url))
+        request.headers["traceparent"] = span.traceparent
+        try:
+            response = httpx_send(client, request, *args, **kwargs)
+        except BaseException as exc:
+            _finish_client_span(span, exc=exc)
+            raise
+        _finish_client_span(span, response.status_code)
+        return response
+
+    @functools.wraps(async_httpx_send)
+    async def traced_async_httpx_send(client, request, *args, **kwargs):
+        if not tracer.enabled or current_span.get() is None:
+            return await async_httpx_send(client, request, *args, **kwargs)
+        span = _client_span(request.method, str(request.url))
+        request.headers["traceparent"] = span.traceparent
+        try:
+            response = await async_httpx_send(client, request, *args, **kwargs)
+        except BaseException as exc:
+            _finish_client_span(span, exc=exc)
+            raise
+        _finish_client_span(span, response.status_code)
+        return response
+
+    @functools.wraps(requests_send)
+    def traced_requests_send(session, request, **kwargs):
+        if not tracer.enabled or current_span.get() is None:
+            return requests_send(session, request, **kwargs)
+        span = _client_span(request.method, request.url)
+        request.headers["traceparent"] = span.traceparent
+        try:
+            response = requests_send(session, request, **kwargs)
+        except BaseException as exc:
+            _finish_client_span(span, exc=exc)
+            raise
+        _finish_client_span(span, response.status_code)
+        return response
+
+    for traced in (traced_httpx_send, traced_async_httpx_send, traced_requests_send):
+        traced._traced = True
+    httpx.Client.send = traced_httpx_send
+    httpx.AsyncClient.send = traced_async_httpx_send
+    requests.Session.send = traced_requests_send
+
+    event.listen(Engine, "before_cursor_execute", _statement_started)
+    event.listen(Engine, "after_cursor_execute", _statement_finished)
+    event.listen(Engine, "handle_error", _statement_failed)
+
+
+def _statement_started(conn, cursor, statement, parameters, context, executemany):
+    if tracer.enabled and current_span.get() is not None:
+        context._trace_span = tracer.start_span(
+            "db.query",
+            "client",
+            attributes={"db.system": conn.dialect.name, "db.statement": statement[:1000]},
+        )
+
+
+def _statement_finished(conn, cursor, statement, parameters, context, executemany):
+    span = getattr(context, "_trace_span", None)
+    if span is not None:
+        tracer.end_span(span)
+
+
+def _statement_failed(exception_context):
+    span = getattr(exception_context.execution_context, "_trace_span", None)
+    if span is not None:
+        span.record_error(exception_context.original_exception)
+        tracer.end_span(span)
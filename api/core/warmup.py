@@ -0,0 +1,99 @@
+""" Startup warmup
+
+Without it, the first requests a worker serves after a deploy pay for
+connecting to the database, configuring the ORM mappers, compiling email
+templates, loading reference data and building the OpenAPI schema.
+
+`warmup.run(app)` does all of that once, from the lifespan, in a thread
+so the server can answer /ready meanwhile. /ready answers 503 until the
+warmup is done, so load balancers send traffic to warm workers only. A
+step that fails is logged and reported by /ready, but does not keep the
+worker out of rotation: the request that needs it will retry it.
+"""
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+from fastapi import FastAPI
+from sqlalchemy import text
+from sqlalchemy.orm import configure_mappers
+
+from api.core.dependencies.email_sender import email_renderer
+from api.db.database import SessionLocal, engine
+from api.utils.logger import logger
+from api.utils.settings import settings
+from api.v1.services.billing_plan import billing_plan_service
+from api.v1.services.permissions.permission_resolver import permission_resolver
+from api.v1.services.product import ProductCategoryService
+
+
+class Warmup:
+    def __init__(self, engine=engine, session_factory=SessionLocal):
+        self.engine = engine
+        self.session_factory = session_factory
+        self.ready = threading.Event()
+        self.steps: Dict[str, Dict[str, Any]] = {}
+
+    def open_connections(self):
+        """Opens up to WARMUP_DB_CONNECTIONS pool connections at once and
+        puts them back in the pool"""
+
+        count = settings.WARMUP_DB_CONNECTIONS
+        size = getattr(self.engine.pool, "size", None)
+        if size is not None:
+            count = min(count, size())
+
+        connections = []
+        try:
+            for _ in range(count):
+                connection = self.engine.connect()
+                connections.append(connection)
+                connection.execute(text("SELECT 1"))
+        finally:
+            for connection in connections:
+                connection.close()
+
+    def prime_caches(self):
+        """Loads the role -> permission mapping, the product categories and
+        the billing plans of every organisation"""
+
+        with self.session_factory() as db:
+            permission_resolver.compiled(db)
+            ProductCategoryService.fetch_all_cached(db)
+            billing_plan_service.prime_cache(db)
+
+    def step(self, name: str, function: Callable[[], Any]):
+        started = time.perf_counter()
+        error: Optional[str] = None
+        try:
+            function()
+        except Exception as exc:
+            error = f"{type(exc).__name__}: {exc}"
+            logger.error(f"Warmup step {name} failed: {error}")
+
+        self.steps[name] = {
+            "duration_ms": round((time.perf_counter() - started) * 1000, 1),
+            "error": error,
+        }
+
+    def run(self, app: FastAPI):
+        """Runs every step, then marks the worker as ready"""
+
+        if settings.WARMUP_ENABLED:
+            started = time.perf_counter()
+            self.step("db_connections", self.open_connections)
+            self.step("orm_mappers", configure_mappers)
+            self.step("email_templates", email_renderer.warmup)
+            self.step("reference_data", self.prime_caches)
+            # response validators are built with the routes; the OpenAPI
+            # schema is built on first use
+            self.step("openapi_schema", app.openapi)
+            logger.info(f"Warmup done in {(time.perf_counter() - started) * 1000:.0f} ms")
+
+        self.ready.set()
+
+    def status(self) -> Dict[str, Any]:
+        return {"ready": self.ready.is_set(), "steps": self.steps}
+
+
+warmup = Warmup()
@@ -3,6 +3,7 @@
 from sqlalchemy.orm import sessionmaker, scoped_session, declarative_base
 from sqlalchemy import create_engine
 from api.utils.settings import settings, BASE_DIR
+from api.core.metrics import instrument_engine
 
 
 DB_HOST = settings.DB_HOST
@@ -35,6 +36,7 @@ def get_db_engine(test_mode: bool = False):
 
 
 engine = get_db_engine()
+instrument_engine(engine)
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
@@ -53,3 +55,15 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+def dialect_insert(db):
+    """Returns the dialect specific `insert` of the session's engine,
+    which supports `ON CONFLICT` clauses"""
+
+    if db.get_bind().dialect.name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        from sqlalchemy.dialects.postgresql import insert
+
+    return insert
@@ -1,6 +1,7 @@
 from fastapi import HTTPException, status
 from sqlalchemy.orm import Session
 from api.v1.models import User, Organisation
+from api.v1.services.membership import membership_service
 
 
 def check_model_existence(db: Session, model, id):
@@ -15,10 +16,13 @@ def check_model_existence(db: Session, model, id):
     return obj
 
 
-def check_user_in_org(user: User, organisation: Organisation):
+def check_user_in_org(db: Session, user: User, organisation: Organisation):
     """Checks if a user is a member of an organisation"""
 
-    if user not in organisation.users and not user.is_superadmin:
+    if user.is_superadmin:
+        return
+
+    if not membership_service.is_member(db, user.id, organisation.id):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="You are not a member of this organisation",
@@ -11,8 +11,6 @@ from .config import SECRET_KEY, ALGORITHM
 
 import logging
 
-# Configure logging
-logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/auth/login")
@@ -27,13 +25,11 @@ def get_current_user(
         headers={"WWW-Authenticate": "Bearer"},
     )
     try:
-        logger.debug("Decoding JWT token")
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         user_id: str = payload.get("user_id")
         if user_id is None:
             logger.error("User ID not found in token")
             raise credentials_exception
-        logger.debug(f"Token decoded successfully, user ID: {user_id}")
     except PyJWTError as e:
         logger.error(f"JWT error: {e}")
         raise credentials_exception
@@ -42,7 +38,6 @@ def get_current_user(
     if user is None:
         logger.error("User not found")
         raise credentials_exception
-    logger.debug(f"User found: {user}")
     return user
 
 
@@ -54,5 +49,4 @@ def get_super_admin(db: Session = Depends(get_db), token: str = Depends(oauth2_s
             status_code=status.HTTP_403_FORBIDDEN,
             detail="You do not have permission to access this resource",
         )
-    logger.debug("User is super admin")
     return user
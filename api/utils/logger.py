@@ -1,9 +1,166 @@
+""" Logging setup
+
+Loggers only put records on an in-memory queue. A `QueueListener` thread
+formats them and writes them to the console and to the log file, so
+requests never wait on disk or terminal I/O.
+
+LOG_FORMAT is "json" (one object per line) or "text". Each record
+carries the id of the request it was logged in. The id is taken from the
+X-Request-ID header or generated, and is echoed in the response. It is
+also kept in the request state, for the 500 handler, which runs after
+the middleware has returned.
+LOG_LEVELS sets per-logger levels, e.g.
+"api.v1.routes.auth=DEBUG,sqlalchemy.engine=WARNING". LOG_SAMPLING keeps
+only a fraction of the records below WARNING from hot loggers, e.g.
+"api.utils.dependencies=0.01".
+"""
+import atexit
+import contextvars
+import json
 import logging
+import logging.handlers
+import queue
+import random
+from datetime import datetime, timezone
+from typing import Dict, Optional
+from uuid import uuid4
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from api.utils.settings import settings
+
+
+request_id: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("request_id", default=None)
+
+# attributes every LogRecord has; anything else was passed in `extra`
+RECORD_ATTRIBUTES = set(vars(logging.makeLogRecord({}))) | {"message", "request_id"}
+
+
+def parse_pairs(raw: str) -> Dict[str, str]:
+    """Parses "a=1,b=2" into {"a": "1", "b": "2"}"""
+
+    pairs = (pair.split("=", 1) for pair in raw.split(",") if "=" in pair)
+    return {name.strip(): value.strip() for name, value in pairs}
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "timestamp": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "request_id": getattr(record, "request_id", None),
+        }
+        entry.update(
+            (key, value) for key, value in vars(record).items() if key not in RECORD_ATTRIBUTES
+        )
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class SamplingFilter(logging.Filter):
+    """Keeps `rate` of the records below WARNING from the loggers in
+    `rates` and their children"""
+
+    def __init__(self, rates: Dict[str, float]):
+        super().__init__()
+        self.rates = rates
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+
+        name = record.name
+        while name:
+            if name in self.rates:
+                return random.random() < self.rates[name]
+            name = name.rpartition(".")[0]
+        return True
+
+
+class RequestQueueHandler(logging.handlers.QueueHandler):
+    """Queues records with their request id and their message and
+    traceback rendered, so the listener needs nothing from the caller"""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = logging.makeLogRecord(vars(record))
+        record.request_id = request_id.get()
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+class RequestIdMiddleware:
+    """Sets the request id of the records logged while handling a request,
+    and stores it as `request.state.request_id`"""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        value = dict(scope["headers"]).get(b"x-request-id", b"").decode("latin-1")[:64] or uuid4().hex
+        scope.setdefault("state", {})["request_id"] = value
+
+        async def send_with_request_id(message: Message):
+            if message["type"] == "http.response.start":
+                message["headers"] = [*message.get("headers", []), (b"x-request-id", value.encode())]
+            await send(message)
+
+        reset = request_id.set(value)
+        try:
+            await self.app(scope, receive, send_with_request_id)
+        finally:
+            request_id.reset(reset)
+
+
+listener: Optional[logging.handlers.QueueListener] = None
+
+
+def setup_logging():
+    """Routes the root logger through the queue; runs once per process"""
+
+    global listener
+    if listener is not None:
+        return
+
+    if settings.LOG_FORMAT == "json":
+        formatter = JsonFormatter()
+    else:
+        formatter = logging.Formatter(
+            "%(asctime)s - %(name)s - %(levelname)s - [%(request_id)s] %(message)s"
+        )
+
+    console = logging.StreamHandler()
+    console.setFormatter(formatter)
+    log_file = logging.FileHandler(settings.LOG_FILE)
+    log_file.setLevel(settings.LOG_FILE_LEVEL)
+    log_file.setFormatter(formatter)
+
+    records = queue.SimpleQueue()
+    handler = RequestQueueHandler(records)
+    handler.addFilter(SamplingFilter({name: float(rate) for name, rate in parse_pairs(settings.LOG_SAMPLING).items()}))
+
+    root = logging.getLogger()
+    root.setLevel(settings.LOG_LEVEL)
+    root.addHandler(handler)
+    for name, level in parse_pairs(settings.LOG_LEVELS).items():
+        logging.getLogger(name).setLevel(level.upper())
+
+    listener = logging.handlers.QueueListener(records, console, log_file, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
+
 
-logging.basicConfig(
-    level=logging.ERROR,
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-    handlers=[logging.FileHandler("error.log"), logging.StreamHandler()],
-)
+setup_logging()
 
 logger = logging.getLogger(__name__)
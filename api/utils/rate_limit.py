@@ -0,0 +1,213 @@
+""" Shared rate limiting
+
+Every route limit goes through the one limiter defined here. Its storage
+is chosen with RATE_LIMIT_STORAGE_URI, so limits hold across workers and
+replicas instead of per process:
+
+- `memory://`: per process, the default
+- `sqlite:///path/to/rate_limits.db`: shared by the workers of one host
+- `redis://host:6379/0`: shared by a cluster
+
+Limits use the moving window strategy. The Redis storage keeps a sliding
+log per key; the SQLite storage runs it as a token bucket (GCRA), which
+needs a single row per key and one atomic statement per hit. A storage
+error or timeout lets the request through rather than failing it; Redis
+connections get RATE_LIMIT_STORAGE_TIMEOUT as their socket and connect
+timeouts unless the URI sets them (`?socket_timeout=0.5`), so a hung
+Redis cannot stall requests.
+"""
+import math
+import random
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+from fastapi import Request
+from jose import JWTError, jwt
+from limits.storage import MovingWindowSupport, Storage
+from slowapi import Limiter
+from slowapi.util import get_remote_address
+
+from api.utils.settings import settings
+
+
+class SQLiteStorage(Storage, MovingWindowSupport):
+    """Rate limit storage in a SQLite file shared by local processes.
+
+    `timeout` (in seconds, from the URI query) bounds how long a hit waits
+    for the database lock before giving up.
+    """
+
+    STORAGE_SCHEME = ["sqlite"]
+    PRUNE_PROBABILITY = 0.01
+
+    def __init__(self, uri: str, wrap_exceptions: bool = False, **options):
+        super().__init__(uri, wrap_exceptions=wrap_exceptions, **options)
+        parsed = urlparse(uri)
+        query = parse_qs(parsed.query)
+        # like SQLAlchemy: sqlite:///relative.db, sqlite:////absolute.db
+        self.path = parsed.path[1:] or ":memory:"
+        self.timeout = float(query.get("timeout", [options.get("timeout", 0.05)])[0])
+        self._local = threading.local()
+        self._connect()
+
+    @property
+    def base_exceptions(self):
+        return sqlite3.Error
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(
+                self.path, timeout=self.timeout, isolation_level=None, check_same_thread=False
+            )
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS rate_limit_counters "
+                "(key TEXT PRIMARY KEY, value INTEGER NOT NULL, expires_at REAL NOT NULL)"
+            )
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS rate_limit_buckets "
+                "(key TEXT PRIMARY KEY, tat REAL NOT NULL)"
+            )
+            self._local.connection = connection
+        return connection
+
+    def _prune(self, connection: sqlite3.Connection, now: float):
+        if random.random() < self.PRUNE_PROBABILITY:
+            connection.execute("DELETE FROM rate_limit_counters WHERE expires_at <= ?", (now,))
+            connection.execute("DELETE FROM rate_limit_buckets WHERE tat <= ?", (now,))
+
+    def incr(self, key: str, expiry: int, elastic_expiry: bool = False, amount: int = 1) -> int:
+        connection = self._connect()
+        now = time.time()
+        value = connection.execute(
+            """
+            INSERT INTO rate_limit_counters (key, value, expires_at) VALUES (:key, :amount, :expires_at)
+            ON CONFLICT (key) DO UPDATE SET
+                value = CASE WHEN expires_at <= :now THEN excluded.value ELSE value + excluded.value END,
+                expires_at = CASE WHEN expires_at <= :now OR :elastic THEN excluded.expires_at ELSE expires_at END
+            RETURNING value
+            """,
+            {"key": key, "amount": amount, "expires_at": now + expiry, "now": now, "elastic": elastic_expiry},
+        ).fetchone()[0]
+        self._prune(connection, now)
+        return value
+
+    def get(self, key: str) -> int:
+        row = self._connect().execute(
+            "SELECT value FROM rate_limit_counters WHERE key = ? AND expires_at > ?",
+            (key, time.time()),
+        ).fetchone()
+        return row[0] if row else 0
+
+    def get_expiry(self, key: str) -> int:
+        now = time.time()
+        row = self._connect().execute(
+            "SELECT expires_at FROM rate_limit_counters WHERE key = ? AND expires_at > ?",
+            (key, now),
+        ).fetchone()
+        return int(row[0] if row else now)
+
+    def acquire_entry(self, key: str, limit: int, expiry: int, amount: int = 1) -> bool:
+        """Takes `amount` tokens from a bucket of `limit` tokens that refills
+        over `expiry` seconds.
+
+        The bucket is stored as its theoretical arrival time: the moment it
+        would be full again. A hit moves it forward by the cost of the hit,
+        unless that would leave it more than `expiry` seconds ahead.
+        """
+
+        if amount > limit:
+            return False
+
+        connection = self._connect()
+        now = time.time()
+        cost = expiry * amount / limit
+        row = connection.execute(
+            """
+            INSERT INTO rate_limit_buckets (key, tat) VALUES (:key, :now + :cost)
+            ON CONFLICT (key) DO UPDATE SET tat = max(tat, :now) + :cost
+            WHERE max(tat, :now) + :cost - :now <= :expiry
+            RETURNING tat
+            """,
+            {"key": key, "now": now, "cost": cost, "expiry": expiry + 1e-6},
+        ).fetchone()
+        self._prune(connection, now)
+        return row is not None
+
+    def get_moving_window(self, key: str, limit: int, expiry: int) -> Tuple[int, int]:
+        now = time.time()
+        row = self._connect().execute(
+            "SELECT tat FROM rate_limit_buckets WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None or row[0] <= now:
+            return int(now), 0
+
+        tat = row[0]
+        used = math.ceil((tat - now) * limit / expiry - 1e-6)
+        return int(tat - expiry), min(used, limit)
+
+    def check(self) -> bool:
+        try:
+            self._connect().execute("SELECT 1")
+            return True
+        except sqlite3.Error:
+            return False
+
+    def reset(self) -> Optional[int]:
+        connection = self._connect()
+        cleared = connection.execute("DELETE FROM rate_limit_counters").rowcount
+        cleared += connection.execute("DELETE FROM rate_limit_buckets").rowcount
+        return cleared
+
+    def clear(self, key: str) -> None:
+        connection = self._connect()
+        connection.execute("DELETE FROM rate_limit_counters WHERE key = ?", (key,))
+        connection.execute("DELETE FROM rate_limit_buckets WHERE key = ?", (key,))
+
+
+def rate_limit_key(request: Request) -> str:
+    """Limits signed-in users by account and everyone else by address, so
+    users behind a shared address do not use up each other's limits"""
+
+    authorization = request.headers.get("authorization", "")
+    scheme, _, token = authorization.partition(" ")
+    if scheme.lower() == "bearer" and token:
+        try:
+            payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+            if payload.get("user_id") and payload.get("type") != "refresh":
+                return f"user:{payload['user_id']}"
+        except JWTError:
+            pass
+
+    return get_remote_address(request)
+
+
+def storage_options(uri: str) -> Dict[str, float]:
+    """Default socket timeouts for a Redis storage URI that sets none"""
+
+    parsed = urlparse(uri)
+    if not parsed.scheme.startswith("redis"):
+        return {}
+
+    query = parse_qs(parsed.query)
+    return {
+        option: settings.RATE_LIMIT_STORAGE_TIMEOUT
+        for option in ("socket_timeout", "socket_connect_timeout")
+        if option not in query
+    }
+
+
+limiter = Limiter(
+    key_func=rate_limit_key,
+    strategy="moving-window",
+    storage_uri=settings.RATE_LIMIT_STORAGE_URI,
+    storage_options=storage_options(settings.RATE_LIMIT_STORAGE_URI),
+    # a broken or slow storage must not take the API down with it
+    swallow_errors=True,
+    in_memory_fallback_enabled=True,
+)
@@ -1,40 +1,185 @@
+""" Error reports to Telex
+
+Unhandled exceptions are reported to the Telex webhook without making the
+failing request wait. `report` only records the error in a buffer, where
+identical errors (same exception type, request and raising line) are
+grouped and counted. A background task posts the buffer every
+TELEX_FLUSH_INTERVAL seconds, at most TELEX_BATCH_SIZE groups per post,
+over one shared HTTP client.
+
+After TELEX_BREAKER_THRESHOLD failed posts in a row, posting stops for
+TELEX_BREAKER_COOLDOWN seconds, after which a single post is tried. The
+errors are kept meanwhile; when more than TELEX_BUFFER_SIZE distinct
+errors are waiting, new ones are dropped and counted.
+"""
+import asyncio
+import datetime
+import hashlib
 import json
+import time
+import traceback
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
 import httpx
-import datetime
-from api.utils.settings import settings
+
 from api.utils.logger import logger
+from api.utils.settings import settings
+
+
+def fingerprint(request_method: str, request_path: str, exc: BaseException) -> str:
+    """Identifies an error by its type, request and the line that raised
+    it, or its message when there is no traceback"""
+
+    frames = traceback.extract_tb(exc.__traceback__) if exc.__traceback__ else None
+    origin = f"{frames[-1].filename}:{frames[-1].lineno}" if frames else str(exc)
+    key = f"{type(exc).__name__}|{request_method} {request_path}|{origin}"
+    return hashlib.sha1(key.encode()).hexdigest()
+
+
+class TelexReporter:
+    def __init__(self):
+        self.buffer: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self.dropped = 0
+        self.failures = 0
+        self.open_until = 0.0
+        self._client: Optional[httpx.AsyncClient] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stopping: Optional[asyncio.Event] = None
+
+    def report(self, request_method: str, request_path: str, exc: BaseException):
+        """Records an error for the next flush"""
+
+        if not settings.TELEX_WEBHOOK_URL:
+            return
+
+        now = datetime.datetime.now(datetime.timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+        key = fingerprint(request_method, request_path, exc)
+        entry = self.buffer.get(key)
+        if entry is not None:
+            entry["count"] += 1
+            entry["last_seen"] = now
+            return
+        if len(self.buffer) >= settings.TELEX_BUFFER_SIZE:
+            self.dropped += 1
+            return
+
+        self.buffer[key] = {
+            "fingerprint": key[:12],
+            "count": 1,
+            "first_seen": now,
+            "last_seen": now,
+            "request_method": request_method,
+            "request_path": request_path,
+            "status_code": getattr(exc, "status_code", 500),
+            "error_message": f"An unexpected error occurred: {exc}",
+        }
+
+    def restore(self, batch: "OrderedDict[str, Dict[str, Any]]"):
+        """Puts back a batch that could not be sent, ahead of newer errors"""
+
+        for key, entry in self.buffer.items():
+            if key in batch:
+                batch[key]["count"] += entry["count"]
+                batch[key]["last_seen"] = entry["last_seen"]
+            elif len(batch) < settings.TELEX_BUFFER_SIZE:
+                batch[key] = entry
+            else:
+                self.dropped += entry["count"]
+        self.buffer = batch
+
+    @staticmethod
+    def payload(errors: List[Dict[str, Any]], dropped: int) -> Dict[str, Any]:
+        occurrences = sum(error["count"] for error in errors)
+        return {
+            "status": "error",
+            "username": "hng_boilerplate",
+            "message": json.dumps(
+                {
+                    "event_name": "server_error",
+                    "occurrences": occurrences,
+                    "dropped": dropped,
+                    "errors": errors,
+                },
+                indent=4,
+            ),
+            "event_name": f"🚨 Internal Server Error ({occurrences} in {len(errors)} groups)",
+        }
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(timeout=settings.TELEX_TIMEOUT)
+        return self._client
+
+    async def flush(self) -> bool:
+        """Posts up to TELEX_BATCH_SIZE error groups. Returns False when
+        they were kept for later, because Telex failed or is skipped while
+        the circuit breaker is open"""
+
+        if not self.buffer:
+            return True
+        if time.monotonic() < self.open_until:
+            return False
+
+        batch = OrderedDict()
+        while self.buffer and len(batch) < settings.TELEX_BATCH_SIZE:
+            key, entry = self.buffer.popitem(last=False)
+            batch[key] = entry
+        dropped, self.dropped = self.dropped, 0
 
-TELEX_WEBHOOK_URL = settings.TELEX_WEBHOOK_URL
-
-async def send_error_to_telex(request_method, request_url_path, exc):
-    """Send error log to Telex"""
-    if not TELEX_WEBHOOK_URL:
-        logger.error("TELEX_WEBHOOK_URL is not set")
-        return
-    
-    status_code = getattr(exc, "status_code", 500)
-    error_data = {
-        "status": "error",
-        "username": "hng_boilerplate",
-        "message": json.dumps(
-            {
-                "timestamp": datetime.datetime.utcnow().strftime("%Y-%m-%d %H:%M"),
-                "event_name": "server_error",
-                "request_method": request_method,
-                "request_path": request_url_path,
-                "status_code": status_code,
-                "error_message": f"An unexpected error occurred: {exc}",
-            },
-            indent=4
-        ),
-        "event_name": "🚨 Internal Server Error",
-    }
-
-    async with httpx.AsyncClient() as client:
         try:
-            response = await client.post(TELEX_WEBHOOK_URL, json=error_data)
+            response = await self.client.post(
+                settings.TELEX_WEBHOOK_URL, json=self.payload(list(batch.values()), dropped)
+            )
             response.raise_for_status()
-        except httpx.HTTPStatusError as http_err:
-            logger.error(f"Telex API returned an error: {http_err.response.status_code} - {http_err.response.text}")
-        except Exception as e:
-            logger.exception(f"Failed to send error log to Telex: {e}")
+        except Exception as exc:
+            self.restore(batch)
+            self.dropped += dropped
+            self.failures += 1
+            if self.failures >= settings.TELEX_BREAKER_THRESHOLD:
+                self.open_until = time.monotonic() + settings.TELEX_BREAKER_COOLDOWN
+                logger.error(
+                    f"Telex error reports paused for {settings.TELEX_BREAKER_COOLDOWN:g}s "
+                    f"after {self.failures} failures: {exc}"
+                )
+            else:
+                logger.error(f"Failed to send error reports to Telex: {exc}")
+            return False
+
+        self.failures = 0
+        self.open_until = 0.0
+        return True
+
+    async def run(self):
+        if self._stopping is None:
+            self._stopping = asyncio.Event()
+
+        while not self._stopping.is_set():
+            try:
+                await asyncio.wait_for(self._stopping.wait(), timeout=settings.TELEX_FLUSH_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            await self.flush()
+
+    def start(self):
+        """Starts flushing as a task of the running event loop"""
+
+        if not settings.TELEX_WEBHOOK_URL:
+            logger.error("TELEX_WEBHOOK_URL is not set")
+        self._stopping = asyncio.Event()
+        self._task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        """Flushes once more and closes the client"""
+
+        if self._task is not None:
+            self._stopping.set()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = self._stopping = None
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+telex_reporter = TelexReporter()
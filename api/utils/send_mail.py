@@ -1,48 +1,47 @@
 import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
+from sqlalchemy.orm import Session
+from api.core.dependencies.email_sender import email_templates
 from api.utils.settings import settings
+from api.v1.services.email_outbox import email_outbox_service
 
 
-async def send_magic_link(context: dict):
-    """Sends magic-kink to user email"""
-    from main import email_templates
-    sender_email = settings.MAIL_USERNAME
-    receiver_email = context.get('email')
-    password = settings.MAIL_PASSWORD
-    
-    html = email_templates.get_template("signin.html").render(context)
+def send_magic_link(db: Session, context: dict):
+    """Queues the magic link email to the user"""
 
-    message = MIMEMultipart("alternative")
-    message["Subject"] = "Your Magic Link"
-    message["From"] = sender_email
-    message["To"] = receiver_email
-    
-    part = MIMEText(html, "html")
-
-    message.attach(part)
-
-    with smtplib.SMTP_SSL(settings.MAIL_SERVER, settings.MAIL_PORT) as server:
-        server.login(sender_email, password)
-        server.sendmail(sender_email, receiver_email, message.as_string())
+    email_outbox_service.enqueue(
+        db,
+        recipient=context.get('email'),
+        template_name="signin.html",
+        subject="Your Magic Link",
+        context=context,
+    )
+    db.commit()
 
 
-async def send_contact_mail(context: dict):
-    """Sends user contact to admin mail
+def send_contact_mail(db: Session, context: dict):
+    """Queues the user contact to the admin mail and a confirmation to the user
 
     Args:
+        db (Session): Database session the emails are queued in.
         context (dict): Holds data for sending email, such as 'name', 'email', and 'message'.
     """
-    from main import email_templates
-    sender_email = settings.MAIL_FROM
-    admin_email = settings.MAIL_USERNAME
-    user_email = context.get('email')
-
-    admin_html = email_templates.get_template("contact_us.html").render(context)
-    customer_html = email_templates.get_template("email_feedback.html").render(context)
-
-    send_mail_handler(sender_email, admin_email, admin_html, "New Contact Request")
-    send_mail_handler(admin_email, user_email, customer_html, "Thank you for contacting us")
+    email_outbox_service.enqueue(
+        db,
+        recipient=settings.MAIL_USERNAME,
+        template_name="contact_us.html",
+        subject="New Contact Request",
+        context=context,
+    )
+    email_outbox_service.enqueue(
+        db,
+        recipient=context.get('email'),
+        template_name="email_feedback.html",
+        subject="Thank you for contacting us",
+        context=context,
+    )
+    db.commit()
 
 
 def send_mail_handler(sender, reciever, html, subject):
@@ -61,7 +60,6 @@ def send_mail_handler(sender, reciever, html, subject):
 
 
 def send_faq_inquiry_mail(context: dict):
-    from main import email_templates
     sender_email = settings.MAIL_USERNAME
     receiver_email = context.get('email')
     password = settings.MAIL_PASSWORD
@@ -28,6 +28,134 @@ class Settings(BaseSettings):
     MAIL_PORT: int = config("MAIL_PORT")
     MAIL_SERVER: str = config("MAIL_SERVER")
 
+    # pooled SMTP sessions, per mail server
+    MAIL_POOL_SIZE: int = config("MAIL_POOL_SIZE", default=4, cast=int)
+    MAIL_POOL_MAX_MESSAGES_PER_CONNECTION: int = config(
+        "MAIL_POOL_MAX_MESSAGES_PER_CONNECTION", default=100, cast=int
+    )
+    MAIL_POOL_IDLE_TIMEOUT: float = config("MAIL_POOL_IDLE_TIMEOUT", default=30, cast=float)
+
+    # email outbox relay; disable EMAIL_OUTBOX_IN_PROCESS when running the
+    # dedicated worker (python -m api.v1.services.email_outbox)
+    EMAIL_OUTBOX_IN_PROCESS: bool = config("EMAIL_OUTBOX_IN_PROCESS", default=True, cast=bool)
+    EMAIL_OUTBOX_POLL_INTERVAL: float = config("EMAIL_OUTBOX_POLL_INTERVAL", default=2, cast=float)
+    EMAIL_OUTBOX_BATCH_SIZE: int = config("EMAIL_OUTBOX_BATCH_SIZE", default=50, cast=int)
+    EMAIL_OUTBOX_MAX_ATTEMPTS: int = config("EMAIL_OUTBOX_MAX_ATTEMPTS", default=8, cast=int)
+    EMAIL_OUTBOX_BACKOFF_BASE: float = config("EMAIL_OUTBOX_BACKOFF_BASE", default=30, cast=float)
+    EMAIL_OUTBOX_BACKOFF_MAX: float = config("EMAIL_OUTBOX_BACKOFF_MAX", default=3600, cast=float)
+    EMAIL_OUTBOX_LEASE_SECONDS: float = config("EMAIL_OUTBOX_LEASE_SECONDS", default=300, cast=float)
+    # sent and dead emails carry reset links and tokens in their context
+    EMAIL_OUTBOX_RETENTION_DAYS: int = config("EMAIL_OUTBOX_RETENTION_DAYS", default=7, cast=int)
+
+    # background jobs; disable JOB_WORKER_IN_PROCESS when running dedicated
+    # workers (python -m api.v1.services.job_queue)
+    JOB_WORKER_IN_PROCESS: bool = config("JOB_WORKER_IN_PROCESS", default=True, cast=bool)
+    JOB_WORKER_QUEUES: str = config("JOB_WORKER_QUEUES", default="")  # comma separated, all when empty
+    JOB_WORKER_CONCURRENCY: int = config("JOB_WORKER_CONCURRENCY", default=4, cast=int)
+    JOB_WORKER_POOL: str = config("JOB_WORKER_POOL", default="thread")  # thread, process
+    JOB_POLL_INTERVAL: float = config("JOB_POLL_INTERVAL", default=1, cast=float)
+    JOB_LEASE_SECONDS: float = config("JOB_LEASE_SECONDS", default=300, cast=float)
+    JOB_MAX_ATTEMPTS: int = config("JOB_MAX_ATTEMPTS", default=3, cast=int)
+    JOB_BACKOFF_BASE: float = config("JOB_BACKOFF_BASE", default=10, cast=float)
+    JOB_BACKOFF_MAX: float = config("JOB_BACKOFF_MAX", default=3600, cast=float)
+    JOB_RETENTION_DAYS: int = config("JOB_RETENTION_DAYS", default=7, cast=int)  # finished jobs
+
+    # periodic maintenance; on Postgres only the replica holding the
+    # SCHEDULER_LOCK_KEY advisory lock queues the scheduled jobs
+    SCHEDULER_ENABLED: bool = config("SCHEDULER_ENABLED", default=True, cast=bool)
+    SCHEDULER_TICK_SECONDS: float = config("SCHEDULER_TICK_SECONDS", default=30, cast=float)
+    SCHEDULER_LOCK_KEY: int = config("SCHEDULER_LOCK_KEY", default=720_538_001, cast=int)
+    MAINTENANCE_BATCH_SIZE: int = config("MAINTENANCE_BATCH_SIZE", default=1000, cast=int)
+    INVITATION_RETENTION_DAYS: int = config("INVITATION_RETENTION_DAYS", default=30, cast=int)
+
+    # newsletter broadcasts; the send rate is the provider's limit in
+    # messages per second, concurrency is capped by MAIL_POOL_SIZE
+    NEWSLETTER_BROADCAST_CHUNK_SIZE: int = config(
+        "NEWSLETTER_BROADCAST_CHUNK_SIZE", default=500, cast=int
+    )
+    NEWSLETTER_SEND_RATE: float = config("NEWSLETTER_SEND_RATE", default=14, cast=float)
+    NEWSLETTER_BROADCAST_LEASE_SECONDS: float = config(
+        "NEWSLETTER_BROADCAST_LEASE_SECONDS", default=300, cast=float
+    )
+
+    # in-app API health prober, run by the scheduler; probes run through
+    # the app itself unless API_PROBE_BASE_URL is set. API_PROBE_TARGETS
+    # overrides the probed groups as JSON: {"Blog API": ["GET /api/v1/blogs/"]}
+    API_PROBE_ENABLED: bool = config("API_PROBE_ENABLED", default=True, cast=bool)
+    API_PROBE_SCHEDULE: str = config("API_PROBE_SCHEDULE", default="* * * * *")
+    API_PROBE_SAMPLES: int = config("API_PROBE_SAMPLES", default=3, cast=int)
+    API_PROBE_TIMEOUT: float = config("API_PROBE_TIMEOUT", default=5, cast=float)
+    API_PROBE_DEGRADED_MS: float = config("API_PROBE_DEGRADED_MS", default=1000, cast=float)
+    API_PROBE_BASE_URL: str = config("API_PROBE_BASE_URL", default="")
+    API_PROBE_TARGETS: str = config("API_PROBE_TARGETS", default="")
+    API_STATUS_SAMPLE_RETENTION_DAYS: int = config(
+        "API_STATUS_SAMPLE_RETENTION_DAYS", default=7, cast=int
+    )
+    API_STATUS_HOURLY_RETENTION_DAYS: int = config(
+        "API_STATUS_HOURLY_RETENTION_DAYS", default=90, cast=int
+    )
+    API_STATUS_DAILY_RETENTION_DAYS: int = config(
+        "API_STATUS_DAILY_RETENTION_DAYS", default=400, cast=int
+    )
+
+    # smoke tests run through the app itself unless SMOKE_TEST_BASE_URL is set
+    SMOKE_TEST_BASE_URL: str = config("SMOKE_TEST_BASE_URL", default="")
+    SMOKE_TEST_CONCURRENCY: int = config("SMOKE_TEST_CONCURRENCY", default=4, cast=int)
+    SMOKE_TEST_TIMEOUT: float = config("SMOKE_TEST_TIMEOUT", default=10, cast=float)
+    TEST_SUITE_TIMEOUT: float = config("TEST_SUITE_TIMEOUT", default=1800, cast=float)
+
+    # rate limit storage shared by workers: memory://, sqlite:///path.db
+    # (?timeout= seconds) or redis://host:port/db, see api/utils/rate_limit.py;
+    # Redis socket timeouts in seconds, unless the URI sets them
+    RATE_LIMIT_STORAGE_URI: str = config("RATE_LIMIT_STORAGE_URI", default="memory://")
+    RATE_LIMIT_STORAGE_TIMEOUT: float = config("RATE_LIMIT_STORAGE_TIMEOUT", default=0.1, cast=float)
+
+    # login locations come from a local MaxMind (GeoLite2) City or Country
+    # database, see the Dockerfile; when unset they are reported as unknown,
+    # when set the app does not start without it
+    GEOIP_DATABASE_PATH: str = config("GEOIP_DATABASE_PATH", default="")
+    GEOIP_CACHE_SIZE: int = config("GEOIP_CACHE_SIZE", default=4096, cast=int)
+    USER_AGENT_CACHE_SIZE: int = config("USER_AGENT_CACHE_SIZE", default=1024, cast=int)
+
+    # /metrics requires "Authorization: Bearer <METRICS_TOKEN>" when set;
+    # queue depths are read from the database at most every TTL seconds
+    METRICS_TOKEN: str = config("METRICS_TOKEN", default="")
+    METRICS_QUEUE_DEPTH_TTL: float = config("METRICS_QUEUE_DEPTH_TTL", default=5, cast=float)
+
+    # request profiling, see api/core/profiling.py; PROFILING_SAMPLE_RATE
+    # profiles 1 in N requests (0 profiles only requests with a token)
+    PROFILING_SAMPLE_RATE: int = config("PROFILING_SAMPLE_RATE", default=0, cast=int)
+    PROFILING_INTERVAL: float = config("PROFILING_INTERVAL", default=0.005, cast=float)
+    PROFILING_TOKEN_TTL: int = config("PROFILING_TOKEN_TTL", default=900, cast=int)
+    PROFILING_TOP_FRAMES: int = config("PROFILING_TOP_FRAMES", default=30, cast=int)
+    PROFILING_MAX_STATEMENTS: int = config("PROFILING_MAX_STATEMENTS", default=500, cast=int)
+    PROFILING_RETENTION_DAYS: int = config("PROFILING_RETENTION_DAYS", default=7, cast=int)
+
+    # tracing, see api/core/tracing.py; TRACING_EXPORTER is none, file or otlp
+    TRACING_EXPORTER: str = config("TRACING_EXPORTER", default="none")
+    TRACING_SAMPLE_RATE: float = config("TRACING_SAMPLE_RATE", default=1.0, cast=float)
+    TRACING_SERVICE_NAME: str = config("TRACING_SERVICE_NAME", default="hng-boilerplate")
+    TRACING_FILE: str = config("TRACING_FILE", default="traces.jsonl")
+    TRACING_OTLP_ENDPOINT: str = config(
+        "TRACING_OTLP_ENDPOINT", default="http://localhost:4318/v1/traces"
+    )
+    TRACING_EXPORT_INTERVAL: float = config("TRACING_EXPORT_INTERVAL", default=5, cast=float)
+    TRACING_EXPORT_TIMEOUT: float = config("TRACING_EXPORT_TIMEOUT", default=10, cast=float)
+    TRACING_BATCH_SIZE: int = config("TRACING_BATCH_SIZE", default=512, cast=int)
+
+    # optional routers to serve, see api/v1/routes/__init__.py
+    OPTIONAL_ROUTERS: str = config("OPTIONAL_ROUTERS", default="sms,stripe,smoke_tests,test_suite")
+
+    # logging, see api/utils/logger.py; the file only gets records at or
+    # above LOG_FILE_LEVEL. At INFO, libraries such as httpx log every call,
+    # so turn single loggers up with LOG_LEVELS instead
+    LOG_LEVEL: str = config("LOG_LEVEL", default="WARNING")
+    LOG_FORMAT: str = config("LOG_FORMAT", default="json")  # json, text
+    LOG_FILE: str = config("LOG_FILE", default="error.log")
+    LOG_FILE_LEVEL: str = config("LOG_FILE_LEVEL", default="ERROR")
+    LOG_LEVELS: str = config("LOG_LEVELS", default="")
+    LOG_SAMPLING: str = config("LOG_SAMPLING", default="")
+
     FLUTTERWAVE_SECRET: str = config("FLUTTERWAVE_SECRET")
 
     TWILIO_ACCOUNT_SID: str = config("TWILIO_ACCOUNT_SID")
@@ -43,5 +171,47 @@ class Settings(BaseSettings):
 
     # telex webhook url
     TELEX_WEBHOOK_URL: str = config("TELEX_WEBHOOK_URL")
+    # error reports are grouped and posted in batches, see api/utils/send_logs.py
+    TELEX_FLUSH_INTERVAL: float = config("TELEX_FLUSH_INTERVAL", default=10, cast=float)
+    TELEX_BATCH_SIZE: int = config("TELEX_BATCH_SIZE", default=20, cast=int)
+    TELEX_BUFFER_SIZE: int = config("TELEX_BUFFER_SIZE", default=200, cast=int)
+    TELEX_TIMEOUT: float = config("TELEX_TIMEOUT", default=5, cast=float)
+    TELEX_BREAKER_THRESHOLD: int = config("TELEX_BREAKER_THRESHOLD", default=3, cast=int)
+    TELEX_BREAKER_COOLDOWN: float = config("TELEX_BREAKER_COOLDOWN", default=60, cast=float)
+
+    # organisation membership cache (seconds)
+    MEMBERSHIP_CACHE_TTL: int = config("MEMBERSHIP_CACHE_TTL", default=30, cast=int)
+
+    # effective permissions cache (seconds)
+    PERMISSION_CACHE_TTL: int = config("PERMISSION_CACHE_TTL", default=300, cast=int)
+
+    # organisations returned on login/register (seconds)
+    USER_ORGANISATIONS_CACHE_TTL: int = config(
+        "USER_ORGANISATIONS_CACHE_TTL", default=60, cast=int
+    )
+
+    # product categories, billing plans (seconds)
+    REFERENCE_DATA_CACHE_TTL: int = config("REFERENCE_DATA_CACHE_TTL", default=300, cast=int)
+
+    # startup warmup, see api/core/warmup.py
+    WARMUP_ENABLED: bool = config("WARMUP_ENABLED", default=True, cast=bool)
+    WARMUP_DB_CONNECTIONS: int = config("WARMUP_DB_CONNECTIONS", default=5, cast=int)
+
+    # realtime push (local | broker)
+    PUBSUB_BACKEND: str = config("PUBSUB_BACKEND", default="local")
+    PUBSUB_BROKER_HOST: str = config("PUBSUB_BROKER_HOST", default="127.0.0.1")
+    PUBSUB_BROKER_PORT: int = config("PUBSUB_BROKER_PORT", default=7002, cast=int)
+    PUBSUB_QUEUE_SIZE: int = config("PUBSUB_QUEUE_SIZE", default=100, cast=int)
+    PUBSUB_HEARTBEAT_SECONDS: float = config("PUBSUB_HEARTBEAT_SECONDS", default=15, cast=float)
+
+    # rows per INSERT when notifying many users at once; a broadcast whose
+    # worker stops renewing its lease is resumed by the retried job, so keep
+    # the lease below JOB_LEASE_SECONDS
+    NOTIFICATION_FANOUT_CHUNK_SIZE: int = config(
+        "NOTIFICATION_FANOUT_CHUNK_SIZE", default=1000, cast=int
+    )
+    NOTIFICATION_BROADCAST_LEASE_SECONDS: float = config(
+        "NOTIFICATION_BROADCAST_LEASE_SECONDS", default=60, cast=float
+    )
 
 settings = Settings()
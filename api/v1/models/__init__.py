@@ -1,5 +1,5 @@
 from api.v1.models.activity_logs import ActivityLog
-from api.v1.models.api_status import APIStatus
+from api.v1.models.api_status import APIStatus, APIStatusRollup, APIStatusSample
 from api.v1.models.billing_plan import BillingPlan
 from api.v1.models.comment import Comment, CommentLike, CommentDislike
 from api.v1.models.contact_us import ContactUs
@@ -9,7 +9,7 @@ from api.v1.models.waitlist import Waitlist
 from api.v1.models.user import User
 from api.v1.models.organisation import Organisation
 from api.v1.models.profile import Profile
-from api.v1.models.notifications import Notification
+from api.v1.models.notifications import Notification, NotificationBroadcast
 from api.v1.models.product import ProductVariant, ProductCategory, Product
 from api.v1.models.blog import Blog, BlogLike, BlogDislike
 from api.v1.models.job import Job, JobApplication
@@ -18,9 +18,13 @@ from api.v1.models.token_login import TokenLogin
 from api.v1.models.oauth import OAuth
 from api.v1.models.invitation import Invitation
 from api.v1.models.faq import FAQ
-from api.v1.models.newsletter import Newsletter, NewsletterSubscriber
+from api.v1.models.newsletter import Newsletter, NewsletterBroadcast, NewsletterSubscriber
 from api.v1.models.topic import Topic
 from api.v1.models.email_template import EmailTemplate
+from api.v1.models.email_outbox import EmailOutbox
+from api.v1.models.background_job import BackgroundJob
+from api.v1.models.cache_version import CacheVersion
+from api.v1.models.request_profile import RequestProfile
 from api.v1.models.regions import Region
 from api.v1.models.squeeze import Squeeze
 from api.v1.models.sales import Sales
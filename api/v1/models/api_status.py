@@ -1,11 +1,60 @@
-from sqlalchemy import Column, DateTime, String, Text, Numeric, func
+from sqlalchemy import (
+    Column,
+    DateTime,
+    Index,
+    Integer,
+    String,
+    Text,
+    Numeric,
+    UniqueConstraint,
+    func,
+)
 from api.v1.models.base_model import BaseTableModel
 
 class APIStatus(BaseTableModel):
     __tablename__ = "api_status"
 
-    api_group = Column(String, nullable=False)
+    api_group = Column(String, nullable=False, unique=True)
     status = Column(String, nullable=False)
     last_checked = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
     response_time = Column(Numeric, nullable=True)
+    # set by the in-app prober: p95 latency in ms, share of failed probes
+    p95_response_time = Column(Numeric, nullable=True)
+    error_rate = Column(Numeric, nullable=True)
     details = Column(Text, nullable=True)
+
+
+class APIStatusSample(BaseTableModel):
+    """One recorded status of an API group; append-only, pruned by age"""
+
+    __tablename__ = "api_status_samples"
+
+    api_group = Column(String, nullable=False)
+    status = Column(String, nullable=False)
+    response_time = Column(Numeric, nullable=True)
+    p95_response_time = Column(Numeric, nullable=True)
+    error_rate = Column(Numeric, nullable=True)
+    checked_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+
+    # Serves the rollups' time range scans and the retention sweep
+    __table_args__ = (Index("ix_api_status_samples_checked_at", "checked_at"),)
+
+
+class APIStatusRollup(BaseTableModel):
+    """Samples of an API group summarised over an hour or a day"""
+
+    __tablename__ = "api_status_rollups"
+
+    api_group = Column(String, nullable=False)
+    period = Column(String, nullable=False)  # hour, day
+    bucket_start = Column(DateTime(timezone=True), nullable=False)
+    samples = Column(Integer, nullable=False)
+    up_samples = Column(Integer, nullable=False)  # not Down
+    degraded_samples = Column(Integer, nullable=False)
+    response_time_p50 = Column(Numeric, nullable=True)
+    response_time_p95 = Column(Numeric, nullable=True)
+
+    __table_args__ = (
+        UniqueConstraint("api_group", "period", "bucket_start", name="uq_api_status_rollup_bucket"),
+        Index("ix_api_status_rollups_period_bucket", "period", "bucket_start"),
+    )
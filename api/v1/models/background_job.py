@@ -0,0 +1,33 @@
+from sqlalchemy import JSON, Column, DateTime, Index, Integer, String, Text, func, text
+from api.v1.models.base_model import BaseTableModel
+
+
+class BackgroundJob(BaseTableModel):
+    """A unit of background work, run by a job worker.
+
+    `name` refers to a task registered with `JobQueue.task`; `payload`
+    holds its keyword arguments.
+    """
+
+    __tablename__ = "background_jobs"
+
+    name = Column(String, nullable=False)
+    queue = Column(String, nullable=False, server_default="default")
+    priority = Column(Integer, nullable=False, server_default=text("0"))  # higher runs first
+    payload = Column(JSON, nullable=False)
+    idempotency_key = Column(String, nullable=True, unique=True)
+    status = Column(String, nullable=False, server_default="queued")  # queued, running, succeeded, failed
+    attempts = Column(Integer, nullable=False, server_default=text("0"))
+    max_attempts = Column(Integer, nullable=False, server_default=text("3"))
+    run_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    locked_until = Column(DateTime(timezone=True), nullable=True)
+    locked_by = Column(String, nullable=True)
+    result = Column(JSON, nullable=True)
+    last_error = Column(Text, nullable=True)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+    trace_parent = Column(String, nullable=True)  # W3C traceparent of the code that queued it
+
+    # Serves the workers' claim query
+    __table_args__ = (
+        Index('ix_background_jobs_status_queue_priority', 'status', 'queue', 'priority', 'run_at'),
+    )
@@ -0,0 +1,13 @@
+from sqlalchemy import Column, Integer, String, text
+
+from api.v1.models.base_model import BaseTableModel
+
+
+class CacheVersion(BaseTableModel):
+    """Version of data cached in every worker, bumped in the transaction
+    that changes the data, see api/v1/services/cache_version.py"""
+
+    __tablename__ = "cache_versions"
+
+    name = Column(String, nullable=False, unique=True)
+    version = Column(Integer, nullable=False, server_default=text("0"))
@@ -0,0 +1,30 @@
+from sqlalchemy import JSON, Column, DateTime, Index, Integer, String, Text, func, text
+from api.v1.models.base_model import BaseTableModel
+
+
+class EmailOutbox(BaseTableModel):
+    """An email waiting to be delivered by the outbox relay.
+
+    Rows are added in the same transaction as the change that triggers the
+    email, then claimed, sent and marked by `EmailOutboxService`.
+    """
+
+    __tablename__ = "email_outbox"
+
+    recipient = Column(String, nullable=False)
+    subject = Column(String, nullable=False)
+    template_name = Column(String, nullable=True)  # rendered at send time
+    context = Column(JSON, nullable=True)
+    body = Column(Text, nullable=True)  # used when there is no template
+    subtype = Column(String, nullable=False, server_default="html")  # html, plain
+    status = Column(String, nullable=False, server_default="pending")  # pending, sending, sent, dead
+    attempts = Column(Integer, nullable=False, server_default=text("0"))
+    next_attempt_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    locked_until = Column(DateTime(timezone=True), nullable=True)
+    last_error = Column(Text, nullable=True)
+    sent_at = Column(DateTime(timezone=True), nullable=True)
+
+    # Serves the relay's claim query
+    __table_args__ = (
+        Index('ix_email_outbox_status_next_attempt_at', 'status', 'next_attempt_at'),
+    )
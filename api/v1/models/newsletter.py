@@ -1,5 +1,5 @@
 from datetime import datetime
-from sqlalchemy import Column, String, Text, ForeignKey, UniqueConstraint, DateTime
+from sqlalchemy import Column, String, Text, ForeignKey, UniqueConstraint, DateTime, Float, Integer, text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from api.v1.models.base_model import BaseTableModel
 
@@ -35,3 +35,34 @@ class NewsletterSubscriber(BaseTableModel):
     __table_args__ = (
         UniqueConstraint("email", "newsletter_id", name="uq_subscriber_newsletter"),
     )
+
+
+class NewsletterBroadcast(BaseTableModel):
+    """A newsletter sent to every subscriber by a background job.
+
+    Subscribers are walked in id order; `last_subscriber_id` is the
+    checkpoint a crashed broadcast resumes after.
+    """
+
+    __tablename__ = "newsletter_broadcasts"
+
+    newsletter_id: Mapped[str] = mapped_column(
+        ForeignKey("newsletters.id", ondelete="CASCADE"), nullable=False
+    )
+    sender_id: Mapped[str | None] = mapped_column(
+        ForeignKey("users.id", ondelete="SET NULL"), nullable=True
+    )
+    status: Mapped[str] = mapped_column(
+        String, nullable=False, server_default="pending"
+    )  # pending, running, completed, failed
+    total_recipients: Mapped[int] = mapped_column(Integer, nullable=False, server_default=text("0"))
+    sent: Mapped[int] = mapped_column(Integer, nullable=False, server_default=text("0"))
+    failed: Mapped[int] = mapped_column(Integer, nullable=False, server_default=text("0"))
+    last_subscriber_id: Mapped[str | None] = mapped_column(String, nullable=True)
+    send_seconds: Mapped[float] = mapped_column(Float, nullable=False, server_default=text("0"))
+    locked_until: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+    last_error: Mapped[str | None] = mapped_column(Text, nullable=True)
+    started_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+    completed_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+
+    newsletter: Mapped["Newsletter"] = relationship()
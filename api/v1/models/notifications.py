@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Text, ForeignKey, Boolean
+from sqlalchemy import Column, String, Text, ForeignKey, Boolean, Index, Integer, DateTime, text
 from sqlalchemy.orm import relationship
 from api.v1.models.base_model import BaseTableModel
 
@@ -13,6 +13,45 @@ class Notification(BaseTableModel):
 
     user = relationship("User", back_populates="notifications", primaryjoin="Notification.user_id==User.id", foreign_keys=[user_id])
 
+    # Serves the per-user feed, unread filters and bulk status updates
+    __table_args__ = (
+        Index('ix_notifications_user_id_status_created_at', 'user_id', 'status', 'created_at'),
+    )
+
+
+class NotificationCounter(BaseTableModel):
+    """Maintained count of a user's unread notifications"""
+
+    __tablename__ = "notification_counters"
+
+    user_id = Column(String, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, unique=True)
+    unread_count = Column(Integer, nullable=False, server_default=text("0"))
+
+
+class NotificationBroadcast(BaseTableModel):
+    """A notification sent to every member (or a segment) of an organisation,
+    delivered by a background job that records its progress here.
+
+    Recipients are walked in id order; `last_user_id` is the checkpoint an
+    interrupted broadcast resumes after.
+    """
+
+    __tablename__ = "notification_broadcasts"
+
+    organisation_id = Column(String, ForeignKey("organisations.id", ondelete="CASCADE"), nullable=False)
+    sender_id = Column(String, ForeignKey("users.id", ondelete="SET NULL"), nullable=True)
+    title = Column(String, nullable=False)
+    message = Column(Text, nullable=False)
+    role = Column(String, nullable=True)  # only members with this role
+    setting = Column(String, nullable=True)  # NotificationSetting flag recipients must have on
+    status = Column(String, nullable=False, server_default="pending")  # pending, running, completed, failed
+    total_recipients = Column(Integer, nullable=False, server_default=text("0"))
+    delivered = Column(Integer, nullable=False, server_default=text("0"))
+    last_user_id = Column(String, nullable=True)
+    locked_until = Column(DateTime(timezone=True), nullable=True)
+    error = Column(Text, nullable=True)
+    completed_at = Column(DateTime(timezone=True), nullable=True)
+
 
 class NotificationSetting(BaseTableModel):
     __tablename__ = "notification_settings"
@@ -0,0 +1,19 @@
+from sqlalchemy import JSON, Column, Float, Integer, String, Text
+from api.v1.models.base_model import BaseTableModel
+
+
+class RequestProfile(BaseTableModel):
+    """A sampled profile of one request, taken by `ProfilingMiddleware`"""
+
+    __tablename__ = "request_profiles"
+
+    method = Column(String, nullable=False)
+    path = Column(String, nullable=False)
+    route = Column(String, nullable=True)
+    status_code = Column(Integer, nullable=True)
+    trigger = Column(String, nullable=False)  # header, query, sample
+    duration_ms = Column(Float, nullable=False)
+    samples = Column(Integer, nullable=False)
+    top_frames = Column(JSON, nullable=False)
+    flamegraph = Column(Text, nullable=False)  # collapsed stacks, one "a;b;c count" per line
+    sql = Column(JSON, nullable=False)
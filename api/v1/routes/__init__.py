@@ -1,9 +1,13 @@
 from api.v1.routes.settings import settings
 from api.v1.routes.privacy import privacies
 from api.v1.routes.team import team
+import importlib
+
 from fastapi import APIRouter
 from api.v1.routes.api_status import api_status
 from api.v1.routes.auth import auth
+from api.v1.routes.background_jobs import background_jobs
+from api.v1.routes.request_profiles import request_profiles
 from api.v1.routes.faq_inquiries import faq_inquiries
 from api.v1.routes.newsletter import newsletter, news_sub
 from api.v1.routes.user import user_router
@@ -25,14 +29,11 @@ from api.v1.routes.request_password import pwd_reset
 from api.v1.routes.activity_logs import activity_logs
 from api.v1.routes.contact_us import contact_us
 from api.v1.routes.comment import comment
-from api.v1.routes.sms_twilio import sms
 from api.v1.routes.faq import faq
 import api.v1.routes.payment_flutterwave
-from tests.run_all_test import test_rout
 from api.v1.routes.topic import topic
 from api.v1.routes.notification_settings import notification_setting
 from api.v1.routes.regions import regions
-from api.v1.routes.api_tests import test_router
 from api.v1.routes.email_routes import email_sender
 from api.v1.routes.squeeze import squeeze
 from api.v1.routes.dashboard import dashboard
@@ -45,8 +46,17 @@ from api.v1.routes.job_application import job_application
 from api.v1.routes.privacy import privacies
 from api.v1.routes.settings import settings
 from api.v1.routes.terms_and_conditions import terms_and_conditions
-from api.v1.routes.stripe import subscription_
 from api.v1.routes.wishlist import wishlist
+from api.utils.settings import settings as app_settings
+
+# Routers that can be left out of settings.OPTIONAL_ROUTERS; those left
+# out are not even imported, along with their dependencies
+OPTIONAL_ROUTERS = {
+    "sms": ("api.v1.routes.sms_twilio", "sms"),
+    "stripe": ("api.v1.routes.stripe", "subscription_"),
+    "smoke_tests": ("api.v1.routes.api_tests", "test_router"),
+    "test_suite": ("tests.run_all_test", "test_rout"),
+}
 
 api_version_one = APIRouter(prefix="/api/v1")
 
@@ -70,20 +80,18 @@ api_version_one.include_router(invites)
 api_version_one.include_router(activity_logs)
 api_version_one.include_router(blog)
 api_version_one.include_router(comment)
-api_version_one.include_router(sms)
 api_version_one.include_router(jobs)
-api_version_one.include_router(test_router)
 api_version_one.include_router(faq)
 api_version_one.include_router(topic)
 api_version_one.include_router(contact_us)
 api_version_one.include_router(waitlist_router)
 api_version_one.include_router(newsletter)
+api_version_one.include_router(background_jobs)
+api_version_one.include_router(request_profiles)
 api_version_one.include_router(news_sub)
 api_version_one.include_router(testimonial)
-api_version_one.include_router(test_rout)
 api_version_one.include_router(email_sender)
 api_version_one.include_router(regions)
-api_version_one.include_router(test_router)
 api_version_one.include_router(squeeze)
 api_version_one.include_router(contact)
 api_version_one.include_router(dashboard)
@@ -96,5 +104,8 @@ api_version_one.include_router(settings)
 api_version_one.include_router(team)
 api_version_one.include_router(terms_and_conditions)
 api_version_one.include_router(product_comment)
-api_version_one.include_router(subscription_)
 api_version_one.include_router(wishlist)
+
+for name in filter(None, (name.strip() for name in app_settings.OPTIONAL_ROUTERS.split(","))):
+    module, router = OPTIONAL_ROUTERS[name]
+    api_version_one.include_router(getattr(importlib.import_module(module), router))
@@ -2,16 +2,23 @@ from typing import Annotated
 from api.db.database import get_db
 from api.v1.schemas.api_status import APIStatusPost
 from api.v1.services.api_status import APIStatusService
+from api.v1.services.api_status_history import api_status_history_service
 from api.utils.success_response import success_response
-from fastapi import APIRouter, Depends, status
+from fastapi import APIRouter, Depends, Query, status
 from sqlalchemy.orm import Session
 
 api_status = APIRouter(prefix='/api-status', tags=['API Status'])
 
 
 @api_status.get('', response_model=success_response, status_code=200)
-async def get_api_status(db: Annotated[Session, Depends(get_db)]):
-    all_status = APIStatusService.fetch_all(db)
+async def get_api_status(
+    db: Annotated[Session, Depends(get_db)],
+    days: int = Query(90, ge=1, le=400, description="Window of the uptime and incidents"),
+):
+    """Current status of every API group, with its uptime percentage and
+    incident windows over `days` and its response times over the last day"""
+
+    all_status = api_status_history_service.summary(db, days=days)
 
     return success_response(
         message='All API Status fetched successfully',
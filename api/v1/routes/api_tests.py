@@ -1,26 +1,43 @@
-import io
-import sys
-from fastapi import Depends, status, APIRouter, Response, Request
-from fastapi.responses import JSONResponse
-from api.v1.services.api_tests import PythonAPIs
-from unittest import TestLoader, TextTestRunner, TestCase
+from datetime import datetime, timezone
+
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy.orm import Session
+
+from api.db.database import get_db
+from api.utils.success_response import success_response
+from api.v1.services.job_queue import job_queue
+from api.v1.services.tasks import smoke_tests
 
 test_router = APIRouter(prefix="/hng-test", tags=["Tests"])
 
-@test_router.get("")
-async def run_tests():
-    loader = TestLoader()
-    suite = loader.loadTestsFromTestCase(PythonAPIs)
-    stream = io.StringIO()
-    runner = TextTestRunner(stream=stream, verbosity=2)
-    result = runner.run(suite)
-    stream.seek(0)
-    results = stream.read()
-    response = {
-        "total_tests": result.testsRun,
-        "failures": len(result.failures),
-        "errors": len(result.errors),
-        "skipped": len(result.skipped),
-        "test_results": results,
-    }
-    return JSONResponse(content=response)
+
+@test_router.get("", status_code=status.HTTP_202_ACCEPTED)
+def run_tests(db: Session = Depends(get_db)):
+    """Queues a smoke test run; requests within the same minute share one run"""
+
+    started = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M")
+    job = smoke_tests.enqueue(db, idempotency_key=f"smoke_tests:{started}")
+    db.commit()
+
+    return success_response(
+        status_code=status.HTTP_202_ACCEPTED,
+        message="Smoke tests queued",
+        data={"id": job.id, "status": job.status, "results_url": f"/api/v1/hng-test/{job.id}"},
+    )
+
+
+@test_router.get("/{run_id}", status_code=status.HTTP_200_OK)
+def get_test_run(run_id: str, db: Session = Depends(get_db)):
+    """Retrieves a smoke test run; its report, with each case's outcome and
+    timing, is the result once it has succeeded"""
+
+    job = job_queue.fetch(db, run_id)
+    if job.name != smoke_tests.name:
+        raise HTTPException(status_code=404, detail="Test run does not exist")
+
+    return success_response(
+        status_code=status.HTTP_200_OK,
+        message="Smoke test run retrieved successfully",
+        data=jsonable_encoder(job_queue.status(job)),
+    )
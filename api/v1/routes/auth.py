@@ -1,12 +1,9 @@
 import logging
-from datetime import timedelta
+from datetime import datetime, timedelta, timezone
 from fastapi.responses import JSONResponse
 from jose import ExpiredSignatureError, JWTError
-from slowapi import Limiter
-from slowapi.util import get_remote_address
 
 from fastapi import (
-    BackgroundTasks,
     Depends,
     status,
     APIRouter,
@@ -18,7 +15,7 @@ from fastapi.encoders import jsonable_encoder
 from sqlalchemy.orm import Session
 from typing import Annotated
 
-from api.core.dependencies.email_sender import send_email
+from api.utils.rate_limit import limiter
 from api.utils.success_response import auth_response, success_response
 from api.utils.send_mail import send_magic_link
 from api.v1.models import User
@@ -35,8 +32,10 @@ from api.v1.schemas.token import TokenRequest
 from api.v1.schemas.user import (MagicLinkRequest,
                                  ChangePasswordSchema,
                                  AuthMeResponse)
-from api.v1.services.login_notification import send_login_notification
+from api.v1.services.email_outbox import email_outbox_service
+from api.v1.services.login_notification import client_details
 from api.v1.services.organisation import organisation_service
+from api.v1.services.tasks import login_notification
 from api.v1.schemas.organisation import CreateUpdateOrganisation
 from api.db.database import get_db
 from api.v1.services.user import user_service
@@ -53,18 +52,13 @@ from api.utils.settings import settings
 
 auth = APIRouter(prefix="/auth", tags=["Authentication"])
 
-# Initialize rate limiter
-limiter = Limiter(key_func=get_remote_address)
 
-# Setup logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
   
 @auth.post("/register", status_code=status.HTTP_201_CREATED, response_model=auth_response)
-@limiter.limit("5/minute")  # Limit to 5 requests per minute per IP
+@limiter.limit("5/minute")  # Limit to 5 requests per minute per client
 def register(
     request: Request,
-    background_tasks: BackgroundTasks,
     response: Response,
     user_schema: UserCreate,
     db: Session = Depends(get_db),
@@ -96,9 +90,9 @@ def register(
     cta_link = f"{settings.ANCHOR_PYTHON_BASE_URL}/about-us"
 
 
-    # Send email in the background
-    background_tasks.add_task(
-        send_email,
+    # Queue the welcome email, the outbox relay sends it
+    email_outbox_service.enqueue(
+        db,
         recipient=user.email,
         template_name="welcome.html",
         subject="Welcome to HNG Boilerplate",
@@ -109,6 +103,7 @@ def register(
             "cta_link": cta_link,
         },
     )
+    db.commit()
 
     response = auth_response(
         status_code=201,
@@ -153,7 +148,7 @@ def verify_email(token: str, db: Session = Depends(get_db)):
             )
 
 @auth.post("/resend_verification_email")
-def resend_verification_email(request: Request, data: UserEmailSender, background_tasks: BackgroundTasks, db: Session = Depends(get_db)):
+def resend_verification_email(request: Request, data: UserEmailSender, db: Session = Depends(get_db)):
     """Resends the email verification link"""
     email = data.email
     print(email)
@@ -163,8 +158,8 @@ def resend_verification_email(request: Request, data: UserEmailSender, backgroun
     verification_link = f"{base_url}/api/v1/auth/verify-email?token={verification_token}"
     cta_link = 'https://anchor-python.teams.hng.tech/about-us'
 
-    background_tasks.add_task(
-        send_email,
+    email_outbox_service.enqueue(
+        db,
         recipient=email,
         template_name='welcome.html',
         subject='Welcome to HNG Boilerplate, Verify Your Email below',
@@ -175,6 +170,7 @@ def resend_verification_email(request: Request, data: UserEmailSender, backgroun
             'cta_link': cta_link
         }
     )
+    db.commit()
 
     return {
         "status": "success",
@@ -186,7 +182,7 @@ def resend_verification_email(request: Request, data: UserEmailSender, backgroun
 
 
 @auth.post(path="/register-super-admin", status_code=status.HTTP_201_CREATED, response_model=auth_response)
-@limiter.limit("5/minute")  # Limit to 5 requests per minute per IP
+@limiter.limit("5/minute")  # Limit to 5 requests per minute per client
 def register_as_super_admin(
     request: Request, user: UserCreate, db: Session = Depends(get_db)
 ):
@@ -230,8 +226,8 @@ def register_as_super_admin(
 
 
 @auth.post("/login", status_code=status.HTTP_200_OK, response_model=auth_response)
-@limiter.limit("5/minute")  # Limit to 5 requests per minute per IP
-def login(request: Request, login_request: LoginRequest, background_tasks: BackgroundTasks, db: Session = Depends(get_db)):
+@limiter.limit("5/minute")  # Limit to 5 requests per minute per client
+def login(request: Request, login_request: LoginRequest, db: Session = Depends(get_db)):
 
     """Endpoint to log in a user"""
 
@@ -248,7 +244,17 @@ def login(request: Request, login_request: LoginRequest, background_tasks: Backg
 
     # Background task for email notification
     logger.info(f"Queueing login notification for {user.email} in the background...")
-    background_tasks.add_task(send_login_notification, user, request)
+    ip_address, user_agent = client_details(request)
+    login_notification.enqueue(
+        db,
+        email=user.email,
+        first_name=user.first_name,
+        last_name=user.last_name,
+        ip_address=ip_address,
+        user_agent=user_agent,
+        login_time=datetime.now(timezone.utc),
+    )
+    db.commit()
 
     response = auth_response(
         status_code=200,
@@ -276,7 +282,7 @@ def login(request: Request, login_request: LoginRequest, background_tasks: Backg
 
 
 @auth.post("/logout", status_code=status.HTTP_200_OK)
-@limiter.limit("5/minute")  # Limit to 5 requests per minute per IP
+@limiter.limit("5/minute")  # Limit to 5 requests per minute per client
 def logout(
     request: Request,
     response: Response,
@@ -294,7 +300,7 @@ def logout(
 
 
 @auth.post("/refresh-access-token", status_code=status.HTTP_200_OK)
-@limiter.limit("5/minute")  # Limit to 5 requests per minute per IP
+@limiter.limit("5/minute")  # Limit to 5 requests per minute per client
 def refresh_access_token(
     request: Request, response: Response, db: Session = Depends(get_db)
 ):
@@ -326,10 +332,9 @@ def refresh_access_token(
 
 
 @auth.post("/request-token", status_code=status.HTTP_200_OK)
-@limiter.limit("5/minute")  # Limit to 5 requests per minute per IP
+@limiter.limit("5/minute")  # Limit to 5 requests per minute per client
 async def request_signin_token(
     request: Request,
-    background_tasks: BackgroundTasks,
     email_schema: EmailRequest,
     db: Session = Depends(get_db),
 ):
@@ -344,9 +349,9 @@ async def request_signin_token(
     # Send mail notification
     link = f"{settings.ANCHOR_PYTHON_BASE_URL}/login/verify-token?token={token}"
 
-    # Send email in the background
-    background_tasks.add_task(
-        send_email,
+    # Queue the email, the outbox relay sends it
+    email_outbox_service.enqueue(
+        db,
         recipient=user.email,
         template_name="request-token.html",
         subject="Request Token Login",
@@ -356,6 +361,7 @@ async def request_signin_token(
             "link": link,
         },
     )
+    db.commit()
 
     return success_response(
         status_code=200, message=f"Sign-in token sent to {user.email}"
@@ -365,7 +371,7 @@ async def request_signin_token(
 @auth.post(
     "/verify-token", status_code=status.HTTP_200_OK, response_model=auth_response
 )
-@limiter.limit("5/minute")  # Limit to 5 requests per minute per IP
+@limiter.limit("5/minute")  # Limit to 5 requests per minute per client
 async def verify_signin_token(
     request: Request, token_schema: TokenRequest, db: Session = Depends(get_db)
 ):
@@ -405,11 +411,10 @@ async def verify_signin_token(
 
 # TODO: Fix magic link authentication
 @auth.post("/magic-link", status_code=status.HTTP_200_OK)
-@limiter.limit("5/minute")  # Limit to 5 requests per minute per IP
+@limiter.limit("5/minute")  # Limit to 5 requests per minute per client
 def request_magic_link(
     request: Request,
     requests: MagicLinkRequest,
-    background_tasks: BackgroundTasks,
     response: Response,
     db: Session = Depends(get_db),
 ):
@@ -419,8 +424,8 @@ def request_magic_link(
         f"{settings.ANCHOR_PYTHON_BASE_URL}/login/magic-link?token={magic_link_token}"
     )
 
-    background_tasks.add_task(
-        send_magic_link,
+    send_magic_link(
+        db,
         context={
             "first_name": user.first_name,
             "last_name": user.last_name,
@@ -436,7 +441,7 @@ def request_magic_link(
 
 
 @auth.post("/magic-link/verify")
-@limiter.limit("5/minute")  # Limit to 5 requests per minute per IP
+@limiter.limit("5/minute")  # Limit to 5 requests per minute per client
 async def verify_magic_link(
     request: Request, token_schema: Token, db: Session = Depends(get_db)
 ):
@@ -471,7 +476,7 @@ async def verify_magic_link(
 
 
 @auth.put("/password", status_code=200)
-@limiter.limit("5/minute")  # Limit to 5 requests per minute per IP
+@limiter.limit("5/minute")  # Limit to 5 requests per minute per client
 async def change_password(
     request: Request,
     schema: ChangePasswordSchema,
@@ -490,7 +495,7 @@ async def change_password(
 
 
 @auth.get("/@me", status_code=status.HTTP_200_OK, response_model=AuthMeResponse)
-@limiter.limit("5/minute")  # Limit to 5 requests per minute per IP
+@limiter.limit("5/minute")  # Limit to 5 requests per minute per client
 def get_current_user_details(
     request: Request,
     db: Annotated[Session, Depends(get_db)],
@@ -0,0 +1,32 @@
+from fastapi import APIRouter, Depends, status
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy.orm import Session
+
+from api.db.database import get_db
+from api.utils.success_response import success_response
+from api.v1.models.user import User
+from api.v1.services.job_queue import job_queue
+from api.v1.services.user import user_service
+
+
+background_jobs = APIRouter(prefix="/background-jobs", tags=["Background Jobs"])
+
+
+@background_jobs.get(
+    "/{job_id}",
+    response_model=success_response,
+    status_code=status.HTTP_200_OK,
+)
+def get_background_job(
+    job_id: str,
+    db: Session = Depends(get_db),
+    admin: User = Depends(user_service.get_current_super_admin),
+):
+    """Retrieves the status, attempts and result of a background job"""
+
+    job = job_queue.fetch(db, job_id)
+    return success_response(
+        message="Background job retrieved successfully",
+        status_code=status.HTTP_200_OK,
+        data=jsonable_encoder(job_queue.status(job)),
+    )
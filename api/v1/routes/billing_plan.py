@@ -26,7 +26,7 @@ async def retrieve_all_billing_plans(
     Endpoint to get all billing plans
     """
 
-    plans = billing_plan_service.fetch_all(db=db, organisation_id=organisation_id)
+    plans = billing_plan_service.fetch_all_cached(db=db, organisation_id=organisation_id)
 
     return success_response(
         status_code=status.HTTP_200_OK,
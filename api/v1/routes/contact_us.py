@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, status, BackgroundTasks
+from fastapi import APIRouter, Depends, status
 from sqlalchemy.orm import Session
 from api.db.database import get_db
 from api.utils.send_mail import send_contact_mail
@@ -27,14 +27,13 @@ contact_us = APIRouter(prefix="/contact", tags=["Contact-Us"])
 )
 async def create_contact_us(
     data: CreateContactUs, db: Annotated[Session, Depends(get_db)],
-    background_tasks: BackgroundTasks,
 ):
     """Add a new contact us message."""
     new_contact_us_message = contact_us_service.create(db, data)
 
-    # Send email to admin
-    background_tasks.add_task(
-        send_contact_mail, 
+    # Queue email to admin
+    send_contact_mail(
+        db,
         context={
             "full_name": new_contact_us_message.full_name,
             "email": new_contact_us_message.email,
@@ -1,4 +1,4 @@
-from fastapi import BackgroundTasks, Depends, APIRouter, status, HTTPException, Response, Request
+from fastapi import Depends, APIRouter, status, HTTPException, Response, Request
 from fastapi.responses import JSONResponse
 from sqlalchemy.orm import Session
 from typing import Annotated
@@ -23,12 +23,11 @@ FRONTEND_URL = config("FRONTEND_URL")
 
 
 @google_auth.post("/google", status_code=200)
-async def google_login(background_tasks: BackgroundTasks, token_request: OAuthToken, db: Session = Depends(get_db)):
+async def google_login(token_request: OAuthToken, db: Session = Depends(get_db)):
     """
     Handles Google OAuth login.
 
     Args:
-    - background_tasks (BackgroundTasks): Background tasks to be executed.
     - token_request (OAuthToken): OAuth token request.
     - db (Session): Database session.
 
@@ -91,7 +90,7 @@ async def google_login(background_tasks: BackgroundTasks, token_request: OAuthTo
 
             google_oauth_service = GoogleOauthServices()
             # User does not exist, create a new user
-            user = google_oauth_service.create(background_tasks=background_tasks, db=db, google_response=profile_data)
+            user = google_oauth_service.create(db=db, google_response=profile_data)
             access_token = user_service.create_access_token(user_id=user.id)
             refresh_token = user_service.create_refresh_token(user_id=user.id)
             response = JSONResponse(
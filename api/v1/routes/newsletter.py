@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, status, Query, BackgroundTasks, HTTPException
+from fastapi import APIRouter, Depends, status, Query, HTTPException
 from typing import Annotated
 from sqlalchemy.orm import Session
 from api.utils.settings import settings
@@ -15,7 +15,9 @@ from api.v1.services.newsletter import NewsletterService, Newsletter
 from fastapi.encoders import jsonable_encoder
 from api.v1.models.user import User
 from api.v1.services.user import user_service
-from api.core.dependencies.email_sender import send_email
+from api.v1.services.email_outbox import email_outbox_service
+from api.v1.services.newsletter_broadcast import newsletter_broadcast_service
+from api.v1.services.tasks import newsletter_broadcast
 
 newsletter = APIRouter(prefix="/newsletters", tags=["Newsletter"])
 news_sub = APIRouter(prefix="/newsletter-subscription", tags=["Newsletter"])
@@ -26,7 +28,6 @@ from api.utils.pagination import paginated_response
 async def sub_newsletter(
     request: EmailSchema,
     db: Annotated[Session, Depends(get_db)],
-    background_tasks: BackgroundTasks,
 ):
     """
     Newsletter subscription endpoint
@@ -42,13 +43,14 @@ async def sub_newsletter(
         link = f"{settings.ANCHOR_PYTHON_BASE_URL}/"
 
         # Send email in the background
-        background_tasks.add_task(
-            send_email,
+        email_outbox_service.enqueue(
+            db,
             recipient=request.email,
             template_name="newsletter-subscription.html",
             subject="Thank You for Subscribing to HNG Boilerplate Newsletters",
             context={"link": link},
         )
+        db.commit()
         message = "Thank you for subscribing to our newsletter."
     else:
         message = "You have already subscribed to our newsletter. Thank you."
@@ -96,6 +98,26 @@ def retrieve_subscribers(
     )
 
 
+@newsletter.get(
+    "/broadcasts/{broadcast_id}",
+    response_model=success_response,
+    status_code=status.HTTP_200_OK,
+)
+def get_newsletter_broadcast(
+    broadcast_id: str,
+    db: Session = Depends(get_db),
+    admin: User = Depends(user_service.get_current_super_admin),
+):
+    """Retrieves the progress and delivery stats of a newsletter broadcast"""
+
+    broadcast = newsletter_broadcast_service.fetch(db, broadcast_id)
+    return success_response(
+        message="Newsletter broadcast retrieved successfully",
+        status_code=status.HTTP_200_OK,
+        data=jsonable_encoder(newsletter_broadcast_service.stats(broadcast)),
+    )
+
+
 @newsletter.get(
     "/{id}", response_model=SingleNewsletterResponse, status_code=status.HTTP_200_OK
 )
@@ -157,7 +179,6 @@ def get_all_newsletters(
 
 @newsletter.post("/unsubscribe")
 async def unsubscribe_newsletter(
-    background_tasks: BackgroundTasks,
     request: EmailSchema,
     db: Session = Depends(get_db),
 ):
@@ -165,14 +186,38 @@ async def unsubscribe_newsletter(
     Newsletter unsubscription endpoint
     """
     NewsletterService.unsubscribe(db, request)
-    background_tasks.add_task(
-        send_email,
+    email_outbox_service.enqueue(
+        db,
         recipient=request.email,
         template_name="unsubscribe.html",
         subject="Unsubscription from HNG Boilerplate Newsletter",
         context={},
     )
+    db.commit()
     return success_response(
         message="Unsubscribed successfully.",
         status_code=status.HTTP_200_OK,
     )
+
+
+@newsletter.post(
+    "/{id}/broadcasts",
+    response_model=success_response,
+    status_code=status.HTTP_202_ACCEPTED,
+)
+def broadcast_newsletter(
+    id: str,
+    db: Session = Depends(get_db),
+    admin: User = Depends(user_service.get_current_super_admin),
+):
+    """Sends a newsletter to every subscriber in the background"""
+
+    broadcast = newsletter_broadcast_service.create(db, id, admin)
+    newsletter_broadcast.enqueue(db, broadcast_id=broadcast.id)
+    db.commit()
+
+    return success_response(
+        message="Newsletter broadcast queued",
+        status_code=status.HTTP_202_ACCEPTED,
+        data=jsonable_encoder(newsletter_broadcast_service.stats(broadcast)),
+    )
@@ -1,13 +1,20 @@
-from fastapi import Depends, status, APIRouter, Path, HTTPException
+import asyncio
+import json
+from fastapi import Depends, status, APIRouter, Path, HTTPException, Query, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
+from api.core.pubsub import notification_bus
+from api.utils.settings import settings
 from api.utils.success_response import success_response
 from api.v1.models import User
-from typing import Annotated
+from typing import Annotated, Literal, Optional
 from api.db.database import get_db
 from api.v1.services.user import user_service
 from api.v1.services.notification import notification_service
+from api.v1.services.notification_broadcast import notification_broadcast_service
+from api.v1.services.tasks import notification_broadcast
 
-from api.v1.schemas.notification import NotificationCreate
+from api.v1.schemas.notification import NotificationBroadcastCreate, NotificationCreate
 
 
 notification = APIRouter(prefix="/notifications", tags=["Notifications"])
@@ -58,11 +65,149 @@ def mark_notification_as_read(
 def get_current_user_notifications(
     current_user: User = Depends(user_service.get_current_user),
     db: Session = Depends(get_db),
+    limit: Annotated[int, Query(ge=1, le=100)] = 20,
+    cursor: Optional[str] = None,
+    status: Optional[Literal["read", "unread"]] = None,
 ):
-    data = notification_service.get_current_user_notifications(current_user, db)
+    data = notification_service.get_current_user_notifications(
+        current_user, db, limit=limit, cursor=cursor, status=status
+    )
     return success_response(status_code=200, message="All notifications", data=data)
 
 
+@notification.get(
+    "/unread-count",
+    summary="Count unread notifications",
+    description="This endpoint returns the number of unread notifications of the current user",
+    status_code=status.HTTP_200_OK,
+)
+def get_unread_notifications_count(
+    current_user: User = Depends(user_service.get_current_user),
+    db: Session = Depends(get_db),
+):
+    count = notification_service.get_unread_count(current_user, db)
+    return success_response(
+        status_code=200, message="Unread notifications count", data={"unread_count": count}
+    )
+
+
+def get_stream_user_id(request: Request, token: Optional[str] = None) -> str:
+    """Authenticates a push connection from the bearer header or the `token`
+    query parameter (EventSource and WebSocket clients cannot set headers)
+    without opening a database session for the lifetime of the stream"""
+
+    credentials_exception = HTTPException(
+        status_code=401,
+        detail="Could not validate credentials",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+
+    authorization = request.headers.get("authorization", "")
+    if authorization.lower().startswith("bearer "):
+        token = authorization[7:]
+
+    if not token:
+        raise credentials_exception
+
+    return user_service.verify_access_token(token, credentials_exception).id
+
+
+@notification.get(
+    "/stream",
+    summary="Stream new notifications",
+    description="Server-Sent Events stream of the current user's new notifications",
+)
+async def stream_notifications(user_id: str = Depends(get_stream_user_id)):
+    subscription = notification_bus.subscribe(
+        notification_service.notification_topic(user_id)
+    )
+
+    async def event_stream():
+        with subscription:
+            while True:
+                try:
+                    event = await subscription.get(timeout=settings.PUBSUB_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": heartbeat\n\n"
+                    continue
+
+                yield f"event: notification\ndata: {json.dumps(event)}\n\n"
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@notification.websocket("/ws")
+async def notifications_websocket(websocket: WebSocket, token: Optional[str] = None):
+    """WebSocket stream of the current user's new notifications"""
+
+    try:
+        user_id = get_stream_user_id(websocket, token)
+    except HTTPException:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+
+    await websocket.accept()
+
+    with notification_bus.subscribe(notification_service.notification_topic(user_id)) as subscription:
+        try:
+            while True:
+                try:
+                    event = await subscription.get(timeout=settings.PUBSUB_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    await websocket.send_json({"type": "heartbeat"})
+                    continue
+
+                await websocket.send_json({"type": "notification", "data": event})
+        except WebSocketDisconnect:
+            pass
+
+
+@notification.post(
+    "/broadcasts",
+    summary="Notify the members of an organisation",
+    description="Queues a notification for every member of an organisation, optionally "
+    "limited to a role and to members who enabled a notification setting. "
+    "Organisation admins and owners only.",
+    status_code=status.HTTP_202_ACCEPTED,
+)
+def broadcast_notification(
+    schema: NotificationBroadcastCreate,
+    current_user: User = Depends(user_service.get_current_user),
+    db: Session = Depends(get_db),
+):
+    broadcast = notification_broadcast_service.create(db, schema, current_user)
+    notification_broadcast.enqueue(db, broadcast_id=broadcast.id)
+    db.commit()
+
+    return success_response(
+        status_code=202,
+        message="Notification broadcast queued",
+        data=notification_broadcast_service.progress(broadcast),
+    )
+
+
+@notification.get(
+    "/broadcasts/{broadcast_id}",
+    summary="Fetch the progress of a broadcast",
+    status_code=status.HTTP_200_OK,
+)
+def get_notification_broadcast(
+    broadcast_id: str,
+    current_user: User = Depends(user_service.get_current_user),
+    db: Session = Depends(get_db),
+):
+    broadcast = notification_broadcast_service.fetch(db, broadcast_id, current_user)
+    return success_response(
+        status_code=200,
+        message="Notification broadcast fetched successfully",
+        data=notification_broadcast_service.progress(broadcast),
+    )
+
+
 @notification.get(
     "/{notification_id}",
     summary="Fetch a notification",
@@ -106,9 +251,11 @@ async def mark_notifications_as_read(
     current_user=Depends(user_service.get_current_user),
     db: Session = Depends(get_db),
 ):
-    notification_service.mark_notifications_as_read(current_user, db)
+    updated = notification_service.mark_notifications_as_read(current_user, db)
     return success_response(
-        status_code=200, message="All notifications marked as read successfully.", data={}
+        status_code=200,
+        message="All notifications marked as read successfully.",
+        data={"updated": updated},
     )
 
 
@@ -14,10 +14,13 @@ from api.v1.schemas.organisation import (
     CreateUpdateOrganisation,
     PaginatedOrgUsers,
     OrganisationBase,
+    BulkAddOrganisationMembers,
 )
 from api.db.database import get_db
 from api.v1.services.user import user_service
 from api.v1.services.organisation import organisation_service
+from api.v1.services.membership import membership_service
+from api.v1.services.permissions.permission_resolver import permission_resolver, require_permission
 
 from typing import Annotated
 
@@ -67,6 +70,34 @@ async def get_organisation_users(
     return organisation_service.paginate_users_in_organisation(db, org_id, skip, limit)
 
 
+@organisation.post(
+    "/{org_id}/users/bulk",
+    response_model=success_response,
+    status_code=status.HTTP_200_OK,
+)
+def bulk_add_organisation_users(
+    org_id: str,
+    schema: BulkAddOrganisationMembers,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_permission("manage_organisation")),
+):
+    """Endpoint to add many users to an organisation with their roles.
+
+    Every row gets an outcome: added, role_assigned, already_member,
+    role_conflict, duplicate, user_not_found or role_not_found.
+    """
+
+    result = organisation_service.bulk_add_users_to_organisation(
+        db=db, org_id=org_id, schema=schema
+    )
+
+    return success_response(
+        status_code=status.HTTP_200_OK,
+        message="Bulk membership request processed",
+        data=jsonable_encoder(result),
+    )
+
+
 @organisation.get("/{org_id}/users/export", status_code=200)
 async def export_organisation_member_data_to_csv(
     org_id: str,
@@ -92,11 +123,11 @@ async def update_organisation(
     org_id: str,
     schema: CreateUpdateOrganisation,
     db: Session = Depends(get_db),
-    current_user: User = Depends(user_service.get_current_user),
+    current_user: User = Depends(require_permission("manage_organisation")),
 ):
     """Endpoint to update organisation"""
 
-    updated_organisation = organisation_service.update(db, org_id, schema, current_user)
+    updated_organisation = organisation_service.update(db, org_id, schema)
 
     return success_response(
         status_code=status.HTTP_200_OK,
@@ -202,8 +233,14 @@ async def remove_user_from_organisation(
         (user_organisation_roles.c.organisation_id == org_id) &
         (user_organisation_roles.c.user_id == user_id)
     ))
+    permission_resolver.bump(db)
+    membership_service.bump(db)
     db.commit()
 
+    membership_service.invalidate(user_id, org_id, db=db)
+    permission_resolver.invalidate_user(user_id, org_id)
+    organisation_service.invalidate_user_organisations(user_id)
+
     return {
         "message": "User successfully removed from organisation",
         "success": True,
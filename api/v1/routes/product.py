@@ -20,7 +20,6 @@ from api.v1.schemas.product import (
     ProductStockResponse,
     ProductFilterResponse,
     SuccessResponse,
-    ProductCategoryRetrieve,
     ProductDetail,
 )
 from api.utils.dependencies import get_current_user
@@ -85,11 +84,7 @@ def retrieve_categories(
     Retrieve all product categories from database
     """
 
-    categories = ProductCategoryService.fetch_all(db)
-
-    categories_filtered = list(
-        map(lambda x: ProductCategoryRetrieve.model_validate(x), categories)
-    )
+    categories_filtered = ProductCategoryService.fetch_all_cached(db)
 
     if len(categories_filtered) == 0:
         categories_filtered = [{}]
@@ -1,11 +1,9 @@
 from fastapi import (Depends, APIRouter,
                      Request,
                      status,  File,
-                     UploadFile, HTTPException,
-                     BackgroundTasks)
+                     UploadFile, HTTPException)
 from sqlalchemy.orm import Session
 from typing import Annotated
-from PIL import Image
 from io import BytesIO
 from fastapi.responses import JSONResponse
 import os
@@ -70,13 +68,11 @@ async def update_user_profile(
     schema: ProfileCreateUpdate,
     db: Annotated[Session, Depends(get_db)],
     current_user: Annotated[User, Depends(user_service.get_current_user)],
-    background_tasks: BackgroundTasks
 ):
     """Endpoint to update user profile"""
     return profile_service.update(db,
                                   schema,
-                                  current_user,
-                                  background_tasks)
+                                  current_user)
 
 
 @profile.post("/verify-recovery-email", status_code=status.HTTP_200_OK,
@@ -136,6 +132,8 @@ async def upload_profile_image(
     if file.content_type not in ["image/jpeg", "image/png"]:
         raise HTTPException(status_code=400, detail="Invalid file format. Only JPG and PNG are supported.")
 
+    from PIL import Image
+
     try:
         image = Image.open(BytesIO(await file.read()))
         image = image.resize((300, 300))
@@ -1,5 +1,5 @@
 import json
-from fastapi import APIRouter, Depends, status, HTTPException, BackgroundTasks
+from fastapi import APIRouter, Depends, status, HTTPException
 from fastapi.responses import Response
 from sqlalchemy.orm import Session
 from typing import Annotated
@@ -13,7 +13,7 @@ from datetime import timedelta
 from api.db.database import get_db
 from api.v1.services.request_pwd import reset_password_service
 import logging
-from api.core.dependencies.email_sender import send_email
+from api.v1.services.email_outbox import email_outbox_service
 from api.utils.settings import settings
 
 
@@ -28,14 +28,12 @@ pwd_reset = APIRouter(prefix="/auth", tags=["Authentication"])
 )
 async def request_reset_link(
     reset_email: RequestEmail,
-    background_tasks: BackgroundTasks,
     db: Annotated[Session, Depends(get_db)],
 ):
     """
     Generates a link for resetting password for a user.
         Args:
             reset_email: The request body containing the data
-            background_tasks: The Background task method.
             db: the database Session object.
         Retuns:
             Response: response containing a successful message.
@@ -48,8 +46,8 @@ async def request_reset_link(
     link = f"{settings.ANCHOR_PYTHON_BASE_URL}/reset-password?token={reset_token}"
 
     try:
-        background_tasks.add_task(
-            send_email,
+        email_outbox_service.enqueue(
+            db,
             recipient=user.email,
             template_name="reset-password.html",
             subject="Password Reset",
@@ -59,6 +57,7 @@ async def request_reset_link(
                 "link": link,
             },
         )
+        db.commit()
 
         return ResetPasswordResponse(
             message="Reset password link successfully sent to user",
@@ -0,0 +1,95 @@
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Query, status
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import PlainTextResponse
+from sqlalchemy.orm import Session
+
+from api.core.profiling import TOKEN_HEADER, TOKEN_QUERY_PARAM, create_token
+from api.db.database import get_db
+from api.utils.success_response import success_response
+from api.v1.models.user import User
+from api.v1.services.request_profile import request_profile_service
+from api.v1.services.user import user_service
+
+
+request_profiles = APIRouter(prefix="/request-profiles", tags=["Request Profiles"])
+
+
+@request_profiles.post(
+    "/tokens",
+    response_model=success_response,
+    status_code=status.HTTP_201_CREATED,
+)
+def create_profiling_token(admin: User = Depends(user_service.get_current_super_admin)):
+    """Issues a short-lived token; requests that carry it are profiled"""
+
+    token, expires_at = create_token()
+    return success_response(
+        message="Profiling token created successfully",
+        status_code=status.HTTP_201_CREATED,
+        data={
+            "token": token,
+            "expires_at": expires_at,
+            "header": TOKEN_HEADER.decode(),
+            "query_param": TOKEN_QUERY_PARAM,
+        },
+    )
+
+
+@request_profiles.get(
+    "",
+    response_model=success_response,
+    status_code=status.HTTP_200_OK,
+)
+def get_request_profiles(
+    path: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=500),
+    db: Session = Depends(get_db),
+    admin: User = Depends(user_service.get_current_super_admin),
+):
+    """Lists the latest request profiles, without their stacks"""
+
+    fields = ("id", "method", "path", "route", "status_code", "trigger", "duration_ms", "samples", "created_at")
+    return success_response(
+        message="Request profiles retrieved successfully",
+        status_code=status.HTTP_200_OK,
+        data=jsonable_encoder(
+            [
+                {field: getattr(profile, field) for field in fields}
+                for profile in request_profile_service.fetch_all(db, path, limit)
+            ]
+        ),
+    )
+
+
+@request_profiles.get(
+    "/{profile_id}",
+    response_model=success_response,
+    status_code=status.HTTP_200_OK,
+)
+def get_request_profile(
+    profile_id: str,
+    db: Session = Depends(get_db),
+    admin: User = Depends(user_service.get_current_super_admin),
+):
+    """Retrieves a request profile: its top frames, stacks and SQL timeline"""
+
+    profile = request_profile_service.fetch(db, profile_id)
+    return success_response(
+        message="Request profile retrieved successfully",
+        status_code=status.HTTP_200_OK,
+        data=jsonable_encoder(profile),
+    )
+
+
+@request_profiles.get("/{profile_id}/flamegraph", response_class=PlainTextResponse)
+def get_request_profile_flamegraph(
+    profile_id: str,
+    db: Session = Depends(get_db),
+    admin: User = Depends(user_service.get_current_super_admin),
+):
+    """The profile's stacks in the collapsed format, for flamegraph.pl or
+    speedscope"""
+
+    return request_profile_service.fetch(db, profile_id).flamegraph
@@ -1,7 +1,6 @@
 from fastapi import APIRouter, Depends, HTTPException, Request, status, Query
 from sqlalchemy.orm import Session
-import stripe
-from api.v1.services.stripe_payment import stripe_payment_request, \
+from api.v1.services.stripe_payment import get_stripe, stripe_payment_request, \
 update_user_plan, fetch_all_organisations_with_users_and_plans, get_all_plans
 import json
 from api.v1.schemas.stripe import PlanUpgradeRequest
@@ -19,7 +18,6 @@ from dotenv import load_dotenv, find_dotenv
 
 load_dotenv(find_dotenv())
 
-stripe.api_key = os.getenv('STRIPE_SECRET_KEY')
 endpoint_secret = os.getenv('STRIPE_WEBHOOK_SECRET')
 
 subscription_ = APIRouter(prefix="/payment", tags=["subscribe-plan"])
@@ -45,6 +43,7 @@ def success_upgrade(session_id: str= Query(...)):
 
 @subscription_.get("/stripe/status")
 async def verify_payment(session_id: str, db: Session = Depends(get_db)):
+    stripe = get_stripe()
     try:
         # Retrieve the session from Stripe
         session = stripe.checkout.Session.retrieve(session_id)
@@ -111,6 +110,7 @@ async def webhook_received(
 
     payload = await request.body()
     event = None
+    stripe = get_stripe()
 
     try:
         event = stripe.Event.construct_from(json.loads(payload), stripe.api_key)
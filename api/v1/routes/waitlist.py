@@ -6,8 +6,8 @@ from api.v1.schemas.waitlist import WaitlistAddUserSchema
 from api.utils.json_response import JsonResponseDict
 from fastapi.exceptions import HTTPException
 from sqlalchemy.exc import IntegrityError
-from api.core.dependencies.email_sender import send_email
-from fastapi import APIRouter, HTTPException, Depends, Request, status, BackgroundTasks
+from api.v1.services.email_outbox import email_outbox_service
+from fastapi import APIRouter, HTTPException, Depends, Request, status
 from sqlalchemy.orm import Session
 from api.v1.schemas.waitlist import WaitlistAddUserSchema
 from api.v1.services.waitlist_email import (
@@ -66,7 +66,6 @@ def process_waitlist_signup(user: WaitlistAddUserSchema, db: Session):
 
 @waitlist.post("/", response_model=success_response, status_code=201)
 async def waitlist_signup(
-    background_tasks: BackgroundTasks,
     request: Request,
     user: WaitlistAddUserSchema,
     db: Session = Depends(get_db),
@@ -93,13 +92,14 @@ async def waitlist_signup(
     if db_user:
         cta_link = f"{settings.ANCHOR_PYTHON_BASE_URL}/about-us"
         # Send email in the background
-        background_tasks.add_task(
-            send_email,
+        email_outbox_service.enqueue(
+            db,
             recipient=user.email,
             template_name="waitlists.html",
             subject="Welcome to HNG Waitlist",
             context={"name": user.full_name, "cta_link": cta_link},
         )
+        db.commit()
     return success_response(message="You are all signed up!", status_code=201)
 
 
@@ -1,5 +1,6 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from datetime import datetime
+from typing import Literal, Optional
 
 
 class NotificationBase(BaseModel):
@@ -21,3 +22,26 @@ class NotificationRead(NotificationBase):
     
     class Config:
         from_attributes = True
+
+
+# NotificationSetting flags a broadcast can be restricted to
+BroadcastSetting = Literal[
+    "mobile_push_notifications",
+    "email_notification_activity_in_workspace",
+    "email_notification_always_send_email_notifications",
+    "email_notification_email_digest",
+    "email_notification_announcement_and_update_emails",
+    "slack_notifications_activity_on_your_workspace",
+    "slack_notifications_always_send_email_notifications",
+    "slack_notifications_announcement_and_update_emails",
+]
+
+
+class NotificationBroadcastCreate(BaseModel):
+    """Notification sent to the members of an organisation"""
+
+    organisation_id: str
+    title: str = Field(min_length=1)
+    message: str = Field(min_length=1)
+    role: Optional[str] = None
+    setting: Optional[BroadcastSetting] = None
@@ -1,6 +1,6 @@
 from datetime import datetime
 from typing import Dict, List
-from pydantic import BaseModel, EmailStr, field_validator, ConfigDict
+from pydantic import BaseModel, EmailStr, Field, field_validator, model_validator, ConfigDict
 from typing import Optional
 
 from api.utils.success_response import success_response
@@ -81,3 +81,36 @@ class OrganisationData(BaseModel):
     address: Optional[str] = None
     description: Optional[str] = None
     organisation_id: str
+
+
+MAX_BULK_MEMBERS = 5000
+
+
+class BulkMemberItem(BaseModel):
+    """A user to add to an organisation with the role to assign"""
+
+    user_id: Optional[str] = None
+    email: Optional[EmailStr] = None
+    role: str = "user"
+
+    @model_validator(mode="after")
+    def user_reference_validator(self):
+        if not self.user_id and not self.email:
+            raise ValueError("Either user_id or email is required")
+        return self
+
+
+class BulkAddOrganisationMembers(BaseModel):
+    """Schema to add many users to an organisation in one request"""
+
+    members: List[BulkMemberItem] = Field(..., min_length=1, max_length=MAX_BULK_MEMBERS)
+
+
+class BulkMemberResult(BaseModel):
+    """Outcome of a single row of a bulk membership request"""
+
+    index: int
+    user_id: Optional[str] = None
+    email: Optional[str] = None
+    role: str
+    outcome: str
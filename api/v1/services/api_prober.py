@@ -0,0 +1,169 @@
+""" Synthetic API health prober
+
+Replaces the Postman run and `update_api_status.py`: on the
+API_PROBE_SCHEDULE cron schedule each configured API group is exercised
+with a few requests, through the app itself or over HTTP when
+API_PROBE_BASE_URL is set, and the measured latency percentiles and
+error rates are written to APIStatus in one batch. Cycles run as the
+`api_probe` scheduled job, so only one instance probes at a time.
+"""
+import asyncio
+import json
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+from api.db.database import SessionLocal
+from api.utils.settings import settings
+from api.v1.services.api_status import APIStatusService, percentile
+
+
+DEFAULT_TARGETS = {
+    "Home": ["GET /probe"],
+    "API Status": ["GET /api/v1/api-status"],
+    "Blog API": ["GET /api/v1/blogs/"],
+    "FAQ API": ["GET /api/v1/faqs"],
+    "Jobs API": ["GET /api/v1/jobs"],
+}
+
+
+@dataclass
+class ProbeTarget:
+    group: str
+    method: str
+    path: str
+
+
+@dataclass
+class ProbeResult:
+    target: ProbeTarget
+    latency: float  # milliseconds
+    status_code: Optional[int] = None
+    error: Optional[str] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+def load_targets(raw: str = "") -> List[ProbeTarget]:
+    """Parses targets from `{"group": ["METHOD /path", ...]}` JSON,
+    falling back to DEFAULT_TARGETS"""
+
+    groups = json.loads(raw) if raw else DEFAULT_TARGETS
+    return [
+        ProbeTarget(group, *request.split(" ", 1))
+        for group, requests in groups.items()
+        for request in requests
+    ]
+
+
+class ApiProber:
+    def __init__(
+        self,
+        session_factory=SessionLocal,
+        targets: Optional[List[ProbeTarget]] = None,
+        samples: int = settings.API_PROBE_SAMPLES,
+    ):
+        self.session_factory = session_factory
+        self.targets = targets if targets is not None else load_targets(settings.API_PROBE_TARGETS)
+        self.samples = samples
+
+    @staticmethod
+    def client(app) -> httpx.AsyncClient:
+        if settings.API_PROBE_BASE_URL:
+            return httpx.AsyncClient(
+                base_url=settings.API_PROBE_BASE_URL, timeout=settings.API_PROBE_TIMEOUT
+            )
+        return httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=app),
+            base_url="http://api-prober",
+            timeout=settings.API_PROBE_TIMEOUT,
+        )
+
+    async def probe(self, client: httpx.AsyncClient, target: ProbeTarget) -> ProbeResult:
+        start = time.perf_counter()
+        try:
+            response = await asyncio.wait_for(
+                client.request(target.method, target.path),
+                timeout=settings.API_PROBE_TIMEOUT,
+            )
+        except Exception as exc:
+            return ProbeResult(
+                target,
+                latency=(time.perf_counter() - start) * 1000,
+                error=f"{target.method} {target.path}: {str(exc) or type(exc).__name__}",
+            )
+
+        result = ProbeResult(
+            target,
+            latency=(time.perf_counter() - start) * 1000,
+            status_code=response.status_code,
+        )
+        if response.status_code >= 400:
+            result.error = f"{target.method} {target.path}: HTTP {response.status_code}"
+        return result
+
+    async def probe_target(self, client: httpx.AsyncClient, target: ProbeTarget) -> List[ProbeResult]:
+        # a target's samples run one after another so they do not queue
+        # behind each other and skew the latencies
+        return [await self.probe(client, target) for _ in range(self.samples)]
+
+    @staticmethod
+    def summarise(group: str, results: List[ProbeResult]) -> Dict[str, Any]:
+        latencies = [result.latency for result in results if result.ok]
+        failures = [result for result in results if not result.ok]
+        error_rate = len(failures) / len(results)
+        p95 = percentile(latencies, 95)
+
+        if error_rate == 1:
+            status, details = "Down", failures[-1].error
+        elif failures:
+            status = "Degraded"
+            details = f"{len(failures)} of {len(results)} requests failed: {failures[-1].error}"
+        elif p95 > settings.API_PROBE_DEGRADED_MS:
+            status, details = "Degraded", "High response time detected"
+        else:
+            status, details = "Operational", "All tests passed"
+
+        return {
+            "api_group": group,
+            "status": status,
+            "response_time": round(percentile(latencies, 50), 2) if latencies else None,
+            "p95_response_time": round(p95, 2) if latencies else None,
+            "error_rate": round(error_rate, 4),
+            "details": details,
+            "last_checked": datetime.now(timezone.utc),
+        }
+
+    def save(self, rows: List[Dict[str, Any]]):
+        with self.session_factory() as db:
+            APIStatusService.upsert_many(db, rows)
+
+    async def run_cycle(self, client: httpx.AsyncClient) -> List[Dict[str, Any]]:
+        """Probes every target concurrently and records one status per group"""
+
+        results = await asyncio.gather(
+            *(self.probe_target(client, target) for target in self.targets)
+        )
+
+        groups: Dict[str, List[ProbeResult]] = {}
+        for target_results in results:
+            for result in target_results:
+                groups.setdefault(result.target.group, []).append(result)
+
+        rows = [self.summarise(group, group_results) for group, group_results in groups.items()]
+        await asyncio.to_thread(self.save, rows)
+        return rows
+
+    async def run(self, app) -> List[Dict[str, Any]]:
+        """Runs one probe cycle against `app`"""
+
+        async with self.client(app) as client:
+            return await self.run_cycle(client)
+
+
+api_prober = ApiProber()
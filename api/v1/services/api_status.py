@@ -1,13 +1,44 @@
-from typing import Any, List, Optional
+import math
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Sequence
+from uuid_extensions import uuid7
 from api.core.base.services import Service
+from api.db.database import dialect_insert
 from sqlalchemy.orm import Session
-from api.v1.models.api_status import APIStatus
+from api.v1.models.api_status import APIStatus, APIStatusSample
 from api.v1.schemas.api_status import APIStatusPost
 from fastapi import HTTPException
 
 
+def percentile(values: Sequence[float], q: float) -> Optional[float]:
+    """Nearest-rank percentile of `values`, `q` between 0 and 100"""
+
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(math.ceil(q / 100 * len(ordered)), 1)
+    return ordered[rank - 1]
+
+
 class APIStatusService(Service):
 
+    @staticmethod
+    def add_samples(db: Session, rows: List[Dict[str, Any]]):
+        """Appends the statuses being recorded to the status history; they
+        are committed with the statuses"""
+
+        db.add_all(
+            APIStatusSample(
+                api_group=row["api_group"],
+                status=row["status"],
+                response_time=row.get("response_time"),
+                p95_response_time=row.get("p95_response_time"),
+                error_rate=row.get("error_rate"),
+                checked_at=row.get("last_checked") or datetime.now(timezone.utc),
+            )
+            for row in rows
+        )
+
     @staticmethod
     def fetch(db: Session, status_id) -> APIStatus:
         status = db.query(APIStatus).get(status_id).first()
@@ -52,6 +83,7 @@ class APIStatusService(Service):
         """
 
         try:
+            APIStatusService.add_samples(db, [schema.model_dump()])
             existing_status = db.query(APIStatus).filter(APIStatus.api_group == schema.api_group).first()
 
             if existing_status:
@@ -82,6 +114,35 @@ class APIStatusService(Service):
                 detail="A database error occurred."
             )
 
+    @staticmethod
+    def upsert_many(db: Session, rows: List[Dict[str, Any]]):
+        """
+        Upserts the statuses of several API groups in one statement.
+
+        Parameters:
+            db (Session): The SQLAlchemy database session to perform the operation.
+            rows (list): APIStatus column values, one dict per api_group.
+        """
+
+        if not rows:
+            return
+
+        insert = dialect_insert(db)
+        statement = insert(APIStatus).values(
+            [{"id": str(uuid7()), **row} for row in rows]
+        )
+        statement = statement.on_conflict_do_update(
+            index_elements=[APIStatus.api_group],
+            set_={
+                column: statement.excluded[column]
+                for column in rows[0]
+                if column != "api_group"
+            },
+        )
+        db.execute(statement)
+        APIStatusService.add_samples(db, rows)
+        db.commit()
+
     # @staticmethod
     # def update(db: Session, schema: APIStatusPost) -> APIStatus:
     #     status = APIStatus(
@@ -0,0 +1,225 @@
+""" API status history
+
+Every recorded status is appended to api_status_samples. Samples are
+summarised into hourly and daily rollups, and the status page reads only
+the rollups, so serving it stays cheap however long the history is.
+Samples, hourly and daily rollups are each kept for their own retention
+period.
+"""
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy.orm import Session
+from uuid_extensions import uuid7
+
+from api.db.database import dialect_insert
+from api.utils.settings import settings
+from api.v1.models.api_status import APIStatus, APIStatusRollup, APIStatusSample
+from api.v1.services.api_status import percentile
+from api.v1.services.maintenance import MaintenanceService
+
+
+PERIODS = {"hour": timedelta(hours=1), "day": timedelta(days=1)}
+
+
+def as_utc(moment: datetime) -> datetime:
+    # SQLite hands back naive datetimes
+    return moment if moment.tzinfo else moment.replace(tzinfo=timezone.utc)
+
+
+def bucket_start(moment: datetime, period: str) -> datetime:
+    moment = as_utc(moment).replace(minute=0, second=0, microsecond=0)
+    return moment.replace(hour=0) if period == "day" else moment
+
+
+class APIStatusHistoryService:
+
+    @staticmethod
+    def rollup(db: Session, period: str, since: datetime, until: Optional[datetime] = None) -> int:
+        """
+        (Re)computes the rollups of the `period` buckets from `since` up to
+        `until`; the bucket in progress is included and refreshed on the
+        next run.
+
+        Returns the number of rollups written.
+        """
+
+        start = bucket_start(since, period)
+        end = until or datetime.now(timezone.utc)
+        samples = (
+            db.query(APIStatusSample)
+            .filter(APIStatusSample.checked_at >= start, APIStatusSample.checked_at < end)
+            .all()
+        )
+
+        buckets: Dict[tuple, List[APIStatusSample]] = {}
+        for sample in samples:
+            key = (sample.api_group, bucket_start(sample.checked_at, period))
+            buckets.setdefault(key, []).append(sample)
+
+        if not buckets:
+            return 0
+
+        rows = []
+        for (api_group, bucket), bucket_samples in buckets.items():
+            response_times = [
+                float(sample.response_time)
+                for sample in bucket_samples
+                if sample.response_time is not None
+            ]
+            p95_times = [
+                float(sample.p95_response_time if sample.p95_response_time is not None else sample.response_time)
+                for sample in bucket_samples
+                if sample.response_time is not None
+            ]
+            rows.append(
+                {
+                    "id": str(uuid7()),
+                    "api_group": api_group,
+                    "period": period,
+                    "bucket_start": bucket,
+                    "samples": len(bucket_samples),
+                    "up_samples": sum(sample.status != "Down" for sample in bucket_samples),
+                    "degraded_samples": sum(sample.status == "Degraded" for sample in bucket_samples),
+                    "response_time_p50": percentile(response_times, 50),
+                    "response_time_p95": percentile(p95_times, 95),
+                }
+            )
+
+        insert = dialect_insert(db)
+        statement = insert(APIStatusRollup).values(rows)
+        statement = statement.on_conflict_do_update(
+            index_elements=[
+                APIStatusRollup.api_group,
+                APIStatusRollup.period,
+                APIStatusRollup.bucket_start,
+            ],
+            set_={
+                column: statement.excluded[column]
+                for column in (
+                    "samples",
+                    "up_samples",
+                    "degraded_samples",
+                    "response_time_p50",
+                    "response_time_p95",
+                )
+            },
+        )
+        db.execute(statement)
+        db.commit()
+        return len(rows)
+
+    @staticmethod
+    def purge(db: Session) -> Dict[str, int]:
+        """Deletes samples and rollups past their retention"""
+
+        now = datetime.now(timezone.utc)
+        return {
+            "samples": MaintenanceService.delete_in_batches(
+                db,
+                APIStatusSample,
+                APIStatusSample.checked_at
+                < now - timedelta(days=settings.API_STATUS_SAMPLE_RETENTION_DAYS),
+            ),
+            "hourly": MaintenanceService.delete_in_batches(
+                db,
+                APIStatusRollup,
+                APIStatusRollup.period == "hour",
+                APIStatusRollup.bucket_start
+                < now - timedelta(days=settings.API_STATUS_HOURLY_RETENTION_DAYS),
+            ),
+            "daily": MaintenanceService.delete_in_batches(
+                db,
+                APIStatusRollup,
+                APIStatusRollup.period == "day",
+                APIStatusRollup.bucket_start
+                < now - timedelta(days=settings.API_STATUS_DAILY_RETENTION_DAYS),
+            ),
+        }
+
+    @staticmethod
+    def incidents(rollups: List[APIStatusRollup]) -> List[Dict[str, Any]]:
+        """Merges consecutive hours with failed or degraded samples into
+        incident windows"""
+
+        windows: List[Dict[str, Any]] = []
+        for rollup in sorted(rollups, key=lambda rollup: rollup.bucket_start):
+            if rollup.up_samples == rollup.samples and not rollup.degraded_samples:
+                continue
+
+            start = as_utc(rollup.bucket_start)
+            end = start + PERIODS["hour"]
+            status = "Down" if rollup.up_samples < rollup.samples else "Degraded"
+            if windows and windows[-1]["end"] == start:
+                windows[-1]["end"] = end
+                if status == "Down":
+                    windows[-1]["status"] = status
+            else:
+                windows.append({"start": start, "end": end, "status": status})
+        return windows
+
+    def summary(self, db: Session, days: int = 90) -> List[Dict[str, Any]]:
+        """
+        The current status of every API group with its uptime percentage
+        over `days`, the p50/p95 response time of the last 24 hours and
+        its incident windows, all read from rollups.
+        """
+
+        now = datetime.now(timezone.utc)
+        since = bucket_start(now - timedelta(days=days), "day")
+        rollups = (
+            db.query(APIStatusRollup)
+            .filter(
+                APIStatusRollup.bucket_start >= since,
+                (APIStatusRollup.period == "day")
+                | (APIStatusRollup.bucket_start >= now - timedelta(hours=24))
+                | (APIStatusRollup.up_samples < APIStatusRollup.samples)
+                | (APIStatusRollup.degraded_samples > 0),
+            )
+            .all()
+        )
+
+        daily: Dict[str, List[APIStatusRollup]] = {}
+        hourly: Dict[str, List[APIStatusRollup]] = {}
+        for rollup in rollups:
+            target = daily if rollup.period == "day" else hourly
+            target.setdefault(rollup.api_group, []).append(rollup)
+
+        summaries = []
+        for status in db.query(APIStatus).order_by(APIStatus.api_group).all():
+            days_of_group = daily.get(status.api_group, [])
+            hours_of_group = hourly.get(status.api_group, [])
+            recent = [
+                rollup
+                for rollup in hours_of_group
+                if as_utc(rollup.bucket_start) >= now - timedelta(hours=24)
+            ]
+            samples = sum(rollup.samples for rollup in days_of_group)
+            summaries.append(
+                {
+                    "id": status.id,
+                    "api_group": status.api_group,
+                    "status": status.status,
+                    "last_checked": status.last_checked,
+                    "response_time": status.response_time,
+                    "details": status.details,
+                    "uptime": (
+                        round(sum(rollup.up_samples for rollup in days_of_group) / samples * 100, 3)
+                        if samples
+                        else None
+                    ),
+                    "response_time_p50": percentile(
+                        [float(r.response_time_p50) for r in recent if r.response_time_p50 is not None], 50
+                    ),
+                    # the worst hour's p95, an upper bound of the day's
+                    "response_time_p95": max(
+                        (float(r.response_time_p95) for r in recent if r.response_time_p95 is not None),
+                        default=None,
+                    ),
+                    "incidents": self.incidents(hours_of_group),
+                }
+            )
+        return summaries
+
+
+api_status_history_service = APIStatusHistoryService()
@@ -1,11 +1,17 @@
+from collections import defaultdict
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import IntegrityError, SQLAlchemyError
 from api.v1.models.billing_plan import BillingPlan
 from typing import Any, Optional
 from api.core.base.services import Service
+from api.core.reference_cache import ReferenceCache
 from api.v1.schemas.plans import CreateBillingPlanSchema
 from api.utils.db_validators import check_model_existence
 from fastapi import HTTPException, status
+from fastapi.encoders import jsonable_encoder
+
+
+billing_plans_cache = ReferenceCache("billing_plans")
 
 
 class BillingPlanService(Service):
@@ -54,8 +60,10 @@ class BillingPlanService(Service):
 
         try:
             db.add(plan)
+            billing_plans_cache.bump(db)
             db.commit()
             db.refresh(plan)
+            billing_plans_cache.invalidate(plan.organisation_id)
             return plan
         
         except IntegrityError as e:
@@ -88,7 +96,9 @@ class BillingPlanService(Service):
         plan = check_model_existence(db, BillingPlan, id)
 
         db.delete(plan)
+        billing_plans_cache.bump(db)
         db.commit()
+        billing_plans_cache.invalidate(plan.organisation_id)
 
     def fetch(self, db: Session, billing_plan_id: str):
         billing_plan = db.query(BillingPlan).get(billing_plan_id)
@@ -110,8 +120,11 @@ class BillingPlanService(Service):
         for column, value in update_data.items():
             setattr(plan, column, value)
 
+        billing_plans_cache.bump(db)
         db.commit()
         db.refresh(plan)
+        # the plan may have moved to another organisation
+        billing_plans_cache.invalidate()
 
         return plan
 
@@ -130,5 +143,25 @@ class BillingPlanService(Service):
 
         return query.all()
 
+    def fetch_all_cached(self, db: Session, organisation_id: str):
+        """Fetch the billing plans of an organisation, from the reference
+        data cache"""
+
+        return billing_plans_cache.get(
+            db,
+            organisation_id,
+            lambda: jsonable_encoder(self.fetch_all(db, organisation_id=organisation_id)),
+        )
+
+    def prime_cache(self, db: Session):
+        """Caches the billing plans of every organisation, with one query"""
+
+        plans = defaultdict(list)
+        for plan in db.query(BillingPlan).all():
+            plans[plan.organisation_id].append(jsonable_encoder(plan))
+
+        for organisation_id, organisation_plans in plans.items():
+            billing_plans_cache.set(db, organisation_id, organisation_plans)
+
 
 billing_plan_service = BillingPlanService()
@@ -0,0 +1,87 @@
+from typing import Any, Dict
+
+from sqlalchemy import event, func, select
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+from uuid_extensions import uuid7
+
+from api.db.database import dialect_insert
+from api.v1.models.cache_version import CacheVersion
+
+# cached data, by the name of its version
+PERMISSIONS = "permissions"
+MEMBERSHIPS = "memberships"
+ORGANISATIONS = "organisations"
+
+
+class CacheVersionService:
+    """Keeps the caches of every worker consistent
+
+    Caches of data shared by all workers tag their entries with the
+    version of that data. Whoever changes the data calls `bump` in the
+    same transaction, so once it commits, every worker sees a new version
+    and stops using the entries tagged with the old one.
+
+    All versions are read with one query per transaction and kept on
+    `Session.info` until the transaction ends. A transaction that bumped a
+    version does not use the caches: it could roll back.
+    """
+
+    SESSION_CACHE_KEY = "cache_versions"
+    BUMPED_KEY = "cache_versions_bumped"
+
+    def current(self, db: Session) -> Dict[str, int]:
+        """Returns the version of every cached data, by name"""
+
+        info = getattr(db, "info", None)
+        if isinstance(info, dict) and self.SESSION_CACHE_KEY in info:
+            return info[self.SESSION_CACHE_KEY]
+
+        versions = dict(db.execute(select(CacheVersion.name, CacheVersion.version)).all())
+        if isinstance(info, dict):
+            info[self.SESSION_CACHE_KEY] = versions
+        return versions
+
+    def get(self, db: Session, name: str) -> Any:
+        """Returns the version of a cached data. When it cannot be read,
+        returns a value equal to no other, so that nothing is served from
+        the cache"""
+
+        info = getattr(db, "info", None)
+        if isinstance(info, dict) and info.get(self.BUMPED_KEY):
+            return object()
+
+        try:
+            return self.current(db).get(name, 0)
+        except SQLAlchemyError:
+            return object()
+
+    def bump(self, db: Session, *names: str):
+        """Moves the given cached data to a new version, when the current
+        transaction commits"""
+
+        stmt = dialect_insert(db)(CacheVersion).values(
+            [{"id": str(uuid7()), "name": name, "version": 1} for name in names]
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[CacheVersion.name],
+            set_={"version": CacheVersion.version + 1, "updated_at": func.now()},
+        )
+        db.execute(stmt)
+
+        info = getattr(db, "info", None)
+        if isinstance(info, dict):
+            info.pop(self.SESSION_CACHE_KEY, None)
+            info[self.BUMPED_KEY] = True
+
+
+@event.listens_for(Session, "after_transaction_end")
+def _clear_session_cache_versions(session: Session, transaction):
+    """Scopes the versions read to a single transaction"""
+
+    if transaction.parent is None:
+        session.info.pop(CacheVersionService.SESSION_CACHE_KEY, None)
+        session.info.pop(CacheVersionService.BUMPED_KEY, None)
+
+
+cache_version_service = CacheVersionService()
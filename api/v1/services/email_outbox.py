@@ -0,0 +1,244 @@
+""" Transactional email outbox
+
+Emails are written to the `email_outbox` table in the same transaction as
+the change that triggers them, so a request only pays for an INSERT and a
+committed email survives worker restarts. The relay claims due rows with
+`FOR UPDATE SKIP LOCKED` (several relays never pick the same row), sends
+them through the pooled mail client, retries failures with exponential
+backoff and dead-letters rows that keep failing.
+
+The relay runs inside the app by default; set EMAIL_OUTBOX_IN_PROCESS to
+False and run `python -m api.v1.services.email_outbox` for a dedicated
+worker.
+"""
+import asyncio
+import random
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional
+
+from fastapi.encoders import jsonable_encoder
+from fastapi_mail import MessageSchema, MessageType
+from sqlalchemy import and_, or_, select, update
+from sqlalchemy.orm import Session, sessionmaker
+
+from api.core.dependencies.email_sender import email_renderer, get_mail_client
+from api.db.database import SessionLocal
+from api.utils.logger import logger
+from api.utils.settings import settings
+from api.v1.models.email_outbox import EmailOutbox
+
+
+class EmailOutboxService:
+    """Queues emails in the outbox and relays them to the mail server"""
+
+    def __init__(self, session_factory: sessionmaker = SessionLocal):
+        self.session_factory = session_factory
+        self._task: Optional[asyncio.Task] = None
+        self._stopping: Optional[asyncio.Event] = None
+
+    def enqueue(
+        self,
+        db: Session,
+        recipient: str,
+        subject: str,
+        template_name: Optional[str] = None,
+        context: Optional[dict] = None,
+        body: Optional[str] = None,
+        subtype: str = "html",
+    ) -> EmailOutbox:
+        """Adds an email to the current transaction; it is sent once the
+        caller commits"""
+
+        if template_name is None and body is None:
+            raise ValueError("An email needs a template or a body")
+
+        email = EmailOutbox(
+            recipient=recipient,
+            subject=subject,
+            template_name=template_name,
+            context=jsonable_encoder(context or {}),
+            body=body,
+            subtype=subtype,
+            status="pending",
+            attempts=0,
+            next_attempt_at=datetime.now(timezone.utc),
+        )
+        db.add(email)
+        return email
+
+    def enqueue_now(self, **kwargs) -> str:
+        """Queues an email in its own transaction, for callers without a
+        request session (e.g. background tasks)"""
+
+        with self.session_factory() as db:
+            email = self.enqueue(db, **kwargs)
+            db.commit()
+            return email.id
+
+    def claim(self, db: Session, limit: int) -> List[dict]:
+        """Leases up to `limit` due emails to the calling relay.
+
+        Rows stuck in `sending` past their lease (the relay died mid-batch)
+        are due again.
+        """
+
+        now = datetime.now(timezone.utc)
+        rows = (
+            db.execute(
+                select(EmailOutbox)
+                .where(
+                    or_(
+                        and_(EmailOutbox.status == "pending", EmailOutbox.next_attempt_at <= now),
+                        and_(EmailOutbox.status == "sending", EmailOutbox.locked_until < now),
+                    )
+                )
+                .order_by(EmailOutbox.next_attempt_at)
+                .limit(limit)
+                .with_for_update(skip_locked=True)
+            )
+            .scalars()
+            .all()
+        )
+
+        lease = now + timedelta(seconds=settings.EMAIL_OUTBOX_LEASE_SECONDS)
+        claimed = []
+        for row in rows:
+            row.status = "sending"
+            row.locked_until = lease
+            claimed.append(
+                {
+                    "id": row.id,
+                    "recipient": row.recipient,
+                    "subject": row.subject,
+                    "template_name": row.template_name,
+                    "context": row.context,
+                    "body": row.body,
+                    "subtype": row.subtype,
+                    "attempts": row.attempts,
+                }
+            )
+        db.commit()
+        return claimed
+
+    @staticmethod
+    def backoff(attempts: int) -> float:
+        """Seconds to wait before the next attempt, with jitter so failed
+        batches don't retry in lockstep"""
+
+        delay = min(
+            settings.EMAIL_OUTBOX_BACKOFF_BASE * 2 ** (attempts - 1),
+            settings.EMAIL_OUTBOX_BACKOFF_MAX,
+        )
+        return delay * random.uniform(0.5, 1)
+
+    def record(self, db: Session, email: dict, error: Optional[Exception]):
+        """Marks a claimed email as sent, scheduled for a retry or dead"""
+
+        now = datetime.now(timezone.utc)
+        attempts = email["attempts"] + 1
+
+        if error is None:
+            values = {"status": "sent", "sent_at": now, "last_error": None}
+        elif attempts >= settings.EMAIL_OUTBOX_MAX_ATTEMPTS:
+            logger.error(
+                f"Email {email['id']} to {email['recipient']} dead-lettered after "
+                f"{attempts} attempts: {error}"
+            )
+            values = {"status": "dead", "last_error": str(error)}
+        else:
+            values = {
+                "status": "pending",
+                "next_attempt_at": now + timedelta(seconds=self.backoff(attempts)),
+                "last_error": str(error),
+            }
+
+        db.execute(
+            update(EmailOutbox)
+            .where(EmailOutbox.id == email["id"])
+            .values(attempts=attempts, locked_until=None, **values)
+        )
+
+    @staticmethod
+    def build_message(email: dict) -> MessageSchema:
+        body = email["body"]
+        if email["template_name"]:
+            body = email_renderer.render(email["template_name"], email["context"])
+
+        return MessageSchema(
+            subject=email["subject"],
+            recipients=[email["recipient"]],
+            body=body,
+            subtype=MessageType.plain if email["subtype"] == "plain" else MessageType.html,
+        )
+
+    def _claim(self, limit: int) -> List[dict]:
+        with self.session_factory() as db:
+            return self.claim(db, limit)
+
+    def _record(self, results):
+        with self.session_factory() as db:
+            for email, error in results:
+                self.record(db, email, error)
+            db.commit()
+
+    async def process_batch(self, limit: Optional[int] = None) -> int:
+        """Sends one batch of due emails and returns how many were claimed"""
+
+        emails = await asyncio.to_thread(
+            self._claim, limit or settings.EMAIL_OUTBOX_BATCH_SIZE
+        )
+        if not emails:
+            return 0
+
+        results, sendable, messages = [], [], []
+        for email in emails:
+            try:
+                messages.append(self.build_message(email))
+                sendable.append(email)
+            except Exception as exc:
+                results.append((email, exc))
+
+        if messages:
+            errors = await get_mail_client().send_messages(messages)
+            results.extend(zip(sendable, errors))
+
+        await asyncio.to_thread(self._record, results)
+        return len(emails)
+
+    async def run(self, poll_interval: float = settings.EMAIL_OUTBOX_POLL_INTERVAL):
+        """Relays emails until `stop` is called"""
+
+        if self._stopping is None:
+            self._stopping = asyncio.Event()
+
+        while not self._stopping.is_set():
+            try:
+                if await self.process_batch():
+                    continue
+            except Exception as exc:
+                logger.error(f"Email outbox relay failed: {exc}")
+
+            try:
+                await asyncio.wait_for(self._stopping.wait(), timeout=poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    def start(self):
+        """Starts the relay as a task of the running event loop"""
+
+        self._stopping = asyncio.Event()
+        self._task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._stopping.set()
+        await self._task
+        self._task = self._stopping = None
+
+
+email_outbox_service = EmailOutboxService()
+
+
+if __name__ == "__main__":
+    asyncio.run(email_outbox_service.run())
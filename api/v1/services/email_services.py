@@ -1,9 +1,10 @@
 from typing import Optional
-from fastapi_mail import FastMail, MessageSchema, ConnectionConfig
+from fastapi_mail import MessageSchema, ConnectionConfig
 from pydantic import EmailStr
 import os
 from dotenv import load_dotenv
 from fastapi import BackgroundTasks
+from api.core.dependencies.smtp_pool import PooledFastMail
 
 load_dotenv()
 
@@ -20,7 +21,7 @@ class EmailService:
             MAIL_STARTTLS = False,
             MAIL_SSL_TLS = True,
         )
-        self.fast_mail = FastMail(self.conf)
+        self.fast_mail = PooledFastMail(self.conf)
 
     async def send_email(
         self, 
@@ -4,8 +4,8 @@ from api.core.base.services import Service
 from api.v1.models.email_template import EmailTemplate
 from api.v1.schemas.email_template import EmailTemplateSchema
 from api.utils.db_validators import check_model_existence
+from api.v1.services.email_outbox import email_outbox_service
 import logging
-import time
 
 
 
@@ -61,28 +61,21 @@ class EmailTemplateService(Service):
         db.commit()
         
     
-    def send(self, db: Session, template_id: str, recipient_email: str, max_retries: int = 3):
-        """Send an email template to a recipient with error handling and retries"""
-        
+    def send(self, db: Session, template_id: str, recipient_email: str):
+        """Queues an email template to a recipient; the outbox relay sends it
+        and retries failed deliveries"""
+
         template = self.fetch(db=db, template_id=template_id)
 
-        for attempt in range(max_retries):
-            try:
-                self._send_email(recipient_email, template)
-                logging.info(f"Template {template_id} sent successfully to {recipient_email}")
-                return {"status": "success", "message": f"Email sent to {recipient_email}"}
-            
-            except Exception as e:
-                logging.error(f"Attempt {attempt + 1} failed to send template {template_id}: {e}")
-                time.sleep(2 ** attempt)
-
-        logging.error(f"All attempts to send template {template_id} to {recipient_email} failed.")
-        return {"status": "failure", "message": "Failed to send email after multiple attempts"}
-
-    def _send_email(self, recipient_email: str, template: EmailTemplate):
-        """Mock email sending function"""
-        if not recipient_email or not template:
-            raise ValueError("Invalid recipient email or template.")
-        pass
+        email_outbox_service.enqueue(
+            db,
+            recipient=recipient_email,
+            subject=template.title,
+            body=template.template,
+        )
+        db.commit()
+
+        logging.info(f"Template {template_id} queued for {recipient_email}")
+        return {"status": "success", "message": f"Email queued for {recipient_email}"}
 
 email_template_service = EmailTemplateService()
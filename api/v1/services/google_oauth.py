@@ -1,6 +1,6 @@
-from fastapi import BackgroundTasks, Depends, HTTPException
+from fastapi import Depends, HTTPException
 from datetime import datetime, timezone
-from api.core.dependencies.email_sender import send_email
+from api.v1.services.email_outbox import email_outbox_service
 from api.db.database import get_db
 from api.v1.models.organisation import Organisation
 from api.v1.models.oauth import OAuth
@@ -25,7 +25,7 @@ class GoogleOauthServices(Service):
     """
     Handles database operations for google oauth
     """
-    def create(self, background_tasks: BackgroundTasks, google_response: dict, db: Session):
+    def create(self, google_response: dict, db: Session):
         """
         Creates a user using information from google.
 
@@ -50,8 +50,8 @@ class GoogleOauthServices(Service):
                 return existing_user
             else:
                 new_user = self.create_new_user(google_response, db)
-                background_tasks.add_task(
-                    send_email, 
+                email_outbox_service.enqueue(
+                    db,
                     recipient=new_user.email,
                     template_name='welcome.html',
                     subject='Welcome to HNG Boilerplate',
@@ -60,6 +60,7 @@ class GoogleOauthServices(Service):
                         'last_name': new_user.last_name
                     }
                 )
+                db.commit()
                 return new_user
         except Exception as e:
             db.rollback()
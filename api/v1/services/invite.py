@@ -10,6 +10,9 @@ from api.v1.models.invitation import Invitation
 from api.v1.models.organisation import Organisation
 from api.v1.models.user import User
 from api.v1.services.user import user_service
+from api.v1.services.membership import membership_service
+from api.v1.services.organisation import organisation_service
+from api.v1.services.permissions.permission_resolver import permission_resolver
 from sqlalchemy.exc import IntegrityError
 from api.v1.models.permissions.role import Role
 from api.v1.schemas.permissions.roles import RoleCreate
@@ -147,8 +150,14 @@ class InviteService(Service):
 
             # Mark the invitation as used
             invite.is_valid = False
+            permission_resolver.bump(session)
+            membership_service.bump(session)
             session.commit()
 
+            membership_service.invalidate(user.id, org.id, db=session)
+            permission_resolver.invalidate_user(user.id, org.id)
+            organisation_service.invalidate_user_organisations(user.id)
+
             response = OrderedDict(
                 [
                     ("status", "success"),
@@ -0,0 +1,537 @@
+""" Background job queue
+
+Work that should not hold up a request (notification fan-out, newsletter
+broadcasts, login notifications...) is recorded in the `background_jobs`
+table, usually in the same transaction as the change that triggers it,
+and run by a job worker. Workers claim jobs with `FOR UPDATE SKIP LOCKED`
+under a lease they keep renewing, highest priority first, and retry
+failed jobs with exponential backoff.
+
+Tasks are plain functions registered with `job_queue.task`; their
+signature types the payload, which is validated when the job is queued:
+
+    @job_queue.task("send_report", queue="bulk")
+    def send_report(organisation_id: str, month: int): ...
+
+    send_report.enqueue(db, organisation_id=org.id, month=10)
+    db.commit()
+
+Coroutine tasks run on the worker's event loop, the others on its thread
+or process pool. The worker runs inside the app by default; set
+JOB_WORKER_IN_PROCESS to False and run `python -m api.v1.services.job_queue`
+to give background work its own processes.
+"""
+import argparse
+import asyncio
+import contextvars
+import functools
+import importlib
+import inspect
+import os
+import random
+import socket
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, List, Optional, Type
+
+from fastapi.encoders import jsonable_encoder
+from pydantic import BaseModel, ValidationError, create_model
+from sqlalchemy import and_, or_, select, update
+from sqlalchemy.orm import Session, sessionmaker
+
+from api.core.tracing import parse_traceparent, tracer
+from api.db.database import SessionLocal, dialect_insert
+from api.utils.db_validators import check_model_existence
+from api.utils.logger import logger
+from api.utils.settings import settings
+from api.v1.models.background_job import BackgroundJob
+
+
+# modules defining the tasks, imported by workers before running jobs
+TASK_MODULES = ["api.v1.services.tasks"]
+
+
+@dataclass
+class Task:
+    """A function registered to run as a background job"""
+
+    owner: "JobQueue"
+    name: str
+    func: Callable
+    queue: str
+    priority: int
+    max_attempts: int
+    payload_model: Type[BaseModel]
+
+    def __call__(self, *args, **kwargs):
+        return self.func(*args, **kwargs)
+
+    @property
+    def is_async(self) -> bool:
+        return inspect.iscoroutinefunction(self.func)
+
+    def payload(self, kwargs: dict) -> dict:
+        """Validates job arguments against the task signature"""
+
+        try:
+            return self.payload_model(**kwargs).model_dump(mode="json")
+        except ValidationError as exc:
+            raise ValueError(f"Invalid arguments for task {self.name}: {exc}") from exc
+
+    def arguments(self, payload: dict) -> dict:
+        model = self.payload_model(**payload)
+        return {name: getattr(model, name) for name in self.payload_model.model_fields}
+
+    def enqueue(
+        self,
+        db: Session,
+        *,
+        idempotency_key: Optional[str] = None,
+        priority: Optional[int] = None,
+        run_at: Optional[datetime] = None,
+        **kwargs,
+    ) -> BackgroundJob:
+        """Adds a job to the current transaction; it runs once the caller commits"""
+
+        return self.owner.enqueue(
+            db,
+            self,
+            kwargs,
+            idempotency_key=idempotency_key,
+            priority=priority,
+            run_at=run_at,
+        )
+
+    def enqueue_now(self, **kwargs) -> str:
+        """Queues a job in its own transaction and returns its id"""
+
+        with self.owner.session_factory() as db:
+            job = self.enqueue(db, **kwargs)
+            db.commit()
+            return job.id
+
+
+class JobQueue:
+    """Registers tasks and stores, claims and records their jobs"""
+
+    def __init__(self, session_factory: sessionmaker = SessionLocal):
+        self.session_factory = session_factory
+        self.tasks: Dict[str, Task] = {}
+
+    def task(
+        self,
+        name: Optional[str] = None,
+        queue: str = "default",
+        priority: int = 0,
+        max_attempts: Optional[int] = None,
+    ) -> Callable[[Callable], Task]:
+        """Registers a function as a task; its parameters must be typed"""
+
+        def register(func: Callable) -> Task:
+            task_name = name or func.__name__
+            if task_name in self.tasks:
+                raise ValueError(f"Task {task_name} is already registered")
+
+            fields = {}
+            for parameter in inspect.signature(func).parameters.values():
+                if parameter.annotation is inspect.Parameter.empty:
+                    raise TypeError(f"Parameter {parameter.name} of task {task_name} has no type")
+                default = ... if parameter.default is inspect.Parameter.empty else parameter.default
+                fields[parameter.name] = (parameter.annotation, default)
+
+            task = Task(
+                owner=self,
+                name=task_name,
+                func=func,
+                queue=queue,
+                priority=priority,
+                max_attempts=max_attempts or settings.JOB_MAX_ATTEMPTS,
+                payload_model=create_model(f"{task_name}_payload", **fields),
+            )
+            self.tasks[task_name] = task
+            return task
+
+        return register
+
+    def enqueue(
+        self,
+        db: Session,
+        task: Task,
+        kwargs: dict,
+        idempotency_key: Optional[str] = None,
+        priority: Optional[int] = None,
+        run_at: Optional[datetime] = None,
+    ) -> BackgroundJob:
+        """Adds a job to the current transaction.
+
+        Jobs sharing an idempotency key are only queued once; queueing again
+        returns the existing job.
+        """
+
+        values = {
+            "name": task.name,
+            "queue": task.queue,
+            "priority": task.priority if priority is None else priority,
+            "payload": task.payload(kwargs),
+            "idempotency_key": idempotency_key,
+            "status": "queued",
+            "attempts": 0,
+            "max_attempts": task.max_attempts,
+            "run_at": run_at or datetime.now(timezone.utc),
+            "trace_parent": tracer.traceparent(),
+        }
+
+        if idempotency_key is None:
+            job = BackgroundJob(**values)
+            db.add(job)
+            return job
+
+        insert = dialect_insert(db)
+        db.execute(
+            insert(BackgroundJob)
+            .values(**values)
+            .on_conflict_do_nothing(index_elements=["idempotency_key"])
+        )
+        return db.scalar(
+            select(BackgroundJob).where(BackgroundJob.idempotency_key == idempotency_key)
+        )
+
+    def claim(
+        self,
+        db: Session,
+        limit: int,
+        worker_id: str,
+        queues: Optional[List[str]] = None,
+    ) -> List[dict]:
+        """Leases up to `limit` due jobs to a worker, highest priority first.
+
+        Every claim counts as an attempt. Jobs stuck in `running` past their
+        lease (the worker died or hung) are due again, unless they have used
+        up their attempts, in which case they are marked as failed.
+        """
+
+        now = datetime.now(timezone.utc)
+        query = select(BackgroundJob).where(
+            or_(
+                and_(BackgroundJob.status == "queued", BackgroundJob.run_at <= now),
+                and_(BackgroundJob.status == "running", BackgroundJob.locked_until < now),
+            )
+        )
+        if queues:
+            query = query.where(BackgroundJob.queue.in_(queues))
+
+        jobs = (
+            db.execute(
+                query.order_by(BackgroundJob.priority.desc(), BackgroundJob.run_at)
+                .limit(limit)
+                .with_for_update(skip_locked=True)
+            )
+            .scalars()
+            .all()
+        )
+
+        lease = now + timedelta(seconds=settings.JOB_LEASE_SECONDS)
+        claimed = []
+        for job in jobs:
+            if job.status == "running" and job.attempts >= job.max_attempts:
+                logger.error(
+                    f"Job {job.id} ({job.name}) failed after {job.attempts} attempts: "
+                    f"lease held by {job.locked_by} expired"
+                )
+                job.status = "failed"
+                job.finished_at = now
+                job.last_error = "Lease expired before the job finished"
+                job.locked_until = job.locked_by = None
+                continue
+
+            job.status = "running"
+            job.attempts += 1
+            job.locked_until = lease
+            job.locked_by = worker_id
+            claimed.append(
+                {
+                    "id": job.id,
+                    "name": job.name,
+                    "payload": job.payload,
+                    "attempts": job.attempts,
+                    "max_attempts": job.max_attempts,
+                    "trace_parent": job.trace_parent,
+                }
+            )
+        db.commit()
+        return claimed
+
+    def renew(self, db: Session, job_ids: List[str], worker_id: str):
+        """Extends the lease of the jobs a worker is still running"""
+
+        db.execute(
+            update(BackgroundJob)
+            .where(BackgroundJob.id.in_(job_ids), BackgroundJob.locked_by == worker_id)
+            .values(
+                locked_until=datetime.now(timezone.utc)
+                + timedelta(seconds=settings.JOB_LEASE_SECONDS)
+            )
+        )
+        db.commit()
+
+    @staticmethod
+    def backoff(attempts: int) -> float:
+        """Seconds to wait before the next attempt, with jitter"""
+
+        delay = min(
+            settings.JOB_BACKOFF_BASE * 2 ** (attempts - 1),
+            settings.JOB_BACKOFF_MAX,
+        )
+        return delay * random.uniform(0.5, 1)
+
+    def record(
+        self,
+        db: Session,
+        job: dict,
+        worker_id: str,
+        error: Optional[BaseException] = None,
+        result: Any = None,
+    ):
+        """Marks a claimed job as succeeded, queued for a retry or failed.
+
+        Nothing is recorded once the worker lost its lease, since the job
+        then belongs to whichever worker claimed it again.
+        """
+
+        now = datetime.now(timezone.utc)
+        attempts = job["attempts"]
+
+        if error is None:
+            values = {
+                "status": "succeeded",
+                "result": jsonable_encoder(result),
+                "finished_at": now,
+                "last_error": None,
+            }
+        elif attempts >= job["max_attempts"]:
+            logger.error(f"Job {job['id']} ({job['name']}) failed after {attempts} attempts: {error}")
+            values = {"status": "failed", "finished_at": now, "last_error": str(error)}
+        else:
+            values = {
+                "status": "queued",
+                "run_at": now + timedelta(seconds=self.backoff(attempts)),
+                "last_error": str(error),
+            }
+
+        recorded = db.execute(
+            update(BackgroundJob)
+            .where(BackgroundJob.id == job["id"], BackgroundJob.locked_by == worker_id)
+            .values(locked_until=None, locked_by=None, **values)
+        )
+        db.commit()
+        if recorded.rowcount == 0:
+            logger.warning(f"Job {job['id']} ({job['name']}) lost its lease; its outcome was not recorded")
+
+    def fetch(self, db: Session, job_id: str) -> BackgroundJob:
+        return check_model_existence(db, BackgroundJob, job_id)
+
+    @staticmethod
+    def status(job: BackgroundJob) -> dict:
+        return {
+            "id": job.id,
+            "name": job.name,
+            "queue": job.queue,
+            "priority": job.priority,
+            "status": job.status,
+            "attempts": job.attempts,
+            "max_attempts": job.max_attempts,
+            "run_at": job.run_at,
+            "result": job.result,
+            "last_error": job.last_error,
+            "created_at": job.created_at,
+            "finished_at": job.finished_at,
+        }
+
+    def load_tasks(self):
+        for module in TASK_MODULES:
+            importlib.import_module(module)
+
+    def get_task(self, name: str) -> Task:
+        if name not in self.tasks:
+            self.load_tasks()
+        if name not in self.tasks:
+            raise LookupError(f"Unknown task {name}")
+        return self.tasks[name]
+
+
+job_queue = JobQueue()
+
+
+def run_task(name: str, payload: dict):
+    """Runs a synchronous task of `job_queue` in a pool process; module
+    level so it can be pickled"""
+
+    task = job_queue.get_task(name)
+    return task.func(**task.arguments(payload))
+
+
+class JobWorker:
+    """Claims jobs and runs up to `concurrency` of them at a time"""
+
+    def __init__(
+        self,
+        queue: JobQueue = job_queue,
+        queues: Optional[List[str]] = None,
+        concurrency: int = settings.JOB_WORKER_CONCURRENCY,
+        pool: str = settings.JOB_WORKER_POOL,
+        poll_interval: float = settings.JOB_POLL_INTERVAL,
+    ):
+        if pool not in ("thread", "process"):
+            raise ValueError("The job worker pool must be 'thread' or 'process'")
+
+        self.queue = queue
+        self.queues = queues or None
+        self.concurrency = concurrency
+        self.pool = pool
+        self.poll_interval = poll_interval
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{id(self)}"
+
+        self._executor: Optional[Executor] = None
+        self._running: Dict[str, asyncio.Task] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._stopping: Optional[asyncio.Event] = None
+
+    def _in_session(self, method, *args):
+        with self.queue.session_factory() as db:
+            return method(db, *args)
+
+    async def execute(self, job: dict):
+        """Runs a claimed job and records the outcome"""
+
+        error, result = None, None
+        attributes = {"job.id": job["id"], "job.name": job["name"], "job.attempt": job["attempts"]}
+        with tracer.span(
+            f"job {job['name']}", "consumer", parse_traceparent(job.get("trace_parent")), attributes
+        ) as span:
+            try:
+                task = self.queue.get_task(job["name"])
+                loop = asyncio.get_running_loop()
+                if task.is_async:
+                    result = await task.func(**task.arguments(job["payload"]))
+                elif self.pool == "process":
+                    result = await loop.run_in_executor(
+                        self._executor, run_task, job["name"], job["payload"]
+                    )
+                else:
+                    # in the current span, so the task's own spans nest under it
+                    result = await loop.run_in_executor(
+                        self._executor,
+                        functools.partial(
+                            contextvars.copy_context().run, task.func, **task.arguments(job["payload"])
+                        ),
+                    )
+            except asyncio.CancelledError:
+                # shutting down: the job is claimed again once its lease
+                # expires, which counts as another attempt
+                raise
+            except Exception as exc:
+                error = exc
+                if span is not None:
+                    span.record_error(exc)
+
+        await asyncio.to_thread(self._in_session, self.queue.record, job, self.worker_id, error, result)
+
+    async def _heartbeat(self):
+        while True:
+            await asyncio.sleep(settings.JOB_LEASE_SECONDS / 3)
+            if self._running:
+                try:
+                    await asyncio.to_thread(
+                        self._in_session, self.queue.renew, list(self._running), self.worker_id
+                    )
+                except Exception as exc:
+                    logger.error(f"Could not renew job leases: {exc}")
+
+    async def run(self, burst: bool = False):
+        """Runs jobs until `stop` is called, or until none are due when
+        `burst` is set"""
+
+        if self._stopping is None:
+            self._stopping = asyncio.Event()
+        self.queue.load_tasks()
+        self._executor = (
+            ProcessPoolExecutor(self.concurrency)
+            if self.pool == "process"
+            else ThreadPoolExecutor(self.concurrency, thread_name_prefix="job-worker")
+        )
+        heartbeat = asyncio.create_task(self._heartbeat())
+
+        try:
+            while not self._stopping.is_set():
+                free = self.concurrency - len(self._running)
+                jobs = []
+                if free > 0:
+                    try:
+                        jobs = await asyncio.to_thread(
+                            self._in_session, self.queue.claim, free, self.worker_id, self.queues
+                        )
+                    except Exception as exc:
+                        logger.error(f"Job worker could not claim jobs: {exc}")
+
+                for job in jobs:
+                    running = asyncio.create_task(self.execute(job))
+                    self._running[job["id"]] = running
+                    running.add_done_callback(
+                        lambda _, job_id=job["id"]: self._running.pop(job_id, None)
+                    )
+
+                if jobs:
+                    continue
+                if burst and not self._running:
+                    break
+
+                waits = [asyncio.create_task(self._stopping.wait()), *self._running.values()]
+                await asyncio.wait(
+                    waits, timeout=self.poll_interval, return_when=asyncio.FIRST_COMPLETED
+                )
+                waits[0].cancel()
+        finally:
+            heartbeat.cancel()
+            for running in list(self._running.values()):
+                running.cancel()
+            await asyncio.gather(*self._running.values(), return_exceptions=True)
+            self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def start(self):
+        """Starts the worker as a task of the running event loop"""
+
+        self._stopping = asyncio.Event()
+        self._task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._stopping.set()
+        await self._task
+        self._task = self._stopping = None
+
+
+job_worker = JobWorker(
+    queues=[queue for queue in settings.JOB_WORKER_QUEUES.split(",") if queue]
+)
+
+
+if __name__ == "__main__":
+    # use the module tasks register with, not this `__main__` copy
+    from api.v1.services.job_queue import JobWorker
+
+    parser = argparse.ArgumentParser(description="Runs background jobs")
+    parser.add_argument("--queues", default=settings.JOB_WORKER_QUEUES,
+                        help="comma separated queues to serve, all when empty")
+    parser.add_argument("--concurrency", type=int, default=settings.JOB_WORKER_CONCURRENCY)
+    parser.add_argument("--pool", choices=["thread", "process"], default=settings.JOB_WORKER_POOL)
+    parser.add_argument("--burst", action="store_true", help="exit once no job is due")
+    args = parser.parse_args()
+
+    worker = JobWorker(
+        queues=[queue for queue in args.queues.split(",") if queue],
+        concurrency=args.concurrency,
+        pool=args.pool,
+    )
+    asyncio.run(worker.run(burst=args.burst))
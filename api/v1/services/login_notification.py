@@ -1,25 +1,17 @@
 import logging
-from datetime import datetime
-import user_agents
-from user_agents.parsers import UserAgent
+from datetime import datetime, timezone
+from functools import lru_cache
+from typing import Optional, Tuple
 from fastapi import Request
-from api.core.dependencies.email_sender import send_email
-from api.v1.models import User
-import requests
+from api.core.dependencies.geoip import geoip_resolver
+from api.utils.settings import settings
+from api.v1.services.email_outbox import email_outbox_service
 
-# Setup logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
-async def send_login_notification(user: User, request: Request):
-    """
-    Send a login notification email to the user.
-
-    Args:
-        user (User): The user who just logged in
-        request (Request): The FastAPI request object
-    """
+def client_details(request: Request) -> Tuple[str, str]:
+    """Returns the IP address and user agent of the client behind a request"""
 
     # Extract IP address from request headers
     ip_address = request.client.host
@@ -27,25 +19,17 @@ async def send_login_notification(user: User, request: Request):
     if request.headers.get("x-forwarded-for"):
         ip_address = request.headers.get("x-forwarded-for").split(",")[0].strip()
 
-    # Default location
-    location = "Unknown Location"
-
-    # Check if IP is local
-    if not ip_address.startswith(("127.", "192.168.", "10.", "172.")):  # Ignore local IPs
-        try:
-            response = requests.get(f"http://ip-api.com/json/{ip_address}", timeout=5)
-            response.raise_for_status()  # Ensure response is successful (200 OK)
-            geo_data = response.json()   # Convert response only if request didn't fail
-            city = geo_data.get("city", "Unknown City")
-            country = geo_data.get("country", "Unknown Country")
-            location = f"{city}, {country}"
-        except requests.RequestException as e:
-            logger.error(f"Failed to fetch location for IP {ip_address}. Error: {str(e)}")
-            location = "Unknown Location"  # Ensure a fallback value
-
-    # Get user agent information
-    user_agent_string = request.headers.get("user-agent", "")
-    user_agent: UserAgent = user_agents.parse(user_agent_string)
+    return ip_address, request.headers.get("user-agent", "")
+
+
+@lru_cache(maxsize=settings.USER_AGENT_CACHE_SIZE)
+def describe_device(user_agent_string: str) -> str:
+    """Describes the device, OS and browser of a user agent string"""
+
+    # imported on first use, its regexes are slow to load
+    import user_agents
+
+    user_agent = user_agents.parse(user_agent_string)
 
     # Format device information
     device = f"{user_agent.device.family}"
@@ -53,27 +37,49 @@ async def send_login_notification(user: User, request: Request):
     os_info = f"{user_agent.os.family} {user_agent.os.version_string}"
 
     if device == "Other":
-        device_info = f"{os_info} - {browser}"
-    else:
-        device_info = f"{device} ({os_info}) - {browser}"
+        return f"{os_info} - {browser}"
+    return f"{device} ({os_info}) - {browser}"
+
+
+def notify_login(
+    email: str,
+    first_name: Optional[str],
+    last_name: Optional[str],
+    ip_address: str,
+    user_agent_string: str,
+    login_time: datetime,
+):
+    """
+    Looks up where a login came from and queues the notification email.
+
+    `login_time` is when the user logged in, which may be well before the
+    job runs.
+
+    The location comes from the local GeoIP database, so no network call
+    is made; queueing the email is blocking, so this runs in a worker
+    thread or as the `login_notification` job.
+    """
+
+    location = geoip_resolver.locate(ip_address)
+    device_info = describe_device(user_agent_string)
 
     # Email links
     change_password_link = "https://anchor-python.teams.hng.tech/change-password"
     help_center_link = "https://anchor-python.teams.hng.tech/help-center"
 
     # Log the notification event
-    logger.info(f"Sending login notification to {user.email} from {ip_address} ({location}) on {device_info}")
+    logger.info(f"Sending login notification to {email} from {ip_address} ({location}) on {device_info}")
 
-    # Send the notification email with error handling
+    # Queue the notification email with error handling
     try:
-        await send_email(
-            recipient=user.email,
+        email_outbox_service.enqueue_now(
+            recipient=email,
             template_name='login-notification.html',
             subject='New Login to Your Account',
             context={
-                'first_name': user.first_name,
-                'last_name': user.last_name,
-                'login_time': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                'first_name': first_name,
+                'last_name': last_name,
+                'login_time': login_time.astimezone(timezone.utc).strftime("%Y-%m-%d %H:%M:%S UTC"),
                 'ip_address': ip_address,
                 'location': location,
                 'device': device_info,
@@ -82,6 +88,6 @@ async def send_login_notification(user: User, request: Request):
                 'current_year': datetime.now().year
             }
         )
-        logger.info(f"Login notification sent successfully to {user.email}")
+        logger.info(f"Login notification queued for {email}")
     except Exception as e:
-        logger.error(f"Failed to send login notification to {user.email}: {str(e)}")
\ No newline at end of file
+        logger.error(f"Failed to queue login notification to {email}: {str(e)}")
\ No newline at end of file
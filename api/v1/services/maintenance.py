@@ -0,0 +1,141 @@
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import delete, select, update
+from sqlalchemy.orm import Session
+
+from api.utils.settings import settings
+from api.v1.models.background_job import BackgroundJob
+from api.v1.models.billing_plan import UserSubscription
+from api.v1.models.email_outbox import EmailOutbox
+from api.v1.models.invitation import Invitation
+from api.v1.models.reset_password_token import ResetPasswordToken
+from api.v1.models.token_login import TokenLogin
+from api.v1.services.request_pwd import RESET_TOKEN_EXPIRY
+from api.v1.services.stripe_payment import SUBSCRIPTION_DATE_FORMAT
+
+
+class MaintenanceService:
+    """Expiry sweeps and cleanup of rows nothing reads anymore.
+
+    Rows are deleted or updated in batches of `MAINTENANCE_BATCH_SIZE`,
+    committing after each, so a large backlog never holds long locks.
+    """
+
+    @staticmethod
+    def delete_in_batches(db: Session, model, *conditions) -> int:
+        total = 0
+        while True:
+            ids = (
+                select(model.id)
+                .where(*conditions)
+                .limit(settings.MAINTENANCE_BATCH_SIZE)
+                .scalar_subquery()
+            )
+            deleted = db.execute(
+                delete(model)
+                .where(model.id.in_(ids))
+                .execution_options(synchronize_session=False)
+            ).rowcount
+            db.commit()
+
+            total += deleted
+            if deleted < settings.MAINTENANCE_BATCH_SIZE:
+                return total
+
+    @staticmethod
+    def update_in_batches(db: Session, model, values: dict, *conditions) -> int:
+        """Updates rows matching `conditions`; `values` must make them stop
+        matching, or the loop never ends"""
+
+        total = 0
+        while True:
+            ids = (
+                select(model.id)
+                .where(*conditions)
+                .limit(settings.MAINTENANCE_BATCH_SIZE)
+                .scalar_subquery()
+            )
+            updated = db.execute(
+                update(model)
+                .where(model.id.in_(ids))
+                .values(**values)
+                .execution_options(synchronize_session=False)
+            ).rowcount
+            db.commit()
+
+            total += updated
+            if updated < settings.MAINTENANCE_BATCH_SIZE:
+                return total
+
+    def purge_login_tokens(self, db: Session) -> int:
+        """Deletes sign-in tokens past their expiry"""
+
+        return self.delete_in_batches(
+            db, TokenLogin, TokenLogin.expiry_time < datetime.utcnow()
+        )
+
+    def purge_reset_tokens(self, db: Session) -> int:
+        """Deletes password reset entries whose last token has expired"""
+
+        expired = datetime.now(timezone.utc) - RESET_TOKEN_EXPIRY
+        return self.delete_in_batches(
+            db, ResetPasswordToken, ResetPasswordToken.updated_at < expired
+        )
+
+    def purge_email_outbox(self, db: Session) -> int:
+        """Deletes sent and dead emails older than
+        `EMAIL_OUTBOX_RETENTION_DAYS`, with the links and tokens in them"""
+
+        cutoff = datetime.now(timezone.utc) - timedelta(days=settings.EMAIL_OUTBOX_RETENTION_DAYS)
+        return self.delete_in_batches(
+            db,
+            EmailOutbox,
+            EmailOutbox.status.in_(("sent", "dead")),
+            EmailOutbox.updated_at < cutoff,
+        )
+
+    def purge_background_jobs(self, db: Session) -> int:
+        """Deletes jobs that finished more than `JOB_RETENTION_DAYS` ago"""
+
+        cutoff = datetime.now(timezone.utc) - timedelta(days=settings.JOB_RETENTION_DAYS)
+        return self.delete_in_batches(
+            db,
+            BackgroundJob,
+            BackgroundJob.status.in_(("succeeded", "failed")),
+            BackgroundJob.finished_at < cutoff,
+        )
+
+    def expire_invitations(self, db: Session) -> dict:
+        """Invalidates expired invitations and deletes those expired for
+        longer than `INVITATION_RETENTION_DAYS`"""
+
+        now = datetime.now(timezone.utc)
+        expired = self.update_in_batches(
+            db,
+            Invitation,
+            {"is_valid": False},
+            Invitation.is_valid.is_(True),
+            Invitation.expires_at < now,
+        )
+        deleted = self.delete_in_batches(
+            db,
+            Invitation,
+            Invitation.expires_at
+            < now - timedelta(days=settings.INVITATION_RETENTION_DAYS),
+        )
+        return {"expired": expired, "deleted": deleted}
+
+    def expire_subscriptions(self, db: Session) -> int:
+        """Deactivates subscriptions past their end date"""
+
+        now = datetime.utcnow().strftime(SUBSCRIPTION_DATE_FORMAT)
+        return self.update_in_batches(
+            db,
+            UserSubscription,
+            {"active": False},
+            UserSubscription.active.is_(True),
+            UserSubscription.end_date < now,
+        )
+
+
+maintenance_service = MaintenanceService()
@@ -0,0 +1,126 @@
+import threading
+from typing import Dict, Optional, Tuple
+
+from cachetools import TTLCache
+from sqlalchemy import event, exists, or_, select
+from sqlalchemy.orm import Session
+
+from api.utils.settings import settings
+from api.v1.models.associations import user_organisation_association
+from api.v1.models.permissions.user_org_role import user_organisation_roles
+from api.v1.services.cache_version import MEMBERSHIPS, cache_version_service
+
+
+class MembershipService:
+    """Organisation membership service
+
+    Answers "is this user a member of this organisation" with a single
+    `EXISTS` over the primary keys of `user_organisation` and
+    `user_organisation_roles` instead of loading `organisation.users`.
+
+    Answers are cached twice:
+    - per transaction, on `Session.info`, cleared when the transaction ends
+    - per process, in a TTL cache shared by all requests, with the
+      database version of MEMBERSHIPS each answer was read at. Whoever
+      changes membership calls `bump(db)` before committing, so every
+      worker drops its answers once the change is committed. `invalidate`
+      drops them right away in this process.
+    """
+
+    SESSION_CACHE_KEY = "org_membership"
+
+    def __init__(self, ttl: int = settings.MEMBERSHIP_CACHE_TTL, maxsize: int = 100_000):
+        self._cache: TTLCache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._lock = threading.Lock()
+
+    def _session_cache(self, db: Session) -> Dict[Tuple[str, str], bool]:
+        """Returns the membership cache bound to the session's transaction"""
+
+        info = getattr(db, "info", None)
+        if not isinstance(info, dict):
+            return {}
+
+        return info.setdefault(self.SESSION_CACHE_KEY, {})
+
+    @staticmethod
+    def bump(db: Session):
+        """Invalidates the membership answers of every worker once the
+        current transaction commits"""
+
+        cache_version_service.bump(db, MEMBERSHIPS)
+
+    def _query_membership(self, db: Session, user_id: str, org_id: str) -> bool:
+        """Runs the EXISTS query against both membership tables"""
+
+        in_organisation = exists().where(
+            user_organisation_association.c.user_id == user_id,
+            user_organisation_association.c.organisation_id == org_id,
+        )
+        has_org_role = exists().where(
+            user_organisation_roles.c.user_id == user_id,
+            user_organisation_roles.c.organisation_id == org_id,
+        )
+
+        return bool(db.execute(select(or_(in_organisation, has_org_role))).scalar())
+
+    def is_member(self, db: Session, user_id: str, org_id: str) -> bool:
+        """Checks if a user belongs to an organisation"""
+
+        key = (str(user_id), str(org_id))
+
+        session_cache = self._session_cache(db)
+        if key in session_cache:
+            return session_cache[key]
+
+        version = cache_version_service.get(db, MEMBERSHIPS)
+        with self._lock:
+            cached = self._cache.get(key)
+
+        if cached is not None and cached[0] == version:
+            member = cached[1]
+        else:
+            member = self._query_membership(db, *key)
+            with self._lock:
+                self._cache[key] = (version, member)
+
+        session_cache[key] = member
+        return member
+
+    def invalidate(self, user_id: str, org_id: Optional[str] = None, db: Optional[Session] = None):
+        """Drops cached membership answers for a user.
+
+        Invalidates a single organisation when `org_id` is given, otherwise
+        every organisation cached for the user.
+        """
+
+        user_id = str(user_id)
+
+        with self._lock:
+            if org_id is not None:
+                self._cache.pop((user_id, str(org_id)), None)
+            else:
+                for key in [key for key in self._cache.keys() if key[0] == user_id]:
+                    self._cache.pop(key, None)
+
+        if db is not None:
+            session_cache = self._session_cache(db)
+            for key in [key for key in session_cache if key[0] == user_id]:
+                if org_id is None or key[1] == str(org_id):
+                    session_cache.pop(key, None)
+
+    def clear(self):
+        """Drops every cached membership answer"""
+
+        with self._lock:
+            self._cache.clear()
+
+
+@event.listens_for(Session, "after_transaction_end")
+def _clear_session_membership_cache(session: Session, transaction):
+    """Scopes the per-session cache to a single transaction"""
+
+    if transaction.parent is None:
+        session.info.pop(MembershipService.SESSION_CACHE_KEY, None)
+
+
+membership_service = MembershipService()
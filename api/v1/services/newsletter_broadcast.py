@@ -0,0 +1,339 @@
+import asyncio
+import time
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional, Tuple
+
+from fastapi_mail import MessageSchema, MessageType
+from sqlalchemy import func, or_, select, update
+from sqlalchemy.orm import Session, sessionmaker
+
+from api.core.dependencies.email_sender import email_renderer, get_mail_client
+from api.db.database import SessionLocal
+from api.utils.db_validators import check_model_existence
+from api.utils.logger import logger
+from api.utils.settings import settings
+from api.v1.models.newsletter import (
+    Newsletter,
+    NewsletterBroadcast,
+    NewsletterSubscriber,
+)
+from api.v1.models.user import User
+
+
+class SendRateLimiter:
+    """Token bucket keeping sends under a provider's messages-per-second
+    limit, allowing bursts of up to one second's worth"""
+
+    def __init__(self, rate: float):
+        self.rate = rate
+        self.capacity = max(int(rate), 1)
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+
+    async def acquire(self, count: int = 1):
+        if self.rate <= 0:
+            return
+
+        while True:
+            now = time.monotonic()
+            self._tokens = min(
+                self.capacity, self._tokens + (now - self._updated) * self.rate
+            )
+            self._updated = now
+            if self._tokens >= count:
+                self._tokens -= count
+                return
+            await asyncio.sleep((count - self._tokens) / self.rate)
+
+
+class NewsletterBroadcastService:
+    """Sends a newsletter to every subscriber.
+
+    Subscribers are read in id-ordered chunks of
+    `NEWSLETTER_BROADCAST_CHUNK_SIZE` (keyset pagination, so memory stays
+    flat however many there are). The newsletter is rendered once per run
+    and sent through the pooled mail client, which caps concurrency at the
+    pool size, at no more than `NEWSLETTER_SEND_RATE` messages per second.
+    Progress is checkpointed after every chunk under a lease; a broadcast
+    whose worker died is queued again by the `resume_newsletter_broadcasts`
+    maintenance job, and picks up after the last checkpointed subscriber.
+    """
+
+    def __init__(self, session_factory: sessionmaker = SessionLocal):
+        self.session_factory = session_factory
+
+    def create(
+        self, db: Session, newsletter_id: str, current_user: User
+    ) -> NewsletterBroadcast:
+        """Records a pending broadcast, to be sent with `run`"""
+
+        check_model_existence(db, Newsletter, newsletter_id)
+
+        broadcast = NewsletterBroadcast(
+            newsletter_id=newsletter_id,
+            sender_id=current_user.id,
+            status="pending",
+            total_recipients=0,
+            sent=0,
+            failed=0,
+            send_seconds=0,
+        )
+        db.add(broadcast)
+        db.commit()
+        db.refresh(broadcast)
+        return broadcast
+
+    def fetch(self, db: Session, broadcast_id: str) -> NewsletterBroadcast:
+        return check_model_existence(db, NewsletterBroadcast, broadcast_id)
+
+    @staticmethod
+    def subscribers_filter(newsletter_id: str):
+        # subscriptions without a newsletter are to all newsletters
+        return or_(
+            NewsletterSubscriber.newsletter_id.is_(None),
+            NewsletterSubscriber.newsletter_id == newsletter_id,
+        )
+
+    def next_chunk(
+        self, db: Session, newsletter_id: str, after: Optional[str], limit: int
+    ) -> List[dict]:
+        """Returns the `limit` subscribers following `after` in id order"""
+
+        query = select(NewsletterSubscriber.id, NewsletterSubscriber.email).where(
+            self.subscribers_filter(newsletter_id)
+        )
+        if after is not None:
+            query = query.where(NewsletterSubscriber.id > after)
+
+        rows = db.execute(query.order_by(NewsletterSubscriber.id).limit(limit))
+        return [{"id": row.id, "email": row.email} for row in rows]
+
+    def claim(self, db: Session, broadcast_id: str) -> Optional[dict]:
+        """Leases a pending or interrupted broadcast to the calling worker;
+        returns None when it is finished or another worker holds it"""
+
+        now = datetime.now(timezone.utc)
+        claimed = db.execute(
+            update(NewsletterBroadcast)
+            .where(
+                NewsletterBroadcast.id == broadcast_id,
+                NewsletterBroadcast.status.in_(["pending", "running"]),
+                or_(
+                    NewsletterBroadcast.locked_until.is_(None),
+                    NewsletterBroadcast.locked_until < now,
+                ),
+            )
+            .values(
+                status="running",
+                locked_until=now
+                + timedelta(seconds=settings.NEWSLETTER_BROADCAST_LEASE_SECONDS),
+                started_at=func.coalesce(NewsletterBroadcast.started_at, now),
+            )
+        ).rowcount
+        if not claimed:
+            db.rollback()
+            return None
+
+        broadcast = db.get(NewsletterBroadcast, broadcast_id)
+        if not broadcast.total_recipients:
+            broadcast.total_recipients = db.scalar(
+                select(func.count(NewsletterSubscriber.id)).where(
+                    self.subscribers_filter(broadcast.newsletter_id)
+                )
+            )
+        db.commit()
+
+        return {
+            "newsletter_id": broadcast.newsletter_id,
+            "title": broadcast.newsletter.title,
+            "content": broadcast.newsletter.content or "",
+            "last_subscriber_id": broadcast.last_subscriber_id,
+        }
+
+    def checkpoint(
+        self,
+        db: Session,
+        broadcast_id: str,
+        last_subscriber_id: str,
+        sent: int,
+        failed: int,
+        seconds: float,
+        error: Optional[str] = None,
+    ):
+        """Records a delivered chunk and renews the lease"""
+
+        values = {
+            "last_subscriber_id": last_subscriber_id,
+            "sent": NewsletterBroadcast.sent + sent,
+            "failed": NewsletterBroadcast.failed + failed,
+            "send_seconds": NewsletterBroadcast.send_seconds + seconds,
+            "locked_until": datetime.now(timezone.utc)
+            + timedelta(seconds=settings.NEWSLETTER_BROADCAST_LEASE_SECONDS),
+        }
+        if error is not None:
+            values["last_error"] = error
+
+        db.execute(
+            update(NewsletterBroadcast)
+            .where(NewsletterBroadcast.id == broadcast_id)
+            .values(**values)
+        )
+        db.commit()
+
+    def finish(
+        self, db: Session, broadcast_id: str, status: str, error: Optional[str] = None
+    ):
+        """Ends a run, releasing the lease; `running` leaves it resumable"""
+
+        values = {"status": status, "locked_until": None}
+        if status == "completed":
+            values["completed_at"] = datetime.now(timezone.utc)
+        if error is not None:
+            values["last_error"] = error
+
+        db.execute(
+            update(NewsletterBroadcast)
+            .where(NewsletterBroadcast.id == broadcast_id)
+            .values(**values)
+        )
+        db.commit()
+
+    def _in_session(self, method, *args):
+        with self.session_factory() as db:
+            return method(db, *args)
+
+    async def send_chunk(
+        self,
+        subscribers: List[dict],
+        subject: str,
+        body: str,
+        limiter: SendRateLimiter,
+    ) -> List[Optional[Exception]]:
+        """Sends one chunk, in batches the rate limit allows at once"""
+
+        client = get_mail_client()
+        batch_size = limiter.capacity if limiter.rate > 0 else len(subscribers)
+
+        results = []
+        for start in range(0, len(subscribers), batch_size):
+            batch = subscribers[start : start + batch_size]
+            await limiter.acquire(len(batch))
+            results.extend(
+                await client.send_messages(
+                    [
+                        MessageSchema(
+                            subject=subject,
+                            recipients=[subscriber["email"]],
+                            body=body,
+                            subtype=MessageType.html,
+                        )
+                        for subscriber in batch
+                    ]
+                )
+            )
+        return results
+
+    async def run(self, broadcast_id: str):
+        """Sends a broadcast from its last checkpoint; meant to run as a
+        background task"""
+
+        state = await asyncio.to_thread(self._in_session, self.claim, broadcast_id)
+        if state is None:
+            return
+
+        try:
+            body = email_renderer.render(
+                "newsletter.html",
+                {
+                    "title": state["title"],
+                    "content": state["content"],
+                    "unsubscribe_link": f"{settings.ANCHOR_PYTHON_BASE_URL}/unsubscribe",
+                },
+            )
+            limiter = SendRateLimiter(settings.NEWSLETTER_SEND_RATE)
+            cursor = state["last_subscriber_id"]
+
+            while True:
+                subscribers = await asyncio.to_thread(
+                    self._in_session,
+                    self.next_chunk,
+                    state["newsletter_id"],
+                    cursor,
+                    settings.NEWSLETTER_BROADCAST_CHUNK_SIZE,
+                )
+                if not subscribers:
+                    break
+
+                started = time.perf_counter()
+                results = await self.send_chunk(
+                    subscribers, state["title"], body, limiter
+                )
+                errors = [error for error in results if error is not None]
+                cursor = subscribers[-1]["id"]
+
+                await asyncio.to_thread(
+                    self._in_session,
+                    self.checkpoint,
+                    broadcast_id,
+                    cursor,
+                    len(results) - len(errors),
+                    len(errors),
+                    time.perf_counter() - started,
+                    str(errors[-1]) if errors else None,
+                )
+
+            await asyncio.to_thread(
+                self._in_session, self.finish, broadcast_id, "completed"
+            )
+        except asyncio.CancelledError:
+            # shutting down: let the next worker resume right away
+            await asyncio.to_thread(
+                self._in_session, self.finish, broadcast_id, "running"
+            )
+            raise
+        except Exception as exc:
+            logger.error(f"Newsletter broadcast {broadcast_id} failed: {exc}")
+            await asyncio.to_thread(
+                self._in_session, self.finish, broadcast_id, "failed", str(exc)
+            )
+
+    def interrupted(self, db: Session) -> List[Tuple[str, datetime]]:
+        """Returns the id and last update of the broadcasts whose worker
+        stopped before finishing them"""
+
+        return db.execute(
+            select(NewsletterBroadcast.id, NewsletterBroadcast.updated_at).where(
+                NewsletterBroadcast.status == "running",
+                or_(
+                    NewsletterBroadcast.locked_until.is_(None),
+                    NewsletterBroadcast.locked_until < datetime.now(timezone.utc),
+                ),
+            )
+        ).all()
+
+    @staticmethod
+    def stats(broadcast: NewsletterBroadcast) -> dict:
+        total = broadcast.total_recipients or 0
+        sent, failed = broadcast.sent or 0, broadcast.failed or 0
+        processed = sent + failed
+        seconds = broadcast.send_seconds or 0
+
+        return {
+            "id": broadcast.id,
+            "newsletter_id": broadcast.newsletter_id,
+            "status": broadcast.status,
+            "total_recipients": total,
+            "sent": sent,
+            "failed": failed,
+            "progress": round(processed / total * 100, 2)
+            if total
+            else (100.0 if broadcast.status == "completed" else 0.0),
+            "messages_per_second": round(processed / seconds, 2) if seconds else 0.0,
+            "failure_rate": round(failed / processed * 100, 2) if processed else 0.0,
+            "last_error": broadcast.last_error,
+            "started_at": broadcast.started_at,
+            "completed_at": broadcast.completed_at,
+        }
+
+
+newsletter_broadcast_service = NewsletterBroadcastService()
@@ -1,9 +1,17 @@
+import base64
+import binascii
+from datetime import datetime
+from typing import List, Optional
+
 from fastapi import Depends, HTTPException
+from sqlalchemy import and_, bindparam, func, or_, select, update
 from sqlalchemy.orm import Session
+from uuid_extensions import uuid7
 
 from api.core.base.services import Service
-from api.db.database import get_db
-from api.v1.models.notifications import Notification
+from api.core.pubsub import notification_bus
+from api.db.database import get_db, dialect_insert
+from api.v1.models.notifications import Notification, NotificationCounter
 from api.v1.models.user import User
 
 
@@ -15,28 +23,127 @@ class NotificationService(Service):
         """Function to send a notification"""
         new_notification = Notification(user_id=user.id, title=title, message=message, status="unread")
         db.add(new_notification)
+        db.flush()
+        self.adjust_unread_count(db, user.id, 1)
         db.commit()
         db.refresh(new_notification)
+
+        notification_bus.publish(
+            self.notification_topic(user.id), self.to_event(new_notification)
+        )
         return new_notification
 
+    @staticmethod
+    def notification_topic(user_id: str) -> str:
+        """Pubsub topic carrying a user's new notifications"""
+
+        return f"notifications:{user_id}"
+
+    @staticmethod
+    def to_event(notification: Notification) -> dict:
+        """JSON payload pushed to connected clients"""
+
+        return {
+            "id": notification.id,
+            "title": notification.title,
+            "message": notification.message,
+            "status": notification.status,
+            "created_at": notification.created_at.isoformat()
+            if notification.created_at
+            else None,
+        }
+
+
+    def adjust_unread_count(self, db: Session, user_id: str, delta: int):
+        """Adds `delta` to the user's unread counter in the current transaction.
+
+        A missing counter is created from an indexed COUNT of the user's unread
+        notifications, so it must be called after the change it accounts for.
+        """
+
+        self.adjust_unread_counts(db, [user_id], delta)
+
+    def adjust_unread_counts(self, db: Session, user_ids: List[str], delta: int):
+        """Adds `delta` to the unread counters of many users with one
+        executemany upsert (see `adjust_unread_count`)"""
+
+        if not user_ids:
+            return
+
+        unread = (
+            select(func.count())
+            .select_from(Notification)
+            .where(
+                Notification.user_id == bindparam("counter_user_id"),
+                Notification.status == "unread",
+            )
+            .scalar_subquery()
+        )
+
+        stmt = dialect_insert(db)(NotificationCounter).values(
+            id=bindparam("counter_id"),
+            user_id=bindparam("counter_user_id"),
+            unread_count=unread,
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[NotificationCounter.user_id],
+            set_={
+                "unread_count": NotificationCounter.unread_count + delta,
+                "updated_at": func.now(),
+            },
+        )
+        db.execute(
+            stmt,
+            [
+                {"counter_id": str(uuid7()), "counter_user_id": user_id}
+                for user_id in user_ids
+            ],
+        )
+
+    def get_unread_count(self, user: User, db: Session) -> int:
+        """Returns the user's unread notifications count from the maintained counter"""
+
+        count = db.execute(
+            select(NotificationCounter.unread_count).where(
+                NotificationCounter.user_id == user.id
+            )
+        ).scalar_one_or_none()
+
+        if count is None:
+            self.adjust_unread_count(db, user.id, 0)
+            db.commit()
+            count = db.execute(
+                select(NotificationCounter.unread_count).where(
+                    NotificationCounter.user_id == user.id
+                )
+            ).scalar_one()
+
+        return max(count, 0)
 
     def mark_notifications_as_read(
         self,
         user: User,
         db: Session = Depends(get_db),
-    ):
-        unread_notifications = (
-            db.query(Notification).filter(Notification.status == "unread").all()
+    ) -> int:
+        """Marks every unread notification of the user as read with a single
+        UPDATE and returns the number of notifications updated"""
+
+        result = db.execute(
+            update(Notification)
+            .where(Notification.user_id == user.id, Notification.status == "unread")
+            .values(status="read")
+            .execution_options(synchronize_session=False)
         )
+        updated = result.rowcount
 
-        if not unread_notifications:
+        if not updated:
             raise HTTPException(status_code=404, detail="No unread notifications found.")
 
-        for unread_notification in unread_notifications:
-            unread_notification.status = "read"
-
+        self.adjust_unread_count(db, user.id, -updated)
         db.commit()
 
+        return updated
+
     def mark_notification_as_read(
         self,
         notification_id: str,
@@ -58,6 +165,8 @@ class NotificationService(Service):
 
         # update notification status
         notification.status = "read"
+        db.flush()
+        self.adjust_unread_count(db, user.id, -1)
 
         # commit changes
         db.commit()
@@ -84,13 +193,74 @@ class NotificationService(Service):
             )
 
         db.delete(notification)
+        db.flush()
+        if notification.status == "unread":
+            self.adjust_unread_count(db, user.id, -1)
         db.commit()
         db.refresh()
 
-    def get_current_user_notifications(self, user: User, db: Session = Depends(get_db)):
-        """Endpoint to get current user notifications"""
+    @staticmethod
+    def encode_cursor(notification: Notification) -> str:
+        """Builds the opaque cursor pointing after a notification"""
+
+        raw = f"{notification.created_at.isoformat()}|{notification.id}"
+        return base64.urlsafe_b64encode(raw.encode()).decode()
+
+    @staticmethod
+    def decode_cursor(cursor: str):
+        """Reads the position encoded in a cursor"""
+
+        try:
+            created_at, notification_id = (
+                base64.urlsafe_b64decode(cursor.encode()).decode().split("|", 1)
+            )
+            return datetime.fromisoformat(created_at), notification_id
+        except (ValueError, binascii.Error, UnicodeDecodeError):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    def get_current_user_notifications(
+        self,
+        user: User,
+        db: Session = Depends(get_db),
+        limit: int = 20,
+        cursor: Optional[str] = None,
+        status: Optional[str] = None,
+    ):
+        """Endpoint to get current user notifications, newest first.
+
+        Uses keyset pagination on (created_at, id): pass the returned
+        `next_cursor` to fetch the following page.
+        """
+
+        query = db.query(Notification).filter(Notification.user_id == user.id)
+
+        if status:
+            query = query.filter(Notification.status == status)
+
+        if cursor:
+            created_at, notification_id = self.decode_cursor(cursor)
+            query = query.filter(
+                or_(
+                    Notification.created_at < created_at,
+                    and_(
+                        Notification.created_at == created_at,
+                        Notification.id < notification_id,
+                    ),
+                )
+            )
+
+        notifications = (
+            query.order_by(Notification.created_at.desc(), Notification.id.desc())
+            .limit(limit + 1)
+            .all()
+        )
+
+        next_cursor = None
+        if len(notifications) > limit:
+            notifications = notifications[:limit]
+            next_cursor = self.encode_cursor(notifications[-1])
 
-        return {"notifications": user.notifications}
+        return {"notifications": notifications, "next_cursor": next_cursor}
 
     def fetch_notification_by_id(
         self, notification_id: str, db: Session = Depends(get_db)
@@ -0,0 +1,284 @@
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional
+
+from fastapi import HTTPException, status
+from sqlalchemy import exists, false, func, insert, or_, select, true, union, update
+from sqlalchemy.orm import Session, sessionmaker
+from uuid_extensions import uuid7
+
+from api.core.pubsub import notification_bus
+from api.db.database import SessionLocal
+from api.utils.db_validators import check_model_existence
+from api.utils.logger import logger
+from api.utils.settings import settings
+from api.v1.models.associations import user_organisation_association
+from api.v1.models.notifications import (
+    Notification,
+    NotificationBroadcast,
+    NotificationSetting,
+)
+from api.v1.models.organisation import Organisation
+from api.v1.models.permissions.role import Role
+from api.v1.models.permissions.user_org_role import user_organisation_roles
+from api.v1.models.user import User
+from api.v1.schemas.notification import NotificationBroadcastCreate
+from api.v1.services.notification import notification_service
+from api.v1.services.organisation import organisation_service
+
+
+class NotificationBroadcastService:
+    """Fans a notification out to the members of an organisation.
+
+    Recipients are resolved with one query that applies the role segment
+    and the members' `NotificationSetting` flags in SQL, and walked in
+    id-ordered chunks of `NOTIFICATION_FANOUT_CHUNK_SIZE`. Each chunk is
+    written in one batched INSERT, committed together with the checkpoint
+    of the broadcast under a lease. When a run fails or its worker dies,
+    the retried job picks up after the last checkpointed recipient.
+    """
+
+    def __init__(self, session_factory: sessionmaker = SessionLocal):
+        self.session_factory = session_factory
+
+    def create(
+        self, db: Session, schema: NotificationBroadcastCreate, current_user: User
+    ) -> NotificationBroadcast:
+        """Records a pending broadcast, to be delivered with `run`"""
+
+        check_model_existence(db, Organisation, schema.organisation_id)
+
+        if not current_user.is_superadmin:
+            role = organisation_service.get_organisation_user_role(
+                current_user.id, schema.organisation_id, db
+            )
+            if role not in ["admin", "owner"]:
+                raise HTTPException(
+                    status_code=status.HTTP_403_FORBIDDEN, detail="Not enough permissions"
+                )
+
+        broadcast = NotificationBroadcast(
+            organisation_id=schema.organisation_id,
+            sender_id=current_user.id,
+            title=schema.title,
+            message=schema.message,
+            role=schema.role,
+            setting=schema.setting,
+            status="pending",
+            total_recipients=0,
+            delivered=0,
+        )
+        db.add(broadcast)
+        db.commit()
+        db.refresh(broadcast)
+        return broadcast
+
+    def fetch(
+        self, db: Session, broadcast_id: str, current_user: User
+    ) -> NotificationBroadcast:
+        """Returns a broadcast to its sender, the organisation admins or a superadmin"""
+
+        broadcast = check_model_existence(db, NotificationBroadcast, broadcast_id)
+
+        if not current_user.is_superadmin and broadcast.sender_id != current_user.id:
+            role = organisation_service.get_organisation_user_role(
+                current_user.id, broadcast.organisation_id, db
+            )
+            if role not in ["admin", "owner"]:
+                raise HTTPException(
+                    status_code=status.HTTP_403_FORBIDDEN, detail="Not enough permissions"
+                )
+
+        return broadcast
+
+    @staticmethod
+    def recipients_query(broadcast: NotificationBroadcast):
+        """Selects the ids of the active members who should receive a broadcast"""
+
+        org_id = broadcast.organisation_id
+        legacy_members = select(user_organisation_association.c.user_id).where(
+            user_organisation_association.c.organisation_id == org_id
+        )
+        members = select(user_organisation_roles.c.user_id).where(
+            user_organisation_roles.c.organisation_id == org_id
+        )
+
+        if broadcast.role:
+            legacy_members = legacy_members.where(
+                user_organisation_association.c.role == broadcast.role
+            )
+            members = members.join(
+                Role, Role.id == user_organisation_roles.c.role_id
+            ).where(Role.name == broadcast.role)
+
+        query = select(User.id).where(
+            User.id.in_(union(legacy_members, members)),
+            User.is_active == true(),
+            User.is_deleted == false(),
+        )
+
+        if broadcast.setting:
+            flag = getattr(NotificationSetting, broadcast.setting)
+            # members who never saved their settings get the column default
+            if str(flag.server_default.arg) == "true":
+                query = query.where(
+                    ~exists().where(
+                        NotificationSetting.user_id == User.id, flag == false()
+                    )
+                )
+            else:
+                query = query.where(
+                    exists().where(NotificationSetting.user_id == User.id, flag == true())
+                )
+
+        return query.order_by(User.id)
+
+    @staticmethod
+    def lease() -> datetime:
+        return datetime.now(timezone.utc) + timedelta(
+            seconds=settings.NOTIFICATION_BROADCAST_LEASE_SECONDS
+        )
+
+    def claim(self, db: Session, broadcast_id: str) -> Optional[NotificationBroadcast]:
+        """Leases a pending, interrupted or failed broadcast to the calling
+        worker; returns None when it is missing or completed.
+
+        Raises while another worker holds the lease, so the job is retried
+        once that lease has had time to run out.
+        """
+
+        claimed = db.execute(
+            update(NotificationBroadcast)
+            .where(
+                NotificationBroadcast.id == broadcast_id,
+                NotificationBroadcast.status.in_(["pending", "running", "failed"]),
+                or_(
+                    NotificationBroadcast.locked_until.is_(None),
+                    NotificationBroadcast.locked_until < datetime.now(timezone.utc),
+                ),
+            )
+            .values(status="running", locked_until=self.lease())
+        ).rowcount
+        db.commit()
+
+        broadcast = db.get(NotificationBroadcast, broadcast_id)
+        if claimed:
+            return broadcast
+        if broadcast is None or broadcast.status == "completed":
+            return None
+        raise RuntimeError(f"Notification broadcast {broadcast_id} is leased to another worker")
+
+    def run(self, broadcast_id: str):
+        """Delivers a broadcast from its last checkpoint; meant to run as a
+        background task.
+
+        Errors are recorded on the broadcast and re-raised, so the job queue
+        retries the job.
+        """
+
+        with self.session_factory() as db:
+            broadcast = self.claim(db, broadcast_id)
+            if broadcast is None:
+                return
+
+            try:
+                self.deliver(db, broadcast)
+            except Exception as exc:
+                db.rollback()
+                logger.error(f"Notification broadcast {broadcast_id} failed: {exc}")
+                db.execute(
+                    update(NotificationBroadcast)
+                    .where(NotificationBroadcast.id == broadcast_id)
+                    .values(status="failed", error=str(exc), locked_until=None)
+                )
+                db.commit()
+                raise
+
+    def deliver(self, db: Session, broadcast: NotificationBroadcast) -> NotificationBroadcast:
+        """Notifies the recipients of a claimed broadcast chunk by chunk,
+        after its last checkpoint"""
+
+        if broadcast.last_user_id is None:
+            broadcast.total_recipients = db.scalar(
+                select(func.count()).select_from(
+                    self.recipients_query(broadcast).order_by(None).subquery()
+                )
+            )
+            db.commit()
+
+        created_at = datetime.now(timezone.utc)
+        while True:
+            query = self.recipients_query(broadcast)
+            if broadcast.last_user_id is not None:
+                query = query.where(User.id > broadcast.last_user_id)
+            chunk = (
+                db.execute(query.limit(settings.NOTIFICATION_FANOUT_CHUNK_SIZE))
+                .scalars()
+                .all()
+            )
+            if not chunk:
+                break
+
+            rows = self.insert_chunk(db, broadcast, chunk, created_at)
+            broadcast.delivered += len(chunk)
+            broadcast.last_user_id = chunk[-1]
+            broadcast.locked_until = self.lease()
+            db.commit()
+
+            for row in rows:
+                notification_bus.publish(
+                    notification_service.notification_topic(row["user_id"]),
+                    {**row, "created_at": created_at.isoformat()},
+                )
+
+        broadcast.status = "completed"
+        broadcast.completed_at = datetime.now(timezone.utc)
+        broadcast.locked_until = None
+        db.commit()
+        return broadcast
+
+    @staticmethod
+    def insert_chunk(
+        db: Session,
+        broadcast: NotificationBroadcast,
+        user_ids: List[str],
+        created_at: datetime,
+    ) -> List[dict]:
+        rows = [
+            {
+                "id": str(uuid7()),
+                "user_id": user_id,
+                "title": broadcast.title,
+                "message": broadcast.message,
+                "status": "unread",
+            }
+            for user_id in user_ids
+        ]
+        db.execute(
+            insert(Notification.__table__),
+            [{**row, "created_at": created_at} for row in rows],
+        )
+        notification_service.adjust_unread_counts(db, user_ids, 1)
+        return rows
+
+    @staticmethod
+    def progress(broadcast: NotificationBroadcast) -> dict:
+        total = broadcast.total_recipients or 0
+        return {
+            "id": broadcast.id,
+            "organisation_id": broadcast.organisation_id,
+            "title": broadcast.title,
+            "role": broadcast.role,
+            "setting": broadcast.setting,
+            "status": broadcast.status,
+            "total_recipients": total,
+            "delivered": broadcast.delivered or 0,
+            "progress": round((broadcast.delivered or 0) / total * 100, 2)
+            if total
+            else (100.0 if broadcast.status == "completed" else 0.0),
+            "error": broadcast.error,
+            "created_at": broadcast.created_at,
+            "completed_at": broadcast.completed_at,
+        }
+
+
+notification_broadcast_service = NotificationBroadcastService()
@@ -1,15 +1,19 @@
 import csv
+import threading
 from io import StringIO
 import logging
+from collections import Counter
+from cachetools import TTLCache
 from typing import Any, Optional, Annotated
 from fastapi import HTTPException, Depends, status
 from sqlalchemy.orm import Session
 from sqlalchemy import or_, and_
 from fastapi import HTTPException, status
-from sqlalchemy import select
+from sqlalchemy import select, union
 from api.core.base.services import Service
 from api.utils.db_validators import check_model_existence, check_user_in_org
 from api.utils.pagination import paginated_response
+from api.utils.settings import settings
 from api.v1.models.permissions.role import Role
 from api.v1.models.product import Product
 from api.v1.models.permissions.role_permissions import role_permissions
@@ -19,18 +23,45 @@ from api.v1.models.permissions.user_org_role import user_organisation_roles
 from api.v1.models.organisation import Organisation
 from api.v1.models.invitation import Invitation
 from api.v1.models.user import User
+from api.v1.services.cache_version import (
+    MEMBERSHIPS,
+    ORGANISATIONS,
+    PERMISSIONS,
+    cache_version_service,
+)
+from api.v1.services.membership import membership_service
+from api.v1.services.permissions.permission_resolver import permission_resolver
 from api.v1.schemas.organisation import (
     CreateUpdateOrganisation,
     AddUpdateOrganisationRole,
     RemoveUserFromOrganisation,
-    OrganisationData
+    OrganisationData,
+    BulkAddOrganisationMembers,
+    BulkMemberResult,
 )
-from api.db.database import get_db
+from api.db.database import get_db, dialect_insert
+
+
+# roles of the `user_organisation` table
+LEGACY_ROLES = ("admin", "user", "guest", "owner")
 
 
 class OrganisationService(Service):
     """Organisation service functionality"""
 
+    def __init__(self):
+        self._user_organisations = TTLCache(
+            maxsize=10_000, ttl=settings.USER_ORGANISATIONS_CACHE_TTL
+        )
+        self._user_organisations_lock = threading.Lock()
+
+    @staticmethod
+    def bump(db: Session):
+        """Invalidates the cached organisations of every worker once the
+        current transaction commits"""
+
+        cache_version_service.bump(db, ORGANISATIONS)
+
     def get_role_id(self, db: Session, role: str):
         '''Returns the role id associated with a role'''
 
@@ -62,6 +93,7 @@ class OrganisationService(Service):
             role='owner'
         )
         db.execute(stmt)
+        membership_service.bump(db)
         db.commit()
         admin_role = db.query(Role).filter_by(name="admin").first()
         if not admin_role:
@@ -82,6 +114,8 @@ class OrganisationService(Service):
             db.execute(user_role_stmt)
             db.commit()
 
+        self.invalidate_user_organisations(user.id)
+
         return new_organisation
 
 
@@ -141,25 +175,20 @@ class OrganisationService(Service):
 
 
 
-    def update(self, db: Session, id: str, schema, current_user: User):
-        """Updates a product"""
+    def update(self, db: Session, id: str, schema):
+        """Updates an organisation; the route checks the caller's permission"""
 
         organisation = self.fetch(db=db, id=id)
 
-        # check if the current user has the permission to update the organisation
-        role = self.get_organisation_user_role(current_user.id, id, db)
-        if role not in ["admin", "owner"]:
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN, detail="Not enough permissions"
-            )
-
         # Update the fields with the provided schema data
         update_data = schema.dict(exclude_unset=True)
         for key, value in update_data.items():
             setattr(organisation, key, value)
 
+        self.bump(db)
         db.commit()
         db.refresh(organisation)
+        self.invalidate_user_organisations()
         return organisation
 
     def delete(self, db: Session, id: str):
@@ -167,7 +196,10 @@ class OrganisationService(Service):
         
         organisation = self.fetch(db, id=id)
         db.delete(organisation)
+        self.bump(db)
+        membership_service.bump(db)
         db.commit()
+        self.invalidate_user_organisations()
 
     def check_user_role_in_org(self, db: Session, user: User, org: Organisation, role: str):
         '''Check user role in organisation'''
@@ -196,7 +228,7 @@ class OrganisationService(Service):
         organisation = check_model_existence(db, Organisation, schema.org_id)
 
         # Check if user is not in organisation
-        check_user_in_org(user, organisation)
+        check_user_in_org(db, user, organisation)
 
         # Update user role
         stmt = user_organisation_association.update().where(
@@ -205,7 +237,9 @@ class OrganisationService(Service):
         ).values(role=schema.role)
 
         db.execute(stmt)
+        membership_service.bump(db)
         db.commit()
+        self.invalidate_user_organisations(user.id)
 
 
     # def add_user_to_organisation(self, db: Session, org_id: str, user_id: str):
@@ -217,7 +251,7 @@ class OrganisationService(Service):
         organisation = check_model_existence(db, Organisation, schema.org_id)
 
         # Check if user is not in organisation
-        check_user_in_org(user, organisation)
+        check_user_in_org(db, user, organisation)
 
         # Check for user role permissions
         self.check_user_role_in_org(db=db, user=user, org=organisation, role='admin')\
@@ -231,8 +265,167 @@ class OrganisationService(Service):
         )
 
         db.execute(stmt)
+        membership_service.bump(db)
         db.commit()
 
+        membership_service.invalidate(user.id, organisation.id, db=db)
+        self.invalidate_user_organisations(user.id)
+
+
+    def bulk_add_users_to_organisation(
+        self,
+        db: Session,
+        org_id: str,
+        schema: BulkAddOrganisationMembers,
+    ):
+        """Adds many users to an organisation with their roles; the route
+        checks the caller's permission.
+
+        Users, roles and existing memberships (in both membership tables)
+        are validated with one query each, then every accepted row is
+        written with a single multi-row `INSERT ... ON CONFLICT` per
+        membership table in one transaction. Existing members who have no
+        role yet get the requested role; members who already hold a
+        different role, in either table, are left untouched.
+
+        `user_organisation` is still read for member listings and admin
+        checks, so new members get a row there too, with the role when it
+        is one it knows, `user` otherwise. Existing rows are never changed.
+        """
+
+        check_model_existence(db, Organisation, org_id)
+
+        members = schema.members
+        user_ids = {member.user_id for member in members if member.user_id}
+        emails = {member.email for member in members if member.email}
+        role_names = {member.role for member in members}
+
+        users = db.execute(
+            select(User.id, User.email).where(
+                or_(User.id.in_(user_ids), User.email.in_(emails)),
+                User.is_deleted.is_not(True),
+            )
+        ).all()
+        known_ids = {user_id for user_id, _ in users}
+        ids_by_email = {email: user_id for user_id, email in users}
+
+        role_ids = dict(
+            db.execute(select(Role.name, Role.id).where(Role.name.in_(role_names))).all()
+        )
+
+        current_roles = dict(
+            db.execute(
+                select(user_organisation_roles.c.user_id, user_organisation_roles.c.role_id).where(
+                    user_organisation_roles.c.organisation_id == org_id,
+                    user_organisation_roles.c.user_id.in_(known_ids),
+                )
+            ).all()
+        )
+        legacy_roles = dict(
+            db.execute(
+                select(
+                    user_organisation_association.c.user_id, user_organisation_association.c.role
+                ).where(
+                    user_organisation_association.c.organisation_id == org_id,
+                    user_organisation_association.c.user_id.in_(known_ids),
+                )
+            ).all()
+        )
+
+        results = []
+        rows = []
+        legacy_rows = []
+        seen = set()
+        for index, member in enumerate(members):
+            user_id = member.user_id if member.user_id in known_ids else ids_by_email.get(member.email)
+            role_id = role_ids.get(member.role)
+
+            if user_id is None:
+                outcome = "user_not_found"
+            elif role_id is None:
+                outcome = "role_not_found"
+            elif user_id in seen:
+                outcome = "duplicate"
+            elif user_id not in current_roles:
+                if user_id not in legacy_roles:
+                    outcome = "added"
+                elif legacy_roles[user_id] == member.role:
+                    outcome = "already_member"
+                else:
+                    outcome = "role_conflict"
+            elif current_roles[user_id] is None:
+                outcome = "role_assigned"
+            elif current_roles[user_id] == role_id:
+                outcome = "already_member"
+            else:
+                outcome = "role_conflict"
+
+            if outcome in ("added", "role_assigned"):
+                rows.append({
+                    "user_id": user_id,
+                    "organisation_id": org_id,
+                    "role_id": role_id,
+                    "status": "active",
+                })
+                legacy_rows.append({
+                    "user_id": user_id,
+                    "organisation_id": org_id,
+                    "role": member.role if member.role in LEGACY_ROLES else "user",
+                    "status": "member",
+                })
+            if user_id is not None:
+                seen.add(user_id)
+
+            results.append(BulkMemberResult(
+                index=index,
+                user_id=user_id,
+                email=member.email,
+                role=member.role,
+                outcome=outcome,
+            ))
+
+        if rows:
+            stmt = dialect_insert(db)(user_organisation_roles).values(rows)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[
+                    user_organisation_roles.c.user_id,
+                    user_organisation_roles.c.organisation_id,
+                ],
+                set_={"role_id": stmt.excluded.role_id},
+                where=user_organisation_roles.c.role_id.is_(None),
+            )
+            legacy_stmt = dialect_insert(db)(user_organisation_association).values(legacy_rows)
+            legacy_stmt = legacy_stmt.on_conflict_do_nothing(
+                index_elements=[
+                    user_organisation_association.c.user_id,
+                    user_organisation_association.c.organisation_id,
+                ],
+            )
+
+            try:
+                db.execute(stmt)
+                db.execute(legacy_stmt)
+                permission_resolver.bump(db)
+                membership_service.bump(db)
+                db.commit()
+            except Exception as e:
+                db.rollback()
+                logging.error(f"Bulk membership insert failed for organisation {org_id}: {e}")
+                raise HTTPException(
+                    status_code=500, detail="An error occurred while adding users to the organisation"
+                )
+
+            for row in rows:
+                membership_service.invalidate(row["user_id"], org_id, db=db)
+                permission_resolver.invalidate_user(row["user_id"], org_id)
+                self.invalidate_user_organisations(row["user_id"])
+
+        return {
+            "organisation_id": org_id,
+            "summary": dict(Counter(result.outcome for result in results)),
+            "results": results,
+        }
+
 
     # # def remove_user_from_organisation(self, db: Session, org_id: str, user_id: str):
     def remove_user_from_organisation(self, schema: RemoveUserFromOrganisation, db: Session):
@@ -243,7 +436,7 @@ class OrganisationService(Service):
         organisation = check_model_existence(db, Organisation, schema.org_id)
 
         # Check if user is not in organisation
-        check_user_in_org(user, organisation)
+        check_user_in_org(db, user, organisation)
 
         # Check for user role permissions
         self.check_user_role_in_org(db=db, user=user, org=organisation, role='admin')\
@@ -256,8 +449,12 @@ class OrganisationService(Service):
         )
 
         db.execute(stmt)
+        membership_service.bump(db)
         db.commit()
 
+        membership_service.invalidate(user.id, organisation.id, db=db)
+        self.invalidate_user_organisations(user.id)
+
 
     def get_users_in_organisation(self, db: Session, org_id: str):
         '''Fetches all users in an organisation'''
@@ -353,56 +550,91 @@ class OrganisationService(Service):
     def retrieve_user_organizations(self, user: User,
                                     db: Annotated[Session, Depends(get_db)]):
         """
-        Retrieves all organizations a user belongs to.
-       
+        Retrieves all organizations a user belongs to, each with the user's
+        roles in it, using a single query. Results are cached per user with
+        the versions of memberships, roles and organisations they were read
+        at, so a change committed by any worker invalidates them.
+
         Args:
             user: the user to retrieve the organizations
         """
-        builtin_roles = ['user', 'admin', 'manager', 'guest']
+        user_id = str(user.id)
+        version = tuple(
+            cache_version_service.get(db, name)
+            for name in (MEMBERSHIPS, PERMISSIONS, ORGANISATIONS)
+        )
 
-        user_organisations = db.query(Organisation).join(
-            user_organisation_association,
-            Organisation.id == user_organisation_association.c.organisation_id
-        ).filter(
-            user_organisation_association.c.user_id == user.id
+        with self._user_organisations_lock:
+            cached = self._user_organisations.get(user_id)
+        if cached is not None and cached[0] == version:
+            return list(cached[1])
+
+        member_orgs = union(
+            select(user_organisation_association.c.organisation_id).where(
+                user_organisation_association.c.user_id == user_id
+            ),
+            select(user_organisation_roles.c.organisation_id).where(
+                user_organisation_roles.c.user_id == user_id
+            ),
+        ).subquery()
+
+        # (user_id, organisation_id) is the primary key of both association
+        # tables, so the joins below yield exactly one row per organisation
+        rows = db.execute(
+            select(Organisation, user_organisation_association.c.role, Role.name)
+            .join(member_orgs, member_orgs.c.organisation_id == Organisation.id)
+            .outerjoin(
+                user_organisation_association,
+                and_(
+                    user_organisation_association.c.organisation_id == Organisation.id,
+                    user_organisation_association.c.user_id == user_id,
+                ),
+            )
+            .outerjoin(
+                user_organisation_roles,
+                and_(
+                    user_organisation_roles.c.organisation_id == Organisation.id,
+                    user_organisation_roles.c.user_id == user_id,
+                ),
+            )
+            .outerjoin(Role, Role.id == user_organisation_roles.c.role_id)
+            .order_by(Organisation.created_at, Organisation.id)
         ).all()
-       
-        if user_organisations:
-            organisation_roles = db.query(
-                Role
-                ).outerjoin(
-                    user_organisation_roles,
-                    Role.id == user_organisation_roles.c.role_id,
-                ).filter(
-                    or_(
-                        and_(
-                            user_organisation_roles.c.user_id == user.id,
-                            Role.is_builtin == False
-                        ),
-                        Role.is_builtin == True
-                    )
-                ).all()
-
-            if len(organisation_roles) < 1:
-                organisation_roles = builtin_roles
-            else:
-                organisation_roles = [role.name for role in organisation_roles if role]
 
-            return [OrganisationData(
+        user_organisations = []
+        for org, membership_role, role_name in rows:
+            user_role = [
+                role for role in dict.fromkeys([membership_role, role_name]) if role
+            ]
+            user_organisations.append(OrganisationData(
                 id=org.id,
                 created_at=org.created_at,
                 updated_at=org.updated_at,
                 name=org.name,
                 email=org.email,
                 industry=org.industry,
-                user_role=organisation_roles,
+                user_role=user_role,
                 type=org.type,
                 country=org.country,
                 state=org.state,
                 address=org.address,
                 description=org.description,
                 organisation_id=org.id
-            ) for org in user_organisations]
+            ))
+
+        with self._user_organisations_lock:
+            self._user_organisations[user_id] = (version, tuple(user_organisations))
+
+        return user_organisations
+
+    def invalidate_user_organisations(self, user_id: Optional[str] = None):
+        """Drops the cached organisations of a user, or of every user"""
+
+        with self._user_organisations_lock:
+            if user_id is None:
+                self._user_organisations.clear()
+            else:
+                self._user_organisations.pop(str(user_id), None)
 
 
 organisation_service = OrganisationService()
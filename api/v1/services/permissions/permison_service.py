@@ -9,6 +9,7 @@ from fastapi import HTTPException,status
 from sqlalchemy.exc import IntegrityError
 from fastapi.responses import JSONResponse
 from sqlalchemy import delete
+from api.v1.services.permissions.permission_resolver import permission_resolver
 
 class PermissionService:
     @staticmethod
@@ -50,7 +51,9 @@ class PermissionService:
             # Assign the permission to the role
             stmt = role_permissions.insert().values(role_id=role_id, permission_id=permission_id)
             db.execute(stmt)
+            permission_resolver.bump(db)
             db.commit()
+            permission_resolver.invalidate_roles()
             
             response = success_response(200, "Permission assigned successfully")
             return response
@@ -69,7 +72,9 @@ class PermissionService:
             try:
                 db.execute(delete(role_permissions).where(role_permissions.c.permission_id == permission_id))
                 db.delete(permission)
+                permission_resolver.bump(db)
                 db.commit()
+                permission_resolver.invalidate_roles()
                 return {}
             except IntegrityError as e :
                db.rollback()
@@ -96,7 +101,9 @@ class PermissionService:
 
             # Assign the new permission to the role
             db.execute(role_permissions.insert().values(role_id=role_id, permission_id=new_permission_id))
+            permission_resolver.bump(db)
             db.commit()
+            permission_resolver.invalidate_roles()
             return {"success": True, "message": "Permission updated successfully"}
 
         except IntegrityError as e:
@@ -0,0 +1,217 @@
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Dict, FrozenSet, Optional, Tuple
+
+from cachetools import TTLCache
+from fastapi import Depends, HTTPException, Path, status
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from api.db.database import get_db
+from api.utils.settings import settings
+from api.v1.models.permissions.permissions import Permission
+from api.v1.models.permissions.role_permissions import role_permissions
+from api.v1.models.permissions.user_org_role import user_organisation_roles
+from api.v1.models.user import User
+from api.v1.services.cache_version import PERMISSIONS, cache_version_service
+from api.v1.services.user import user_service
+
+
+@dataclass(frozen=True)
+class CompiledPermissions:
+    """Role -> permission mapping compiled to bitmasks"""
+
+    version: Tuple[int, Any]
+    bits: Dict[str, int] = field(default_factory=dict)
+    role_masks: Dict[str, int] = field(default_factory=dict)
+
+    def mask_for(self, titles) -> int:
+        """Returns the bitmask of the given permission titles"""
+
+        mask = 0
+        for title in titles:
+            mask |= self.bits.get(title, 0)
+        return mask
+
+    def titles_for(self, mask: int) -> FrozenSet[str]:
+        """Expands a bitmask back into permission titles"""
+
+        return frozenset(title for title, bit in self.bits.items() if mask & bit)
+
+
+class PermissionResolver:
+    """Resolves "can user U do P in organisation O" at request time
+
+    The role -> permission table is compiled once into bitmasks and reused
+    until a role or permission change bumps the version. Effective masks
+    per (user, organisation) are cached with the version they were built
+    from, so a cache hit costs only the version lookup, one query per
+    transaction shared with the other caches.
+
+    The version pairs a local counter, bumped by the `invalidate_*`
+    methods, with the database version of PERMISSIONS. Whoever changes
+    roles, permissions or role assignments calls `bump(db)` before
+    committing, so every worker stops using its cached answers as soon as
+    the change is committed.
+    """
+
+    def __init__(self, ttl: int = settings.PERMISSION_CACHE_TTL, maxsize: int = 100_000):
+        self._lock = threading.Lock()
+        self._version = 0
+        self._compiled: Optional[CompiledPermissions] = None
+        self._effective: TTLCache = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    @property
+    def version(self) -> int:
+        return self._version
+
+    @staticmethod
+    def bump(db: Session):
+        """Invalidates the cached permissions of every worker once the
+        current transaction commits"""
+
+        cache_version_service.bump(db, PERMISSIONS)
+
+    def _compile(self, db: Session, version: Tuple[int, Any]) -> CompiledPermissions:
+        """Loads every role -> permission pair and builds the bitmasks"""
+
+        rows = db.execute(
+            select(role_permissions.c.role_id, Permission.title)
+            .join(Permission, Permission.id == role_permissions.c.permission_id)
+        ).all()
+
+        bits: Dict[str, int] = {}
+        role_masks: Dict[str, int] = {}
+        for role_id, title in rows:
+            bit = bits.setdefault(title, 1 << len(bits))
+            role_masks[role_id] = role_masks.get(role_id, 0) | bit
+
+        compiled = CompiledPermissions(version=version, bits=bits, role_masks=role_masks)
+
+        with self._lock:
+            # Keep the result only if no invalidation happened meanwhile
+            if self._version == version[0]:
+                self._compiled = compiled
+
+        return compiled
+
+    def compiled(self, db: Session) -> CompiledPermissions:
+        """Returns the current compiled mapping, compiling it if stale"""
+
+        with self._lock:
+            local_version = self._version
+        version = (local_version, cache_version_service.get(db, PERMISSIONS))
+
+        compiled = self._compiled
+        if compiled is None or compiled.version != version:
+            compiled = self._compile(db, version)
+        return compiled
+
+    def _user_mask(self, db: Session, compiled: CompiledPermissions, user_id: str, org_id: str) -> int:
+        """Combines the masks of every role the user holds in the organisation"""
+
+        role_ids = db.execute(
+            select(user_organisation_roles.c.role_id).where(
+                user_organisation_roles.c.user_id == user_id,
+                user_organisation_roles.c.organisation_id == org_id,
+                user_organisation_roles.c.role_id.is_not(None),
+            )
+        ).scalars()
+
+        mask = 0
+        for role_id in role_ids:
+            mask |= compiled.role_masks.get(role_id, 0)
+        return mask
+
+    def _effective_mask(self, db: Session, user_id: str, org_id: str) -> Tuple[CompiledPermissions, int]:
+        compiled = self.compiled(db)
+        key = (str(user_id), str(org_id))
+
+        with self._lock:
+            cached = self._effective.get(key)
+
+        if cached is not None and cached[0] == compiled.version:
+            return compiled, cached[1]
+
+        mask = self._user_mask(db, compiled, *key)
+        with self._lock:
+            self._effective[key] = (compiled.version, mask)
+
+        return compiled, mask
+
+    def get_permissions(self, db: Session, user_id: str, org_id: str) -> FrozenSet[str]:
+        """Returns the titles of every permission the user has in the organisation"""
+
+        compiled, mask = self._effective_mask(db, user_id, org_id)
+        return compiled.titles_for(mask)
+
+    def has_permission(self, db: Session, user_id: str, org_id: str, *titles: str) -> bool:
+        """Checks if the user has all of the given permissions in the organisation"""
+
+        compiled, mask = self._effective_mask(db, user_id, org_id)
+
+        titles = set(titles)
+        required = compiled.mask_for(titles)
+        if len(titles) != bin(required).count("1"):
+            # At least one permission is not granted to any role
+            return False
+
+        return mask & required == required
+
+    def invalidate_roles(self):
+        """Marks the compiled role -> permission mapping as stale"""
+
+        with self._lock:
+            self._version += 1
+            self._compiled = None
+
+    def invalidate_user(self, user_id: str, org_id: Optional[str] = None):
+        """Drops the cached effective permissions of a user"""
+
+        user_id = str(user_id)
+
+        with self._lock:
+            if org_id is not None:
+                self._effective.pop((user_id, str(org_id)), None)
+            else:
+                for key in [key for key in self._effective.keys() if key[0] == user_id]:
+                    self._effective.pop(key, None)
+
+    def clear(self):
+        """Drops every cached answer and the compiled mapping"""
+
+        with self._lock:
+            self._version += 1
+            self._compiled = None
+            self._effective.clear()
+
+
+permission_resolver = PermissionResolver()
+
+
+def require_permission(*titles: str):
+    """Route dependency that requires the current user to hold every
+    given permission in the organisation identified by the `org_id`
+    path parameter. Super admins are always allowed.
+
+    Usage:
+        @router.put("/{org_id}", dependencies=[Depends(require_permission("manage_organisation"))])
+    """
+
+    def permission_dependency(
+        org_id: str = Path(..., description="The ID of the organisation"),
+        db: Session = Depends(get_db),
+        current_user: User = Depends(user_service.get_current_user),
+    ) -> User:
+        if current_user.is_superadmin:
+            return current_user
+
+        if not permission_resolver.has_permission(db, current_user.id, org_id, *titles):
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="You do not have permission to perform this action",
+            )
+
+        return current_user
+
+    return permission_dependency
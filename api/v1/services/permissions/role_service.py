@@ -12,6 +12,8 @@ from sqlalchemy.exc import IntegrityError
 from sqlalchemy import update, insert
 from api.utils.db_validators import check_model_existence
 from api.v1.services.organisation import organisation_service as org_service
+from api.v1.services.membership import membership_service
+from api.v1.services.permissions.permission_resolver import permission_resolver
 
 
 class RoleService:
@@ -63,7 +65,10 @@ class RoleService:
             ).values(role_id=role_id)
             
             db.execute(stmt)
+            permission_resolver.bump(db)
             db.commit()
+            permission_resolver.invalidate_user(user_id, org_id)
+            org_service.invalidate_user_organisations(user_id)
 
             return success_response(200, "Role assigned to user successfully")
         except Exception as e:
@@ -78,7 +83,10 @@ class RoleService:
             raise HTTPException(status_code=404, detail="Role not found")
 
         db.delete(role)
+        permission_resolver.bump(db)
         db.commit()
+        permission_resolver.invalidate_roles()
+        org_service.invalidate_user_organisations()
         return RoleDeleteResponse(id=role_id, message="Role successfully deleted")
     
     
@@ -130,7 +138,13 @@ class RoleService:
                 user_organisation_roles.c.organisation_id == org_id,
                 user_organisation_roles.c.role_id == role.id,
             ))
+            permission_resolver.bump(db)
+            membership_service.bump(db)
             db.commit()
+
+            membership_service.invalidate(user_id, org_id, db=db)
+            permission_resolver.invalidate_user(user_id, org_id)
+            org_service.invalidate_user_organisations(user_id)
             
     
     @staticmethod
@@ -143,8 +157,10 @@ class RoleService:
             raise HTTPException(status_code=400, detail="Cannot change role type (builtin/custom)")
 
         role.name = role_update.name
+        org_service.bump(db)
         db.commit()
         db.refresh(role)
+        org_service.invalidate_user_organisations()
         
         response = success_response(200, f'Role {role.name} updated successfully', role)
         return response
@@ -160,8 +176,10 @@ class RoleService:
             raise HTTPException(status_code=400, detail="Role is not a built-in role")
 
         role.name = role_update.name
+        org_service.bump(db)
         db.commit()
         db.refresh(role)
+        org_service.invalidate_user_organisations()
         
         response = success_response(200, f'Built-in role {role.name} updated successfully', role)
         return response
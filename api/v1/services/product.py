@@ -6,6 +6,7 @@ from fastapi import HTTPException, status
 
 
 from api.core.base.services import Service
+from api.core.reference_cache import ReferenceCache
 from api.utils.db_validators import check_model_existence
 from api.v1.models.product import (
     Product,
@@ -15,7 +16,7 @@ from api.v1.models.product import (
 )
 from api.v1.models.user import User
 from api.v1.models import Organisation
-from api.v1.schemas.product import ProductCategoryCreate, ProductCreate
+from api.v1.schemas.product import ProductCategoryCreate, ProductCategoryRetrieve, ProductCreate
 from api.utils.db_validators import check_user_in_org
 from api.v1.schemas.product import ProductFilterResponse
 
@@ -36,7 +37,7 @@ class ProductService(Service):
 
     #     organisation = check_model_existence(db, Organisation, org_id)
 
-    #     check_user_in_org(user=current_user, organisation=organisation)
+    #     check_user_in_org(db=db, user=current_user, organisation=organisation)
 
     def create(
         self, db: Session, schema: ProductCreate, org_id: str, current_user: User
@@ -47,7 +48,7 @@ class ProductService(Service):
 
         organisation = check_model_existence(db, Organisation, org_id)
 
-        check_user_in_org(user=current_user, organisation=organisation)
+        check_user_in_org(db=db, user=current_user, organisation=organisation)
 
         # check if user inputted a valid category
 
@@ -90,7 +91,7 @@ class ProductService(Service):
 
         organisation = check_model_existence(db, Organisation, org_id)
 
-        check_user_in_org(user=current_user, organisation=organisation)
+        check_user_in_org(db=db, user=current_user, organisation=organisation)
 
         product = check_model_existence(db, Product, product_id)
         return product
@@ -152,7 +153,7 @@ class ProductService(Service):
         organisation = check_model_existence(db, Organisation, org_id)
 
         # Check if the user exist in the organisation
-        check_user_in_org(user=user, organisation=organisation)
+        check_user_in_org(db=db, user=user, organisation=organisation)
 
         # calculating offset value from page and limit given
         offset_value = (page - 1) * limit
@@ -244,6 +245,9 @@ class ProductService(Service):
         return products
 
 
+product_categories_cache = ReferenceCache("product_categories")
+
+
 class ProductCategoryService(Service):
     """Product categories service functionality"""
 
@@ -256,8 +260,10 @@ class ProductCategoryService(Service):
         try:
             new_category = ProductCategory(**schema.model_dump())
             db.add(new_category)
+            product_categories_cache.bump(db)
             db.commit()
             db.refresh(new_category)
+            product_categories_cache.invalidate()
         except sqlalchemy.exc.IntegrityError:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
@@ -282,5 +288,18 @@ class ProductCategoryService(Service):
 
         return query.all()
 
+    @staticmethod
+    def fetch_all_cached(db: Session):
+        """Fetch all product categories, from the reference data cache"""
+
+        return product_categories_cache.get(
+            db,
+            "all",
+            lambda: [
+                ProductCategoryRetrieve.model_validate(category)
+                for category in ProductCategoryService.fetch_all(db)
+            ],
+        )
+
 
 product_service = ProductService()
@@ -4,7 +4,7 @@ from datetime import datetime, timedelta, timezone
 from jose import jwt, JWTError
 from typing import Annotated
 from sqlalchemy.orm import Session
-from fastapi import HTTPException, BackgroundTasks, Depends, status
+from fastapi import HTTPException, Depends, status
 from api.core.base.services import Service
 from api.utils.db_validators import check_model_existence
 from api.v1.models import Profile, User
@@ -15,9 +15,9 @@ from api.v1.schemas.profile import (
     ProfileRecoveryEmailResponse,
     Token,
 )
-from api.core.dependencies.email_sender import send_email
 from api.utils.settings import settings
 from api.db.database import get_db
+from api.v1.services.email_outbox import email_outbox_service
 
 
 class ProfileService(Service):
@@ -71,7 +71,6 @@ class ProfileService(Service):
         db: Annotated[Session, Depends(get_db)],
         schema: ProfileCreateUpdate,
         user: User,
-        background_tasks: BackgroundTasks,
     ) -> Profile:
         """
         Updates a user's profile data.
@@ -85,7 +84,7 @@ class ProfileService(Service):
         for field, value in schema.model_dump().items():
             if value is not None:
                 if field == "recovery_email":
-                    self.send_token_to_user_email(value, user, background_tasks)
+                    self.send_token_to_user_email(value, user, db)
                     message = "Profile updated successfully. Access your email to verify recovery_email"
                     continue
                 setattr(profile, field, value)
@@ -99,15 +98,16 @@ class ProfileService(Service):
         )
 
     def send_token_to_user_email(
-        self, recovery_email: str, user: User, background_tasks: BackgroundTasks
+        self, recovery_email: str, user: User, db: Session
     ):
         """
-        Mails the token for recovery email to the user.
+        Queues the token for recovery email to the user, the email is
+        sent once the caller commits.
 
         Args:
             user: the user object.
             recovery_email: the new recovery_email from the user.
-            background_tasks: the background_task object.
+            db: database session the email is queued in.
         Return:
             response: feedback to the user.
         """
@@ -116,9 +116,8 @@ class ProfileService(Service):
             f"{settings.ANCHOR_PYTHON_BASE_URL}/dashboard/admin/settings?token={token}"
         )
 
-        # Send email in the background
-        background_tasks.add_task(
-            send_email,
+        email_outbox_service.enqueue(
+            db,
             recipient=user.email,
             template_name="profile_recovery_email.html",
             subject="Recovery Email Change",
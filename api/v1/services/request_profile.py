@@ -0,0 +1,49 @@
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List
+
+from sqlalchemy.orm import Session, sessionmaker
+
+from api.db.database import SessionLocal
+from api.utils.db_validators import check_model_existence
+from api.utils.settings import settings
+from api.v1.models.request_profile import RequestProfile
+from api.v1.services.maintenance import MaintenanceService
+
+
+class RequestProfileService:
+    """Stores and serves the profiles taken by `ProfilingMiddleware`"""
+
+    def __init__(self, session_factory: sessionmaker = SessionLocal):
+        self.session_factory = session_factory
+
+    def save(self, profile: Dict[str, Any]) -> RequestProfile:
+        with self.session_factory() as db:
+            request_profile = RequestProfile(**profile)
+            db.add(request_profile)
+            db.commit()
+            return request_profile
+
+    @staticmethod
+    def fetch_all(db: Session, path: str = None, limit: int = 50) -> List[RequestProfile]:
+        """The latest profiles, of the requests to `path` if given"""
+
+        query = db.query(RequestProfile)
+        if path:
+            query = query.filter(RequestProfile.path == path)
+        return query.order_by(RequestProfile.created_at.desc(), RequestProfile.id.desc()).limit(limit).all()
+
+    @staticmethod
+    def fetch(db: Session, profile_id: str) -> RequestProfile:
+        return check_model_existence(db, RequestProfile, profile_id)
+
+    @staticmethod
+    def purge(db: Session) -> int:
+        return MaintenanceService.delete_in_batches(
+            db,
+            RequestProfile,
+            RequestProfile.created_at
+            < datetime.now(timezone.utc) - timedelta(days=settings.PROFILING_RETENTION_DAYS),
+        )
+
+
+request_profile_service = RequestProfileService()
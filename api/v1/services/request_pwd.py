@@ -1,4 +1,4 @@
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 from fastapi import Depends, status, HTTPException
 from sqlalchemy.orm import Session
 from fastapi import HTTPException, Depends, status
@@ -18,6 +18,7 @@ from api.v1.services.user import user_service
 
 SECRET_KEY = settings.SECRET_KEY
 ALGORITHM = settings.ALGORITHM
+RESET_TOKEN_EXPIRY = timedelta(minutes=5)
 
 
 class RequestPasswordService(Service):
@@ -49,6 +50,9 @@ class RequestPasswordService(Service):
         """
         check_reset_token = db.query(ResetPasswordToken).filter_by(user_id=user.id).one_or_none()
         if check_reset_token:
+            # keeps the entry from being swept while the new token is valid
+            check_reset_token.updated_at = datetime.now(timezone.utc)
+            db.commit()
             return self.generate_password_reset_token(user)
         reset_token = ResetPasswordToken(
             user_id=user.id,
@@ -68,7 +72,7 @@ class RequestPasswordService(Service):
             password_reset_token: password reset token
         """
         now = datetime.utcnow()
-        expire = now + timedelta(minutes=5)
+        expire = now + RESET_TOKEN_EXPIRY
         payload = {"email": user.email, "jti": user.id,
                    "iat": now, "exp": expire}
         return jwt.encode(claims=payload, key=SECRET_KEY, algorithm=ALGORITHM)
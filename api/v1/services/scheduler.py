@@ -0,0 +1,257 @@
+""" Periodic job scheduler
+
+Maintenance work runs on cron-style schedules. Every app instance runs a
+scheduler, but only the leader (the holder of a Postgres advisory lock)
+queues the due runs as background jobs; if its connection dies the lock
+is released and another instance takes over. Each run is queued with an
+idempotency key of its schedule and time, so a run is never queued twice
+even while leadership changes hands.
+
+    scheduler.add("*/10 * * * *", purge_expired_login_tokens)
+"""
+import asyncio
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Set
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection, Engine
+
+from api.db.database import engine as default_engine
+from api.utils.logger import logger
+from api.utils.settings import settings
+from api.v1.services.job_queue import Task, job_queue
+
+
+class CronSchedule:
+    """A five field cron expression: minute hour day-of-month month
+    day-of-week (0 is Sunday), supporting `*`, lists, ranges and steps.
+    Times are UTC."""
+
+    FIELDS = ((0, 59), (0, 23), (1, 31), (1, 12), (0, 6))
+
+    def __init__(self, expression: str):
+        parts = expression.split()
+        if len(parts) != 5:
+            raise ValueError(f"Invalid cron expression {expression!r}")
+
+        self.expression = expression
+        self.minutes, self.hours, self.days, self.months, self.weekdays = (
+            self._parse(part, low, high) for part, (low, high) in zip(parts, self.FIELDS)
+        )
+        self._any_day = parts[2] == "*"
+        self._any_weekday = parts[4] == "*"
+
+    @staticmethod
+    def _parse(field: str, low: int, high: int) -> Set[int]:
+        values = set()
+        for part in field.split(","):
+            bounds, _, step = part.partition("/")
+            if bounds == "*":
+                start, end = low, high
+            elif "-" in bounds:
+                start, end = (int(bound) for bound in bounds.split("-"))
+            else:
+                start = int(bounds)
+                end = high if step else start
+
+            step = int(step) if step else 1
+            if not low <= start <= end <= high or step < 1:
+                raise ValueError(f"Invalid cron field {field!r}")
+            values.update(range(start, end + 1, step))
+        return values
+
+    def _day_matches(self, moment: datetime) -> bool:
+        weekday = (moment.weekday() + 1) % 7
+        if self._any_day:
+            return weekday in self.weekdays
+        if self._any_weekday:
+            return moment.day in self.days
+        # like cron, a restricted day of month and day of week match either
+        return moment.day in self.days or weekday in self.weekdays
+
+    def next_after(self, moment: datetime) -> datetime:
+        """Returns the first matching minute after `moment`"""
+
+        candidate = moment.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limit = candidate + timedelta(days=366 * 4)
+
+        while candidate < limit:
+            if candidate.month not in self.months:
+                candidate = (
+                    candidate.replace(day=1, hour=0, minute=0) + timedelta(days=32)
+                ).replace(day=1)
+            elif not self._day_matches(candidate):
+                candidate = candidate.replace(hour=0, minute=0) + timedelta(days=1)
+            elif candidate.hour not in self.hours:
+                candidate = candidate.replace(minute=0) + timedelta(hours=1)
+            elif candidate.minute not in self.minutes:
+                candidate += timedelta(minutes=1)
+            else:
+                return candidate
+
+        raise ValueError(f"Cron expression {self.expression!r} never matches")
+
+
+class AdvisoryLockLeader:
+    """Leadership held through a Postgres session advisory lock.
+
+    The lock lives as long as the connection that took it, so a crashed
+    leader loses it as soon as the server notices. Other databases have
+    no advisory locks; every instance leads there, which the idempotent
+    job keys make safe for single-node setups.
+    """
+
+    def __init__(self, engine: Engine, key: int):
+        self.engine = engine
+        self.key = key
+        self._connection: Optional[Connection] = None
+
+    @property
+    def supported(self) -> bool:
+        return self.engine.dialect.name == "postgresql"
+
+    def acquire(self) -> bool:
+        """Takes or confirms leadership without waiting; blocking I/O"""
+
+        if not self.supported:
+            return True
+
+        if self._connection is not None:
+            try:
+                self._connection.execute(text("SELECT 1"))
+                self._connection.commit()
+                return True
+            except Exception as exc:
+                logger.error(f"Scheduler lost its leader connection: {exc}")
+                self._connection.invalidate()
+                self._connection = None
+
+        connection = self.engine.connect()
+        try:
+            acquired = connection.execute(
+                text("SELECT pg_try_advisory_lock(:key)"), {"key": self.key}
+            ).scalar()
+            connection.commit()
+        except Exception:
+            connection.close()
+            raise
+
+        if not acquired:
+            connection.close()
+            return False
+
+        logger.info("This instance is now the scheduler leader")
+        self._connection = connection
+        return True
+
+    def release(self):
+        if self._connection is None:
+            return
+        try:
+            self._connection.execute(
+                text("SELECT pg_advisory_unlock(:key)"), {"key": self.key}
+            )
+            self._connection.commit()
+        finally:
+            self._connection.close()
+            self._connection = None
+
+
+@dataclass
+class ScheduledJob:
+    name: str
+    schedule: CronSchedule
+    task: Task
+    payload: Dict[str, Any] = field(default_factory=dict)
+    next_run: Optional[datetime] = None
+
+
+class Scheduler:
+    """Queues registered tasks as background jobs on their schedules"""
+
+    def __init__(
+        self,
+        leader: Optional[AdvisoryLockLeader] = None,
+        tick_seconds: float = settings.SCHEDULER_TICK_SECONDS,
+    ):
+        self.leader = leader or AdvisoryLockLeader(
+            default_engine, settings.SCHEDULER_LOCK_KEY
+        )
+        self.tick_seconds = tick_seconds
+        self.jobs: List[ScheduledJob] = []
+        self._task: Optional[asyncio.Task] = None
+        self._stopping: Optional[asyncio.Event] = None
+
+    def add(self, cron: str, task: Task, name: Optional[str] = None, **payload) -> ScheduledJob:
+        """Schedules `task`, called with `payload`; a task scheduled more
+        than once needs a distinct `name` per schedule"""
+
+        job = ScheduledJob(
+            name=name or task.name, schedule=CronSchedule(cron), task=task, payload=payload
+        )
+        self.jobs.append(job)
+        return job
+
+    def tick(self, now: Optional[datetime] = None) -> List[str]:
+        """Queues the runs that fell due, when leading; blocking I/O.
+
+        Returns the idempotency keys of the runs queued.
+        """
+
+        now = now or datetime.now(timezone.utc)
+        due = []
+        for job in self.jobs:
+            if job.next_run is None:
+                job.next_run = job.schedule.next_after(now)
+            if job.next_run <= now:
+                due.append((job, job.next_run))
+                # runs missed while the app was down are not caught up
+                job.next_run = job.schedule.next_after(now)
+
+        if not due or not self.leader.acquire():
+            return []
+
+        queued = []
+        for job, run_at in due:
+            key = f"schedule:{job.name}:{run_at.isoformat()}"
+            try:
+                job.task.enqueue_now(idempotency_key=key, **job.payload)
+                queued.append(key)
+            except Exception as exc:
+                logger.error(f"Could not queue scheduled job {job.name}: {exc}")
+        return queued
+
+    async def run(self):
+        if self._stopping is None:
+            self._stopping = asyncio.Event()
+
+        while not self._stopping.is_set():
+            try:
+                await asyncio.to_thread(self.tick)
+            except Exception as exc:
+                logger.error(f"Scheduler tick failed: {exc}")
+
+            try:
+                await asyncio.wait_for(self._stopping.wait(), timeout=self.tick_seconds)
+            except asyncio.TimeoutError:
+                pass
+
+        await asyncio.to_thread(self.leader.release)
+
+    def start(self):
+        """Starts the scheduler as a task of the running event loop"""
+
+        job_queue.load_tasks()
+        self._stopping = asyncio.Event()
+        self._task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._stopping.set()
+        await self._task
+        self._task = self._stopping = None
+
+
+scheduler = Scheduler()
@@ -0,0 +1,148 @@
+""" Smoke tests
+
+A set of quick, side-effect free requests that check the API is serving.
+They run as a background job, through the app itself over an in-process
+ASGI transport (or against SMOKE_TEST_BASE_URL), several at a time, and
+report each case's outcome and timing. The full pytest suite can also be
+run as a job, in a subprocess.
+"""
+import asyncio
+import sys
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional
+
+import httpx
+
+from api.utils.settings import settings
+
+
+@dataclass
+class SmokeCase:
+    name: str
+    method: str
+    path: str
+    expected_status: int
+    json: Optional[Dict[str, Any]] = None
+    # further checks on the response; raise AssertionError to fail
+    check: Optional[Callable[[httpx.Response], None]] = None
+
+
+def has_data(response: httpx.Response):
+    assert "data" in response.json(), "response has no data"
+
+
+SMOKE_CASES = [
+    SmokeCase("home", "GET", "/", 200, check=has_data),
+    SmokeCase("probe", "GET", "/probe", 200),
+    SmokeCase("api status", "GET", "/api/v1/api-status", 200, check=has_data),
+    SmokeCase("faqs", "GET", "/api/v1/faqs", 200, check=has_data),
+    SmokeCase("blogs", "GET", "/api/v1/blogs/", 200),
+    SmokeCase("jobs", "GET", "/api/v1/jobs", 200),
+    SmokeCase("users require auth", "GET", "/api/v1/users", 401),
+    SmokeCase("user organisations require auth", "GET", "/api/v1/users/organisations", 401),
+    SmokeCase(
+        "waitlist rejects invalid email",
+        "POST",
+        "/api/v1/waitlist/",
+        422,
+        json={"email": "not-an-email", "full_name": "Smoke Test"},
+    ),
+]
+
+
+class SmokeTestRunner:
+    def __init__(
+        self,
+        cases: Optional[List[SmokeCase]] = None,
+        concurrency: int = settings.SMOKE_TEST_CONCURRENCY,
+    ):
+        self.cases = cases if cases is not None else SMOKE_CASES
+        self.concurrency = concurrency
+
+    @staticmethod
+    def client(app) -> httpx.AsyncClient:
+        if settings.SMOKE_TEST_BASE_URL:
+            return httpx.AsyncClient(
+                base_url=settings.SMOKE_TEST_BASE_URL, timeout=settings.SMOKE_TEST_TIMEOUT
+            )
+        return httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=app),
+            base_url="http://smoke-tests",
+            timeout=settings.SMOKE_TEST_TIMEOUT,
+        )
+
+    async def run_case(
+        self, client: httpx.AsyncClient, case: SmokeCase, slots: asyncio.Semaphore
+    ) -> Dict[str, Any]:
+        result = {
+            "name": case.name,
+            "request": f"{case.method} {case.path}",
+            "expected_status": case.expected_status,
+            "status_code": None,
+            "passed": False,
+            "error": None,
+        }
+
+        async with slots:
+            start = time.perf_counter()
+            try:
+                response = await client.request(case.method, case.path, json=case.json)
+                result["status_code"] = response.status_code
+                assert response.status_code == case.expected_status, (
+                    f"expected HTTP {case.expected_status}, got {response.status_code}"
+                )
+                if case.check:
+                    case.check(response)
+                result["passed"] = True
+            except Exception as exc:
+                result["error"] = str(exc) or type(exc).__name__
+            result["duration_ms"] = round((time.perf_counter() - start) * 1000, 2)
+
+        return result
+
+    async def run(self, app) -> Dict[str, Any]:
+        """Runs every case and returns the report"""
+
+        slots = asyncio.Semaphore(self.concurrency)
+        start = time.perf_counter()
+        async with self.client(app) as client:
+            results = await asyncio.gather(
+                *(self.run_case(client, case, slots) for case in self.cases)
+            )
+
+        passed = sum(result["passed"] for result in results)
+        return {
+            "total": len(results),
+            "passed": passed,
+            "failed": len(results) - passed,
+            "duration_ms": round((time.perf_counter() - start) * 1000, 2),
+            "cases": results,
+        }
+
+
+async def run_test_suite(timeout: float = settings.TEST_SUITE_TIMEOUT) -> Dict[str, Any]:
+    """Runs the pytest suite in a subprocess; the output is trimmed to its
+    last 100,000 characters"""
+
+    start = time.perf_counter()
+    process = await asyncio.create_subprocess_exec(
+        sys.executable, "-m", "pytest", "--maxfail=1", "--disable-warnings", "--tb=short",
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.STDOUT,
+    )
+    try:
+        output, _ = await asyncio.wait_for(process.communicate(), timeout=timeout)
+    except asyncio.TimeoutError:
+        process.kill()
+        output, _ = await process.communicate()
+        output += f"\nTest run timed out after {timeout:g}s".encode()
+
+    return {
+        "returncode": process.returncode,
+        "duration_ms": round((time.perf_counter() - start) * 1000, 2),
+        "output": output.decode(errors="replace")[-100_000:],
+    }
+
+
+smoke_test_runner = SmokeTestRunner()
@@ -1,11 +1,27 @@
-from twilio.rest import Client
+from functools import lru_cache
+
 from api.utils.settings import settings
 
-client = Client(settings.TWILIO_ACCOUNT_SID, settings.TWILIO_AUTH_TOKEN)
+
+@lru_cache(maxsize=None)
+def get_client():
+    """The Twilio client, created on first use"""
+
+    from twilio.rest import Client
+
+    return Client(settings.TWILIO_ACCOUNT_SID, settings.TWILIO_AUTH_TOKEN)
+
+
+def __getattr__(name):
+    # `client` is still available as a module attribute
+    if name == "client":
+        return get_client()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
 def send_sms(phone_number: str, message: str):
     try:
-        message = client.messages.create(
+        message = get_client().messages.create(
             body=message,
             from_=settings.TWILIO_PHONE_NUMBER,
             to=phone_number
@@ -13,4 +29,3 @@ def send_sms(phone_number: str, message: str):
         return {"status": "success", "sid": message.sid}
     except Exception as e:
         return {"status": "error", "detail": str(e)}
-    
\ No newline at end of file
@@ -1,10 +1,10 @@
-from fastapi import BackgroundTasks, HTTPException
+from fastapi import HTTPException
 from sqlalchemy.orm import Session
 
 from api.core.base.services import Service
 from api.utils.settings import settings
 from api.v1.models.squeeze import Squeeze
-from api.core.dependencies.email_sender import send_email
+from api.v1.services.email_outbox import email_outbox_service
 from api.v1.models.squeeze import Squeeze
 from api.v1.schemas.squeeze import CreateSqueeze, FilterSqueeze, UpdateSqueeze
 
@@ -12,9 +12,7 @@ from api.v1.schemas.squeeze import CreateSqueeze, FilterSqueeze, UpdateSqueeze
 class SqueezeService(Service):
     """Squeeze service"""
 
-    def create(
-        self, background_tasks: BackgroundTasks, db: Session, data: CreateSqueeze
-    ):
+    def create(self, db: Session, data: CreateSqueeze):
         """Create squeeze page"""
         new_squeeze = Squeeze(
             title=data.title,
@@ -29,16 +27,16 @@ class SqueezeService(Service):
             full_name=data.full_name,
         )
         db.add(new_squeeze)
-        db.commit()
-        db.refresh(new_squeeze)
         cta_link = f"{settings.ANCHOR_PYTHON_BASE_URL}/about-us"
-        background_tasks.add_task(
-            send_email,
+        email_outbox_service.enqueue(
+            db,
             recipient=data.email,
             template_name="squeeze.html",
             subject="Welcome to HNG Squeeze",
             context={"name": data.full_name, "cta_link": cta_link},
         )
+        db.commit()
+        db.refresh(new_squeeze)
 
         return new_squeeze
 
@@ -3,7 +3,7 @@ from api.v1.models.user import User
 from api.v1.models.billing_plan import BillingPlan, UserSubscription
 from api.v1.models.organisation import Organisation
 from api.v1.models.payment import Payment
-import stripe
+from functools import lru_cache
 from sqlalchemy.orm import joinedload
 from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy import select, join
@@ -13,10 +13,20 @@ import os
 from sqlalchemy import cast, DateTime
 from fastapi import HTTPException, status, Request
 from datetime import datetime, timedelta
-from dateutil.relativedelta import relativedelta
 from api.utils.settings import settings
 
-stripe.api_key = os.getenv("STRIPE_SECRET_KEY")
+SUBSCRIPTION_DATE_FORMAT = "%Y-%m-%d %H:%M:%S.%f"
+
+
+@lru_cache(maxsize=None)
+def get_stripe():
+    """The configured stripe module, imported on first use as it is slow
+    to import"""
+
+    import stripe
+
+    stripe.api_key = os.getenv("STRIPE_SECRET_KEY")
+    return stripe
 
 
 def get_plan_by_id(db: Session, plan_id: str):
@@ -42,8 +52,12 @@ def is_eligible_for_plan(db: Session, user_id: str, plan_id: str):
     if not user_subscription:
         return True
 
-    # Check if the user's current subscription has ended
-    if user_subscription.end_date < datetime.utcnow():
+    # Check if the user's current subscription has ended; the expiry sweep
+    # deactivates it later. end_date is stored as a string in
+    # SUBSCRIPTION_DATE_FORMAT, which sorts chronologically
+    if not user_subscription.active or (
+        user_subscription.end_date < datetime.utcnow().strftime(SUBSCRIPTION_DATE_FORMAT)
+    ):
         return True
 
     # If the user is trying to upgrade or downgrade, they are eligible
@@ -139,6 +153,8 @@ async def update_user_plan(
             "%Y-%m-%d %H:%M:%S.%f"
         )
         user_subscription.billing_cycle = datetime.utcnow() + duration
+        # a renewal after the expiry sweep deactivated the subscription
+        user_subscription.active = True
 
     else:
         user_subscription = UserSubscription(
@@ -179,6 +195,7 @@ def stripe_payment_request(db: Session, user_id: str, request: Request, plan_id:
         return fail_response(status_code=404, message="Plan not found")
 
     if plan.name != "Free":
+        stripe = get_stripe()
         try:
             # Create a checkout session
             checkout_session = stripe.checkout.Session.create(
@@ -0,0 +1,169 @@
+""" Background job tasks
+
+Every task the job workers can run is registered here, so a worker only
+has to import this module to know them all.
+"""
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from api.db.database import SessionLocal
+from api.utils.settings import settings
+from api.v1.services.api_prober import api_prober
+from api.v1.services.api_status_history import api_status_history_service
+from api.v1.services.job_queue import job_queue
+from api.v1.services.login_notification import notify_login
+from api.v1.services.maintenance import maintenance_service
+from api.v1.services.newsletter_broadcast import newsletter_broadcast_service
+from api.v1.services.notification_broadcast import notification_broadcast_service
+from api.v1.services.request_profile import request_profile_service
+from api.v1.services.scheduler import scheduler
+from api.v1.services.smoke_tests import run_test_suite, smoke_test_runner
+
+
+@job_queue.task("login_notification", priority=10)
+def login_notification(
+    email: str,
+    first_name: Optional[str],
+    last_name: Optional[str],
+    ip_address: str,
+    user_agent: str,
+    login_time: datetime,
+):
+    """Emails a user about a new login to their account"""
+
+    notify_login(email, first_name, last_name, ip_address, user_agent, login_time)
+
+
+@job_queue.task("notification_broadcast", queue="bulk")
+def notification_broadcast(broadcast_id: str):
+    """Notifies the members of an organisation; a retried or reclaimed job
+    resumes after the last checkpointed recipient"""
+
+    notification_broadcast_service.run(broadcast_id)
+
+
+@job_queue.task("newsletter_broadcast", queue="bulk", max_attempts=1)
+async def newsletter_broadcast(broadcast_id: str):
+    """Sends a newsletter to its subscribers; an interrupted broadcast is
+    resumed from its checkpoint, not retried from the start"""
+
+    await newsletter_broadcast_service.run(broadcast_id)
+
+
+@job_queue.task("smoke_tests", max_attempts=1)
+async def smoke_tests():
+    """Runs the smoke tests through the app and returns their report"""
+
+    from main import app
+
+    return await smoke_test_runner.run(app)
+
+
+@job_queue.task("api_probe", max_attempts=1)
+async def api_probe():
+    """Probes the API groups and records their status"""
+
+    from main import app
+
+    rows = await api_prober.run(app)
+    return {row["api_group"]: row["status"] for row in rows}
+
+
+@job_queue.task("pytest_suite", queue="bulk", max_attempts=1)
+async def pytest_suite():
+    """Runs the pytest suite in a subprocess and returns its output"""
+
+    return await run_test_suite()
+
+
+# maintenance runs again on its next schedule, so it is never retried
+
+@job_queue.task("purge_login_tokens", queue="maintenance", max_attempts=1)
+def purge_login_tokens():
+    with SessionLocal() as db:
+        return maintenance_service.purge_login_tokens(db)
+
+
+@job_queue.task("purge_reset_tokens", queue="maintenance", max_attempts=1)
+def purge_reset_tokens():
+    with SessionLocal() as db:
+        return maintenance_service.purge_reset_tokens(db)
+
+
+@job_queue.task("purge_email_outbox", queue="maintenance", max_attempts=1)
+def purge_email_outbox():
+    with SessionLocal() as db:
+        return maintenance_service.purge_email_outbox(db)
+
+
+@job_queue.task("purge_background_jobs", queue="maintenance", max_attempts=1)
+def purge_background_jobs():
+    with SessionLocal() as db:
+        return maintenance_service.purge_background_jobs(db)
+
+
+@job_queue.task("expire_invitations", queue="maintenance", max_attempts=1)
+def expire_invitations():
+    with SessionLocal() as db:
+        return maintenance_service.expire_invitations(db)
+
+
+@job_queue.task("expire_subscriptions", queue="maintenance", max_attempts=1)
+def expire_subscriptions():
+    with SessionLocal() as db:
+        return maintenance_service.expire_subscriptions(db)
+
+
+@job_queue.task("resume_newsletter_broadcasts", queue="maintenance", max_attempts=1)
+def resume_newsletter_broadcasts():
+    """Queues the broadcasts whose worker stopped before finishing them.
+    Every run of a broadcast updates it, so each interruption is queued
+    once"""
+
+    with newsletter_broadcast_service.session_factory() as db:
+        interrupted = newsletter_broadcast_service.interrupted(db)
+        for broadcast_id, updated_at in interrupted:
+            newsletter_broadcast.enqueue(
+                db,
+                broadcast_id=broadcast_id,
+                idempotency_key=f"newsletter_broadcast:{broadcast_id}:{updated_at.isoformat()}",
+            )
+        db.commit()
+        return len(interrupted)
+
+
+@job_queue.task("rollup_api_status", queue="maintenance", max_attempts=1)
+def rollup_api_status(period: str):
+    """Refreshes the API status rollups of the current and previous
+    hour or day"""
+
+    since = datetime.now(timezone.utc) - (timedelta(hours=1) if period == "hour" else timedelta(days=1))
+    with SessionLocal() as db:
+        return api_status_history_service.rollup(db, period, since)
+
+
+@job_queue.task("purge_api_status_history", queue="maintenance", max_attempts=1)
+def purge_api_status_history():
+    with SessionLocal() as db:
+        return api_status_history_service.purge(db)
+
+
+@job_queue.task("purge_request_profiles", queue="maintenance", max_attempts=1)
+def purge_request_profiles():
+    with SessionLocal() as db:
+        return request_profile_service.purge(db)
+
+
+scheduler.add("*/10 * * * *", purge_login_tokens)
+scheduler.add("*/15 * * * *", purge_reset_tokens)
+scheduler.add("0 4 * * *", purge_email_outbox)
+scheduler.add("15 4 * * *", purge_background_jobs)
+scheduler.add("0 * * * *", expire_invitations)
+scheduler.add("*/5 * * * *", expire_subscriptions)
+scheduler.add("*/5 * * * *", resume_newsletter_broadcasts)
+scheduler.add("*/5 * * * *", rollup_api_status, name="rollup_api_status_hourly", period="hour")
+scheduler.add("15 * * * *", rollup_api_status, name="rollup_api_status_daily", period="day")
+scheduler.add("30 3 * * *", purge_api_status_history)
+scheduler.add("45 3 * * *", purge_request_profiles)
+if settings.API_PROBE_ENABLED:
+    scheduler.add(settings.API_PROBE_SCHEDULE, api_probe)
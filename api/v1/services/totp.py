@@ -4,7 +4,6 @@ from api.v1.schemas.totp_device import TOTPDeviceRequestSchema
 from fastapi import HTTPException, status
 from api.v1.models import TOTPDevice
 import pyotp
-import qrcode
 import io
 import base64
 from sqlalchemy.exc import SQLAlchemyError
@@ -92,6 +91,8 @@ class TOTPService(Service):
     def generate_qrcode(self, otpauth_url: str) -> str:
         """Generate a QR code for the otpauth URL and returns it as base64 string"""
 
+        import qrcode
+
         try:
             qr = qrcode.make(otpauth_url)
             buffer = io.BytesIO()
@@ -0,0 +1,20 @@
+""" Gunicorn settings
+
+    PROMETHEUS_MULTIPROC_DIR=/tmp/metrics gunicorn main:app
+
+Workers keep their metrics in PROMETHEUS_MULTIPROC_DIR, which must exist
+and be emptied before the server starts. The live gauges of a worker that
+exits are dropped here.
+"""
+import os
+
+worker_class = "uvicorn.workers.UvicornWorker"
+bind = os.environ.get("GUNICORN_BIND", "0.0.0.0:7001")
+workers = int(os.environ.get("WEB_CONCURRENCY", 2))
+
+
+def child_exit(server, worker):
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        from prometheus_client import multiprocess
+
+        multiprocess.mark_process_dead(worker.pid)
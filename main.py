@@ -1,12 +1,11 @@
+import asyncio
+import secrets
 import uvicorn
 from fastapi.staticfiles import StaticFiles
 import uvicorn, os
 from sqlalchemy.exc import IntegrityError
 from fastapi import HTTPException, Request
-from slowapi import Limiter
-from slowapi.util import get_remote_address
 from slowapi.errors import RateLimitExceeded
-from fastapi.templating import Jinja2Templates
 from fastapi.exceptions import RequestValidationError
 from fastapi.responses import JSONResponse
 from contextlib import asynccontextmanager
@@ -16,20 +15,54 @@ from fastapi.middleware.cors import CORSMiddleware
 from starlette.requests import Request
 from starlette.middleware.sessions import SessionMiddleware  # required by google oauth
 
+from api.core.dependencies.email_sender import email_templates
+from api.core.dependencies.geoip import geoip_resolver
+from api.core.dependencies.smtp_pool import close_smtp_pools
+from api.core.metrics import MetricsMiddleware, metrics_response
+from api.core.profiling import ProfilingMiddleware
+from api.core.tracing import TracingMiddleware, instrument, tracer
+from api.core.warmup import warmup
+from api.core.pubsub import notification_bus
 from api.utils.json_response import JsonResponseDict
-from api.utils.logger import logger
+from api.utils.logger import RequestIdMiddleware, logger, request_id
+from api.utils.rate_limit import limiter
 from api.v1.routes import api_version_one
+from api.v1.services.email_outbox import email_outbox_service
+from api.v1.services.job_queue import job_worker
+from api.v1.services.scheduler import scheduler
 from api.utils.settings import settings
-from api.utils.send_logs import send_error_to_telex
-from scripts.populate_db import populate_roles_and_permissions
+from api.utils.send_logs import telex_reporter
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Lifespan function"""
 
+    geoip_resolver.open()
+    warming_up = asyncio.create_task(asyncio.to_thread(warmup.run, app))
+    await notification_bus.start()
+    telex_reporter.start()
+    if settings.EMAIL_OUTBOX_IN_PROCESS:
+        email_outbox_service.start()
+    if settings.JOB_WORKER_IN_PROCESS:
+        job_worker.start()
+    if settings.SCHEDULER_ENABLED:
+        scheduler.start()
+
     yield
 
+    # stop receiving traffic while shutting down
+    warmup.ready.clear()
+    warming_up.cancel()
+    await asyncio.gather(warming_up, return_exceptions=True)
+    await scheduler.stop()
+    await job_worker.stop()
+    await email_outbox_service.stop()
+    await notification_bus.stop()
+    await telex_reporter.stop()
+    await close_smtp_pools()
+    await asyncio.to_thread(tracer.flush)
+
 
 app = FastAPI(
     lifespan=lifespan,
@@ -39,8 +72,10 @@ app = FastAPI(
 )
 
 
-# Initialize the rate limiter
-limiter = Limiter(key_func=get_remote_address)
+# Outbound HTTP calls and SQL statements are traced, see api/core/tracing.py
+instrument()
+
+# Routes share one limiter, see api/utils/rate_limit.py
 app.state.limiter = limiter
 
 
@@ -49,9 +84,6 @@ import os
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))  # Get absolute path
 TEMPLATE_DIR = os.path.join(BASE_DIR, "api/core/dependencies/email/templates")
 
-# Set up email templates and css static files
-email_templates = Jinja2Templates(directory="api/core/dependencies/email/templates")
-
 # MEDIA_DIR = os.path.expanduser('~/.media')
 MEDIA_DIR = "./media"
 if not os.path.exists(MEDIA_DIR):
@@ -75,6 +107,10 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(TracingMiddleware)
+app.add_middleware(ProfilingMiddleware)
+app.add_middleware(MetricsMiddleware)
+app.add_middleware(RequestIdMiddleware)
 
 app.include_router(api_version_one)
 
@@ -91,6 +127,28 @@ async def probe():
     return {"message": "I am the Python FastAPI API responding"}
 
 
+@app.get("/ready", include_in_schema=False)
+async def ready():
+    """Readiness probe, ready once the startup warmup is done"""
+
+    return JSONResponse(
+        status_code=status.HTTP_200_OK if warmup.ready.is_set() else status.HTTP_503_SERVICE_UNAVAILABLE,
+        content=warmup.status(),
+    )
+
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics(request: Request):
+    """Prometheus metrics for this server"""
+
+    if settings.METRICS_TOKEN and not secrets.compare_digest(
+        request.headers.get("Authorization", ""), f"Bearer {settings.METRICS_TOKEN}"
+    ):
+        raise HTTPException(status_code=401, detail="Invalid metrics token")
+
+    return await asyncio.to_thread(metrics_response)
+
+
 # REGISTER EXCEPTION HANDLERS
 @app.exception_handler(HTTPException)
 async def http_exception(request: Request, exc: HTTPException):
@@ -159,9 +217,16 @@ async def integrity_exception(request: Request, exc: IntegrityError):
 async def global_exception(request: Request, exc: Exception):
     """Other exception handlers"""
 
-    logger.exception(f"Exception occured; {exc}")
+    # runs in ServerErrorMiddleware, after RequestIdMiddleware has returned
+    current_request_id = getattr(request.state, "request_id", None)
+    reset = request_id.set(current_request_id)
+    try:
+        logger.exception(f"Exception occured; {exc}")
+    finally:
+        request_id.reset(reset)
 
-    await send_error_to_telex(request.method, request.url.path, exc)
+    route = request.scope.get("route")
+    telex_reporter.report(request.method, getattr(route, "path", request.url.path), exc)
 
     return JSONResponse(
         status_code=500,
@@ -170,6 +235,7 @@ async def global_exception(request: Request, exc: Exception):
             "status_code": 500,
             "message": f"An unexpected error occurred: {exc}",
         },
+        headers={"X-Request-ID": current_request_id} if current_request_id else None,
     )
 
 
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+""" Measures email renders per second, per send premailer vs precompiled
+
+Usage: python scripts/benchmark_email_render.py [template] [seconds]
+"""
+import sys, os
+import time
+import logging
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from premailer import transform
+from api.core.dependencies.email_sender import email_renderer, email_templates
+
+logging.getLogger("CSSUTILS").setLevel(logging.CRITICAL)
+
+
+def renders_per_second(render, duration: float) -> float:
+    count = 0
+    start = time.perf_counter()
+    while (elapsed := time.perf_counter() - start) < duration:
+        render(count)
+        count += 1
+    return count / elapsed
+
+
+def main():
+    template_name = sys.argv[1] if len(sys.argv) > 1 else "welcome.html"
+    duration = float(sys.argv[2]) if len(sys.argv) > 2 else 3
+
+    def context(i):
+        return {
+            "first_name": f"User {i}",
+            "last_name": "Boilerplate",
+            "email": f"user{i}@example.com",
+            "link": f"https://example.com/verify?token={i}",
+            "unsubscribe_link": f"https://example.com/unsubscribe/{i}",
+        }
+
+    def naive(i):
+        return transform(email_templates.get_template(template_name).render(context(i)))
+
+    def precompiled(i):
+        return email_renderer.render(template_name, context(i))
+
+    start = time.perf_counter()
+    email_renderer.warmup()
+    print(f"warmup: {time.perf_counter() - start:.3f}s")
+
+    before = renders_per_second(naive, duration)
+    after = renders_per_second(precompiled, duration)
+    print(f"{template_name}")
+    print(f"  render + premailer per send: {before:10.0f} renders/s")
+    print(f"  precompiled:                 {after:10.0f} renders/s ({after / before:.0f}x)")
+
+
+if __name__ == "__main__":
+    main()
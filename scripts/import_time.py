@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+""" Measures how long importing the app takes, with python -X importtime
+
+Usage: python scripts/import_time.py [budget ms] [module]
+
+Prints the slowest imports and exits with status 1 when importing takes
+longer than the budget. The budget defaults to IMPORT_TIME_BUDGET_MS, or
+6000 ms, which leaves headroom over the ~4.3 s it measures in a dev
+container; tests/v1/test_import_time.py holds the app to the same budget.
+"""
+import os
+import subprocess
+import sys
+from typing import Dict, Optional, Set, Tuple
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+BUDGET_MS = float(os.environ.get("IMPORT_TIME_BUDGET_MS", 6000))
+
+
+def loaded_modules(module: str = "main", env: Optional[Dict[str, str]] = None) -> Set[str]:
+    """Imports `module` in a fresh interpreter and returns the names of all
+    the modules loaded by then, including those loaded with importlib, which
+    -X importtime does not report"""
+
+    process = subprocess.run(
+        [sys.executable, "-c", f"import sys, {module}; print(*sorted(sys.modules), sep=chr(10))"],
+        cwd=ROOT,
+        env={**os.environ, **(env or {})},
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return set(process.stdout.split())
+
+
+def import_times(module: str = "main", env: Optional[Dict[str, str]] = None) -> Dict[str, Tuple[int, int]]:
+    """Imports `module` in a fresh interpreter and returns the self and
+    cumulative import time, in microseconds, of every module it loaded"""
+
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT,
+        env={**os.environ, **(env or {})},
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+    times = {}
+    for line in process.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        own, cumulative, name = line[len("import time:"):].split("|")
+        times[name.strip()] = (int(own), int(cumulative))
+    return times
+
+
+def main():
+    budget_ms = float(sys.argv[1]) if len(sys.argv) > 1 else BUDGET_MS
+    module = sys.argv[2] if len(sys.argv) > 2 else "main"
+
+    times = import_times(module)
+    total_ms = times[module][1] / 1000
+
+    print(f"import {module}: {total_ms:.0f} ms (budget {budget_ms:.0f} ms)\n")
+    print(f"{'self ms':>10} {'total ms':>10}  module")
+    for name, (own, cumulative) in sorted(times.items(), key=lambda item: -item[1][0])[:25]:
+        print(f"{own / 1000:10.1f} {cumulative / 1000:10.1f}  {name}")
+
+    sys.exit(0 if total_ms <= budget_ms else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -5,6 +5,7 @@ from unittest.mock import patch
 import pytest
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
 from alembic.command import upgrade
 from alembic.config import Config
 from decouple import config as decouple_config
@@ -24,6 +25,14 @@ def auto_mock_client_ip():
         mock_client.host = next(IP_GENERATOR)
         yield
 
+@pytest.fixture(autouse=True)
+def clear_reference_data_cache():
+    """Keeps reference data cached by a test from leaking into the next"""
+    from api.core.reference_cache import ReferenceCache
+
+    yield
+    ReferenceCache.clear_all()
+
 warnings.filterwarnings("ignore", category=DeprecationWarning)
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
@@ -38,6 +47,66 @@ def mock_send_email():
             yield mock_email_sending
 
 
+@pytest.fixture
+def run_background_jobs():
+    """Runs the queued background jobs until none is due, for tests that
+    point `job_queue.session_factory` at their database"""
+    import asyncio
+    from api.v1.services.job_queue import JobWorker
+
+    def run():
+        asyncio.run(JobWorker(concurrency=1, poll_interval=0.01).run(burst=True))
+
+    return run
+
+
+@pytest.fixture(scope="session")
+def sqlite_template():
+    """An in-memory sqlite database with every table sqlite can create,
+    built once and copied into each test's database"""
+    import sqlite3
+
+    import main  # noqa: F401, registers every model
+    from api.db.database import Base
+    from sqlalchemy.exc import CompileError
+
+    template = sqlite3.connect(":memory:", check_same_thread=False)
+    template_engine = create_engine("sqlite://", creator=lambda: template, poolclass=StaticPool)
+    for table in Base.metadata.sorted_tables:
+        try:
+            table.create(template_engine)
+        except CompileError:
+            # postgres only column types (ARRAY)
+            pass
+    yield template
+    template.close()
+
+
+@pytest.fixture
+def engine(sqlite_template):
+    """A fresh in-memory sqlite database shared by every session of the test"""
+    import sqlite3
+
+    connection = sqlite3.connect(":memory:", check_same_thread=False)
+    sqlite_template.backup(connection)
+    engine = create_engine("sqlite://", creator=lambda: connection, poolclass=StaticPool)
+    yield engine
+    engine.dispose()
+    connection.close()
+
+
+@pytest.fixture
+def session_factory(engine):
+    return sessionmaker(bind=engine)
+
+
+@pytest.fixture
+def session(session_factory):
+    db = session_factory()
+    yield db
+    db.close()
+
+
 @pytest.fixture(scope="session")
 def db_engine():
 
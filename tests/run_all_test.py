@@ -1,14 +1,45 @@
-from fastapi import APIRouter, Response
-import subprocess
+from datetime import datetime, timezone
+
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy.orm import Session
+
+from api.db.database import get_db
+from api.utils.success_response import success_response
+from api.v1.services.job_queue import job_queue
+from api.v1.services.tasks import pytest_suite
 
 
 test_rout = APIRouter(prefix='/all', tags=['Tests'])
 
-@test_rout.get("/run-tests")
-async def run_tests():
-    # Run pytest and capture the output
-    result = subprocess.run(['pytest', '--maxfail=1', '--disable-warnings', '--tb=short'], 
-                            capture_output=True, text=True)
-    # Return the output as the response
-    return Response(content=result.stdout, media_type="text/plain")
+@test_rout.get("/run-tests", status_code=status.HTTP_202_ACCEPTED)
+def run_tests(db: Session = Depends(get_db)):
+    """Queues a run of the pytest suite in a job worker; requests within
+    the same ten minutes share one run"""
+
+    now = datetime.now(timezone.utc)
+    started = now.replace(minute=now.minute // 10 * 10).strftime("%Y-%m-%dT%H:%M")
+    job = pytest_suite.enqueue(db, idempotency_key=f"pytest_suite:{started}")
+    db.commit()
+
+    return success_response(
+        status_code=status.HTTP_202_ACCEPTED,
+        message="Test suite queued",
+        data={"id": job.id, "status": job.status, "results_url": f"/api/v1/all/run-tests/{job.id}"},
+    )
+
+
+@test_rout.get("/run-tests/{run_id}", status_code=status.HTTP_200_OK)
+def get_test_run(run_id: str, db: Session = Depends(get_db)):
+    """Retrieves a test suite run; its return code and output are the
+    result once it has finished"""
+
+    job = job_queue.fetch(db, run_id)
+    if job.name != pytest_suite.name:
+        raise HTTPException(status_code=404, detail="Test run does not exist")
 
+    return success_response(
+        status_code=status.HTTP_200_OK,
+        message="Test suite run retrieved successfully",
+        data=jsonable_encoder(job_queue.status(job)),
+    )
@@ -10,7 +10,13 @@ from api.v1.services.user import user_service
 from api.db.database import get_db
 from datetime import datetime, timezone, timedelta
 from uuid_extensions import uuid7
-from api.v1.services.stripe_payment import update_user_plan, fetch_all_organisations_with_users_and_plans
+import asyncio
+from api.v1.services.stripe_payment import (
+    SUBSCRIPTION_DATE_FORMAT,
+    fetch_all_organisations_with_users_and_plans,
+    is_eligible_for_plan,
+    update_user_plan,
+)
 
 client = TestClient(app)
 
@@ -80,4 +86,40 @@ def test_fetch_invalid_billing_plans(mock_user_service, mock_db_session):
         headers={"Authorization": f"Bearer {access_token}"},
     )
     print(response.json())
-    assert response.status_code == 404
\ No newline at end of file
+    assert response.status_code == 404
+
+def subscription_session(subscription):
+    session = MagicMock(spec=Session)
+    session.query().filter().first.side_effect = lambda: {
+        User: mock_user,
+        BillingPlan: mock_plan,
+        UserSubscription: subscription,
+    }[session.query.call_args[0][0]]
+    return session
+
+
+def test_ended_subscription_is_eligible_before_the_expiry_sweep():
+    subscription = UserSubscription(
+        user_id=user_id, plan_id=plan_id, organisation_id=org_id, active=True,
+        start_date=(start_date - timedelta(days=31)).strftime(SUBSCRIPTION_DATE_FORMAT),
+        end_date=(start_date - timedelta(days=1)).strftime(SUBSCRIPTION_DATE_FORMAT),
+    )
+
+    assert is_eligible_for_plan(subscription_session(subscription), user_id, plan_id)
+
+    subscription.end_date = end_date.strftime(SUBSCRIPTION_DATE_FORMAT)
+    assert not is_eligible_for_plan(subscription_session(subscription), user_id, plan_id)
+
+
+def test_renewal_reactivates_an_expired_subscription():
+    subscription = UserSubscription(
+        user_id=user_id, plan_id=plan_id, organisation_id=org_id, active=False,
+        billing_plan=mock_plan,
+        start_date=(start_date - timedelta(days=31)).strftime(SUBSCRIPTION_DATE_FORMAT),
+        end_date=(start_date - timedelta(days=1)).strftime(SUBSCRIPTION_DATE_FORMAT),
+    )
+
+    renewed = asyncio.run(update_user_plan(subscription_session(subscription), user_id, plan_id))
+
+    assert renewed.active is True
+    assert renewed.end_date > datetime.utcnow().strftime(SUBSCRIPTION_DATE_FORMAT)
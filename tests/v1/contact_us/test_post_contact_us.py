@@ -8,7 +8,6 @@ from sqlalchemy.orm import Session
 from uuid_extensions import uuid7
 
 from api.db.database import get_db
-from api.utils.send_mail import send_contact_mail
 from api.v1.models.contact_us import ContactUs
 from api.v1.models.organisation import Organisation
 from api.v1.services.user import user_service
@@ -47,9 +46,9 @@ def mock_contact_us():
         org_id=mock_org().id
     )
 
-@patch('fastapi.BackgroundTasks.add_task')
+@patch("api.v1.routes.contact_us.send_contact_mail")
 @patch("api.v1.services.contact_us.contact_us_service.create")
-def test_post_contact_us(mock_create, mock_add_task, db_session_mock, client):
+def test_post_contact_us(mock_create, mock_send_contact_mail, db_session_mock, client):
     '''Test to successfully create a new contact request'''
 
     db_session_mock.add.return_value = None
@@ -73,9 +72,9 @@ def test_post_contact_us(mock_create, mock_add_task, db_session_mock, client):
     # Assert that the contact_us_service.create was called with the expected arguments
     mock_create.assert_called_once()
 
-    mock_add_task.assert_called_once()
-    mock_add_task.assert_called_with(
-            send_contact_mail,
+    mock_send_contact_mail.assert_called_once()
+    mock_send_contact_mail.assert_called_with(
+            db_session_mock,
             context={
                 "full_name": "Jane Doe",
                 "email": "jane.doe@example.com",
@@ -0,0 +1,206 @@
+import asyncio
+import time
+from datetime import datetime, timedelta, timezone
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from fastapi.testclient import TestClient
+from uuid_extensions import uuid7
+
+from main import app
+from api.db.database import get_db
+from api.v1.models.background_job import BackgroundJob
+from api.v1.models.newsletter import (
+    Newsletter,
+    NewsletterBroadcast,
+    NewsletterSubscriber,
+)
+from api.v1.models.user import User
+from api.v1.services.job_queue import job_queue
+from api.v1.services.newsletter_broadcast import (
+    SendRateLimiter,
+    newsletter_broadcast_service,
+)
+from api.v1.services.tasks import resume_newsletter_broadcasts
+from api.v1.services.user import user_service
+
+
+@pytest.fixture(autouse=True)
+def broadcast_settings(session_factory, monkeypatch):
+    monkeypatch.setattr(newsletter_broadcast_service, "session_factory", session_factory)
+    monkeypatch.setattr(job_queue, "session_factory", session_factory)
+    monkeypatch.setattr("api.utils.settings.settings.NEWSLETTER_BROADCAST_CHUNK_SIZE", 4)
+    monkeypatch.setattr("api.utils.settings.settings.NEWSLETTER_SEND_RATE", 0)
+
+
+@pytest.fixture
+def newsletter(session):
+    admin = User(id=str(uuid7()), email="admin@gmail.com", is_superadmin=True)
+    newsletter = Newsletter(
+        id=str(uuid7()), title="October news", content="<p>Shipped <b>broadcasts</b></p>"
+    )
+    other = Newsletter(id=str(uuid7()), title="Other", content="other")
+    session.add_all([admin, newsletter, other])
+    session.add_all(
+        NewsletterSubscriber(id=str(uuid7()), email=f"sub{i}@gmail.com") for i in range(10)
+    )
+    session.add(
+        NewsletterSubscriber(id=str(uuid7()), email="other@gmail.com", newsletter_id=other.id)
+    )
+    session.commit()
+    return {"admin": admin, "newsletter": newsletter}
+
+
+@pytest.fixture
+def mail_client():
+    client = AsyncMock()
+    client.send_messages.side_effect = lambda messages: [None] * len(messages)
+    with patch("api.v1.services.newsletter_broadcast.get_mail_client", return_value=client):
+        yield client
+
+
+def sent_to(mail_client):
+    return [
+        message.recipients[0]
+        for call in mail_client.send_messages.await_args_list
+        for message in call.args[0]
+    ]
+
+
+@pytest.mark.asyncio
+async def test_broadcast_sends_every_subscriber_in_chunks(session, newsletter, mail_client):
+    broadcast = newsletter_broadcast_service.create(
+        session, newsletter["newsletter"].id, newsletter["admin"]
+    )
+
+    with patch(
+        "api.v1.services.newsletter_broadcast.email_renderer.render", return_value="<html>news</html>"
+    ) as render:
+        await newsletter_broadcast_service.run(broadcast.id)
+
+    assert sorted(sent_to(mail_client)) == sorted(f"sub{i}@gmail.com" for i in range(10))
+    # 10 subscribers in chunks of 4
+    assert mail_client.send_messages.await_count == 3
+    assert render.call_count == 1
+    assert render.call_args.args[1]["content"] == "<p>Shipped <b>broadcasts</b></p>"
+
+    session.refresh(broadcast)
+    stats = newsletter_broadcast_service.stats(broadcast)
+    assert stats["status"] == "completed"
+    assert stats["total_recipients"] == 10
+    assert stats["sent"] == 10
+    assert stats["progress"] == 100.0
+    assert stats["messages_per_second"] > 0
+
+
+@pytest.mark.asyncio
+async def test_failed_recipients_are_counted(session, newsletter, mail_client):
+    mail_client.send_messages.side_effect = lambda messages: [
+        ConnectionError("rejected") if message.recipients[0] == "sub3@gmail.com" else None
+        for message in messages
+    ]
+    broadcast = newsletter_broadcast_service.create(
+        session, newsletter["newsletter"].id, newsletter["admin"]
+    )
+
+    await newsletter_broadcast_service.run(broadcast.id)
+
+    session.refresh(broadcast)
+    stats = newsletter_broadcast_service.stats(broadcast)
+    assert stats["status"] == "completed"
+    assert (stats["sent"], stats["failed"]) == (9, 1)
+    assert stats["failure_rate"] == 10.0
+    assert stats["last_error"] == "rejected"
+
+
+@pytest.mark.asyncio
+async def test_interrupted_broadcast_resumes_after_its_checkpoint(session, newsletter, mail_client):
+    broadcast = newsletter_broadcast_service.create(
+        session, newsletter["newsletter"].id, newsletter["admin"]
+    )
+    calls = 0
+
+    def crash_on_second_chunk(messages):
+        nonlocal calls
+        calls += 1
+        if calls == 2:
+            # the worker is shut down mid-broadcast
+            raise asyncio.CancelledError()
+        return [None] * len(messages)
+
+    mail_client.send_messages.side_effect = crash_on_second_chunk
+    with pytest.raises(asyncio.CancelledError):
+        await newsletter_broadcast_service.run(broadcast.id)
+
+    session.refresh(broadcast)
+    assert broadcast.status == "running"
+    assert broadcast.sent == 4
+    first_chunk = sent_to(mail_client)[:4]
+
+    mail_client.send_messages.reset_mock()
+    mail_client.send_messages.side_effect = lambda messages: [None] * len(messages)
+    assert resume_newsletter_broadcasts() == 1
+    # queued once, however many times the sweep runs
+    resume_newsletter_broadcasts()
+    [job] = session.query(BackgroundJob).filter_by(name="newsletter_broadcast").all()
+    assert job.payload == {"broadcast_id": broadcast.id}
+    await newsletter_broadcast_service.run(broadcast.id)
+
+    resumed = sent_to(mail_client)
+    assert not set(resumed) & set(first_chunk)
+    assert len(first_chunk) + len(resumed) == 10
+
+    session.refresh(broadcast)
+    assert broadcast.status == "completed"
+    assert broadcast.sent == 10
+
+
+@pytest.mark.asyncio
+async def test_leased_broadcast_is_not_run_twice(session, newsletter, mail_client):
+    broadcast = newsletter_broadcast_service.create(
+        session, newsletter["newsletter"].id, newsletter["admin"]
+    )
+    broadcast.status = "running"
+    broadcast.locked_until = datetime.now(timezone.utc) + timedelta(minutes=5)
+    session.commit()
+
+    await newsletter_broadcast_service.run(broadcast.id)
+    assert resume_newsletter_broadcasts() == 0
+
+    mail_client.send_messages.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_rate_limiter_spaces_sends():
+    limiter = SendRateLimiter(rate=100)
+
+    start = time.perf_counter()
+    await limiter.acquire(100)
+    burst = time.perf_counter() - start
+    await limiter.acquire(20)
+    total = time.perf_counter() - start
+
+    assert burst < 0.05
+    assert total >= 0.18
+
+
+def test_broadcast_endpoints(session, newsletter, mail_client, run_background_jobs):
+    app.dependency_overrides[get_db] = lambda: session
+    app.dependency_overrides[user_service.get_current_super_admin] = lambda: newsletter["admin"]
+    try:
+        client = TestClient(app)
+        response = client.post(f"/api/v1/newsletters/{newsletter['newsletter'].id}/broadcasts")
+        assert response.status_code == 202
+        broadcast_id = response.json()["data"]["id"]
+        run_background_jobs()
+
+        response = client.get(f"/api/v1/newsletters/broadcasts/{broadcast_id}")
+        assert response.status_code == 200
+        assert response.json()["data"]["status"] == "completed"
+        assert response.json()["data"]["sent"] == 10
+
+        response = client.post("/api/v1/newsletters/missing/broadcasts")
+        assert response.status_code == 404
+    finally:
+        app.dependency_overrides = {}
+
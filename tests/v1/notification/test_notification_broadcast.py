@@ -0,0 +1,249 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+from sqlalchemy.orm import sessionmaker
+from uuid_extensions import uuid7
+
+from main import app
+from api.db.database import get_db
+from api.v1.models import User, Organisation
+from api.v1.models.associations import user_organisation_association
+from api.v1.models.notifications import (
+    Notification,
+    NotificationBroadcast,
+    NotificationCounter,
+    NotificationSetting,
+)
+from api.v1.models.permissions.role import Role
+from api.v1.models.permissions.user_org_role import user_organisation_roles
+from api.v1.services.job_queue import job_queue
+from api.v1.services.notification import notification_service
+from api.v1.services.notification_broadcast import notification_broadcast_service
+from api.v1.services.organisation import OrganisationService, organisation_service
+from api.v1.services.user import user_service
+
+
+@pytest.fixture
+def org_setup(session, engine, monkeypatch):
+    # other tests replace the role lookup on the shared service instance
+    monkeypatch.setattr(
+        organisation_service,
+        "get_organisation_user_role",
+        OrganisationService().get_organisation_user_role,
+    )
+    monkeypatch.setattr(
+        notification_broadcast_service, "session_factory", sessionmaker(bind=engine)
+    )
+    monkeypatch.setattr(job_queue, "session_factory", sessionmaker(bind=engine))
+    monkeypatch.setattr("api.utils.settings.settings.NOTIFICATION_FANOUT_CHUNK_SIZE", 2)
+
+    owner = User(id=str(uuid7()), email="owner@gmail.com")
+    org = Organisation(id=str(uuid7()), name="broadcast org")
+    admin = Role(id=str(uuid7()), name="admin", is_builtin=True)
+    members = [User(id=str(uuid7()), email=f"member{i}@gmail.com") for i in range(5)]
+    outsider = User(id=str(uuid7()), email="outsider@gmail.com")
+    session.add_all([owner, org, admin, outsider, *members])
+    session.commit()
+
+    session.execute(
+        user_organisation_association.insert(),
+        [
+            {"user_id": owner.id, "organisation_id": org.id, "role": "owner"},
+            {"user_id": members[0].id, "organisation_id": org.id, "role": "user"},
+            {"user_id": members[1].id, "organisation_id": org.id, "role": "admin"},
+        ],
+    )
+    session.execute(
+        user_organisation_roles.insert(),
+        [
+            {"user_id": members[2].id, "organisation_id": org.id, "role_id": admin.id},
+            {"user_id": members[3].id, "organisation_id": org.id, "role_id": None},
+            # members[1] shows up in both membership tables
+            {"user_id": members[1].id, "organisation_id": org.id, "role_id": None},
+        ],
+    )
+    members[4].is_deleted = True
+    session.execute(
+        user_organisation_roles.insert().values(
+            user_id=members[4].id, organisation_id=org.id, role_id=None
+        )
+    )
+    session.add(
+        NotificationSetting(
+            user_id=members[3].id, email_notification_always_send_email_notifications=False
+        )
+    )
+    session.add(
+        NotificationSetting(
+            user_id=members[0].id, email_notification_announcement_and_update_emails=True
+        )
+    )
+    session.commit()
+    return {"owner": owner, "org": org, "members": members, "outsider": outsider}
+
+
+@pytest.fixture
+def client(session, org_setup):
+    app.dependency_overrides[get_db] = lambda: session
+    app.dependency_overrides[user_service.get_current_user] = lambda: org_setup["owner"]
+    yield TestClient(app)
+    app.dependency_overrides = {}
+
+
+def recipients(session, title):
+    return {
+        n.user_id for n in session.query(Notification).filter_by(title=title).all()
+    }
+
+
+def test_broadcast_notifies_active_members_in_chunks(
+    client, engine, session, org_setup, run_background_jobs
+):
+    owner, members = org_setup["owner"], org_setup["members"]
+    inserts = []
+    event.listen(
+        engine,
+        "before_cursor_execute",
+        lambda conn, cursor, statement, *args: inserts.append(statement)
+        if statement.startswith("INSERT INTO notifications")
+        else None,
+    )
+
+    response = client.post(
+        "/api/v1/notifications/broadcasts",
+        json={"organisation_id": org_setup["org"].id, "title": "all", "message": "hi"},
+    )
+    run_background_jobs()
+
+    assert response.status_code == 202
+    progress = client.get(
+        f"/api/v1/notifications/broadcasts/{response.json()['data']['id']}"
+    ).json()["data"]
+    assert progress["status"] == "completed"
+    assert progress["total_recipients"] == progress["delivered"] == 5
+    assert progress["progress"] == 100
+
+    session.expire_all()
+    assert recipients(session, "all") == {owner.id, *(m.id for m in members[:4])}
+    # 5 recipients in chunks of 2
+    assert len(inserts) == 3
+    assert notification_service.get_unread_count(members[1], session) == 1
+
+
+def test_broadcast_segments_by_role_and_setting(client, session, org_setup, run_background_jobs):
+    members = org_setup["members"]
+
+    for title, body in [
+        ("admins", {"role": "admin"}),
+        ("always", {"setting": "email_notification_always_send_email_notifications"}),
+        ("news", {"setting": "email_notification_announcement_and_update_emails"}),
+    ]:
+        response = client.post(
+            "/api/v1/notifications/broadcasts",
+            json={"organisation_id": org_setup["org"].id, "title": title, "message": "hi", **body},
+        )
+        assert response.status_code == 202
+    run_background_jobs()
+
+    session.expire_all()
+    assert recipients(session, "admins") == {members[1].id, members[2].id}
+    # on by default, members[3] turned it off
+    assert recipients(session, "always") == {
+        org_setup["owner"].id, members[0].id, members[1].id, members[2].id
+    }
+    # off by default, members[0] turned it on
+    assert recipients(session, "news") == {members[0].id}
+
+
+def test_broadcast_requires_admin_or_owner(client, org_setup):
+    app.dependency_overrides[user_service.get_current_user] = lambda: org_setup["members"][0]
+
+    response = client.post(
+        "/api/v1/notifications/broadcasts",
+        json={"organisation_id": org_setup["org"].id, "title": "all", "message": "hi"},
+    )
+
+    assert response.status_code == 403
+
+
+def create_broadcast(session, org_setup, **values):
+    broadcast = NotificationBroadcast(
+        organisation_id=org_setup["org"].id,
+        sender_id=org_setup["owner"].id,
+        title="resumed",
+        message="hi",
+        **{"status": "pending", "total_recipients": 0, "delivered": 0, **values},
+    )
+    session.add(broadcast)
+    session.commit()
+    return broadcast.id
+
+
+def test_failed_broadcast_is_resumed_by_the_retried_job(session, org_setup, monkeypatch):
+    broadcast_id = create_broadcast(session, org_setup)
+    insert_chunk = notification_broadcast_service.insert_chunk
+    calls = []
+
+    def failing_insert_chunk(*args):
+        calls.append(1)
+        if len(calls) == 2:
+            raise ConnectionError("database went away")
+        return insert_chunk(*args)
+
+    monkeypatch.setattr(notification_broadcast_service, "insert_chunk", failing_insert_chunk)
+    with pytest.raises(ConnectionError):
+        notification_broadcast_service.run(broadcast_id)
+
+    session.expire_all()
+    broadcast = session.get(NotificationBroadcast, broadcast_id)
+    assert (broadcast.status, broadcast.delivered, broadcast.locked_until) == ("failed", 2, None)
+
+    notification_broadcast_service.run(broadcast_id)
+
+    session.expire_all()
+    assert broadcast.status == "completed"
+    assert broadcast.total_recipients == broadcast.delivered == 5
+    notified = session.query(Notification.user_id).filter_by(title="resumed").all()
+    assert len(notified) == len(set(notified)) == 5
+
+
+def test_interrupted_broadcast_resumes_after_its_checkpoint(session, org_setup):
+    members = sorted(
+        [org_setup["owner"].id, *(m.id for m in org_setup["members"][:4])]
+    )
+    broadcast_id = create_broadcast(
+        session,
+        org_setup,
+        status="running",
+        total_recipients=5,
+        delivered=2,
+        last_user_id=members[1],
+        # the worker died and its lease ran out
+        locked_until=datetime.now(timezone.utc) - timedelta(seconds=1),
+    )
+
+    notification_broadcast_service.run(broadcast_id)
+
+    session.expire_all()
+    broadcast = session.get(NotificationBroadcast, broadcast_id)
+    assert broadcast.status == "completed"
+    assert broadcast.delivered == 5
+    assert recipients(session, "resumed") == set(members[2:])
+
+
+def test_broadcast_leased_to_another_worker_is_retried_later(session, org_setup):
+    broadcast_id = create_broadcast(
+        session,
+        org_setup,
+        status="running",
+        locked_until=datetime.now(timezone.utc) + timedelta(minutes=1),
+    )
+
+    with pytest.raises(RuntimeError):
+        notification_broadcast_service.run(broadcast_id)
+
+    session.expire_all()
+    assert session.get(NotificationBroadcast, broadcast_id).status == "running"
+    assert recipients(session, "resumed") == set()
@@ -0,0 +1,109 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import event
+from uuid_extensions import uuid7
+
+from api.v1.models.user import User
+from api.v1.models.notifications import Notification
+from api.v1.services.notification import NotificationService
+
+
+@pytest.fixture
+def service():
+    return NotificationService()
+
+
+@pytest.fixture
+def users(session):
+    users = [User(id=str(uuid7()), email=f"user{i}@gmail.com") for i in range(2)]
+    session.add_all(users)
+    session.commit()
+    return users
+
+
+def add_notifications(session, user, count, status="unread"):
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    notifications = [
+        Notification(
+            id=str(uuid7()),
+            user_id=user.id,
+            title=f"title {i}",
+            message="message",
+            status=status,
+            created_at=start + timedelta(minutes=i),
+        )
+        for i in range(count)
+    ]
+    session.add_all(notifications)
+    session.commit()
+    return notifications
+
+
+def test_mark_all_as_read_only_touches_current_user(engine, session, service, users):
+    add_notifications(session, users[0], 3)
+    add_notifications(session, users[1], 2)
+
+    updates = []
+    event.listen(
+        engine,
+        "before_cursor_execute",
+        lambda conn, cursor, statement, *args: updates.append(statement)
+        if statement.startswith("UPDATE notifications")
+        else None,
+    )
+
+    assert service.mark_notifications_as_read(users[0], session) == 3
+    assert len(updates) == 1
+    assert session.query(Notification).filter_by(user_id=users[1].id, status="unread").count() == 2
+
+    with pytest.raises(HTTPException) as exc:
+        service.mark_notifications_as_read(users[0], session)
+    assert exc.value.status_code == 404
+
+
+def test_unread_counter_is_maintained(session, service, users):
+    user = users[0]
+    add_notifications(session, user, 2)
+
+    # counter is backfilled from the notifications table on first use
+    assert service.get_unread_count(user, session) == 2
+
+    sent = service.send_notification("new", "message", user, session)
+    assert service.get_unread_count(user, session) == 3
+
+    service.mark_notification_as_read(sent.id, user, session)
+    assert service.get_unread_count(user, session) == 2
+
+    service.mark_notifications_as_read(user, session)
+    assert service.get_unread_count(user, session) == 0
+
+
+def test_feed_is_cursor_paginated(session, service, users):
+    notifications = add_notifications(session, users[0], 5)
+    add_notifications(session, users[1], 3)
+    newest_first = [n.id for n in reversed(notifications)]
+
+    page = service.get_current_user_notifications(users[0], session, limit=2)
+    seen = [n.id for n in page["notifications"]]
+    while page["next_cursor"]:
+        page = service.get_current_user_notifications(
+            users[0], session, limit=2, cursor=page["next_cursor"]
+        )
+        seen += [n.id for n in page["notifications"]]
+
+    assert seen == newest_first
+
+
+def test_feed_filters_by_status_and_rejects_bad_cursor(session, service, users):
+    add_notifications(session, users[0], 2)
+    add_notifications(session, users[0], 1, status="read")
+
+    page = service.get_current_user_notifications(users[0], session, status="read")
+    assert [n.status for n in page["notifications"]] == ["read"]
+    assert page["next_cursor"] is None
+
+    with pytest.raises(HTTPException) as exc:
+        service.get_current_user_notifications(users[0], session, cursor="not-a-cursor")
+    assert exc.value.status_code == 400
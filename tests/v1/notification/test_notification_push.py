@@ -0,0 +1,100 @@
+import asyncio
+import threading
+
+import pytest
+from fastapi.testclient import TestClient
+from uuid_extensions import uuid7
+
+from main import app
+from api.core.pubsub import BrokerBackend, PubSubBus, notification_bus, run_broker
+from api.v1.services.notification import notification_service
+from api.v1.services.user import user_service
+
+
+@pytest.mark.asyncio
+async def test_publish_from_worker_thread_reaches_subscribers():
+    bus = PubSubBus(queue_size=10)
+    await bus.start()
+
+    with bus.subscribe("topic") as subscription:
+        thread = threading.Thread(target=bus.publish, args=("topic", {"n": 1}))
+        thread.start()
+        thread.join()
+
+        assert await subscription.get(timeout=1) == {"n": 1}
+
+    assert bus.subscriber_count("topic") == 0
+    await bus.stop()
+
+
+@pytest.mark.asyncio
+async def test_slow_subscriber_drops_oldest_messages():
+    bus = PubSubBus(queue_size=2)
+    await bus.start()
+
+    with bus.subscribe("topic") as subscription:
+        for n in range(5):
+            bus.publish("topic", n)
+
+        assert subscription.dropped == 3
+        assert [await subscription.get(timeout=1) for _ in range(2)] == [3, 4]
+
+    await bus.stop()
+
+
+@pytest.mark.asyncio
+async def test_broker_relays_between_workers(unused_tcp_port):
+    broker = asyncio.create_task(run_broker("127.0.0.1", unused_tcp_port))
+    await asyncio.sleep(0.1)
+
+    workers = [
+        PubSubBus(backend=BrokerBackend("127.0.0.1", unused_tcp_port, reconnect_delay=0.05))
+        for _ in range(2)
+    ]
+    for worker in workers:
+        await worker.start()
+        await worker.backend.wait_connected()
+
+    with workers[1].subscribe("topic") as remote, workers[0].subscribe("topic") as local:
+        workers[0].publish("topic", {"hello": "world"})
+
+        assert await remote.get(timeout=2) == {"hello": "world"}
+        assert await local.get(timeout=2) == {"hello": "world"}
+        # the broker does not echo messages back to the publisher
+        with pytest.raises(asyncio.TimeoutError):
+            await local.get(timeout=0.2)
+
+    for worker in workers:
+        await worker.stop()
+    # let the broker see the workers disconnect before shutting it down
+    await asyncio.sleep(0.1)
+    broker.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await broker
+
+
+def test_websocket_receives_published_notification():
+    user_id = str(uuid7())
+    token = user_service.create_access_token(user_id)
+    client = TestClient(app)
+
+    with client.websocket_connect(f"/api/v1/notifications/ws?token={token}") as websocket:
+        topic = notification_service.notification_topic(user_id)
+        for _ in range(100):
+            if notification_bus.subscriber_count(topic):
+                break
+            threading.Event().wait(0.01)
+
+        notification_bus.publish(topic, {"id": "1", "title": "Hello"})
+
+        assert websocket.receive_json() == {
+            "type": "notification",
+            "data": {"id": "1", "title": "Hello"},
+        }
+
+
+def test_push_requires_a_valid_token():
+    client = TestClient(app)
+
+    assert client.get("/api/v1/notifications/stream").status_code == 401
+    assert client.get("/api/v1/notifications/stream?token=invalid").status_code == 401
@@ -121,6 +121,7 @@ def test_get_products_for_organisation_user_belongs(
 
 ### Test for user not in Organisation
 def test_get_products_for_organisation_user_not_belong(
+    mocker,
     mock_db_session,
     another_user,
     test_organisation,
@@ -129,6 +130,9 @@ def test_get_products_for_organisation_user_not_belong(
 ):
     # Ensure the organisation does not contain another_user
     test_organisation.users = []
+    mocker.patch(
+        "api.utils.db_validators.membership_service.is_member", return_value=False
+    )
 
     # Mock the `get` method for `Organisation`
     def mock_get(model, ident):
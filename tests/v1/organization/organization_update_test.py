@@ -9,6 +9,7 @@ from api.v1.services.user import user_service
 from api.v1.models import User
 from api.v1.models.organisation import Organisation
 from api.v1.services.organisation import organisation_service
+from api.v1.services.permissions.permission_resolver import permission_resolver
 from main import app
 
 
@@ -49,16 +50,21 @@ def client(db_session_mock):
     app.dependency_overrides = {}
 
 
-def test_update_organisation_success(client, db_session_mock):
+@pytest.fixture
+def has_permission():
+    with patch.object(permission_resolver, "has_permission", return_value=True) as has_permission:
+        yield has_permission
+
+
+def test_update_organisation_success(client, db_session_mock, has_permission):
     """Test to successfully update an existing organisation"""
 
     org_id = "existing-org-id"
     current_user = mock_get_current_user()  # Get the actual user object
     app.dependency_overrides[user_service.get_current_user] = lambda: current_user
 
-    # Mock the organisation fetch and user role retrieval
+    # Mock the organisation fetch
     organisation_service.fetch = MagicMock(return_value=mock_org())
-    organisation_service.get_organisation_user_role = MagicMock(return_value="admin")
 
     db_session_mock.commit.return_value = None
     db_session_mock.refresh.return_value = None
@@ -81,9 +87,37 @@ def test_update_organisation_success(client, db_session_mock):
     assert response.status_code == 200
     assert response.json()["message"] == "Organisation updated successfully"
     assert response.json()["data"]["name"] == "Updated Organisation"
+    has_permission.assert_called_once_with(
+        db_session_mock, current_user.id, org_id, "manage_organisation"
+    )
+
+
+def test_update_organisation_forbidden(client, db_session_mock, has_permission):
+    """Test to fail updating an organisation without the manage_organisation permission"""
+
+    has_permission.return_value = False
+    app.dependency_overrides[user_service.get_current_user] = mock_get_current_user
+
+    response = client.patch(
+        "/api/v1/organisations/existing-org-id",
+        headers={"Authorization": "Bearer token"},
+        json={
+            "name": "Updated Organisation",
+            "email": "updated@gmail.com",
+            "industry": "Tech",
+            "type": "Tech",
+            "country": "Nigeria",
+            "state": "Lagos",
+            "address": "Ikorodu, Lagos",
+            "description": "Ikorodu",
+        },
+    )
+
+    assert response.status_code == 403
+    db_session_mock.commit.assert_not_called()
 
 
-def test_update_organisation_missing_field(client, db_session_mock):
+def test_update_organisation_missing_field(client, db_session_mock, has_permission):
     """Test to fail updating an organisation due to missing fields"""
 
     org_id = "existing-org-id"
@@ -0,0 +1,235 @@
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import event, select
+from uuid_extensions import uuid7
+
+from main import app
+from api.db.database import get_db
+from api.v1.models import User, Organisation
+from api.v1.models.associations import user_organisation_association
+from api.v1.models.permissions.permissions import Permission
+from api.v1.models.permissions.role import Role
+from api.v1.models.permissions.user_org_role import user_organisation_roles
+from api.v1.services.organisation import organisation_service
+from api.v1.services.permissions import permission_resolver as resolver_module
+from api.v1.services.permissions.permission_resolver import PermissionResolver
+from api.v1.services.user import user_service
+
+
+@pytest.fixture
+def org_setup(session):
+    owner = User(id=str(uuid7()), email="owner@gmail.com")
+    org = Organisation(id=str(uuid7()), name="bulk org")
+    admin = Role(id=str(uuid7()), name="admin", is_builtin=True)
+    member = Role(id=str(uuid7()), name="user", is_builtin=True)
+    admin.permissions.append(Permission(id=str(uuid7()), title="manage_organisation"))
+    users = [User(id=str(uuid7()), email=f"user{i}@gmail.com") for i in range(4)]
+    session.add_all([owner, org, admin, member, *users])
+    session.commit()
+
+    session.execute(
+        user_organisation_association.insert().values(
+            user_id=owner.id, organisation_id=org.id, role="owner"
+        )
+    )
+    # users[2] is already a member without a role, users[3] is an admin
+    session.execute(
+        user_organisation_roles.insert(),
+        [
+            {"user_id": owner.id, "organisation_id": org.id, "role_id": admin.id},
+            {"user_id": users[2].id, "organisation_id": org.id, "role_id": None},
+            {"user_id": users[3].id, "organisation_id": org.id, "role_id": admin.id},
+        ],
+    )
+    session.commit()
+    return {"owner": owner, "org": org, "users": users, "roles": {"admin": admin, "user": member}}
+
+
+@pytest.fixture
+def client(session, org_setup, monkeypatch):
+    monkeypatch.setattr(resolver_module, "permission_resolver", PermissionResolver(ttl=60))
+    app.dependency_overrides[get_db] = lambda: session
+    app.dependency_overrides[user_service.get_current_user] = lambda: org_setup["owner"]
+    yield TestClient(app)
+    app.dependency_overrides = {}
+
+
+def test_bulk_add_reports_per_row_outcomes(client, session, org_setup, engine):
+    org, users = org_setup["org"], org_setup["users"]
+    inserts = []
+    event.listen(
+        engine,
+        "before_cursor_execute",
+        lambda conn, cursor, statement, *args: inserts.append(statement)
+        if statement.startswith("INSERT INTO user_organisation_roles")
+        else None,
+    )
+
+    response = client.post(
+        f"/api/v1/organisations/{org.id}/users/bulk",
+        json={
+            "members": [
+                {"user_id": users[0].id, "role": "admin"},
+                {"email": users[1].email},
+                {"user_id": users[2].id, "role": "user"},
+                {"user_id": users[3].id, "role": "admin"},
+                {"user_id": users[3].id, "role": "user"},
+                {"user_id": users[0].id, "role": "user"},
+                {"user_id": str(uuid7())},
+                {"email": users[1].email, "role": "unknown"},
+            ]
+        },
+    )
+
+    assert response.status_code == 200
+    data = response.json()["data"]
+    assert [row["outcome"] for row in data["results"]] == [
+        "added",
+        "added",
+        "role_assigned",
+        "already_member",
+        "duplicate",
+        "duplicate",
+        "user_not_found",
+        "role_not_found",
+    ]
+    assert data["summary"]["added"] == 2
+    assert len(inserts) == 1
+
+    roles = dict(
+        session.execute(
+            select(user_organisation_roles.c.user_id, user_organisation_roles.c.role_id).where(
+                user_organisation_roles.c.organisation_id == org.id
+            )
+        ).all()
+    )
+    assert roles == {
+        org_setup["owner"].id: org_setup["roles"]["admin"].id,
+        users[0].id: org_setup["roles"]["admin"].id,
+        users[1].id: org_setup["roles"]["user"].id,
+        users[2].id: org_setup["roles"]["user"].id,
+        users[3].id: org_setup["roles"]["admin"].id,
+    }
+
+
+def test_bulk_added_users_are_listed_and_pass_admin_checks(client, session, org_setup):
+    org, users = org_setup["org"], org_setup["users"]
+
+    response = client.post(
+        f"/api/v1/organisations/{org.id}/users/bulk",
+        json={
+            "members": [
+                {"user_id": users[0].id, "role": "admin"},
+                {"user_id": users[1].id},
+                {"user_id": org_setup["owner"].id, "role": "user"},
+            ]
+        },
+    )
+    assert response.status_code == 200
+    # the owner already holds the admin role
+    assert response.json()["data"]["results"][2]["outcome"] == "role_conflict"
+
+    legacy_roles = dict(
+        session.execute(
+            select(user_organisation_association.c.user_id, user_organisation_association.c.role).where(
+                user_organisation_association.c.organisation_id == org.id
+            )
+        ).all()
+    )
+    assert legacy_roles == {
+        org_setup["owner"].id: "owner",
+        users[0].id: "admin",
+        users[1].id: "user",
+    }
+    organisation_service.check_user_role_in_org(session, users[0], org, "admin")
+
+    listed = client.get(f"/api/v1/organisations/{org.id}/users", params={"limit": 10})
+    assert listed.status_code == 200
+    assert {user["id"] for user in listed.json()["data"]["items"]} >= {users[0].id, users[1].id}
+
+
+def test_bulk_add_leaves_legacy_only_members_untouched(client, session, org_setup):
+    org, users = org_setup["org"], org_setup["users"]
+    legacy_admin = User(id=str(uuid7()), email="legacy@gmail.com")
+    session.add(legacy_admin)
+    session.commit()
+    session.execute(
+        user_organisation_association.insert().values(
+            user_id=legacy_admin.id, organisation_id=org.id, role="admin", status="suspended"
+        )
+    )
+    session.commit()
+
+    response = client.post(
+        f"/api/v1/organisations/{org.id}/users/bulk",
+        json={
+            "members": [
+                {"user_id": legacy_admin.id, "role": "user"},
+                {"email": legacy_admin.email, "role": "admin"},
+                {"user_id": users[0].id},
+            ]
+        },
+    )
+
+    assert response.status_code == 200
+    data = response.json()["data"]
+    assert [row["outcome"] for row in data["results"]] == [
+        "role_conflict",
+        "duplicate",
+        "added",
+    ]
+    legacy_row = session.execute(
+        select(user_organisation_association.c.role, user_organisation_association.c.status).where(
+            user_organisation_association.c.organisation_id == org.id,
+            user_organisation_association.c.user_id == legacy_admin.id,
+        )
+    ).one()
+    assert tuple(legacy_row) == ("admin", "suspended")
+    assert session.execute(
+        select(user_organisation_roles.c.user_id).where(
+            user_organisation_roles.c.organisation_id == org.id,
+            user_organisation_roles.c.user_id == legacy_admin.id,
+        )
+    ).first() is None
+
+
+def test_bulk_add_legacy_member_with_same_role_is_already_member(client, session, org_setup):
+    org = org_setup["org"]
+    legacy_admin = User(id=str(uuid7()), email="legacy@gmail.com")
+    session.add(legacy_admin)
+    session.commit()
+    session.execute(
+        user_organisation_association.insert().values(
+            user_id=legacy_admin.id, organisation_id=org.id, role="admin"
+        )
+    )
+    session.commit()
+
+    response = client.post(
+        f"/api/v1/organisations/{org.id}/users/bulk",
+        json={"members": [{"user_id": legacy_admin.id, "role": "admin"}]},
+    )
+
+    assert response.status_code == 200
+    assert response.json()["data"]["results"][0]["outcome"] == "already_member"
+
+
+def test_bulk_add_requires_manage_organisation(client, session, org_setup):
+    outsider = User(id=str(uuid7()), email="outsider@gmail.com")
+    session.add(outsider)
+    session.commit()
+    app.dependency_overrides[user_service.get_current_user] = lambda: outsider
+
+    response = client.post(
+        f"/api/v1/organisations/{org_setup['org'].id}/users/bulk",
+        json={"members": [{"user_id": org_setup["users"][0].id}]},
+    )
+
+    assert response.status_code == 403
+
+
+def test_bulk_add_validates_payload(client, org_setup):
+    url = f"/api/v1/organisations/{org_setup['org'].id}/users/bulk"
+
+    assert client.post(url, json={"members": []}).status_code == 422
+    assert client.post(url, json={"members": [{"role": "user"}]}).status_code == 422
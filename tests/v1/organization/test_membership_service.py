@@ -0,0 +1,84 @@
+import pytest
+from uuid_extensions import uuid7
+
+from api.v1.models.associations import user_organisation_association
+from api.v1.models.permissions.user_org_role import user_organisation_roles
+from api.v1.services.membership import MembershipService
+
+
+@pytest.fixture
+def service():
+    return MembershipService(ttl=60)
+
+
+def test_member_via_user_organisation(session, service):
+    user_id, org_id = str(uuid7()), str(uuid7())
+    session.execute(
+        user_organisation_association.insert().values(
+            user_id=user_id, organisation_id=org_id, role="user", status="member"
+        )
+    )
+
+    assert service.is_member(session, user_id, org_id) is True
+    assert service.is_member(session, user_id, str(uuid7())) is False
+
+
+def test_member_via_organisation_roles(session, service):
+    user_id, org_id = str(uuid7()), str(uuid7())
+    session.execute(
+        user_organisation_roles.insert().values(
+            user_id=user_id, organisation_id=org_id, status="active"
+        )
+    )
+
+    assert service.is_member(session, user_id, org_id) is True
+
+
+def test_answers_are_cached_until_invalidated(session, service, mocker):
+    user_id, org_id = str(uuid7()), str(uuid7())
+    query = mocker.spy(service, "_query_membership")
+
+    assert service.is_member(session, user_id, org_id) is False
+    session.commit()
+    assert service.is_member(session, user_id, org_id) is False
+    assert query.call_count == 1
+
+    session.execute(
+        user_organisation_association.insert().values(
+            user_id=user_id, organisation_id=org_id, role="user", status="member"
+        )
+    )
+    session.commit()
+    service.invalidate(user_id, org_id, db=session)
+
+    assert service.is_member(session, user_id, org_id) is True
+    assert query.call_count == 2
+
+
+def test_session_cache_is_dropped_at_transaction_end(session, service):
+    user_id, org_id = str(uuid7()), str(uuid7())
+
+    service.is_member(session, user_id, org_id)
+    assert session.info[MembershipService.SESSION_CACHE_KEY]
+
+    session.commit()
+    assert MembershipService.SESSION_CACHE_KEY not in session.info
+
+
+def test_change_in_another_worker_invalidates(session_factory, service):
+    user_id, org_id = str(uuid7()), str(uuid7())
+    with session_factory() as db:
+        assert service.is_member(db, user_id, org_id) is False
+
+    # another worker adds the user, without access to this cache
+    with session_factory() as db:
+        db.execute(
+            user_organisation_association.insert().values(
+                user_id=user_id, organisation_id=org_id, role="user", status="member"
+            )
+        )
+        MembershipService.bump(db)
+        db.commit()
+
+    with session_factory() as db:
+        assert service.is_member(db, user_id, org_id) is True
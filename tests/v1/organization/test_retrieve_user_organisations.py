@@ -0,0 +1,121 @@
+import pytest
+from sqlalchemy import event
+from uuid_extensions import uuid7
+
+from api.v1.models import User, Organisation
+from api.v1.models.associations import user_organisation_association
+from api.v1.models.permissions.role import Role
+from api.v1.models.permissions.user_org_role import user_organisation_roles
+from api.v1.services.organisation import OrganisationService
+
+
+@pytest.fixture
+def service():
+    return OrganisationService()
+
+
+@pytest.fixture
+def user(session):
+    user = User(id=str(uuid7()), email="member@gmail.com")
+    session.add(user)
+    session.commit()
+    return user
+
+
+def add_org(session, name):
+    org = Organisation(id=str(uuid7()), name=name)
+    session.add(org)
+    session.commit()
+    return org
+
+
+def test_each_organisation_gets_its_own_roles(session, service, user):
+    admin = Role(id=str(uuid7()), name="admin", is_builtin=True)
+    custom = Role(id=str(uuid7()), name="reviewer", is_builtin=False)
+    session.add_all([admin, custom])
+    owned, invited, legacy = (add_org(session, name) for name in ("a", "b", "c"))
+
+    session.execute(
+        user_organisation_association.insert().values(
+            user_id=user.id, organisation_id=owned.id, role="owner"
+        )
+    )
+    session.execute(
+        user_organisation_roles.insert().values(
+            user_id=user.id, organisation_id=owned.id, role_id=admin.id, is_owner=True
+        )
+    )
+    session.execute(
+        user_organisation_roles.insert().values(
+            user_id=user.id, organisation_id=invited.id, role_id=custom.id
+        )
+    )
+    session.execute(
+        user_organisation_association.insert().values(
+            user_id=user.id, organisation_id=legacy.id, role="user"
+        )
+    )
+    add_org(session, "not a member")
+    session.commit()
+
+    organisations = service.retrieve_user_organizations(user, session)
+
+    assert {org.name: org.user_role for org in organisations} == {
+        "a": ["owner", "admin"],
+        "b": ["reviewer"],
+        "c": ["user"],
+    }
+
+
+def test_organisations_are_cached_until_invalidated(engine, session, service, user):
+    org = add_org(session, "a")
+    session.execute(
+        user_organisation_association.insert().values(
+            user_id=user.id, organisation_id=org.id, role="owner"
+        )
+    )
+    session.commit()
+    assert len(service.retrieve_user_organizations(user, session)) == 1
+
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+
+    service.retrieve_user_organizations(user, session)
+    assert statements == []
+
+    other = add_org(session, "b")
+    session.execute(
+        user_organisation_association.insert().values(
+            user_id=user.id, organisation_id=other.id, role="user"
+        )
+    )
+    session.commit()
+    service.invalidate_user_organisations(user.id)
+
+    assert len(service.retrieve_user_organizations(user, session)) == 2
+
+
+def test_user_without_organisations(session, service, user):
+    assert service.retrieve_user_organizations(user, session) == []
+
+
+def test_rename_in_another_worker_invalidates(session, session_factory, service, user):
+    org = add_org(session, "a")
+    session.execute(
+        user_organisation_association.insert().values(
+            user_id=user.id, organisation_id=org.id, role="owner"
+        )
+    )
+    session.commit()
+    [cached] = service.retrieve_user_organizations(user, session)
+    session.commit()
+
+    # another worker renames the organisation, without access to this cache
+    with session_factory() as db:
+        db.get(Organisation, cached.id).name = "renamed"
+        OrganisationService.bump(db)
+        db.commit()
+
+    [organisation] = service.retrieve_user_organizations(user, session)
+    assert cached.name == "a"
+    assert organisation.name == "renamed"
@@ -0,0 +1,165 @@
+import pytest
+from fastapi import APIRouter, Depends, FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+from uuid_extensions import uuid7
+
+from api.db.database import get_db
+from api.v1.models import User, Organisation  # noqa: F401
+from api.v1.models.permissions.role import Role
+from api.v1.models.permissions.permissions import Permission
+from api.v1.models.permissions.user_org_role import user_organisation_roles
+from api.v1.services.user import user_service
+from api.v1.services.permissions import permission_resolver as resolver_module
+from api.v1.services.permissions.permission_resolver import (
+    PermissionResolver,
+    require_permission,
+)
+
+
+@pytest.fixture
+def seeded(session):
+    admin = Role(id=str(uuid7()), name="admin", is_builtin=True)
+    member = Role(id=str(uuid7()), name="user", is_builtin=True)
+    manage = Permission(id=str(uuid7()), title="manage_organisation")
+    view = Permission(id=str(uuid7()), title="view_user")
+    admin.permissions.extend([manage, view])
+    member.permissions.append(view)
+    session.add_all([admin, member])
+    session.commit()
+
+    user_id, org_id = str(uuid7()), str(uuid7())
+    session.execute(
+        user_organisation_roles.insert().values(
+            user_id=user_id, organisation_id=org_id, role_id=member.id
+        )
+    )
+    session.commit()
+    return {"admin": admin, "user": member, "user_id": user_id, "org_id": org_id}
+
+
+@pytest.fixture
+def resolver():
+    return PermissionResolver(ttl=60)
+
+
+def count_queries(engine):
+    statements = []
+    event.listen(
+        engine,
+        "before_cursor_execute",
+        lambda *args: statements.append(args[2]),
+    )
+    return statements
+
+
+def test_effective_permissions(session, seeded, resolver):
+    user_id, org_id = seeded["user_id"], seeded["org_id"]
+
+    assert resolver.get_permissions(session, user_id, org_id) == {"view_user"}
+    assert resolver.has_permission(session, user_id, org_id, "view_user")
+    assert not resolver.has_permission(session, user_id, org_id, "manage_organisation")
+    assert not resolver.has_permission(session, user_id, org_id, "unknown")
+    assert not resolver.has_permission(session, user_id, str(uuid7()), "view_user")
+
+
+def test_cache_hit_runs_no_queries(engine, session, seeded, resolver):
+    user_id, org_id = seeded["user_id"], seeded["org_id"]
+    resolver.has_permission(session, user_id, org_id, "view_user")
+
+    statements = count_queries(engine)
+    assert resolver.has_permission(session, user_id, org_id, "view_user")
+    assert statements == []
+
+
+def test_cache_hit_reads_only_the_version(engine, session, seeded, resolver):
+    user_id, org_id = seeded["user_id"], seeded["org_id"]
+    resolver.has_permission(session, user_id, org_id, "view_user")
+    session.commit()
+
+    statements = count_queries(engine)
+    assert resolver.has_permission(session, user_id, org_id, "view_user")
+    assert resolver.has_permission(session, user_id, org_id, "view_user")
+    assert len(statements) == 1
+    assert "cache_versions" in statements[0]
+
+
+def test_change_in_another_worker_invalidates(session_factory, seeded, resolver):
+    user_id, org_id = seeded["user_id"], seeded["org_id"]
+    with session_factory() as db:
+        assert not resolver.has_permission(db, user_id, org_id, "manage_organisation")
+
+    # another worker assigns the admin role, with its own resolver
+    with session_factory() as db:
+        db.execute(
+            user_organisation_roles.update()
+            .where(user_organisation_roles.c.user_id == user_id)
+            .values(role_id=seeded["admin"].id)
+        )
+        PermissionResolver.bump(db)
+        db.commit()
+
+    with session_factory() as db:
+        assert resolver.has_permission(db, user_id, org_id, "manage_organisation")
+
+
+def test_role_assignment_invalidates_user(session, seeded, resolver):
+    user_id, org_id = seeded["user_id"], seeded["org_id"]
+    assert not resolver.has_permission(session, user_id, org_id, "manage_organisation")
+
+    session.execute(
+        user_organisation_roles.update()
+        .where(user_organisation_roles.c.user_id == user_id)
+        .values(role_id=seeded["admin"].id)
+    )
+    session.commit()
+    resolver.invalidate_user(user_id, org_id)
+
+    assert resolver.has_permission(session, user_id, org_id, "manage_organisation")
+
+
+def test_permission_change_bumps_version(session, seeded, resolver):
+    user_id, org_id = seeded["user_id"], seeded["org_id"]
+    resolver.get_permissions(session, user_id, org_id)
+    version = resolver.version
+
+    manage = session.query(Permission).filter_by(title="manage_organisation").one()
+    seeded["user"].permissions.append(manage)
+    session.commit()
+    resolver.invalidate_roles()
+
+    assert resolver.version == version + 1
+    assert resolver.get_permissions(session, user_id, org_id) == {
+        "view_user",
+        "manage_organisation",
+    }
+
+
+def test_require_permission_dependency(session, seeded, monkeypatch):
+    monkeypatch.setattr(resolver_module, "permission_resolver", PermissionResolver(ttl=60))
+    current_user = User(id=seeded["user_id"], email="member@gmail.com", is_superadmin=False)
+
+    router = APIRouter()
+
+    @router.get("/{org_id}/view", dependencies=[Depends(require_permission("view_user"))])
+    def view(org_id: str):
+        return {"ok": True}
+
+    @router.get(
+        "/{org_id}/manage",
+        dependencies=[Depends(require_permission("manage_organisation"))],
+    )
+    def manage(org_id: str):
+        return {"ok": True}
+
+    app = FastAPI()
+    app.include_router(router)
+    app.dependency_overrides[get_db] = lambda: session
+    app.dependency_overrides[user_service.get_current_user] = lambda: current_user
+    client = TestClient(app)
+
+    assert client.get(f"/{seeded['org_id']}/view").status_code == 200
+    assert client.get(f"/{seeded['org_id']}/manage").status_code == 403
+
+    current_user.is_superadmin = True
+    assert client.get(f"/{seeded['org_id']}/manage").status_code == 200
@@ -0,0 +1,101 @@
+import asyncio
+
+import pytest
+from fastapi import FastAPI, HTTPException
+
+from api.v1.models.api_status import APIStatus, APIStatusSample
+from api.v1.services.api_prober import ApiProber, load_targets
+from api.v1.services.api_status import percentile
+
+
+probed_app = FastAPI()
+calls = {"flaky": 0}
+
+
+@probed_app.get("/fast")
+async def fast():
+    return {"ok": True}
+
+
+@probed_app.get("/slow")
+async def slow():
+    await asyncio.sleep(0.05)
+    return {"ok": True}
+
+
+@probed_app.get("/flaky")
+async def flaky():
+    calls["flaky"] += 1
+    if calls["flaky"] % 2:
+        raise HTTPException(status_code=503)
+    return {"ok": True}
+
+
+@probed_app.get("/down")
+async def down():
+    raise HTTPException(status_code=500)
+
+
+@pytest.fixture
+def prober(session_factory, monkeypatch):
+    monkeypatch.setattr("api.utils.settings.settings.API_PROBE_DEGRADED_MS", 30)
+    targets = load_targets(
+        '{"Fast API": ["GET /fast"], "Slow API": ["GET /slow"], '
+        '"Flaky API": ["GET /flaky", "GET /fast"], "Down API": ["GET /down"]}'
+    )
+    return ApiProber(session_factory=session_factory, targets=targets, samples=4)
+
+
+def test_percentile():
+    values = [5, 1, 4, 2, 3]
+    assert percentile(values, 50) == 3
+    assert percentile(values, 95) == 5
+    assert percentile(values, 0) == 1
+    assert percentile([], 50) is None
+
+
+@pytest.mark.asyncio
+async def test_cycle_records_every_group(prober, session_factory):
+    async with ApiProber.client(probed_app) as client:
+        await prober.run_cycle(client)
+        await prober.run_cycle(client)
+
+    with session_factory() as db:
+        statuses = {row.api_group: row for row in db.query(APIStatus)}
+
+    # upserted, one row per group, with every cycle kept as history
+    assert len(statuses) == 4
+    with session_factory() as db:
+        assert db.query(APIStatusSample).count() == 8
+
+    assert statuses["Fast API"].status == "Operational"
+    assert statuses["Fast API"].error_rate == 0
+    assert statuses["Fast API"].response_time <= statuses["Fast API"].p95_response_time
+
+    assert statuses["Slow API"].status == "Degraded"
+    assert statuses["Slow API"].details == "High response time detected"
+
+    assert statuses["Flaky API"].status == "Degraded"
+    assert float(statuses["Flaky API"].error_rate) == 0.25
+    assert "HTTP 503" in statuses["Flaky API"].details
+
+    assert statuses["Down API"].status == "Down"
+    assert statuses["Down API"].response_time is None
+    assert statuses["Down API"].details == "GET /down: HTTP 500"
+
+
+@pytest.mark.asyncio
+async def test_prober_runs_a_cycle_against_the_app(prober, session_factory):
+    rows = await prober.run(probed_app)
+
+    assert {row["api_group"]: row["status"] for row in rows}["Down API"] == "Down"
+    with session_factory() as db:
+        assert db.query(APIStatus).count() == 4
+
+
+def test_probe_is_scheduled():
+    from api.v1.services.scheduler import scheduler
+    from api.v1.services.tasks import api_probe
+
+    [job] = [job for job in scheduler.jobs if job.task is api_probe]
+    assert job.schedule.expression == "* * * * *"
@@ -0,0 +1,97 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi.testclient import TestClient
+
+from main import app
+from api.db.database import get_db
+from api.v1.models.api_status import APIStatus, APIStatusRollup, APIStatusSample
+from api.v1.services.api_status import APIStatusService
+from api.v1.services.api_status_history import api_status_history_service
+
+
+def record(db, moment, status="Operational", response_time=100, group="Blog API"):
+    APIStatusService.upsert_many(
+        db,
+        [
+            {
+                "api_group": group,
+                "status": status,
+                "response_time": response_time,
+                "p95_response_time": response_time * 2,
+                "error_rate": 0 if status == "Operational" else 1,
+                "details": status,
+                "last_checked": moment,
+            }
+        ],
+    )
+
+
+@pytest.fixture
+def history(session):
+    now = datetime.now(timezone.utc)
+    # two days of probes every 15 minutes, down for the two hours before
+    # the last one
+    last_hour = now.replace(minute=0, second=0, microsecond=0)
+    for step in range(4 * 48):
+        moment = last_hour - timedelta(minutes=15 * step)
+        down = last_hour - timedelta(hours=3) <= moment < last_hour - timedelta(hours=1)
+        record(session, moment, status="Down" if down else "Operational", response_time=100 + step % 4)
+    api_status_history_service.rollup(session, "hour", now - timedelta(days=3))
+    api_status_history_service.rollup(session, "day", now - timedelta(days=3))
+    return now
+
+
+def test_samples_are_appended_and_status_upserted(session, history):
+    assert session.query(APIStatus).count() == 1
+    assert session.query(APIStatusSample).count() == 4 * 48
+
+
+def test_rollups_summarise_samples(session, history):
+    hours = session.query(APIStatusRollup).filter_by(period="hour").all()
+    assert sum(rollup.samples for rollup in hours) == 4 * 48
+    assert sum(rollup.samples - rollup.up_samples for rollup in hours) == 8
+
+    hour = hours[0]
+    assert float(hour.response_time_p50) in (101, 102)
+    assert float(hour.response_time_p95) == 206
+
+    # recomputing a bucket replaces its rollup
+    api_status_history_service.rollup(session, "hour", history - timedelta(days=3))
+    assert session.query(APIStatusRollup).filter_by(period="hour").count() == len(hours)
+
+
+def test_summary_reports_uptime_latency_and_incidents(session, history):
+    [summary] = api_status_history_service.summary(session)
+
+    assert summary["api_group"] == "Blog API"
+    assert summary["uptime"] == round((4 * 48 - 8) / (4 * 48) * 100, 3)
+    assert 100 <= summary["response_time_p50"] <= 103
+    assert summary["response_time_p95"] == 206
+
+    [incident] = summary["incidents"]
+    assert incident["status"] == "Down"
+    assert incident["end"] - incident["start"] == timedelta(hours=2)
+
+
+def test_old_history_is_purged(session, history, monkeypatch):
+    monkeypatch.setattr("api.utils.settings.settings.API_STATUS_SAMPLE_RETENTION_DAYS", 1)
+    purged = api_status_history_service.purge(session)
+
+    assert purged["samples"] > 0
+    assert purged["hourly"] == purged["daily"] == 0
+    oldest = min(sample.checked_at for sample in session.query(APIStatusSample))
+    assert oldest.replace(tzinfo=timezone.utc) >= history - timedelta(days=1)
+
+
+def test_get_api_status(session, history):
+    app.dependency_overrides[get_db] = lambda: session
+    try:
+        response = TestClient(app).get("/api/v1/api-status", params={"days": 30})
+        assert response.status_code == 200
+        [group] = response.json()["data"]
+        assert group["status"] == "Operational"
+        assert group["uptime"] < 100
+        assert len(group["incidents"]) == 1
+    finally:
+        app.dependency_overrides = {}
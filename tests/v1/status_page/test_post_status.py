@@ -56,7 +56,7 @@ def test_post_api_status(mock_create, db_session_mock, client):
 
     assert response.status_code == 201
 
-@patch("api.v1.services.api_status.APIStatusService.fetch_all")
+@patch("api.v1.routes.api_status.api_status_history_service.summary")
 def test_get_api_status(mock_fetch, db_session_mock, client):
     """Tests the GET /api/v1/api-status endpoint to ensure retrieval of API status"""
 
@@ -64,7 +64,7 @@ def test_get_api_status(mock_fetch, db_session_mock, client):
     db_session_mock.commit.return_value = None
     db_session_mock.refresh.return_value = None
 
-    mock_fetch.return_value = mock_post_api_status()
+    mock_fetch.return_value = [mock_post_api_status()]
 
     response = client.get('/api/v1/api-status')
 
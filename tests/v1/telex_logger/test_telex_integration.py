@@ -1,95 +1,138 @@
-import pytest
-import datetime
+import asyncio
 import json
-from unittest.mock import AsyncMock, patch
-from api.utils.send_logs import send_error_to_telex
-from api.utils.settings import settings
-from api.utils.logger import logger
+from unittest.mock import AsyncMock, MagicMock, patch
 
-mock_webhook = "http://test-webhook.com" or settings.TELEX_WEBHOOK_URL
+import pytest
 
+from api.utils.send_logs import TelexReporter, fingerprint
 
-@pytest.mark.asyncio
-@patch("httpx.AsyncClient.post", new_callable=AsyncMock)
-@patch("api.utils.send_logs.TELEX_WEBHOOK_URL", mock_webhook)
-async def test_send_error_to_telex_success(mock_post):
-    """Test handling failure when sending error log to Telex"""
-
-    mock_post.return_value.status_code = 200
-
-    request_method = "GET"
-    request_url_path = "/test-endpoint"
-    exc = Exception("Test Exception")
-    exc.status_code = 500
-
-    await send_error_to_telex(request_method, request_url_path, exc)
-
-    timestamp = datetime.datetime.utcnow().strftime("%Y-%m-%d %H:%M")
-
-    expected_payload = {
-        "status": "error",
-        "username": "hng_boilerplate",
-        "message": json.dumps(
-            {
-                "timestamp": timestamp,
-                "event_name": "server_error",
-                "request_method": request_method,
-                "request_path": request_url_path,
-                "status_code": 500,
-                "error_message": "An unexpected error occurred: Test Exception",
-            },
-            indent=4,
-        ),
-        "event_name": "🚨 Internal Server Error",
-    }
-
-    mock_post.assert_awaited_once()
+mock_webhook = "http://test-webhook.com"
+
+
+@pytest.fixture(autouse=True)
+def telex_settings(monkeypatch):
+    monkeypatch.setattr("api.utils.settings.settings.TELEX_WEBHOOK_URL", mock_webhook)
+    monkeypatch.setattr("api.utils.settings.settings.TELEX_BATCH_SIZE", 2)
+    monkeypatch.setattr("api.utils.settings.settings.TELEX_BUFFER_SIZE", 3)
+    monkeypatch.setattr("api.utils.settings.settings.TELEX_BREAKER_THRESHOLD", 2)
+
+
+def raised(message, cls=Exception):
+    try:
+        raise cls(message)
+    except Exception as exc:
+        return exc
+
+
+def sent_errors(mock_post):
     args, kwargs = mock_post.await_args
     assert args[0] == mock_webhook
-    assert kwargs["json"]["username"] == expected_payload["username"]
-    assert kwargs["json"]["event_name"] == expected_payload["event_name"]
+    assert kwargs["json"]["username"] == "hng_boilerplate"
+    return json.loads(kwargs["json"]["message"])
 
-    actual_message = json.loads(kwargs["json"]["message"])
-    expected_message = json.loads(expected_payload["message"])
 
-    assert actual_message["status_code"] == expected_message["status_code"]
-    assert actual_message["error_message"] == expected_message["error_message"]
-    assert actual_message["timestamp"] == expected_message["timestamp"]
+def test_identical_errors_share_a_fingerprint():
+    first, second = raised("user 1 not found"), raised("user 2 not found")
+    # raised on the same line
+    assert fingerprint("GET", "/users/{id}", first) == fingerprint("GET", "/users/{id}", second)
+    assert fingerprint("GET", "/users/{id}", first) != fingerprint("POST", "/users/{id}", first)
+    assert fingerprint("GET", "/x", Exception("a")) != fingerprint("GET", "/x", Exception("b"))
 
 
 @pytest.mark.asyncio
 @patch("httpx.AsyncClient.post", new_callable=AsyncMock)
-@patch("api.utils.logger.logger.exception")
-@patch("api.utils.send_logs.TELEX_WEBHOOK_URL", mock_webhook)
-async def test_send_error_to_telex_failure(mock_logger, mock_post):
-    """Test handling failure when sending error log to Telex"""
+async def test_errors_are_grouped_and_sent_in_batches(mock_post):
+    mock_post.return_value = MagicMock(status_code=200)
+    reporter = TelexReporter()
+
+    for _ in range(5):
+        reporter.report("GET", "/test-endpoint", raised("Test Exception"))
+    reporter.report("POST", "/other", raised("Other"))
+    reporter.report("POST", "/third", raised("Third", ValueError))
+    mock_post.assert_not_awaited()
 
-    mock_post.side_effect = Exception("HTTP error")
+    assert await reporter.flush()
+    message = sent_errors(mock_post)
+    assert message["occurrences"] == 6
+    first, second = message["errors"]
+    assert (first["request_path"], first["count"], first["status_code"]) == ("/test-endpoint", 5, 500)
+    assert first["error_message"] == "An unexpected error occurred: Test Exception"
+    assert second["request_path"] == "/other"
 
-    request_method = "POST"
-    request_url_path = "/fail-endpoint"
-    exc = Exception("Another Test Exception")
+    # the rest waits for the next flush
+    assert await reporter.flush()
+    [third] = sent_errors(mock_post)["errors"]
+    assert third["request_path"] == "/third"
+    assert mock_post.await_count == 2
+    await reporter.stop()
 
-    await send_error_to_telex(request_method, request_url_path, exc)
 
-    mock_logger.assert_called_once_with("Failed to send error log to Telex: HTTP error")
+def test_buffer_is_capped():
+    reporter = TelexReporter()
+    for path in ("/a", "/b", "/c", "/d", "/e"):
+        reporter.report("GET", path, raised(path))
+    reporter.report("GET", "/a", raised("/a"))
 
-    mock_post.assert_awaited_once()
+    assert len(reporter.buffer) == 3 and reporter.dropped == 2
+    assert next(iter(reporter.buffer.values()))["count"] == 2
 
 
 @pytest.mark.asyncio
 @patch("httpx.AsyncClient.post", new_callable=AsyncMock)
 @patch("api.utils.logger.logger.error")
-@patch("api.utils.send_logs.TELEX_WEBHOOK_URL", None)
-async def test_send_error_to_telex_missing_webhook(mock_logger, mock_post):
-    """Test that function does nothing if TELEX_WEBHOOK_URL is missing"""
+async def test_failures_keep_errors_and_open_the_breaker(mock_logger, mock_post):
+    mock_post.side_effect = Exception("HTTP error")
+    reporter = TelexReporter()
+    reporter.report("POST", "/fail-endpoint", raised("Another Test Exception"))
+
+    assert not await reporter.flush()
+    mock_logger.assert_called_once_with("Failed to send error reports to Telex: HTTP error")
+    reporter.report("POST", "/fail-endpoint", raised("Another Test Exception"))
+    assert not await reporter.flush()
+    assert mock_post.await_count == 2
+
+    # open: nothing is posted until the cooldown ends
+    assert not await reporter.flush()
+    assert mock_post.await_count == 2
+    [entry] = reporter.buffer.values()
+    assert entry["count"] == 2
+
+    reporter.open_until = 0
+    mock_post.side_effect = None
+    mock_post.return_value = MagicMock(status_code=200)
+    assert await reporter.flush()
+    assert sent_errors(mock_post)["occurrences"] == 2
+    assert reporter.failures == 0 and not reporter.buffer
+    await reporter.stop()
+
 
-    request_method = "GET"
-    request_url_path = "/test-endpoint"
-    exc = Exception("Test Exception")
+@pytest.mark.asyncio
+@patch("httpx.AsyncClient.post", new_callable=AsyncMock)
+@patch("api.utils.logger.logger.error")
+async def test_missing_webhook(mock_logger, mock_post, monkeypatch):
+    """Test that nothing is reported if TELEX_WEBHOOK_URL is missing"""
 
-    await send_error_to_telex(request_method, request_url_path, exc)
+    monkeypatch.setattr("api.utils.settings.settings.TELEX_WEBHOOK_URL", None)
+    reporter = TelexReporter()
+    reporter.start()
+    reporter.report("GET", "/test-endpoint", raised("Test Exception"))
+    await reporter.stop()
 
+    assert not reporter.buffer
     mock_post.assert_not_awaited()
-
     mock_logger.assert_called_once_with("TELEX_WEBHOOK_URL is not set")
+
+
+@pytest.mark.asyncio
+@patch("httpx.AsyncClient.post", new_callable=AsyncMock)
+async def test_reports_are_flushed_periodically(mock_post, monkeypatch):
+    monkeypatch.setattr("api.utils.settings.settings.TELEX_FLUSH_INTERVAL", 0.01)
+    mock_post.return_value = MagicMock(status_code=200)
+    reporter = TelexReporter()
+    reporter.start()
+
+    reporter.report("GET", "/test-endpoint", raised("Test Exception"))
+    await asyncio.sleep(0.1)
+    assert sent_errors(mock_post)["occurrences"] == 1
+
+    await reporter.stop()
@@ -0,0 +1,158 @@
+from datetime import datetime, timedelta, timezone
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from fastapi_mail import MessageType
+
+from api.core.dependencies.email_sender import email_renderer
+from api.v1.models.email_outbox import EmailOutbox
+from api.v1.services.email_outbox import EmailOutboxService
+
+
+CONTEXT = {"first_name": "Ann", "last_name": "Boilerplate", "link": "https://example.com"}
+
+
+@pytest.fixture
+def service(session_factory):
+    return EmailOutboxService(session_factory=session_factory)
+
+
+@pytest.fixture
+def mail_client():
+    client = AsyncMock()
+    client.send_messages.side_effect = lambda messages: [None] * len(messages)
+    with patch("api.v1.services.email_outbox.get_mail_client", return_value=client):
+        yield client
+
+
+def fetch_all(session_factory):
+    with session_factory() as db:
+        return db.query(EmailOutbox).order_by(EmailOutbox.created_at).all()
+
+
+def test_enqueue_is_part_of_the_callers_transaction(service, session_factory):
+    with session_factory() as db:
+        service.enqueue(db, "user@example.com", "Welcome", template_name="welcome.html", context=CONTEXT)
+        db.rollback()
+
+    assert fetch_all(session_factory) == []
+
+    with session_factory() as db:
+        service.enqueue(db, "user@example.com", "Welcome", template_name="welcome.html", context=CONTEXT)
+        db.commit()
+
+    [email] = fetch_all(session_factory)
+    assert email.status == "pending"
+    assert email.attempts == 0
+    assert email.context == CONTEXT
+
+
+def test_enqueue_requires_a_template_or_body(service, session_factory):
+    with session_factory() as db, pytest.raises(ValueError):
+        service.enqueue(db, "user@example.com", "Empty")
+
+
+def test_claim_leases_due_emails_once(service, session_factory):
+    service.enqueue_now(recipient="a@example.com", subject="A", body="a")
+    service.enqueue_now(recipient="b@example.com", subject="B", body="b")
+    with session_factory() as db:
+        later = service.enqueue(db, "c@example.com", "C", body="c")
+        later.next_attempt_at = datetime.now(timezone.utc) + timedelta(hours=1)
+        db.commit()
+
+    with session_factory() as db:
+        claimed = service.claim(db, 10)
+    with session_factory() as db:
+        assert service.claim(db, 10) == []
+
+    assert sorted(email["recipient"] for email in claimed) == ["a@example.com", "b@example.com"]
+    assert {email.status for email in fetch_all(session_factory)} == {"sending", "pending"}
+
+
+def test_expired_lease_is_claimed_again(service, session_factory, monkeypatch):
+    monkeypatch.setattr("api.utils.settings.settings.EMAIL_OUTBOX_LEASE_SECONDS", -1)
+    service.enqueue_now(recipient="a@example.com", subject="A", body="a")
+
+    with session_factory() as db:
+        first = service.claim(db, 10)
+    # the relay holding the lease died before recording the result
+    with session_factory() as db:
+        second = service.claim(db, 10)
+
+    assert [email["id"] for email in second] == [email["id"] for email in first]
+
+
+@pytest.mark.asyncio
+async def test_process_batch_sends_and_marks_emails(service, session_factory, mail_client):
+    service.enqueue_now(
+        recipient="user@example.com", subject="Welcome", template_name="welcome.html", context=CONTEXT
+    )
+    service.enqueue_now(recipient="other@example.com", subject="Plain", body="hello", subtype="plain")
+
+    assert await service.process_batch() == 2
+    assert await service.process_batch() == 0
+
+    [messages] = mail_client.send_messages.await_args.args
+    assert messages[0].body == email_renderer.render("welcome.html", CONTEXT)
+    assert messages[0].recipients == ["user@example.com"]
+    assert messages[1].subtype == MessageType.plain
+
+    for email in fetch_all(session_factory):
+        assert email.status == "sent"
+        assert email.attempts == 1
+        assert email.sent_at is not None
+
+
+@pytest.mark.asyncio
+async def test_failed_send_is_retried_with_backoff(service, session_factory, mail_client):
+    mail_client.send_messages.side_effect = lambda messages: [ConnectionError("refused")]
+    service.enqueue_now(recipient="user@example.com", subject="Hi", body="hi")
+
+    before = datetime.now(timezone.utc)
+    await service.process_batch()
+
+    [email] = fetch_all(session_factory)
+    assert email.status == "pending"
+    assert email.attempts == 1
+    assert email.last_error == "refused"
+    assert email.next_attempt_at.replace(tzinfo=timezone.utc) > before
+    # not due yet
+    assert await service.process_batch() == 0
+
+
+@pytest.mark.asyncio
+async def test_email_is_dead_lettered_after_max_attempts(service, session_factory, mail_client, monkeypatch):
+    monkeypatch.setattr("api.utils.settings.settings.EMAIL_OUTBOX_MAX_ATTEMPTS", 3)
+    monkeypatch.setattr("api.utils.settings.settings.EMAIL_OUTBOX_BACKOFF_BASE", 0)
+    mail_client.send_messages.side_effect = lambda messages: [ConnectionError("refused")]
+    service.enqueue_now(recipient="user@example.com", subject="Hi", body="hi")
+
+    for _ in range(5):
+        await service.process_batch()
+
+    [email] = fetch_all(session_factory)
+    assert email.status == "dead"
+    assert email.attempts == 3
+    assert mail_client.send_messages.await_count == 3
+
+
+@pytest.mark.asyncio
+async def test_unrenderable_email_does_not_block_the_batch(service, session_factory, mail_client):
+    service.enqueue_now(recipient="a@example.com", subject="Broken", template_name="missing.html")
+    service.enqueue_now(recipient="b@example.com", subject="Fine", body="fine")
+
+    await service.process_batch()
+
+    emails = {email.recipient: email for email in fetch_all(session_factory)}
+    assert emails["a@example.com"].status == "pending"
+    assert emails["a@example.com"].last_error
+    assert emails["b@example.com"].status == "sent"
+
+
+def test_backoff_grows_and_is_capped(monkeypatch):
+    monkeypatch.setattr("api.utils.settings.settings.EMAIL_OUTBOX_BACKOFF_BASE", 10)
+    monkeypatch.setattr("api.utils.settings.settings.EMAIL_OUTBOX_BACKOFF_MAX", 60)
+
+    assert 5 <= EmailOutboxService.backoff(1) <= 10
+    assert 20 <= EmailOutboxService.backoff(3) <= 40
+    assert 30 <= EmailOutboxService.backoff(10) <= 60
@@ -0,0 +1,66 @@
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from fastapi.templating import Jinja2Templates
+from premailer import transform
+
+from api.core.dependencies.email_sender import (
+    EmailRenderer,
+    email_renderer,
+    email_templates,
+    send_email,
+)
+
+
+CONTEXT = {
+    "first_name": "Ann & <b>",
+    "last_name": "Boilerplate",
+    "link": "https://example.com/verify?token=1&next=/",
+    "unsubscribe_link": "https://example.com/unsubscribe",
+}
+
+
+@pytest.mark.parametrize(
+    "template_name", ["welcome.html", "reset-password.html", "login-notification.html"]
+)
+def test_precompiled_render_matches_premailer(template_name):
+    renderer = EmailRenderer(email_templates)
+
+    assert renderer.get_compiled(template_name) is not None
+    assert renderer.render(template_name, CONTEXT) == transform(
+        email_templates.get_template(template_name).render(CONTEXT)
+    )
+
+
+def test_premailer_runs_once_per_template():
+    renderer = EmailRenderer(email_templates)
+
+    with patch("api.core.dependencies.email_sender.transform", wraps=transform) as mock_transform:
+        for i in range(5):
+            html = renderer.render("welcome.html", {**CONTEXT, "first_name": f"user{i}"})
+
+    assert mock_transform.call_count == 1
+    assert "Hi user4, Boilerplate" in html
+
+
+def test_templates_with_logic_fall_back_to_full_render(tmp_path):
+    (tmp_path / "styled.html").write_text(
+        "<html><head><style>p { color: red; }</style></head><body>"
+        "{% if name %}<p>Hi {{ name|upper }}</p>{% endif %}</body></html>"
+    )
+    renderer = EmailRenderer(Jinja2Templates(directory=str(tmp_path)))
+
+    assert renderer.get_compiled("styled.html") is None
+    assert '<p style="color:red">Hi ANN</p>' in renderer.render("styled.html", {"name": "ann"})
+
+
+@pytest.mark.asyncio
+async def test_send_email_renders_with_the_shared_client():
+    client = AsyncMock()
+
+    with patch("api.core.dependencies.email_sender.get_mail_client", return_value=client):
+        await send_email("user@example.com", "welcome.html", "Welcome", CONTEXT)
+
+    message = client.send_message.await_args.args[0]
+    assert message.body == email_renderer.render("welcome.html", CONTEXT)
+    assert message.recipients == ["user@example.com"]
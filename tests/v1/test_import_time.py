@@ -0,0 +1,38 @@
+from scripts.import_time import BUDGET_MS, import_times, loaded_modules
+
+
+# slow to import and only needed by some requests
+HEAVY_MODULES = ("stripe", "twilio.rest", "user_agents", "premailer", "qrcode", "PIL.Image", "dateutil")
+OPTIONAL_ROUTER_MODULES = (
+    "api.v1.routes.sms_twilio",
+    "api.v1.routes.stripe",
+    "api.v1.routes.api_tests",
+    "tests.run_all_test",
+)
+
+
+def test_heavy_dependencies_load_on_first_use():
+    modules = loaded_modules("main")
+
+    assert [module for module in HEAVY_MODULES if module in modules] == []
+    assert "scripts.populate_db" not in modules
+    assert all(module in modules for module in OPTIONAL_ROUTER_MODULES)
+
+
+def test_optional_routers_can_be_left_out():
+    modules = loaded_modules("main", env={"OPTIONAL_ROUTERS": "stripe"})
+
+    assert "api.v1.routes.stripe" in modules
+    assert [module for module in OPTIONAL_ROUTER_MODULES if module in modules] == ["api.v1.routes.stripe"]
+
+
+def test_import_times():
+    times = import_times("main")
+    own, cumulative = times["main"]
+    assert 0 < own <= cumulative
+    assert all(name in times for name in ("fastapi", "sqlalchemy", "api.v1.routes"))
+
+
+def test_app_imports_within_budget():
+    total_ms = import_times("main")["main"][1] / 1000
+    assert total_ms <= BUDGET_MS, f"importing main took {total_ms:.0f} ms, over the {BUDGET_MS:.0f} ms budget"
@@ -0,0 +1,252 @@
+import asyncio
+import os
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi.testclient import TestClient
+from uuid_extensions import uuid7
+
+from main import app
+from api.db.database import get_db
+from api.v1.models.background_job import BackgroundJob
+from api.v1.models.user import User
+from api.v1.services.job_queue import JobQueue, JobWorker, job_queue
+from api.v1.services.user import user_service
+
+
+@pytest.fixture
+def queue(session_factory):
+    return JobQueue(session_factory=session_factory)
+
+
+def run_jobs(queue, **kwargs):
+    worker = JobWorker(queue=queue, concurrency=1, poll_interval=0.01, **kwargs)
+    asyncio.run(worker.run(burst=True))
+
+
+def fetch(session_factory, job_id):
+    with session_factory() as db:
+        return db.get(BackgroundJob, job_id)
+
+
+def test_task_payload_is_typed(queue, session_factory):
+    @queue.task("add")
+    def add(a: int, b: int = 1):
+        return a + b
+
+    with session_factory() as db:
+        with pytest.raises(ValueError):
+            add.enqueue(db, a="not a number")
+        with pytest.raises(ValueError):
+            add.enqueue(db, b=2)
+
+    with pytest.raises(TypeError):
+        @queue.task("untyped")
+        def untyped(a):
+            pass
+
+
+def test_worker_runs_sync_and_async_tasks(queue, session_factory):
+    @queue.task("add")
+    def add(a: int, b: int = 1):
+        return a + b
+
+    @queue.task("greet")
+    async def greet(name: str):
+        await asyncio.sleep(0)
+        return f"hello {name}"
+
+    first = add.enqueue_now(a=2, b=3)
+    second = greet.enqueue_now(name="ann")
+    run_jobs(queue)
+
+    assert fetch(session_factory, first).status == "succeeded"
+    assert fetch(session_factory, first).result == 5
+    assert fetch(session_factory, second).result == "hello ann"
+    assert fetch(session_factory, second).attempts == 1
+
+
+def test_jobs_run_by_priority(queue):
+    ran = []
+
+    @queue.task("low")
+    def low(label: str):
+        ran.append(label)
+
+    @queue.task("urgent", priority=10)
+    def urgent(label: str):
+        ran.append(label)
+
+    low.enqueue_now(label="low")
+    urgent.enqueue_now(label="urgent")
+    low.enqueue_now(label="bumped", priority=20)
+    run_jobs(queue)
+
+    assert ran == ["bumped", "urgent", "low"]
+
+
+def test_failing_job_is_retried_then_failed(queue, session_factory, monkeypatch):
+    monkeypatch.setattr("api.utils.settings.settings.JOB_BACKOFF_BASE", 0)
+    calls = []
+
+    @queue.task("flaky", max_attempts=3)
+    def flaky(succeed_on: int):
+        calls.append(1)
+        if len(calls) < succeed_on:
+            raise ConnectionError("try again")
+        return len(calls)
+
+    recovered = flaky.enqueue_now(succeed_on=2)
+    run_jobs(queue)
+    assert fetch(session_factory, recovered).status == "succeeded"
+    assert fetch(session_factory, recovered).attempts == 2
+
+    calls.clear()
+    broken = flaky.enqueue_now(succeed_on=10)
+    run_jobs(queue)
+    job = fetch(session_factory, broken)
+    assert job.status == "failed"
+    assert job.attempts == 3
+    assert job.last_error == "try again"
+
+
+def test_retry_waits_for_its_backoff(queue, session_factory):
+    @queue.task("boom")
+    def boom():
+        raise RuntimeError("boom")
+
+    job_id = boom.enqueue_now()
+    run_jobs(queue)
+
+    job = fetch(session_factory, job_id)
+    assert job.status == "queued"
+    assert job.attempts == 1
+    assert job.run_at.replace(tzinfo=timezone.utc) > datetime.now(timezone.utc)
+
+
+def test_idempotency_key_queues_a_job_once(queue, session_factory):
+    @queue.task("charge")
+    def charge(amount: int):
+        return amount
+
+    with session_factory() as db:
+        first = charge.enqueue(db, amount=10, idempotency_key="invoice-1")
+        second = charge.enqueue(db, amount=10, idempotency_key="invoice-1")
+        db.commit()
+        assert first.id == second.id
+        assert db.query(BackgroundJob).count() == 1
+
+
+def test_expired_lease_is_claimed_again(queue, session_factory):
+    @queue.task("noop")
+    def noop():
+        return "done"
+
+    job_id = noop.enqueue_now()
+    with session_factory() as db:
+        assert len(queue.claim(db, 10, "dead-worker")) == 1
+        # the worker died; its lease runs out
+        db.get(BackgroundJob, job_id).locked_until = datetime.now(timezone.utc) - timedelta(seconds=1)
+        db.commit()
+
+    run_jobs(queue)
+    assert fetch(session_factory, job_id).status == "succeeded"
+
+
+def test_job_that_keeps_losing_its_lease_is_failed(queue, session_factory):
+    @queue.task("hangs", max_attempts=2)
+    def hangs():
+        return "done"
+
+    job_id = hangs.enqueue_now()
+    for worker in ("first-worker", "second-worker"):
+        with session_factory() as db:
+            assert len(queue.claim(db, 10, worker)) == 1
+            db.get(BackgroundJob, job_id).locked_until = datetime.now(timezone.utc) - timedelta(seconds=1)
+            db.commit()
+
+    with session_factory() as db:
+        assert queue.claim(db, 10, "third-worker") == []
+
+    job = fetch(session_factory, job_id)
+    assert job.status == "failed"
+    assert job.attempts == 2
+    assert job.locked_by is None
+
+
+def test_outcome_is_not_recorded_after_the_lease_is_lost(queue, session_factory):
+    @queue.task("slow")
+    def slow():
+        return "done"
+
+    job_id = slow.enqueue_now()
+    with session_factory() as db:
+        [stale] = queue.claim(db, 10, "slow-worker")
+        db.get(BackgroundJob, job_id).locked_until = datetime.now(timezone.utc) - timedelta(seconds=1)
+        db.commit()
+        [current] = queue.claim(db, 10, "other-worker")
+
+        queue.record(db, stale, "slow-worker", error=RuntimeError("too late"))
+        job = db.get(BackgroundJob, job_id)
+        db.refresh(job)
+        assert job.status == "running"
+        assert job.locked_by == "other-worker"
+
+        queue.record(db, current, "other-worker", result="done")
+        db.refresh(job)
+        assert job.status == "succeeded"
+        assert job.attempts == 2
+
+
+def test_worker_only_serves_its_queues(queue, session_factory):
+    @queue.task("bulk_job", queue="bulk")
+    def bulk_job():
+        pass
+
+    job_id = bulk_job.enqueue_now()
+    run_jobs(queue, queues=["default"])
+    assert fetch(session_factory, job_id).status == "queued"
+
+    run_jobs(queue, queues=["bulk"])
+    assert fetch(session_factory, job_id).status == "succeeded"
+
+
+def process_id():
+    return os.getpid()
+
+
+def test_process_pool_runs_tasks_out_of_process(session_factory, monkeypatch):
+    monkeypatch.setattr(job_queue, "session_factory", session_factory)
+    task = job_queue.tasks.get("process_id") or job_queue.task("process_id")(process_id)
+
+    job_id = task.enqueue_now()
+    run_jobs(job_queue, pool="process")
+
+    job = fetch(session_factory, job_id)
+    assert job.status == "succeeded"
+    assert job.result != os.getpid()
+
+
+def test_job_status_endpoint(session_factory, queue):
+    @queue.task("report")
+    def report(month: int):
+        return {"month": month}
+
+    job_id = report.enqueue_now(month=10)
+    run_jobs(queue)
+
+    admin = User(id=str(uuid7()), email="admin@gmail.com", is_superadmin=True)
+    db = session_factory()
+    app.dependency_overrides[get_db] = lambda: db
+    app.dependency_overrides[user_service.get_current_super_admin] = lambda: admin
+    try:
+        client = TestClient(app)
+        response = client.get(f"/api/v1/background-jobs/{job_id}")
+        assert response.status_code == 200
+        assert response.json()["data"]["status"] == "succeeded"
+        assert response.json()["data"]["result"] == {"month": 10}
+
+        assert client.get("/api/v1/background-jobs/missing").status_code == 404
+    finally:
+        app.dependency_overrides = {}
+        db.close()
@@ -0,0 +1,118 @@
+import json
+import logging
+import queue
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from main import global_exception
+from api.utils.logger import (
+    JsonFormatter,
+    RequestIdMiddleware,
+    RequestQueueHandler,
+    SamplingFilter,
+    parse_pairs,
+    request_id,
+)
+
+
+logged_app = FastAPI()
+logged_app.add_middleware(RequestIdMiddleware)
+logged_app.add_exception_handler(Exception, global_exception)
+
+
+@logged_app.get("/request-id")
+async def get_request_id():
+    return {"request_id": request_id.get()}
+
+
+@logged_app.get("/fails")
+async def fails():
+    raise RuntimeError("boom")
+
+
+def queued_record(records: queue.SimpleQueue, log):
+    handler = RequestQueueHandler(records)
+    test_logger = logging.getLogger("tests.logging")
+    test_logger.addHandler(handler)
+    try:
+        log(test_logger)
+    finally:
+        test_logger.removeHandler(handler)
+    return records.get_nowait()
+
+
+def test_records_are_queued_rendered_and_formatted_as_json():
+    records = queue.SimpleQueue()
+    reset = request_id.set("abc123")
+    try:
+        def log(test_logger):
+            try:
+                1 / 0
+            except ZeroDivisionError:
+                test_logger.exception("Failed for %s", "user-1", extra={"route": "/login"})
+
+        record = queued_record(records, log)
+    finally:
+        request_id.reset(reset)
+
+    # the listener gets a self-contained record
+    assert record.args is None and record.exc_info is None
+    entry = json.loads(JsonFormatter().format(record))
+    assert entry["message"] == "Failed for user-1"
+    assert entry["level"] == "ERROR" and entry["logger"] == "tests.logging"
+    assert entry["request_id"] == "abc123" and entry["route"] == "/login"
+    assert "ZeroDivisionError" in entry["exception"]
+
+
+def test_sampling_keeps_warnings():
+    sampling = SamplingFilter({"api.hot": 0.0})
+
+    def record(name, level):
+        return logging.makeLogRecord({"name": name, "levelno": level})
+
+    assert not sampling.filter(record("api.hot", logging.INFO))
+    assert not sampling.filter(record("api.hot.path", logging.DEBUG))
+    assert sampling.filter(record("api.hot", logging.WARNING))
+    assert sampling.filter(record("api.hotter", logging.INFO))
+
+
+def test_parse_pairs():
+    assert parse_pairs("api.auth=DEBUG, sqlalchemy.engine = WARNING,") == {
+        "api.auth": "DEBUG",
+        "sqlalchemy.engine": "WARNING",
+    }
+
+
+def test_request_id_is_taken_from_the_request_or_generated():
+    client = TestClient(logged_app)
+
+    response = client.get("/request-id", headers={"X-Request-ID": "from-proxy"})
+    assert response.json()["request_id"] == "from-proxy"
+    assert response.headers["x-request-id"] == "from-proxy"
+
+    response = client.get("/request-id")
+    assert len(response.json()["request_id"]) == 32
+    assert response.headers["x-request-id"] == response.json()["request_id"]
+
+
+def test_unhandled_errors_are_logged_and_answered_with_the_request_id(monkeypatch):
+    records = queue.SimpleQueue()
+    handler = RequestQueueHandler(records)
+    app_logger = logging.getLogger("api.utils.logger")
+    # tests running the alembic migrations disable the existing loggers
+    monkeypatch.setattr(app_logger, "disabled", False)
+    app_logger.addHandler(handler)
+    try:
+        response = TestClient(logged_app, raise_server_exceptions=False).get(
+            "/fails", headers={"X-Request-ID": "from-proxy"}
+        )
+    finally:
+        app_logger.removeHandler(handler)
+
+    assert response.status_code == 500
+    assert response.headers["x-request-id"] == "from-proxy"
+    record = records.get_nowait()
+    assert record.msg == "Exception occured; boom"
+    assert record.request_id == "from-proxy"
+    assert request_id.get() is None
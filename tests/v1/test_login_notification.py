@@ -1,78 +1,128 @@
-import unittest
-from unittest.mock import patch, MagicMock, AsyncMock
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from unittest.mock import patch
 import pytest
-import requests
-from fastapi import Request
-from api.v1.models import User
-from api.v1.services.login_notification import send_login_notification
+from geoip2.errors import AddressNotFoundError
+from api.core.dependencies.geoip import GeoIPResolver
+from api.v1.services.login_notification import notify_login
+from api.v1.services.tasks import login_notification
 
 
-@pytest.mark.asyncio
-class TestSendLoginNotification:
+class FakeReader:
+    """Stands in for a GeoLite2 City database"""
 
-    @patch('api.v1.services.login_notification.send_email', new_callable=AsyncMock)
-    @patch('api.v1.services.login_notification.requests.get')
-    async def test_send_login_notification_successful(self, mock_request_get, mock_send_email):
-        """Test successful login notification email with correct IP geolocation data."""
+    locations = {"8.8.8.8": ("Mountain View", "United States")}
 
-        # Mock user
-        user = MagicMock(spec=User)
-        user.email = "test@example.com"
-        user.first_name = "Test"
-        user.last_name = "User"
-
-        # Mock request with headers
-        request = MagicMock(spec=Request)
-        request.client.host = "8.8.8.8"
-        request.headers = {
-            "user-agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
-        }
+    def __init__(self):
+        self.lookups = []
 
-        # Mock IP location API response
-        mock_request_get.return_value.json.return_value = {
-            "city": "Mountain View",
-            "country": "United States"
-        }
+    def metadata(self):
+        return SimpleNamespace(database_type="GeoLite2-City")
+
+    def city(self, ip_address):
+        self.lookups.append(ip_address)
+        if ip_address not in self.locations:
+            raise AddressNotFoundError(f"{ip_address} not found")
+        city, country = self.locations[ip_address]
+        return SimpleNamespace(city=SimpleNamespace(name=city), country=SimpleNamespace(name=country))
+
+
+@pytest.fixture
+def resolver():
+    resolver = GeoIPResolver("unused.mmdb")
+    resolver._reader = FakeReader()
+    with patch("api.v1.services.login_notification.geoip_resolver", resolver):
+        yield resolver
 
-        # Call the function
-        await send_login_notification(user, request)
 
-        # Fix: Ensure the request mock includes the timeout argument
-        mock_request_get.assert_called_once_with("http://ip-api.com/json/8.8.8.8", timeout=5)
-        mock_send_email.assert_called_once()
+class TestNotifyLogin:
+
+    @patch('api.v1.services.login_notification.email_outbox_service.enqueue_now')
+    def test_notify_login_successful(self, mock_enqueue, resolver):
+        """Test successful login notification email with correct IP geolocation data."""
+
+        notify_login(
+            "test@example.com",
+            "Test",
+            "User",
+            "8.8.8.8",
+            "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36",
+            datetime.now(timezone.utc),
+        )
+
+        mock_enqueue.assert_called_once()
 
         # Validate email context
-        context = mock_send_email.call_args[1]['context']
+        context = mock_enqueue.call_args[1]['context']
         assert context['location'] == "Mountain View, United States"
+        assert context['device'] == "Windows 10 - Chrome 91.0.4472"
+
+    @patch('api.v1.services.login_notification.email_outbox_service.enqueue_now')
+    def test_notify_login_unknown_address(self, mock_enqueue, resolver):
+        """Test login notification when the IP is not in the GeoIP database."""
+
+        notify_login(
+            "test@example.com",
+            "Test",
+            "User",
+            "1.2.3.4",
+            "Mozilla/5.0 (iPhone; CPU iPhone OS 14_6 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/14.1.1 Mobile/15E148 Safari/604.1",
+            datetime.now(timezone.utc),
+        )
 
-    @patch('api.v1.services.login_notification.send_email', new_callable=AsyncMock)
-    @patch('api.v1.services.login_notification.requests.get')
-    async def test_send_login_notification_api_error(self, mock_request_get, mock_send_email):
-        """Test login notification when the IP geolocation API fails."""
-
-        # Mock user
-        user = MagicMock(spec=User)
-        user.email = "test@example.com"
-        user.first_name = "Test"
-        user.last_name = "User"
-
-        # Mock request
-        request = MagicMock(spec=Request)
-        request.client.host = "1.2.3.4"
-        request.headers = {
-            "user-agent": "Mozilla/5.0 (iPhone; CPU iPhone OS 14_6 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/14.1.1 Mobile/15E148 Safari/604.1",
+        # Ensure the function handles the failure without crashing
+        mock_enqueue.assert_called_once()
+
+        # Validate fallback location
+        context = mock_enqueue.call_args[1]['context']
+        assert context['location'] == "Unknown Location"  # Ensure fallback works
+
+
+@patch('api.v1.services.login_notification.email_outbox_service.enqueue_now')
+def test_job_renders_the_time_of_the_login(mock_enqueue, resolver):
+    payload = login_notification.payload(
+        {
+            "email": "test@example.com",
+            "first_name": "Test",
+            "last_name": None,
+            "ip_address": "8.8.8.8",
+            "user_agent": "",
+            "login_time": datetime(2024, 5, 1, 9, 30, tzinfo=timezone.utc),
         }
+    )
 
-        # Mock API error
-        mock_request_get.side_effect = requests.RequestException("API Error")
+    # the job may run long after the login
+    login_notification(**login_notification.arguments(payload))
 
-        # Call the function
-        await send_login_notification(user, request)
+    context = mock_enqueue.call_args[1]['context']
+    assert context['login_time'] == "2024-05-01 09:30:00 UTC"
 
-        # Fix: Ensure the function handles the failure without crashing
-        mock_request_get.assert_called_once_with("http://ip-api.com/json/1.2.3.4", timeout=5)
-        mock_send_email.assert_called_once()
 
-        # Validate fallback location
-        context = mock_send_email.call_args[1]['context']
-        assert context['location'] == "Unknown Location"  # Ensure fallback works
\ No newline at end of file
+def test_lookups_are_cached(resolver):
+    assert resolver.locate("8.8.8.8") == "Mountain View, United States"
+    assert resolver.locate("8.8.8.8") == "Mountain View, United States"
+    assert resolver._reader.lookups == ["8.8.8.8"]
+
+
+def test_private_and_invalid_addresses_are_not_looked_up(resolver):
+    for address in ["127.0.0.1", "10.1.2.3", "172.16.0.1", "192.168.1.1", "::1", "testclient"]:
+        assert resolver.locate(address) == "Unknown Location"
+    assert resolver._reader.lookups == []
+
+
+def test_missing_database_reports_unknown_location():
+    resolver = GeoIPResolver("/nonexistent/GeoLite2-City.mmdb")
+    assert resolver.locate("8.8.8.8") == "Unknown Location"
+    assert resolver.reader is None
+
+
+def test_configured_database_must_open_at_startup():
+    with pytest.raises(RuntimeError, match="GEOIP_DATABASE_PATH"):
+        GeoIPResolver("/nonexistent/GeoLite2-City.mmdb").open()
+
+
+def test_unset_database_reports_unknown_location():
+    resolver = GeoIPResolver("")
+    resolver.open()
+    assert resolver.locate("8.8.8.8") == "Unknown Location"
+    assert resolver.reader is None
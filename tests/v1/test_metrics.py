@@ -0,0 +1,128 @@
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from fastapi import FastAPI, HTTPException
+from fastapi.testclient import TestClient
+from prometheus_client import REGISTRY
+
+from main import app
+from api.core.metrics import (
+    MetricsMiddleware,
+    QueueDepthCollector,
+    UNMATCHED_ROUTE,
+    metrics_response,
+    queue_depth_collector,
+)
+from api.v1.models.background_job import BackgroundJob
+from api.v1.models.email_outbox import EmailOutbox
+
+
+metered_app = FastAPI()
+metered_app.add_middleware(MetricsMiddleware)
+
+
+@metered_app.get("/metered/items/{item_id}")
+async def get_item(item_id: str):
+    if item_id == "missing":
+        raise HTTPException(status_code=404)
+    return {"id": item_id}
+
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+def test_requests_are_labelled_by_route_template():
+    client = TestClient(metered_app)
+    labels = {"method": "GET", "route": "/metered/items/{item_id}"}
+    ok_before = sample("http_requests_total", status_class="2xx", **labels)
+    missing_before = sample("http_requests_total", status_class="4xx", **labels)
+    timed_before = sample("http_request_duration_seconds_count", **labels)
+
+    for item_id in ("a", "b", "missing"):
+        client.get(f"/metered/items/{item_id}")
+    client.get("/not/a/route")
+
+    assert sample("http_requests_total", status_class="2xx", **labels) == ok_before + 2
+    assert sample("http_requests_total", status_class="4xx", **labels) == missing_before + 1
+    assert sample("http_request_duration_seconds_count", **labels) == timed_before + 3
+    assert sample("http_requests_total", method="GET", route=UNMATCHED_ROUTE, status_class="4xx") >= 1
+    assert sample("http_requests_in_progress", method="GET") == 0
+
+
+def test_queue_depths_are_collected(session_factory):
+    with session_factory() as db:
+        db.add_all(
+            [
+                BackgroundJob(name="a", payload={}, queue="default", status="queued"),
+                BackgroundJob(name="b", payload={}, queue="default", status="queued"),
+                BackgroundJob(name="c", payload={}, queue="bulk", status="running"),
+                BackgroundJob(name="d", payload={}, queue="bulk", status="succeeded"),
+                EmailOutbox(recipient="a@example.com", subject="s", status="pending"),
+            ]
+        )
+        db.commit()
+
+    families = {family.name: family for family in QueueDepthCollector(session_factory).collect()}
+
+    jobs = {tuple(s.labels.values()): s.value for s in families["background_jobs"].samples}
+    assert jobs == {("default", "queued"): 2, ("bulk", "running"): 1}
+    [pending] = families["email_outbox_messages"].samples
+    assert pending.labels == {"status": "pending"} and pending.value == 1
+
+
+def test_metrics_endpoint(monkeypatch):
+    client = TestClient(app)
+    client.get("/probe")
+
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert 'http_requests_total{method="GET",route="/probe",status_class="2xx"}' in response.text
+    assert "db_pool_connections_in_use" in response.text
+
+    monkeypatch.setattr("api.utils.settings.settings.METRICS_TOKEN", "scrape")
+    assert client.get("/metrics").status_code == 401
+    assert client.get("/metrics", headers={"Authorization": "Bearer scrape"}).status_code == 200
+
+
+def test_concurrent_scrapes(monkeypatch):
+    def slow_collect():
+        time.sleep(0.05)
+        return QueueDepthCollector.families([("default", "queued", 1)], [])
+
+    monkeypatch.setattr(queue_depth_collector, "collect", slow_collect)
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        responses = list(pool.map(lambda _: metrics_response(), range(4)))
+
+    for response in responses:
+        assert b'background_jobs{queue="default",status="queued"} 1.0' in response.body
+
+
+def test_workers_are_aggregated(tmp_path):
+    # two processes write their own files; the scrape merges them
+    script = (
+        "from api.core.metrics import HTTP_REQUESTS\n"
+        "HTTP_REQUESTS.labels('GET', '/probe', '2xx').inc(3)\n"
+    )
+    env = {**os.environ, "PROMETHEUS_MULTIPROC_DIR": str(tmp_path)}
+    for _ in range(2):
+        subprocess.run([sys.executable, "-c", script], env=env, check=True)
+
+    output = subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            "from api.core.metrics import metrics_registry\n"
+            "from prometheus_client import generate_latest\n"
+            "print(generate_latest(metrics_registry()).decode())",
+        ],
+        env=env,
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    assert 'http_requests_total{method="GET",route="/probe",status_class="2xx"} 6.0' in output
@@ -0,0 +1,172 @@
+import socket
+import time
+from datetime import timedelta
+from unittest.mock import MagicMock
+
+import fakeredis
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+from limits import parse
+from limits.storage import RedisStorage, storage_from_string
+from limits.strategies import MovingWindowRateLimiter
+from slowapi import Limiter
+
+from api.utils.rate_limit import SQLiteStorage, rate_limit_key, storage_options
+from api.v1.services.user import user_service
+
+
+@pytest.fixture
+def uri(tmp_path):
+    return f"sqlite:///{tmp_path / 'rate_limits.db'}"
+
+
+def test_storage_is_chosen_by_uri(uri):
+    assert isinstance(storage_from_string(uri), SQLiteStorage)
+
+
+def test_bucket_is_shared_by_processes(uri):
+    # each worker process opens its own storage on the same file
+    workers = [MovingWindowRateLimiter(SQLiteStorage(uri)) for _ in range(3)]
+    limit = parse("5/minute")
+
+    allowed = [workers[i % 3].hit(limit, "login", "1.2.3.4") for i in range(8)]
+    assert allowed == [True] * 5 + [False] * 3
+
+    stats = workers[0].get_window_stats(limit, "login", "1.2.3.4")
+    assert stats.remaining == 0
+    assert workers[1].hit(limit, "login", "5.6.7.8")
+
+
+def test_bucket_refills_over_the_window(uri):
+    limiter = MovingWindowRateLimiter(SQLiteStorage(uri))
+    limit = parse("2/second")
+
+    assert limiter.hit(limit, "key") and limiter.hit(limit, "key")
+    assert not limiter.hit(limit, "key")
+    assert not limiter.test(limit, "key")
+
+    time.sleep(0.55)
+    assert limiter.test(limit, "key")
+    assert limiter.hit(limit, "key")
+    assert not limiter.hit(limit, "key")
+
+
+def test_redis_bucket_is_shared_by_replicas():
+    # a stand-in for the one Redis server every replica connects to
+    server = fakeredis.FakeServer()
+    replicas = [
+        MovingWindowRateLimiter(
+            RedisStorage(
+                "redis://localhost:6379/0",
+                connection_pool=fakeredis.FakeRedis(server=server).connection_pool,
+            )
+        )
+        for _ in range(3)
+    ]
+    limit = parse("5/minute")
+
+    assert isinstance(storage_from_string("redis://localhost:6379/0"), RedisStorage)
+    allowed = [replicas[i % 3].hit(limit, "login", "1.2.3.4") for i in range(8)]
+    assert allowed == [True] * 5 + [False] * 3
+    assert replicas[0].get_window_stats(limit, "login", "1.2.3.4").remaining == 0
+    assert replicas[1].hit(limit, "login", "5.6.7.8")
+
+
+@pytest.fixture
+def stalled_redis():
+    """A server that accepts connections but never answers, like a hung Redis"""
+
+    server = socket.socket()
+    server.bind(("127.0.0.1", 0))
+    server.listen(16)
+    yield f"redis://127.0.0.1:{server.getsockname()[1]}/0"
+    server.close()
+
+
+def test_redis_gets_default_socket_timeouts(monkeypatch):
+    monkeypatch.setattr("api.utils.settings.settings.RATE_LIMIT_STORAGE_TIMEOUT", 0.2)
+
+    assert storage_options("memory://") == {}
+    assert storage_options("sqlite:///rate_limits.db") == {}
+    assert storage_options("redis://redis:6379/0") == {
+        "socket_timeout": 0.2,
+        "socket_connect_timeout": 0.2,
+    }
+    assert storage_options("rediss://redis:6379/0?socket_timeout=1") == {
+        "socket_connect_timeout": 0.2
+    }
+
+
+def test_hung_redis_fails_fast(stalled_redis):
+    limiter = MovingWindowRateLimiter(
+        storage_from_string(stalled_redis, **storage_options(stalled_redis))
+    )
+
+    start = time.perf_counter()
+    with pytest.raises(Exception):
+        limiter.hit(parse("5/minute"), "login", "1.2.3.4")
+    assert time.perf_counter() - start < 1
+
+
+def test_hung_redis_lets_requests_through(stalled_redis):
+    limiter = Limiter(
+        key_func=rate_limit_key,
+        strategy="moving-window",
+        storage_uri=stalled_redis,
+        storage_options=storage_options(stalled_redis),
+        swallow_errors=True,
+        in_memory_fallback_enabled=True,
+    )
+    app = FastAPI()
+    app.state.limiter = limiter
+
+    @app.get("/limited")
+    @limiter.limit("5/minute")
+    async def limited(request: Request):
+        return {"ok": True}
+
+    client = TestClient(app)
+    start = time.perf_counter()
+    assert client.get("/limited").status_code == 200
+    assert time.perf_counter() - start < 1
+
+
+def test_fixed_window_counters(uri):
+    storage = SQLiteStorage(uri)
+
+    assert storage.incr("key", expiry=60) == 1
+    assert storage.incr("key", expiry=60, amount=2) == 3
+    assert storage.get("key") == 3
+    assert storage.get_expiry("key") > time.time()
+
+    storage.clear("key")
+    assert storage.get("key") == 0
+
+
+def test_locked_storage_gives_up_quickly(uri):
+    storage = SQLiteStorage(f"{uri}?timeout=0.01")
+    blocker = SQLiteStorage(uri)._connect()
+    blocker.execute("BEGIN IMMEDIATE")
+    try:
+        start = time.perf_counter()
+        with pytest.raises(Exception):
+            storage.acquire_entry("key", 5, 60)
+        assert time.perf_counter() - start < 0.5
+    finally:
+        blocker.execute("ROLLBACK")
+
+
+def test_signed_in_users_are_limited_by_account():
+    request = MagicMock()
+    request.client.host = "1.2.3.4"
+
+    request.headers = {}
+    assert rate_limit_key(request) == "1.2.3.4"
+
+    token = user_service.create_access_token("user-1")
+    request.headers = {"authorization": f"Bearer {token}"}
+    assert rate_limit_key(request) == "user:user-1"
+
+    request.headers = {"authorization": "Bearer not-a-token"}
+    assert rate_limit_key(request) == "1.2.3.4"
@@ -0,0 +1,107 @@
+import time
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+
+from main import app
+from api.core.profiling import ProfilingMiddleware, create_token, sign_token, verify_token
+from api.db.database import get_db
+from api.v1.models.request_profile import RequestProfile
+from api.v1.services.request_profile import request_profile_service
+from api.v1.services.user import user_service
+
+
+engine = create_engine("sqlite://")
+
+profiled_app = FastAPI()
+profiled_app.add_middleware(ProfilingMiddleware)
+
+
+def busy_loop(seconds):
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        sum(range(1000))
+
+
+@profiled_app.get("/slow/{n}")
+def slow(n: int):
+    with engine.connect() as connection:
+        connection.execute(text("SELECT 1"))
+    busy_loop(0.1)
+    return {"n": n}
+
+
+@pytest.fixture(autouse=True)
+def profile_store(session_factory, monkeypatch):
+    monkeypatch.setattr(request_profile_service, "session_factory", session_factory)
+
+
+def test_tokens_are_signed_and_expire():
+    token, _ = create_token()
+    assert verify_token(token)
+
+    expires_at, signature = token.split(".")
+    assert not verify_token(f"{int(expires_at) + 1}.{signature}")
+    assert not verify_token(sign_token(int(time.time()) - 1))
+    assert not verify_token("not-a-token")
+
+
+def test_requests_are_profiled_only_with_a_valid_token(session_factory):
+    client = TestClient(profiled_app)
+    token, _ = create_token()
+
+    assert "x-profile-id" not in client.get("/slow/1").headers
+    assert "x-profile-id" not in client.get("/slow/1", headers={"X-Profile-Token": "forged"}).headers
+
+    response = client.get("/slow/1", headers={"X-Profile-Token": token})
+    assert response.json() == {"n": 1}
+    profile_id = response.headers["x-profile-id"]
+
+    with session_factory() as db:
+        profile = db.get(RequestProfile, profile_id)
+        assert (profile.route, profile.status_code, profile.trigger) == ("/slow/{n}", 200, "header")
+        assert profile.duration_ms >= 100 and profile.samples > 0
+        assert any("busy_loop" in frame["frame"] for frame in profile.top_frames)
+        assert "busy_loop" in profile.flamegraph
+        assert [statement["statement"] for statement in profile.sql] == ["SELECT 1"]
+
+        response = client.get("/slow/2", params={"profile_token": token})
+        assert response.headers["x-profile-id"]
+        assert db.query(RequestProfile).count() == 2
+
+
+def test_requests_are_sampled(session_factory, monkeypatch):
+    monkeypatch.setattr("api.utils.settings.settings.PROFILING_SAMPLE_RATE", 1)
+
+    response = TestClient(profiled_app).get("/slow/1")
+    with session_factory() as db:
+        assert db.get(RequestProfile, response.headers["x-profile-id"]).trigger == "sample"
+
+
+def test_admin_retrieves_profiles(session_factory):
+    token, _ = create_token()
+    profile_id = TestClient(profiled_app).get("/slow/1", headers={"X-Profile-Token": token}).headers["x-profile-id"]
+
+    db = session_factory()
+    app.dependency_overrides[get_db] = lambda: db
+    app.dependency_overrides[user_service.get_current_super_admin] = lambda: None
+    try:
+        client = TestClient(app)
+        assert client.post("/api/v1/request-profiles/tokens").status_code == 201
+
+        [listed] = client.get("/api/v1/request-profiles", params={"path": "/slow/1"}).json()["data"]
+        assert listed["id"] == profile_id and "flamegraph" not in listed
+
+        profile = client.get(f"/api/v1/request-profiles/{profile_id}").json()["data"]
+        assert profile["sql"][0]["statement"] == "SELECT 1"
+
+        flamegraph = client.get(f"/api/v1/request-profiles/{profile_id}/flamegraph")
+        assert flamegraph.headers["content-type"].startswith("text/plain")
+        assert flamegraph.text.splitlines()[0].rsplit(" ", 1)[1].isdigit()
+
+        assert client.get("/api/v1/request-profiles/missing").status_code == 404
+    finally:
+        app.dependency_overrides = {}
+        db.close()
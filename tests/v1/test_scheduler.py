@@ -0,0 +1,188 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from uuid_extensions import uuid7
+
+from api.v1.models.background_job import BackgroundJob
+from api.v1.models.billing_plan import UserSubscription
+from api.v1.models.email_outbox import EmailOutbox
+from api.v1.models.invitation import Invitation
+from api.v1.models.token_login import TokenLogin
+from api.v1.services.job_queue import JobQueue
+from api.v1.services.maintenance import maintenance_service
+from api.v1.services.scheduler import CronSchedule, Scheduler
+from api.v1.services.stripe_payment import SUBSCRIPTION_DATE_FORMAT
+
+
+class FakeLeader:
+    def __init__(self, leading=True):
+        self.leading = leading
+
+    def acquire(self):
+        return self.leading
+
+    def release(self):
+        pass
+
+
+def utc(*args):
+    return datetime(*args, tzinfo=timezone.utc)
+
+
+@pytest.mark.parametrize(
+    "expression, after, expected",
+    [
+        ("*/15 * * * *", utc(2026, 1, 1, 10, 7), utc(2026, 1, 1, 10, 15)),
+        ("*/15 * * * *", utc(2026, 1, 1, 10, 45), utc(2026, 1, 1, 11, 0)),
+        ("0 * * * *", utc(2026, 1, 1, 10, 0), utc(2026, 1, 1, 11, 0)),
+        ("30 2 * * *", utc(2026, 1, 1, 3, 0), utc(2026, 1, 2, 2, 30)),
+        ("0 9 * * 1-5", utc(2026, 1, 2, 10, 0), utc(2026, 1, 5, 9, 0)),
+        ("0 0 1 3 *", utc(2026, 3, 2, 0, 0), utc(2027, 3, 1, 0, 0)),
+        ("5,35 */6 * * *", utc(2026, 1, 1, 6, 10), utc(2026, 1, 1, 6, 35)),
+    ],
+)
+def test_cron_next_run(expression, after, expected):
+    assert CronSchedule(expression).next_after(after) == expected
+
+
+@pytest.mark.parametrize("expression", ["* * * *", "60 * * * *", "* * * * 7", "*/0 * * * *"])
+def test_invalid_cron_expressions(expression):
+    with pytest.raises(ValueError):
+        CronSchedule(expression)
+
+
+def test_due_runs_are_queued_once_across_replicas(session_factory):
+    queue = JobQueue(session_factory=session_factory)
+
+    @queue.task("sweep")
+    def sweep():
+        pass
+
+    replicas = [Scheduler(leader=FakeLeader()) for _ in range(2)]
+    start = utc(2026, 1, 1, 10, 1)
+    for replica in replicas:
+        replica.add("*/5 * * * *", sweep)
+        assert replica.tick(start) == []
+
+    # both think they lead, e.g. during a failover
+    for replica in replicas:
+        assert replica.tick(start + timedelta(minutes=4)) == [
+            "schedule:sweep:2026-01-01T10:05:00+00:00"
+        ]
+        assert replica.tick(start + timedelta(minutes=5)) == []
+
+    with session_factory() as db:
+        assert db.query(BackgroundJob).count() == 1
+
+
+def test_only_the_leader_queues_runs(session_factory):
+    queue = JobQueue(session_factory=session_factory)
+
+    @queue.task("sweep")
+    def sweep():
+        pass
+
+    follower = Scheduler(leader=FakeLeader(leading=False))
+    follower.add("* * * * *", sweep)
+    follower.tick(utc(2026, 1, 1, 10, 0))
+    assert follower.tick(utc(2026, 1, 1, 10, 2)) == []
+
+    with session_factory() as db:
+        assert db.query(BackgroundJob).count() == 0
+
+
+def test_sweeps_run_in_batches(session_factory, monkeypatch):
+    monkeypatch.setattr("api.utils.settings.settings.MAINTENANCE_BATCH_SIZE", 2)
+    now = datetime.now(timezone.utc)
+    db = session_factory()
+
+    db.add_all(
+        TokenLogin(
+            id=str(uuid7()),
+            user_id=str(uuid7()),
+            token=str(i),
+            expiry_time=datetime.utcnow() + timedelta(minutes=-5 if i < 5 else 5),
+        )
+        for i in range(7)
+    )
+    db.add_all(
+        Invitation(
+            id=str(uuid7()),
+            user_id=str(uuid7()),
+            organisation_id=str(uuid7()),
+            expires_at=expires_at,
+        )
+        for expires_at in [now + timedelta(days=1), now - timedelta(days=1), now - timedelta(days=60)]
+    )
+    db.add_all(
+        UserSubscription(
+            id=str(uuid7()),
+            user_id=str(uuid7()),
+            plan_id=str(uuid7()),
+            organisation_id=str(uuid7()),
+            start_date=(datetime.utcnow() - timedelta(days=40)).strftime(SUBSCRIPTION_DATE_FORMAT),
+            end_date=(datetime.utcnow() + timedelta(days=days)).strftime(SUBSCRIPTION_DATE_FORMAT),
+        )
+        for days in [-10, -1, 10]
+    )
+    db.commit()
+
+    assert maintenance_service.purge_login_tokens(db) == 5
+    assert db.query(TokenLogin).count() == 2
+
+    assert maintenance_service.expire_invitations(db) == {"expired": 2, "deleted": 1}
+    assert sorted(invitation.is_valid for invitation in db.query(Invitation)) == [False, True]
+
+    assert maintenance_service.expire_subscriptions(db) == 2
+    assert db.query(UserSubscription).filter_by(active=True).count() == 1
+    db.close()
+
+
+def test_old_sent_and_dead_emails_are_purged(session_factory):
+    old = datetime.now(timezone.utc) - timedelta(days=8)
+    db = session_factory()
+    db.add_all(
+        EmailOutbox(
+            id=str(uuid7()),
+            recipient=f"{status}{age}@example.com",
+            subject="Reset your password",
+            context={"reset_link": "https://example.com/reset?token=secret"},
+            status=status,
+            updated_at=old if age == "old" else datetime.now(timezone.utc),
+        )
+        for status in ("pending", "sent", "dead")
+        for age in ("old", "new")
+    )
+    db.commit()
+
+    assert maintenance_service.purge_email_outbox(db) == 2
+    assert sorted(email.recipient for email in db.query(EmailOutbox)) == [
+        "deadnew@example.com",
+        "pendingnew@example.com",
+        "pendingold@example.com",
+        "sentnew@example.com",
+    ]
+    db.close()
+
+
+def test_finished_jobs_are_purged(session_factory):
+    old = datetime.now(timezone.utc) - timedelta(days=8)
+    db = session_factory()
+    db.add_all(
+        BackgroundJob(name=f"{status}-{age}", payload={}, status=status,
+                      finished_at=old if age == "old" else datetime.now(timezone.utc))
+        for status in ("queued", "running", "succeeded", "failed")
+        for age in ("old", "new")
+    )
+    db.commit()
+
+    assert maintenance_service.purge_background_jobs(db) == 2
+    assert sorted(job.name for job in db.query(BackgroundJob)) == [
+        "failed-new",
+        "queued-new",
+        "queued-old",
+        "running-new",
+        "running-old",
+        "succeeded-new",
+    ]
+    db.close()
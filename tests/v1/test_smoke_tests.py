@@ -0,0 +1,92 @@
+import asyncio
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from main import app
+from api.db.database import get_db
+from api.v1.services.job_queue import job_queue
+from api.v1.services.smoke_tests import (
+    SMOKE_CASES,
+    SmokeCase,
+    SmokeTestRunner,
+    smoke_test_runner,
+)
+
+
+tested_app = FastAPI()
+
+
+@tested_app.get("/slow")
+async def slow():
+    await asyncio.sleep(0.1)
+    return {"data": "slow"}
+
+
+@tested_app.get("/broken")
+async def broken():
+    return {"message": "no data"}
+
+
+@pytest.fixture
+def jobs(session_factory, monkeypatch):
+    monkeypatch.setattr(job_queue, "session_factory", session_factory)
+
+
+@pytest.mark.asyncio
+async def test_runner_reports_each_case_with_timings():
+    cases = [
+        SmokeCase("slow", "GET", "/slow", 200, check=lambda response: response.json()["data"]),
+        SmokeCase("wrong status", "GET", "/missing", 200),
+        SmokeCase("failed check", "GET", "/broken", 200, check=lambda response: response.json()["data"]),
+    ]
+    report = await SmokeTestRunner(cases, concurrency=3).run(tested_app)
+
+    assert (report["total"], report["passed"], report["failed"]) == (3, 1, 2)
+    slow, wrong_status, failed_check = report["cases"]
+    assert slow["passed"] and slow["duration_ms"] >= 100
+    assert wrong_status["error"] == "expected HTTP 200, got 404"
+    assert failed_check["status_code"] == 200 and "data" in failed_check["error"]
+
+
+@pytest.mark.asyncio
+async def test_cases_run_concurrently():
+    cases = [SmokeCase(f"slow {i}", "GET", "/slow", 200) for i in range(4)]
+    report = await SmokeTestRunner(cases, concurrency=4).run(tested_app)
+
+    assert report["passed"] == 4
+    assert report["duration_ms"] < 4 * 100
+
+
+def test_smoke_tests_run_as_a_job(jobs, session_factory, run_background_jobs, monkeypatch):
+    # the cases that need no database
+    monkeypatch.setattr(
+        smoke_test_runner,
+        "cases",
+        [case for case in SMOKE_CASES if case.path in ("/", "/probe", "/api/v1/users", "/api/v1/waitlist/")],
+    )
+    db = session_factory()
+    app.dependency_overrides[get_db] = lambda: db
+    try:
+        client = TestClient(app)
+        response = client.get("/api/v1/hng-test")
+        assert response.status_code == 202
+        run_id = response.json()["data"]["id"]
+
+        # a second request within the minute joins the same run
+        assert client.get("/api/v1/hng-test").json()["data"]["id"] == run_id
+
+        run_background_jobs()
+
+        response = client.get(f"/api/v1/hng-test/{run_id}")
+        assert response.status_code == 200
+        run = response.json()["data"]
+        assert run["status"] == "succeeded"
+        assert run["result"]["total"] == 4
+        assert run["result"]["failed"] == 0, run["result"]["cases"]
+
+        assert client.get("/api/v1/all/run-tests/" + run_id).status_code == 404
+    finally:
+        app.dependency_overrides = {}
+        db.close()
@@ -0,0 +1,192 @@
+import asyncio
+from email.message import EmailMessage
+
+import aiosmtplib
+import pytest
+from aiosmtpd.controller import Controller
+from aiosmtpd.smtp import AuthResult
+from fastapi_mail import ConnectionConfig, MessageSchema, MessageType
+
+from api.core.dependencies.smtp_pool import PooledFastMail, SMTPPool
+
+
+class RecordingHandler:
+    """Local SMTP server stand-in recording what it receives"""
+
+    def __init__(self):
+        self.messages = []
+        self.sessions = set()
+
+    async def handle_RCPT(self, server, session, envelope, address, rcpt_options):
+        if address.startswith("rejected@"):
+            return "550 mailbox unavailable"
+        envelope.rcpt_tos.append(address)
+        return "250 OK"
+
+    async def handle_DATA(self, server, session, envelope):
+        self.sessions.add(id(session))
+        self.messages.append(envelope)
+        return "250 Message accepted for delivery"
+
+
+def authenticate(server, session, envelope, mechanism, auth_data):
+    return AuthResult(success=auth_data.login == b"user" and auth_data.password == b"secret")
+
+
+@pytest.fixture
+def smtp_server(unused_tcp_port):
+    handler = RecordingHandler()
+    controller = Controller(
+        handler,
+        hostname="127.0.0.1",
+        port=unused_tcp_port,
+        authenticator=authenticate,
+        auth_require_tls=False,
+    )
+    controller.start()
+    yield controller
+    controller.stop()
+
+
+def make_pool(server, **kwargs):
+    return SMTPPool(
+        hostname=server.hostname,
+        port=server.port,
+        username="user",
+        password="secret",
+        use_tls=False,
+        start_tls=False,
+        **kwargs,
+    )
+
+
+def make_message(recipient="user@example.com", subject="Hello"):
+    message = EmailMessage()
+    message["From"] = "noreply@example.com"
+    message["To"] = recipient
+    message["Subject"] = subject
+    message.set_content("body")
+    return message
+
+
+@pytest.mark.asyncio
+async def test_sequential_sends_reuse_one_session(smtp_server):
+    pool = make_pool(smtp_server)
+
+    for i in range(5):
+        await pool.send(make_message(subject=f"message {i}"))
+
+    assert len(smtp_server.handler.messages) == 5
+    assert len(smtp_server.handler.sessions) == 1
+    assert pool.stats.connections_opened == 1
+    await pool.close()
+
+
+@pytest.mark.asyncio
+async def test_burst_is_capped_and_reuses_sessions(smtp_server):
+    count = 200
+    pool = make_pool(smtp_server, max_connections=4)
+
+    results = await pool.send_many([make_message(f"user{i}@example.com") for i in range(count)])
+
+    assert results == [None] * count
+    assert len(smtp_server.handler.messages) == count
+    pooled_sessions = len(smtp_server.handler.sessions)
+    assert pooled_sessions <= 4
+    assert pool.stats.connections_opened == pooled_sessions
+    await pool.close()
+
+
+@pytest.mark.asyncio
+async def test_rejected_recipient_does_not_drop_the_session(smtp_server):
+    pool = make_pool(smtp_server, max_connections=1)
+
+    results = await pool.send_many(
+        [make_message("a@example.com"), make_message("rejected@example.com"), make_message("b@example.com")]
+    )
+
+    assert results[0] is None and results[2] is None
+    assert isinstance(results[1], aiosmtplib.SMTPRecipientsRefused)
+    assert len(smtp_server.handler.messages) == 2
+    assert pool.stats.connections_opened == 1
+    await pool.close()
+
+
+@pytest.mark.asyncio
+async def test_session_closed_by_the_server_is_replaced(smtp_server):
+    pool = make_pool(smtp_server)
+    await pool.send(make_message())
+
+    async def disconnected(message):
+        raise aiosmtplib.SMTPServerDisconnected("Connection lost")
+
+    # the server dropped the idle session
+    pool._idle[0].client.send_message = disconnected
+
+    await pool.send(make_message())
+
+    assert len(smtp_server.handler.messages) == 2
+    assert pool.stats.connections_opened == 2
+    await pool.close()
+
+
+@pytest.mark.asyncio
+async def test_failed_login_is_reported_per_message(smtp_server, mocker):
+    pool = make_pool(smtp_server, max_connections=2)
+    mocker.patch.object(
+        aiosmtplib.SMTP,
+        "login",
+        side_effect=aiosmtplib.SMTPAuthenticationError(535, "Authentication credentials invalid"),
+    )
+    close = mocker.spy(aiosmtplib.SMTP, "close")
+
+    results = await pool.send_many([make_message(), make_message()])
+
+    assert all(isinstance(result, aiosmtplib.SMTPAuthenticationError) for result in results)
+    assert smtp_server.handler.messages == []
+    assert pool.stats.connections_opened == 0
+    assert close.call_count == 2
+    await pool.close()
+
+
+def test_sessions_of_a_previous_event_loop_are_closed(smtp_server):
+    pool = make_pool(smtp_server)
+    asyncio.run(pool.send(make_message()))
+    [stale] = pool._idle
+
+    asyncio.run(pool.send(make_message()))
+
+    assert not stale.client.is_connected
+    assert pool.stats.connections_opened == 2
+
+
+@pytest.mark.asyncio
+async def test_pooled_fastmail_sends_message_schemas(smtp_server):
+    conf = ConnectionConfig(
+        MAIL_USERNAME="user",
+        MAIL_PASSWORD="secret",
+        MAIL_FROM="noreply@example.com",
+        MAIL_PORT=smtp_server.port,
+        MAIL_SERVER=smtp_server.hostname,
+        MAIL_STARTTLS=False,
+        MAIL_SSL_TLS=False,
+        MAIL_FROM_NAME="HNG Boilerplate",
+    )
+    mail = PooledFastMail(conf, pool=make_pool(smtp_server, max_connections=1))
+
+    await mail.send_message(
+        MessageSchema(
+            subject="Welcome", recipients=["user@example.com"], body="<p>hi</p>", subtype=MessageType.html
+        )
+    )
+    results = await mail.send_messages(
+        [
+            MessageSchema(subject="News", recipients=[f"user{i}@example.com"], body="news", subtype=MessageType.plain)
+            for i in range(3)
+        ]
+    )
+
+    assert results == [None] * 3
+    assert [envelope.rcpt_tos for envelope in smtp_server.handler.messages][0] == ["user@example.com"]
+    assert len(smtp_server.handler.sessions) == 1
+    await mail.pool.close()
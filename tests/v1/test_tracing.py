@@ -0,0 +1,158 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+import requests
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+
+from api.core.tracing import (
+    JsonFileSink,
+    OTLPSink,
+    TracingMiddleware,
+    instrument,
+    parse_traceparent,
+    tracer,
+)
+from api.v1.services.job_queue import JobQueue, JobWorker
+
+
+class ListSink:
+    def __init__(self):
+        self.spans = []
+
+    def export(self, spans):
+        self.spans.extend(spans)
+
+
+engine = create_engine("sqlite://")
+outbound_requests = []
+
+
+def partner(request):
+    outbound_requests.append(request)
+    return httpx.Response(200, json={"ok": True})
+
+
+traced_app = FastAPI()
+traced_app.add_middleware(TracingMiddleware)
+
+
+@traced_app.get("/orders/{order_id}")
+async def get_order(order_id: str):
+    with engine.connect() as connection:
+        connection.execute(text("SELECT 1"))
+    async with httpx.AsyncClient(transport=httpx.MockTransport(partner)) as client:
+        await client.get("https://partner.example.com/orders?secret=1")
+    return {"id": order_id}
+
+
+@pytest.fixture
+def sink(monkeypatch):
+    instrument()
+    sink = ListSink()
+    monkeypatch.setattr(tracer, "sink", sink)
+    yield sink
+    tracer.flush()
+
+
+def spans_by_name(sink):
+    tracer.flush()
+    return {span.name: span for span in sink.spans}
+
+
+def test_parse_traceparent():
+    parent = parse_traceparent("00-4bf92f3577b34da6a3ce929d0e0e4736-00f067aa0ba902b7-01")
+    assert (parent.trace_id, parent.span_id, parent.sampled) == (
+        "4bf92f3577b34da6a3ce929d0e0e4736",
+        "00f067aa0ba902b7",
+        True,
+    )
+    assert not parse_traceparent("00-4bf92f3577b34da6a3ce929d0e0e4736-00f067aa0ba902b7-00").sampled
+    assert parse_traceparent("00-00000000000000000000000000000000-00f067aa0ba902b7-01") is None
+    assert parse_traceparent("garbage") is None
+    assert parse_traceparent(None) is None
+
+
+def test_request_spans_nest_db_and_http_calls(sink):
+    incoming = "00-4bf92f3577b34da6a3ce929d0e0e4736-00f067aa0ba902b7-01"
+    response = TestClient(traced_app).get("/orders/42", headers={"traceparent": incoming})
+    assert response.status_code == 200
+
+    spans = spans_by_name(sink)
+    server = spans["GET /orders/{order_id}"]
+    query, call = spans["db.query"], spans["HTTP GET"]
+
+    # continues the caller's trace
+    assert server.trace_id == "4bf92f3577b34da6a3ce929d0e0e4736"
+    assert server.parent_id == "00f067aa0ba902b7"
+    assert server.attributes["http.status_code"] == 200
+    assert query.parent_id == call.parent_id == server.span_id
+    assert query.attributes["db.statement"] == "SELECT 1"
+    assert call.attributes["http.url"] == "https://partner.example.com/orders"
+
+    # and passes it on
+    assert outbound_requests[-1].headers["traceparent"] == call.traceparent
+
+
+def test_requests_calls_are_traced(sink, monkeypatch):
+    sent = {}
+
+    def fake_send(adapter, request, **kwargs):
+        sent["traceparent"] = request.headers["traceparent"]
+        response = requests.Response()
+        response.status_code = 503
+        return response
+
+    monkeypatch.setattr(requests.adapters.HTTPAdapter, "send", fake_send)
+
+    with tracer.span("checkout"):
+        requests.post("https://api.flutterwave.example/v3/payments", json={})
+
+    call = spans_by_name(sink)["HTTP POST"]
+    assert call.attributes["http.status_code"] == 503
+    assert sent["traceparent"] == call.traceparent
+
+
+def test_jobs_continue_the_trace_that_queued_them(sink, session_factory):
+    queue = JobQueue(session_factory=session_factory)
+
+    @queue.task("traced_job", max_attempts=1)
+    def traced_job():
+        with engine.connect() as connection:
+            connection.execute(text("SELECT 2"))
+
+    with tracer.span("POST /orders") as request_span:
+        traced_job.enqueue_now()
+    asyncio.run(JobWorker(queue=queue, concurrency=1, poll_interval=0.01).run(burst=True))
+
+    spans = spans_by_name(sink)
+    job = spans["job traced_job"]
+    assert (job.trace_id, job.parent_id, job.kind) == (request_span.trace_id, request_span.span_id, "consumer")
+    [query] = [span for span in sink.spans if span.attributes.get("db.statement") == "SELECT 2"]
+    assert query.parent_id == job.span_id
+
+
+def test_nothing_is_recorded_when_tracing_is_off(monkeypatch):
+    monkeypatch.setattr(tracer, "sink", None)
+    with tracer.span("anything") as span:
+        assert span is None
+    assert tracer.traceparent() is None
+
+
+def test_sinks(tmp_path):
+    span = tracer.start_span("GET /orders/{order_id}", "server", attributes={"http.status_code": 500})
+    span.record_error(ValueError("boom"))
+    span.end_ns = span.start_ns + 2_000_000
+
+    path = tmp_path / "traces.jsonl"
+    JsonFileSink(str(path)).export([span])
+    [line] = path.read_text().splitlines()
+    assert json.loads(line)["duration_ms"] == 2
+
+    payload = OTLPSink("http://collector").payload([span])
+    [otlp_span] = payload["resourceSpans"][0]["scopeSpans"][0]["spans"]
+    assert otlp_span["kind"] == 2 and otlp_span["status"] == {"code": 2, "message": "ValueError: boom"}
+    assert {"key": "http.status_code", "value": {"intValue": "500"}} in otlp_span["attributes"]
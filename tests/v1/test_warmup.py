@@ -0,0 +1,133 @@
+from unittest.mock import MagicMock
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from uuid_extensions import uuid7
+
+from api.core.warmup import Warmup
+from api.v1.models import User, Organisation  # noqa: F401
+from api.v1.models.billing_plan import BillingPlan
+from api.v1.models.permissions.permissions import Permission
+from api.v1.models.permissions.role import Role
+from api.v1.models.product import ProductCategory
+from api.v1.services.billing_plan import billing_plan_service, billing_plans_cache
+from api.v1.services.permissions.permission_resolver import permission_resolver
+from api.v1.services.product import ProductCategoryService, product_categories_cache
+from main import app
+
+
+@pytest.fixture(autouse=True)
+def clear_permissions():
+    yield
+    permission_resolver.clear()
+
+
+@pytest.fixture(autouse=True)
+def seeded(session_factory):
+    with session_factory() as db:
+        admin = Role(id=str(uuid7()), name="admin", is_builtin=True)
+        admin.permissions.append(Permission(id=str(uuid7()), title="manage_organisation"))
+        db.add_all([admin, ProductCategory(id=str(uuid7()), name="Books")])
+        db.commit()
+
+
+def test_warmup_primes_the_caches(engine, session_factory, monkeypatch):
+    primed = []
+    monkeypatch.setattr(billing_plan_service, "prime_cache", primed.append)
+    warmup = Warmup(engine=engine, session_factory=session_factory)
+
+    warmup.run(FastAPI())
+
+    assert warmup.ready.is_set()
+    assert list(warmup.steps) == [
+        "db_connections",
+        "orm_mappers",
+        "email_templates",
+        "reference_data",
+        "openapi_schema",
+    ]
+    assert all(step["error"] is None for step in warmup.steps.values())
+    assert len(primed) == 1
+    assert permission_resolver._compiled is not None
+    assert "manage_organisation" in permission_resolver._compiled.bits
+
+    # served from the cache from now on
+    with session_factory() as db:
+        db.query(ProductCategory).delete()
+        db.commit()
+        [category] = ProductCategoryService.fetch_all_cached(db)
+    assert category.name == "Books"
+
+
+def test_failed_steps_are_reported(engine, session_factory, monkeypatch):
+    def broken(db):
+        raise RuntimeError("database is down")
+
+    monkeypatch.setattr(billing_plan_service, "prime_cache", broken)
+    warmup = Warmup(engine=engine, session_factory=session_factory)
+
+    warmup.run(FastAPI())
+
+    assert warmup.ready.is_set()
+    assert warmup.steps["reference_data"]["error"] == "RuntimeError: database is down"
+
+
+def test_billing_plans_are_cached_per_organisation():
+    org_id, other_org_id = str(uuid7()), str(uuid7())
+    plans = [
+        BillingPlan(id=str(uuid7()), organisation_id=org_id, name="Basic", price=10,
+                    currency="NGN", duration="monthly", features=["a"]),
+        BillingPlan(id=str(uuid7()), organisation_id=org_id, name="Pro", price=20,
+                    currency="NGN", duration="monthly", features=["b"]),
+        BillingPlan(id=str(uuid7()), organisation_id=other_org_id, name="Basic", price=15,
+                    currency="NGN", duration="monthly", features=["a"]),
+    ]
+    db = MagicMock()
+    db.query.return_value.all.return_value = plans
+
+    billing_plan_service.prime_cache(db)
+    db.reset_mock()
+
+    cached = billing_plan_service.fetch_all_cached(db, org_id)
+    assert [plan["name"] for plan in cached] == ["Basic", "Pro"]
+    db.query.assert_not_called()
+
+    db.get.return_value = plans[0]
+    billing_plan_service.delete(db, plans[0].id)
+    assert len(billing_plans_cache) == 1
+
+
+def test_new_categories_invalidate_the_cache(session_factory):
+    with session_factory() as db:
+        assert len(ProductCategoryService.fetch_all_cached(db)) == 1
+        ProductCategoryService.create(db, MagicMock(model_dump=lambda: {"name": "Games"}), None)
+        assert len(product_categories_cache) == 0
+        assert len(ProductCategoryService.fetch_all_cached(db)) == 2
+
+
+def test_change_in_another_worker_invalidates(session_factory):
+    with session_factory() as db:
+        assert len(ProductCategoryService.fetch_all_cached(db)) == 1
+
+    # another worker adds a category, without access to this cache
+    with session_factory() as db:
+        db.add(ProductCategory(id=str(uuid7()), name="Games"))
+        product_categories_cache.bump(db)
+        db.commit()
+
+    with session_factory() as db:
+        assert len(ProductCategoryService.fetch_all_cached(db)) == 2
+
+
+def test_ready_endpoint(monkeypatch):
+    warmup = Warmup()
+    monkeypatch.setattr("main.warmup", warmup)
+    client = TestClient(app)
+
+    response = client.get("/ready")
+    assert response.status_code == 503
+    assert response.json() == {"ready": False, "steps": {}}
+
+    warmup.ready.set()
+    assert client.get("/ready").status_code == 200